@@ -0,0 +1,95 @@
+"""
+Certificate status classification benchmark.
+
+Compares the previous per-row classification (pd.to_datetime(...).date() in an .apply)
+with the vectorized classify_expiry() on a synthetic registry, and optionally times the
+SQL form (expiry_status_sql) inside PostgreSQL over generate_series.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_cert_status.py --rows 100000 [--sql]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cert_status import classify_expiry, expiry_status_sql  # noqa: E402
+
+
+def get_status_per_row(expiry_date):
+    """The per-row classifier previously used by the welder qualification tab."""
+    if pd.isna(expiry_date) or expiry_date is None:
+        return "Permanent / No Expiry"
+    expiry_date = pd.to_datetime(expiry_date).date()
+    today = datetime.now().date()
+    if expiry_date < today:
+        return "Expired"
+    elif expiry_date < today + timedelta(days=30):
+        return "Expiring Soon"
+    return "Valid"
+
+
+def make_registry(rows, seed=0):
+    """Expiry dates from a year ago to three years ahead as date objects (as read from the DB), 5% NULL."""
+    rng = np.random.default_rng(seed)
+    offsets = rng.integers(-365, 3 * 365, size=rows)
+    dates = [date.today() + timedelta(days=int(d)) for d in offsets]
+    for i in rng.choice(rows, size=rows // 20, replace=False):
+        dates[i] = None
+    return pd.Series(dates, dtype=object)
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--sql", action="store_true", help="Also time the SQL expression (uses db.DB_CONFIG)")
+    args = parser.parse_args()
+
+    expiry = make_registry(args.rows)
+
+    t_row, by_row = timed(lambda: expiry.apply(get_status_per_row), repeat=1)
+    t_vec, vectorized = timed(lambda: classify_expiry(expiry))
+    assert (by_row == vectorized.astype(str)).all(), "classifiers disagree"
+
+    print(f"rows: {args.rows}")
+    print(f"per-row apply     : {t_row * 1000:10.1f} ms")
+    print(f"classify_expiry   : {t_vec * 1000:10.1f} ms  ({t_row / t_vec:.0f}x)")
+    print(vectorized.value_counts().to_string())
+
+    if args.sql:
+        from psycopg2 import sql
+        from db import connect_db
+
+        conn = connect_db()
+        query = sql.SQL("""
+            SELECT {status} AS status, COUNT(*)
+            FROM (
+                SELECT CASE WHEN random() < 0.05 THEN NULL
+                            ELSE CURRENT_DATE + (random() * 1460 - 365)::int END AS expiry
+                FROM generate_series(1, %s)
+            ) registry
+            GROUP BY 1
+        """).format(status=expiry_status_sql("expiry"))
+        with conn.cursor() as cur:
+            t_sql, _ = timed(lambda: (cur.execute(query, (args.rows,)), cur.fetchall()))
+        conn.close()
+        print(f"SQL CASE (incl. row generation): {t_sql * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
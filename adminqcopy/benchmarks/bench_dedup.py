@@ -0,0 +1,111 @@
+"""
+Near-duplicate certificate detection benchmark.
+
+Builds re-scan / phone-photo style variants of the first page of every sample certificate in
+'HSL documents/' and reports, for the dHash lookup in cert_dedup.py:
+  - the duplicate hit rate of the variants against an index of the originals,
+  - false matches between different certificates,
+  - hash + lookup time (index padded with random hashes to --index-size),
+  - model time saved per upload batch, given the average extraction time it replaces.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_dedup.py --index-size 50000 --extraction-time 8.0
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+
+from cert_dedup import (  # noqa: E402
+    DUPLICATE_MAX_DISTANCE, dhash, first_page_gray, first_page_hash, hamming_distances
+)
+
+DOCS_DIR = os.path.join(APP_DIR, "HSL documents")
+
+
+def variants(pdf_bytes, rng):
+    """Grayscale first-page variants of one certificate: (name, image array)."""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page = doc.load_page(0)
+        jpeg = page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5)).tobytes("jpeg", jpg_quality=40)
+        rotated = page.get_pixmap(matrix=fitz.Matrix(1.2, 1.2).prerotate(1.5)).tobytes("png")
+
+    scan = first_page_gray(jpeg, "image/jpeg")
+    # Photo: page on a darker background, exposure change and sensor noise
+    photo = np.pad(scan, ((40, 60), (30, 50)), constant_values=235).astype(np.float64) * 0.9
+    photo = np.clip(photo + rng.normal(0, 8, size=photo.shape), 0, 255).astype(np.uint8)
+    return [
+        ("jpeg re-scan", scan),
+        ("phone photo", photo),
+        ("rotated 1.5 deg", first_page_gray(rotated, "image/png")),
+        ("cropped edges", scan[15:-10, 12:-8])
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-size", type=int, default=50_000, help="Fingerprints in the lookup index")
+    parser.add_argument("--extraction-time", type=float, default=8.0, help="Average OCR+LLM time per certificate (s)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    docs = sorted(glob.glob(os.path.join(DOCS_DIR, "*.pdf")))
+    originals, hash_times = [], []
+    for path in docs:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        start = time.perf_counter()
+        originals.append(first_page_hash(pdf_bytes, "application/pdf"))
+        hash_times.append(time.perf_counter() - start)
+
+    # Index: the originals followed by random fingerprints of other certificates
+    filler = rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, size=max(args.index_size - len(docs), 0))
+    index = np.concatenate([np.array(originals, dtype=np.int64), filler])
+
+    print(f"== {len(docs)} certificates, index of {len(index)} fingerprints, max distance {DUPLICATE_MAX_DISTANCE}")
+    print(f"   {'variant':<18}{'hits':>8}{'max dist':>10}")
+    results, lookup_times = {}, []
+    for doc_idx, path in enumerate(docs):
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        for name, gray in variants(pdf_bytes, rng):
+            start = time.perf_counter()
+            distances = hamming_distances(dhash(gray), index)
+            best = int(np.argmin(distances))
+            lookup_times.append(time.perf_counter() - start)
+            hit = best == doc_idx and distances[best] <= DUPLICATE_MAX_DISTANCE
+            results.setdefault(name, []).append((hit, int(distances[doc_idx])))
+
+    total_hits = 0
+    for name, rows in results.items():
+        hits = sum(hit for hit, _ in rows)
+        total_hits += hits
+        print(f"   {name:<18}{hits:>4}/{len(rows):<3}{max(d for _, d in rows):>10}")
+
+    pairwise = [
+        int(hamming_distances(a, [b])[0])
+        for i, a in enumerate(originals) for b in originals[i + 1:]
+    ]
+    false_matches = sum(d <= DUPLICATE_MAX_DISTANCE for d in pairwise)
+    uploads = sum(len(rows) for rows in results.values())
+
+    print(f"   hit rate: {total_hits / uploads:.0%} ({total_hits}/{uploads})")
+    print(f"   false matches between different certificates: {false_matches}/{len(pairwise)} "
+          f"(closest pair {min(pairwise)} bits)")
+    print(f"   first-page hash p50: {np.median(hash_times) * 1000:.1f} ms | "
+          f"lookup p50: {np.median(lookup_times) * 1000:.2f} ms")
+    saved = total_hits * args.extraction_time - uploads * (np.median(hash_times) + np.median(lookup_times))
+    print(f"   model time saved on these {uploads} uploads: {saved:.1f}s "
+          f"(at {args.extraction_time}s per extraction)")
+
+
+if __name__ == "__main__":
+    main()
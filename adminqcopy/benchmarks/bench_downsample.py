@@ -0,0 +1,125 @@
+"""
+Chart downsampling benchmark.
+
+1. Engine cost per million points: downsample() of --points simulated 1 kHz voltage samples to
+   2,000 points in min-max and LTTB (min-max preselection + LTTB) mode, plus plain LTTB
+   without the preselection for reference.
+2. Zoom pyramid: build time of the levels for a full device-hour of voltage, the incremental
+   update after one more 1 s frame, and the warm latency of read_downsampled() for the
+   dashboard's chart windows over --hours of stored data.
+
+The store is written to a temporary directory.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_downsample.py --points 10000000 --hours 2
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import sensor_store  # noqa: E402
+import sensor_pyramid  # noqa: E402
+from downsample import MAX_CHART_POINTS, MODE_LTTB, MODE_MINMAX, downsample, lttb_indices  # noqa: E402
+from sensor_ingest import encode_frame, ingest_frame  # noqa: E402
+from edge_simulator import device_frames  # noqa: E402
+
+WINDOWS = [1, 10, 60, 600, 3600]
+DEVICE = "DEV101"
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def bench_engine(points):
+    gen = device_frames(DEVICE, 0, batch_seconds=points / 1000, seed=0)
+    y = next(gen)[1]["voltage"][1].astype(np.float64)
+    t = np.arange(len(y), dtype=np.float64)
+    print(f"== engine: {len(y):,} points -> {MAX_CHART_POINTS}")
+    for label, fn in [
+        ("min-max", lambda: downsample(t, y, MAX_CHART_POINTS, MODE_MINMAX)),
+        ("lttb (min-max preselect)", lambda: downsample(t, y, MAX_CHART_POINTS, MODE_LTTB)),
+        ("lttb (plain)", lambda: lttb_indices(t, y, MAX_CHART_POINTS)),
+    ]:
+        seconds, _ = best_of(fn, repeat=3)
+        print(f"   {label:<26}{seconds * 1000:9.1f} ms | {seconds * 1000 / (len(y) / 1e6):7.2f} ms per million points")
+
+
+def bench_pyramid(hours):
+    end_ns = (time.time_ns() // sensor_store.NS_PER_HOUR) * sensor_store.NS_PER_HOUR - 10**9
+    start_ns = end_ns - int(hours * 3600) * 10**9
+    gen = device_frames(DEVICE, start_ns, seed=0)
+    start = time.perf_counter()
+    for _ in range(int(hours * 3600)):
+        ingest_frame(encode_frame(DEVICE, *next(gen)))
+    print(f"== pyramid: {hours} h of 1 kHz voltage + 100 Hz IMU stored in {time.perf_counter() - start:.1f}s")
+
+    hour = sensor_store.hour_key(end_ns - 1)
+    index = sensor_store.load_index(DEVICE, hour, "voltage")
+    saved = os.path.join(sensor_store.partition_dir(DEVICE, hour), "voltage.pyramid.npz")
+
+    def build(keep_saved):
+        sensor_pyramid._pyramid_cache.clear()
+        if not keep_saved and os.path.exists(saved):
+            os.remove(saved)
+        return sensor_pyramid.partition_pyramid(DEVICE, hour, "voltage", index)
+
+    n = int(index["count"].sum())
+    seconds, _ = best_of(lambda: build(keep_saved=False), repeat=3)
+    print(f"   build, one device-hour ({n:,} samples)   {seconds * 1000:8.1f} ms")
+    seconds, _ = best_of(lambda: build(keep_saved=True), repeat=3)
+    print(f"   load of the saved levels (closed hour)        {seconds * 1000:8.1f} ms")
+    levels = sensor_pyramid.partition_pyramid(DEVICE, hour, "voltage", index)
+    size = sum(level.nbytes for level in levels)
+    print(f"   levels: {', '.join(f'{len(level):,}' for level in levels)} bins | "
+          f"{size / 1e6:.2f} MB ({size / (n * 4) * 100:.0f}% of the raw data)")
+
+    ingest_frame(encode_frame(DEVICE, *next(gen)))  # one more second, now in the open hour
+    open_hour = sensor_store.hour_key(end_ns + 10**9)
+    sensor_pyramid.partition_pyramid(DEVICE, open_hour, "voltage")
+    ingest_frame(encode_frame(DEVICE, *next(gen)))
+    start = time.perf_counter()
+    sensor_pyramid.partition_pyramid(DEVICE, open_hour, "voltage")
+    print(f"   incremental update after a 1 s frame   {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    latest = sensor_store.latest_timestamp(DEVICE, "voltage")
+    print(f"== read_downsampled, warm (max {MAX_CHART_POINTS} points per trace)")
+    for window in WINDOWS + [int(hours * 3600)]:
+        for mode in (MODE_MINMAX, MODE_LTTB):
+            seconds, (traces, info) = best_of(lambda: sensor_pyramid.read_downsampled(
+                DEVICE, "voltage", latest - window * 10**9, latest, MAX_CHART_POINTS, mode))
+            points = len(traces["voltage"][1])
+            print(f"   {window:>6} s {mode:<7}{info['samples']:>12,} samples -> {points:>5} points "
+                  f"(level {info['level']}) {seconds * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=10_000_000)
+    parser.add_argument("--hours", type=float, default=2)
+    args = parser.parse_args()
+
+    bench_engine(args.points)
+    tmp_dir = tempfile.mkdtemp(prefix="downsample_bench_")
+    try:
+        sensor_store.SENSOR_DATA_DIR = tmp_dir
+        bench_pyramid(args.hours)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Weld record export benchmark.
+
+Fills weld_details in a scratch schema (bench_export, dropped at the end) with --rows records
+over 3 years and 10 contractors, then exports them all:
+1. Streamed: GET /export/<token> from an ingest server on a free port (named cursor, chunked
+   response), read and discarded by a client in this process; CSV and, with pyarrow, Parquet.
+2. Materialized: the way fetch_weld_details() reads (fetchall() into one DataFrame), then
+   to_csv() of the whole frame.
+For each: time, rows per second, file size and the peak memory (RSS, sampled) over the process
+baseline before the export. The streamed export runs first so the materialized one cannot leave
+freed memory behind for it. Also times one month of one contractor (date-range index).
+
+Usage (from the adminqcopy/ directory; needs the PostgreSQL database):
+    python benchmarks/bench_export.py --rows 1000000
+"""
+import argparse
+import datetime
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import pandas as pd
+import psutil
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import db  # noqa: E402
+from db import connect_db  # noqa: E402
+from sensor_ingest import make_ingest_server  # noqa: E402
+from weld_export import EXPORT_COLUMNS, create_export_link, export_url  # noqa: E402
+from tabs.fabrication_team import create_weld_details_table  # noqa: E402
+from weld_partitions import create_month_partitions, month_start  # noqa: E402
+
+BENCH_SCHEMA = "bench_export"
+
+
+def fill(rows):
+    conn = connect_db()
+    with conn.cursor() as cur:
+        create_month_partitions(cur, [month_start(datetime.date(2022, 1, 1), k) for k in range(36)])
+        cur.execute("""
+            INSERT INTO weld_details (uniq_id, device_name, deviceid, contractor_name, block_number, welder_name,
+                badge_number, material_type, thickness, type_of_weld, no_of_passes, weld_length, current, voltage,
+                travel_speed, filler_material, wps_code, remarks, job_completed, created_at)
+            SELECT lpad(to_hex(i), 5, '0'), 'Edge Device ' || (i %% 500), 'DEV' || (100 + i %% 500),
+                   'Contractor ' || (i %% 10 + 1), 'Block ' || (i %% 900 + 100), 'Welder ' || (i %% 200),
+                   'W' || (100 + i %% 200), (ARRAY['Carbon Steel', 'Stainless Steel', 'Alloy Steel'])[i %% 3 + 1],
+                   (ARRAY[6, 8, 10, 12])[i %% 4 + 1], (ARRAY['FCAW', 'SAW', 'SMAW', 'GMAW'])[i %% 4 + 1], i %% 4 + 1,
+                   (ARRAY[300, 450, 600, 800])[i %% 4 + 1], 150 + i %% 110, 20 + i %% 10, 200 + i %% 200,
+                   'ER70S-6', 'WPS-' || lpad((i %% 49 + 1)::text, 3, '0'), CASE WHEN i %% 7 = 0 THEN 'Rework, repaired' END,
+                   'YES', timestamp '2022-01-01' + i * (interval '3 years' / %s)
+            FROM generate_series(1, %s) i
+        """, (rows, rows))
+        cur.execute("ANALYZE weld_details")
+    conn.commit()
+    conn.close()
+
+
+def measure(label, rows, run):
+    """Runs run() -> file size in bytes while sampling the RSS; prints one result line."""
+    process = psutil.Process()
+    baseline, peak, done = process.memory_info().rss, [0], threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], process.memory_info().rss)
+            time.sleep(0.02)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    size = run()
+    seconds = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    print(f"   {label:<22}{seconds:6.1f} s | {rows / seconds:9,.0f} rows/s | {size / 1e6:6.0f} MB | "
+          f"peak memory +{max(peak[0] - baseline, 0) / 1e6:5.0f} MB")
+
+
+def download(url):
+    """Reads a streamed export and returns its size and the CSV line count (None for Parquet)."""
+    size, lines = 0, 0
+    with urllib.request.urlopen(url) as response:
+        while True:
+            chunk = response.read(1 << 20)
+            if not chunk:
+                break
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+    return size, lines
+
+
+def materialized():
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM weld_details ORDER BY created_at, id")
+            df = pd.DataFrame(cur.fetchall(), columns=EXPORT_COLUMNS)
+    finally:
+        conn.close()
+    data = df.to_csv(index=False).encode("utf-8")
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = connect_db()
+    if conn is None:
+        print("== database: not reachable, skipped")
+        return
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE; CREATE SCHEMA {BENCH_SCHEMA}")
+    conn.commit()
+    conn.close()
+    db.DB_CONFIG["options"] = f"-c search_path={BENCH_SCHEMA}"
+    server = None
+    try:
+        create_weld_details_table()
+        start = time.perf_counter()
+        fill(args.rows)
+        print(f"== {args.rows:,} weld records inserted in {time.perf_counter() - start:.1f} s")
+
+        server = make_ingest_server("127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        lines = {}
+
+        def streamed(export_format, filters=None):
+            def run():
+                url = export_url(create_export_link(filters or {}, export_format), "127.0.0.1", port)
+                size, lines[export_format] = download(url)
+                return size
+            return run
+
+        measure("streamed CSV", args.rows, streamed("CSV"))
+        assert lines["CSV"] == args.rows + 1, lines
+        try:
+            measure("streamed Parquet", args.rows, streamed("Parquet"))
+        except ValueError as e:
+            print(f"   streamed Parquet      skipped: {e}")
+        measure("fetchall + to_csv", args.rows, materialized)
+
+        filters = {"start_date": datetime.date(2023, 6, 1), "end_date": datetime.date(2023, 6, 30),
+                   "contractor": "Contractor 3"}
+        month = args.rows // 36 // 10
+        start = time.perf_counter()
+        size, _ = download(export_url(create_export_link(filters, "CSV"), "127.0.0.1", port))
+        print(f"   one month, one contractor (~{month:,} rows): {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"{size / 1e6:.1f} MB")
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        db.DB_CONFIG.pop("options", None)
+        conn = connect_db()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Certificate extraction benchmark.
+
+Runs the sample certificates in 'HSL documents/' through the welder pipeline
+(process_document: OCR -> pruning -> Ollama) and the machine pipeline
+(process_file_for_ocr -> call_machine_ocr_api) against local replay servers, then reports
+p50/p95 per stage (ocr_time, llm_time, total_time) and per-field accuracy against
+benchmarks/golden_labels.json.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_extraction.py --repeat 5 --ocr-latency 2.0 --llm-latency 1.5 --gradio-latency 3.0
+    python benchmarks/bench_extraction.py --record    # capture recordings from the live endpoints
+
+Documents without a recording are listed as skipped; run --record on the plant network to
+capture them. A welder recording holding only the OCR response (no "llm" reply) has its OCR stage
+timed, but no extraction to score.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+
+from tabs import welder_qualification as wq  # noqa: E402
+from tabs import machine_calibration as mc  # noqa: E402
+from resilience import resilient_post  # noqa: E402
+from stub_servers import Latency, ReplayServer, ReplayGradioClient  # noqa: E402
+
+DOCS_DIR = os.path.join(APP_DIR, "HSL documents")
+RECORDINGS_DIR = os.path.join(BENCH_DIR, "recordings")
+GOLDEN_PATH = os.path.join(BENCH_DIR, "golden_labels.json")
+STAGES = ["ocr_time", "llm_time", "total_time"]
+
+
+class BenchUpload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile (name, type, getvalue())."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+        self.type = "application/pdf"
+
+
+def recording_path(doc_name):
+    return os.path.join(RECORDINGS_DIR, os.path.splitext(doc_name)[0] + ".json")
+
+
+def load_recording(doc_name):
+    path = recording_path(doc_name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_recording(doc_name, recording):
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    with open(recording_path(doc_name), "w", encoding="utf-8") as f:
+        json.dump(recording, f, ensure_ascii=False)
+
+
+def _norm(value):
+    return re.sub(r"[^a-z0-9]", "", str(value).lower())
+
+
+def field_matches(field, expected, actual):
+    """Dates are compared as dates (day-first), text fields as normalised containment."""
+    missing = actual is None or str(actual).strip().lower() in ("", "null", "none", "n/a")
+    if expected is None:
+        return missing
+    if missing:
+        return False
+    if "date" in field.lower() or "valid" in field.lower():
+        parsed = pd.to_datetime(str(actual).replace("|", "").strip(), dayfirst=True, errors="coerce")
+        return not pd.isna(parsed) and parsed.date().isoformat() == expected
+    return _norm(expected) in _norm(actual)
+
+
+def ocr_payload(upload):
+    return {"file": base64.b64encode(upload.getvalue()).decode("ascii"), "fileType": 0, "visualize": False}
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+# --- Recording ---
+
+def record(golden):
+    """Captures live OCR/Ollama/gradio responses for every labelled document."""
+    for doc_name in golden["welder"]:
+        upload = BenchUpload(os.path.join(DOCS_DIR, doc_name))
+        ocr_json = resilient_post(wq.WELDER_OCR_ENDPOINT, wq.OCR_API_URL, ocr_payload(upload)).json()
+        prompt_text, _ = wq.prune_ocr_lines(ocr_json.get("result", {}).get("ocrResults", []))
+        recording = load_recording(doc_name)
+        recording.update({"ocr": ocr_json, "llm": wq.query_ollama(prompt_text)})
+        save_recording(doc_name, recording)
+        print(f"recorded welder  {doc_name}")
+
+    for doc_name in golden["machine"]:
+        upload = BenchUpload(os.path.join(DOCS_DIR, doc_name))
+        img_bytes, mime_type, _ = mc.process_file_for_ocr(upload)
+        data, _ = mc.call_machine_ocr_api(img_bytes, doc_name, mime_type)
+        if data.get("raw_text") is None:
+            print(f"FAILED  machine {doc_name}")
+            continue
+        recording = load_recording(doc_name)
+        recording["gradio"] = data["raw_text"]
+        save_recording(doc_name, recording)
+        print(f"recorded machine {doc_name}")
+
+
+# --- Benchmark ---
+
+def bench_welder(golden, server, repeat):
+    timings = {stage: [] for stage in STAGES}
+    results, skipped, ocr_only = [], [], []
+    wq.OCR_API_URL, wq.OLLAMA_CHAT_URL = server.ocr_url, server.chat_url
+
+    for doc_name, expected in golden.items():
+        recording = load_recording(doc_name)
+        if "ocr" not in recording:
+            skipped.append(doc_name)
+            continue
+        server.load(recording)
+        if "llm" not in recording:
+            # No Ollama reply recorded: time the OCR call and the pruning only
+            payload = ocr_payload(BenchUpload(os.path.join(DOCS_DIR, doc_name)))
+            for _ in range(repeat):
+                start = time.time()
+                ocr_json = resilient_post(wq.WELDER_OCR_ENDPOINT, wq.OCR_API_URL, payload).json()
+                wq.prune_ocr_lines(ocr_json.get("result", {}).get("ocrResults", []))
+                timings["ocr_time"].append(round(time.time() - start, 2))
+            ocr_only.append(doc_name)
+            continue
+        data = None
+        for _ in range(repeat):
+            data, metrics = wq.process_document(BenchUpload(os.path.join(DOCS_DIR, doc_name)))
+            if metrics:
+                for stage in STAGES:
+                    timings[stage].append(metrics[stage])
+        results.append((doc_name, expected, data or {}))
+    return timings, results, skipped, ocr_only
+
+
+def bench_machine(golden, client, repeat):
+    timings = {stage: [] for stage in STAGES}
+    results, skipped = [], []
+    mc._ocr_client = client
+
+    for doc_name, expected in golden.items():
+        recording = load_recording(doc_name)
+        if "gradio" not in recording:
+            skipped.append(doc_name)
+            continue
+        client.load(recording)
+        data = None
+        for _ in range(repeat):
+            start = time.time()
+            img_bytes, mime_type, _ = mc.process_file_for_ocr(BenchUpload(os.path.join(DOCS_DIR, doc_name)))
+            data, ocr_time = mc.call_machine_ocr_api(img_bytes, doc_name, mime_type)
+            timings["ocr_time"].append(round(ocr_time, 2))
+            timings["total_time"].append(round(time.time() - start, 2))
+        results.append((doc_name, expected, data or {}))
+    return timings, results, skipped
+
+
+def report(pipeline, timings, results, skipped, ocr_only=()):
+    print(f"\n== {pipeline} pipeline ({len(results) + len(ocr_only)} documents, {len(skipped)} skipped)")
+    for doc_name in skipped:
+        print(f"   skipped (no recording): {doc_name}")
+    for doc_name in ocr_only:
+        print(f"   OCR stage only (no LLM recording, not scored): {doc_name}")
+
+    print(f"   {'stage':<12}{'n':>5}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for stage, values in timings.items():
+        if values:
+            print(f"   {stage:<12}{len(values):>5}{percentile(values, 50):>10}{percentile(values, 95):>10}")
+
+    if results:
+        fields = list(results[0][1].keys())
+        print(f"   {'field':<38}{'accuracy':>10}")
+        for field in fields:
+            hits = sum(field_matches(field, expected[field], data.get(field)) for _, expected, data in results)
+            print(f"   {field:<38}{hits:>4}/{len(results):<5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per document")
+    parser.add_argument("--ocr-latency", type=float, default=0.0, help="Replay latency of the OCR service (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Replay latency of Ollama (s)")
+    parser.add_argument("--gradio-latency", type=float, default=0.0, help="Replay latency of the gradio OCR app (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter added to every latency (s)")
+    parser.add_argument("--record", action="store_true", help="Record responses from the live endpoints instead")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        golden = json.load(f)
+
+    if args.record:
+        record(golden)
+        return
+
+    with ReplayServer(Latency(args.ocr_latency, args.jitter), Latency(args.llm_latency, args.jitter)) as server:
+        report("welder", *bench_welder(golden["welder"], server, args.repeat))
+    client = ReplayGradioClient(Latency(args.gradio_latency, args.jitter))
+    report("machine", *bench_machine(golden["machine"], client, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Dashboard refresh benchmark: self-refreshing cards (fragments) vs full-page reruns.
+
+Serves render_dashboard() of one device from a headless Streamlit server, with edge_simulator.py
+frames written to a temporary sensor store every second, and connects to it over the websocket
+the browser uses. For --seconds each:
+
+    fragments   answers the server's auto-rerun requests the way the browser does, so only the
+                Running Tasks, Voltage and IMU cards rerun, each on its own interval
+    full        reruns the whole script every CHART_REFRESH_SECONDS, which is what keeping the
+                cards live through st.rerun() costs (in app.py the other nine tabs rerun too)
+
+and reports per refresh the bytes sent to the browser and the server CPU time, plus the totals
+per second of dashboard open.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_fragments.py --seconds 20 --window "10 min"
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+import requests
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+import sensor_store  # noqa: E402
+from sensor_ingest import encode_frame, ingest_frame  # noqa: E402
+from edge_simulator import device_frames  # noqa: E402
+from tabs.fabrication_team import CHART_REFRESH_SECONDS, CHART_WINDOWS  # noqa: E402
+
+DEVICE_NAME = "Edge Device 1"
+DEVICE_ID = "DEV101"
+
+APP_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import streamlit as st
+import sensor_store
+sensor_store.SENSOR_DATA_DIR = {store!r}
+from tabs import fabrication_team
+
+# The device registry is not part of the measurement (no database needed)
+fabrication_team.load_device = lambda device_name: {{
+    'deviceName': {device_name!r}, 'deviceId': {device_id!r}, 'contractor': 'Contractor 1',
+    'welderBadge': 'W101', 'machineSerial': 'WM-101', 'online': True, 'lastSeen': None
+}}
+fabrication_team.initialize_state()
+st.session_state.setdefault('voltage_window', {window!r})
+fabrication_team.render_dashboard({device_name!r})
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app_path, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app_path, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/_stcore/health", timeout=1).ok:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Streamlit server did not start")
+
+
+def feed_device(stop, start_ns):
+    """Writes one second of simulated frames per second (after backfilling up to now)."""
+    gen = device_frames(DEVICE_ID, start_ns, seed=0)
+    next_ns = start_ns
+    while not stop.is_set():
+        while next_ns <= time.time_ns() - 10**9:
+            t0_ns, streams = next(gen)
+            ingest_frame(encode_frame(DEVICE_ID, t0_ns, streams))
+            next_ns = t0_ns + 10**9
+        stop.wait(0.1)
+
+
+def rerun_msg(page_hash, fragment_id=""):
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_script_hash = page_hash
+    if fragment_id:
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.is_auto_rerun = True
+    return msg.SerializeToString()
+
+
+async def read_run(ws, run):
+    """Reads the messages of one script or fragment run; returns the bytes received."""
+    total = 0
+    while True:
+        raw = await ws.recv()
+        total += len(raw)
+        msg = ForwardMsg()
+        msg.ParseFromString(raw)
+        kind = msg.WhichOneof("type")
+        if kind == "new_session":
+            run["page_hash"] = msg.new_session.main_script_hash
+        elif kind == "auto_rerun":
+            run["intervals"][msg.auto_rerun.fragment_id] = msg.auto_rerun.interval
+        elif kind == "delta" and msg.delta.fragment_id and msg.delta.new_element.WhichOneof("type") == "heading":
+            run["labels"].setdefault(msg.delta.fragment_id, msg.delta.new_element.heading.body)
+        elif kind == "script_finished":
+            return total
+
+
+async def run_phase(url, process, mode, seconds):
+    """Refreshes the dashboard for 'seconds'; returns ({label: [(bytes, cpu_s)]}, cpu_s, elapsed)."""
+    run = {"page_hash": "", "intervals": {}, "labels": {}}
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+        await ws.send(rerun_msg(""))
+        first_bytes = await read_run(ws, run)  # initial page load
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if mode == "fragments":
+            schedule = {fid: interval for fid, interval in run["intervals"].items()}
+        else:
+            schedule = {"": CHART_REFRESH_SECONDS}
+        due = {fid: start + interval for fid, interval in schedule.items()}
+        stats = {}
+        cpu_start = sum(process.cpu_times()[:2])
+        while True:
+            fid = min(due, key=due.get)
+            if due[fid] > start + seconds:
+                break
+            await asyncio.sleep(max(0.0, due[fid] - loop.time()))
+            cpu_before = sum(process.cpu_times()[:2])
+            await ws.send(rerun_msg(run["page_hash"], fid))
+            nbytes = await read_run(ws, run)
+            label = run["labels"].get(fid, fid) if fid else "whole page"
+            stats.setdefault(label, []).append((nbytes, sum(process.cpu_times()[:2]) - cpu_before))
+            due[fid] += schedule[fid]
+        cpu = sum(process.cpu_times()[:2]) - cpu_start
+        return first_bytes, stats, cpu, loop.time() - start
+
+
+def report(mode, first_bytes, stats, cpu, elapsed):
+    print(f"== {mode} (initial page load {first_bytes / 1e3:.1f} kB)")
+    total_bytes = 0
+    for label, runs in stats.items():
+        nbytes = sum(b for b, _ in runs)
+        total_bytes += nbytes
+        print(f"   {label:<34}{len(runs):>4} refreshes | {nbytes / len(runs) / 1e3:8.1f} kB | "
+              f"{sum(c for _, c in runs) / len(runs) * 1000:6.1f} ms CPU per refresh")
+    print(f"   per second open: {total_bytes / elapsed / 1e3:.1f} kB sent | server CPU {cpu / elapsed * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=20, help="duration of each phase")
+    parser.add_argument("--window", default="10 s", choices=list(CHART_WINDOWS), help="voltage chart window")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="fragment_bench_")
+    stop = threading.Event()
+    server = None
+    try:
+        sensor_store.SENSOR_DATA_DIR = os.path.join(tmp_dir, "sensor_data")
+        backfill_ns = (time.time_ns() // 10**9 - CHART_WINDOWS[args.window] - 5) * 10**9
+        feeder = threading.Thread(target=feed_device, args=(stop, backfill_ns), daemon=True)
+        feeder.start()
+        while sensor_store.latest_timestamp(DEVICE_ID, "voltage") is None or \
+                sensor_store.latest_timestamp(DEVICE_ID, "voltage") < time.time_ns() - 2 * 10**9:
+            time.sleep(0.1)
+
+        app_path = os.path.join(tmp_dir, "dashboard_app.py")
+        with open(app_path, "w") as f:
+            f.write(APP_SCRIPT.format(root=ROOT_DIR, store=sensor_store.SENSOR_DATA_DIR,
+                                      window=args.window, device_name=DEVICE_NAME, device_id=DEVICE_ID))
+        port = free_port()
+        server = start_server(app_path, port)
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        print(f"dashboard of {DEVICE_NAME} ({DEVICE_ID}), voltage window {args.window}, {args.seconds:.0f}s per phase")
+        for mode in ("fragments", "full"):
+            report(mode, *asyncio.run(run_phase(url, psutil.Process(server.pid), mode, args.seconds)))
+    finally:
+        stop.set()
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
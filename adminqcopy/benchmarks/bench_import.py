@@ -0,0 +1,180 @@
+"""
+Bulk weld record import benchmark.
+
+Writes a CSV of --rows synthetic historical weld records (--bad-share of them invalid: a
+fractional thickness, a missing device ID or an unreadable date; 10% with their own unique ID)
+and imports it with import_weld_details() into weld_details in a scratch schema
+(bench_import, dropped at the end). Reports rows per second, the rejected rows found and the
+peak memory of the import over the process baseline (RSS, sampled), and compares with storing
+the records one at a time the way the registration form does (a connection and unique ID check
+per ID, then a connection, lookup and INSERT per record), timed on --single-rows rows.
+
+Usage (from the adminqcopy/ directory; needs the PostgreSQL database):
+    python benchmarks/bench_import.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psutil
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import db  # noqa: E402
+from db import connect_db  # noqa: E402
+from weld_import import import_weld_details  # noqa: E402
+from tabs.fabrication_team import create_weld_details_table, generate_unique_id  # noqa: E402
+
+BENCH_SCHEMA = "bench_import"
+
+
+def write_csv(path, rows, bad_share, seed=0):
+    """Synthetic weld log; returns the number of invalid rows written."""
+    rng = np.random.default_rng(seed)
+    device = rng.integers(1, 501, rows)
+    created = pd.Timestamp("2021-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 3 * 365 * 86400, rows)), unit="s")
+    df = pd.DataFrame({
+        "Device ID": "DEV" + pd.Series(device + 100).astype(str),
+        "Device Name": "Edge Device " + pd.Series(device).astype(str),
+        "Contractor": "Contractor " + pd.Series(device % 10 + 1).astype(str),
+        "Block No": "Block " + pd.Series(rng.integers(100, 999, rows)).astype(str),
+        "Welder": "Welder " + pd.Series(rng.integers(1, 200, rows)).astype(str),
+        "Badge No": "W" + pd.Series(rng.integers(100, 300, rows)).astype(str),
+        "Material": rng.choice(["Carbon Steel", "Stainless Steel", "Alloy Steel"], rows),
+        "Thickness (mm)": rng.choice([6, 8, 10, 12], rows).astype(str),
+        "Weld Type": rng.choice(["FCAW", "SAW", "SMAW", "GMAW"], rows),
+        "Passes": rng.integers(1, 5, rows).astype(str),
+        "Length (mm)": rng.choice([300, 450, 600, 800], rows).astype(str),
+        "Current (A)": rng.integers(150, 260, rows).astype(str),
+        "Voltage (V)": rng.integers(20, 30, rows).astype(str),
+        "Travel Speed": rng.integers(200, 400, rows).astype(str),
+        "Filler Material": rng.choice(["ER70S-6", "E7018", "ER308L"], rows),
+        "WPS Code": "WPS-" + pd.Series(rng.integers(1, 50, rows)).astype(str).str.zfill(3),
+        "Remarks": rng.choice(["", "OK", "Rework, repaired"], rows),
+        "Reg Date": created.strftime("%Y-%m-%d %H:%M:%S"),
+        "uniq_id": "",
+    })
+    # 10% bring their own (distinct) unique ID
+    given = rng.choice(rows, rows // 10, replace=False)
+    letters = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype="S1")
+    ids = np.unique(letters[rng.integers(0, 26, size=(len(given) * 2, 5))].view("S5").ravel())[:len(given)]
+    df.loc[given[:len(ids)], "uniq_id"] = ids.astype(str)
+    bad = rng.choice(rows, int(rows * bad_share), replace=False)
+    kinds = rng.integers(0, 3, len(bad))
+    df.loc[bad[kinds == 0], "Thickness (mm)"] = "12.5"
+    df.loc[bad[kinds == 1], "Device ID"] = ""
+    df.loc[bad[kinds == 2], "Reg Date"] = "31-31-2022"
+    df.to_csv(path, index=False)
+    return len(bad)
+
+
+def store_one(record):
+    """One record the way save_weld_detail() stores a registration."""
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            while True:
+                uniq_id = generate_unique_id()
+                cur.execute("SELECT 1 FROM weld_uniq_ids WHERE uniq_id = %s", (uniq_id,))
+                if cur.fetchone() is None:
+                    break
+    finally:
+        conn.close()
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, job_completed FROM weld_details
+                WHERE deviceid = %s AND uniq_id IS NULL AND job_completed = 'NO'
+                ORDER BY created_at ASC LIMIT 1
+            """, (record["deviceid"],))
+            cur.fetchone()
+            record = dict(record, uniq_id=uniq_id)
+            cur.execute("INSERT INTO weld_uniq_ids (uniq_id) VALUES (%s)", (uniq_id,))
+            cur.execute(f"INSERT INTO weld_details ({', '.join(record)}) VALUES ({', '.join(['%s'] * len(record))})",
+                        list(record.values()))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--bad-share", type=float, default=0.01)
+    parser.add_argument("--single-rows", type=int, default=500)
+    args = parser.parse_args()
+
+    conn = connect_db()
+    if conn is None:
+        print("== database: not reachable, skipped")
+        return
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE; CREATE SCHEMA {BENCH_SCHEMA}")
+    conn.commit()
+    conn.close()
+    db.DB_CONFIG["options"] = f"-c search_path={BENCH_SCHEMA}"
+    tmp_dir = tempfile.mkdtemp(prefix="import_bench_")
+    path = os.path.join(tmp_dir, "weld_log.csv")
+    try:
+        create_weld_details_table()
+        bad = write_csv(path, args.rows, args.bad_share)
+        print(f"== {args.rows:,} records ({os.path.getsize(path) / 1e6:.0f} MB CSV, {bad:,} invalid)")
+
+        process = psutil.Process()
+        baseline, peak, done = process.memory_info().rss, [0], threading.Event()
+
+        def sample():
+            while not done.is_set():
+                peak[0] = max(peak[0], process.memory_info().rss)
+                time.sleep(0.05)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        with open(path, "rb") as f:
+            result = import_weld_details(f, path, seed=0)
+        done.set()
+        sampler.join()
+        assert result["error"] is None, result["error"]
+        print(f"   bulk import     {result['seconds']:6.1f} s | {result['imported'] / result['seconds']:9,.0f} rows/s | "
+              f"{result['imported']:,} imported, {result['rejected']:,} rejected | "
+              f"peak memory +{(peak[0] - baseline) / 1e6:.0f} MB")
+        print("   rejections: " + ", ".join(f"{reason} {n:,}" for reason, n in result["report"]["Reason"].value_counts().items()))
+
+        conn = connect_db()
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*), count(DISTINCT uniq_id) FROM weld_details")
+            total, distinct = cur.fetchone()
+            cur.execute("SELECT count(*) FROM weld_uniq_ids")
+            (registered,) = cur.fetchone()
+        conn.close()
+        assert total == distinct == registered == result["imported"], (total, distinct, registered)
+
+        record = {"deviceid": "DEV101", "device_name": "Edge Device 1", "contractor_name": "Contractor 2",
+                  "thickness": 12, "no_of_passes": 2, "current": 200, "voltage": 24, "job_completed": "YES"}
+        start = time.perf_counter()
+        for _ in range(args.single_rows):
+            store_one(record)
+        per_row = (time.perf_counter() - start) / args.single_rows
+        print(f"   one at a time   {per_row * args.rows / 60:6.1f} min for {args.rows:,} rows (extrapolated) | "
+              f"{1 / per_row:9,.0f} rows/s")
+    finally:
+        db.DB_CONFIG.pop("options", None)
+        conn = connect_db()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
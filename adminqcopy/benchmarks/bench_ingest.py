@@ -0,0 +1,121 @@
+"""
+Sensor ingestion throughput benchmark.
+
+Pre-generates --seconds of frames for --devices simulated edge devices (edge_simulator.py,
+1 kHz voltage + 100 Hz IMU, one frame per second), then measures:
+
+    direct   ingest_frame() in-process from one thread per device (storage cost only)
+    http     the same frames POSTed to the ingestion server (sensor_ingest.py) by one
+             sender thread per device, as the edge devices do
+
+and reports frames/s, samples/s, how many times real time that is for the fleet, bytes on disk
+per sample and per device-hour, and the latency of reading a device's last 10 s back.
+The store is written to a temporary directory.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_ingest.py --devices 50 --seconds 120
+"""
+import argparse
+import os
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import sensor_store  # noqa: E402
+from sensor_ingest import encode_frame, ingest_frame, make_ingest_server  # noqa: E402
+from edge_simulator import VOLTAGE_RATE_HZ, IMU_RATE_HZ, device_frames, device_id_of  # noqa: E402
+
+
+def make_frames(devices, seconds, start_ns):
+    frames = {}
+    for i in range(devices):
+        device_id = device_id_of(i)
+        gen = device_frames(device_id, start_ns, seed=i)
+        frames[device_id] = [encode_frame(device_id, *next(gen)) for _ in range(seconds)]
+    return frames
+
+
+def run_senders(frames, send):
+    """Runs send(device_id, frame) over all frames, one thread per device; returns wall time."""
+    def worker(device_id):
+        for frame in frames[device_id]:
+            send(device_id, frame)
+
+    threads = [threading.Thread(target=worker, args=(device_id,)) for device_id in frames]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def report(label, elapsed, devices, seconds):
+    samples = devices * seconds * (VOLTAGE_RATE_HZ + IMU_RATE_HZ)
+    print(f"{label:<7} {devices * seconds / elapsed:9.0f} frames/s | {samples / elapsed / 1e6:6.2f} M samples/s | "
+          f"{seconds / elapsed:6.1f}x real time for {devices} devices | {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--seconds", type=int, default=120, help="seconds of data per device")
+    args = parser.parse_args()
+
+    start_ns = (time.time_ns() // 10**9 - args.seconds) * 10**9
+    gen_start = time.perf_counter()
+    frames = make_frames(args.devices, args.seconds, start_ns)
+    frame_bytes = sum(len(f) for fs in frames.values() for f in fs)
+    print(f"generated {args.devices} x {args.seconds} frames ({frame_bytes / 1e6:.1f} MB on the wire) "
+          f"in {time.perf_counter() - gen_start:.1f}s")
+
+    tmp_dir = tempfile.mkdtemp(prefix="sensor_bench_")
+    try:
+        sensor_store.SENSOR_DATA_DIR = os.path.join(tmp_dir, "direct")
+        elapsed = run_senders(frames, lambda device_id, frame: ingest_frame(frame))
+        report("direct", elapsed, args.devices, args.seconds)
+
+        sensor_store.SENSOR_DATA_DIR = os.path.join(tmp_dir, "http")
+        token = secrets.token_urlsafe(16)
+        server = make_ingest_server("127.0.0.1", 0, device_token=token)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/frames"
+        sessions = {device_id: requests.Session() for device_id in frames}
+        for session in sessions.values():
+            session.headers["Authorization"] = f"Bearer {token}"
+        elapsed = run_senders(frames, lambda device_id, frame: sessions[device_id].post(url, data=frame).raise_for_status())
+        server.shutdown()
+        report("http", elapsed, args.devices, args.seconds)
+
+        values = args.devices * args.seconds * (VOLTAGE_RATE_HZ + IMU_RATE_HZ * 6)
+        disk = sensor_store.storage_bytes()
+        print(f"on disk: {disk / 1e6:.1f} MB | {disk / values:.2f} bytes per sample and channel | "
+              f"{disk / (args.devices * args.seconds) * 3600 / 1e6:.1f} MB per device-hour")
+
+        # Read-back: last 10 s of voltage of one device, and a check against what was sent
+        device_id = device_id_of(0)
+        timings = []
+        for _ in range(20):
+            start = time.perf_counter()
+            t, v = sensor_store.read_latest(device_id, "voltage", 10)
+            timings.append(time.perf_counter() - start)
+        gen = device_frames(device_id, start_ns, seed=0)
+        sent = np.concatenate([next(gen)[1]["voltage"][1] for _ in range(args.seconds)])
+        ok = len(v) == 10 * VOLTAGE_RATE_HZ and np.array_equal(v[:, 0], sent[-len(v):])
+        print(f"read last 10 s of voltage: {len(v)} samples, p50 {np.median(timings) * 1000:.2f} ms | "
+              f"matches sent data: {ok}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Latest device state benchmark: the latest weld_details registration of a page of devices and of
+the whole fleet.
+
+Writes --rows registrations over --devices devices (spread over three years) to weld_details in a
+scratch schema (bench_latest_state, dropped at the end) and times, with a new connection per
+query as the dashboard makes them:
+
+    per device      the previous get_last_device_id_for_name() + check_last_job_completion_status():
+                    two connections and two ORDER BY created_at DESC LIMIT 1 queries per device
+    DISTINCT ON     one DISTINCT ON (device_name) query over the devices' rows
+    lateral         load_latest_device_states(): one query, a LIMIT 1 index probe per device
+
+for one overview page (DEVICE_PAGE_SIZE devices) and for every device, and prints the query plan
+of load_latest_device_states().
+
+Usage (from the adminqcopy/ directory; needs the PostgreSQL database):
+    python benchmarks/bench_latest_state.py --rows 1000000 --devices 500
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import db  # noqa: E402
+from db import connect_db  # noqa: E402
+from device_registry import DEVICE_PAGE_SIZE  # noqa: E402
+from tabs.fabrication_team import create_weld_details_table, load_latest_device_states  # noqa: E402
+from weld_partitions import create_month_partitions, month_start  # noqa: E402
+
+BENCH_SCHEMA = "bench_latest_state"
+
+
+def previous_latest_state(device_name):
+    """The two per-device lookups the overview / dashboard needed before (one connection each)."""
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT deviceid FROM weld_details WHERE device_name = %s ORDER BY created_at DESC LIMIT 1",
+                        (device_name,))
+            row = cur.fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT job_completed FROM weld_details WHERE deviceid = %s ORDER BY created_at DESC LIMIT 1",
+                        (row[0],))
+            return row[0], cur.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def distinct_on_state(device_names):
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT ON (device_name) device_name, deviceid, job_completed, uniq_id, created_at
+                FROM weld_details WHERE device_name = ANY(%s)
+                ORDER BY device_name, created_at DESC
+            """, (list(device_names),))
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def lateral_state(device_names):
+    load_latest_device_states.clear()
+    return load_latest_device_states(tuple(device_names))
+
+
+def write_rows(rows, devices):
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            start = time.perf_counter()
+            create_month_partitions(cur, [month_start(datetime.date.today(), -k) for k in range(37)])
+            cur.execute("""
+                INSERT INTO weld_details (uniq_id, device_name, deviceid, contractor_name, job_completed, created_at)
+                SELECT chr(65 + i / 456976 %% 26) || chr(65 + i / 17576 %% 26) || chr(65 + i / 676 %% 26)
+                       || chr(65 + i / 26 %% 26) || chr(65 + i %% 26), 'Edge Device ' || (i %% %s + 1), 'DEV' || (i %% %s + 101),
+                       'Contractor ' || (i %% 10 + 1), CASE WHEN i > %s - %s THEN 'NO' ELSE 'YES' END,
+                       now() - (%s - i) * interval '1 second' * (3 * 365 * 86400 / %s)
+                FROM generate_series(1, %s) i
+            """, (devices, devices, rows, devices // 2, rows, rows, rows))
+            cur.execute("ANALYZE weld_details")
+        conn.commit()
+        print(f"== {rows:,} registrations over {devices} devices written in {time.perf_counter() - start:.1f}s")
+    finally:
+        conn.close()
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = connect_db()
+    if conn is None:
+        print("== database: not reachable, skipped")
+        return
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE; CREATE SCHEMA {BENCH_SCHEMA}")
+    conn.commit()
+    conn.close()
+    db.DB_CONFIG["options"] = f"-c search_path={BENCH_SCHEMA}"
+    try:
+        create_weld_details_table()
+        write_rows(args.rows, args.devices)
+        names = [f"Edge Device {i}" for i in range(1, args.devices + 1)]
+        lateral = lateral_state(names)
+        previous = {name: previous_latest_state(name) for name in names}
+        assert all((lateral[n]['deviceid'], lateral[n]['job_completed']) == previous[n] for n in names)
+        assert len(distinct_on_state(names)) == len(lateral) == args.devices
+
+        print(f"{'devices':>7} | {'per device':>10} | {'DISTINCT ON':>11} | {'lateral':>8}")
+        for subset in (names[:DEVICE_PAGE_SIZE], names):
+            per_device = timed(lambda: [previous_latest_state(n) for n in subset], 1)
+            distinct = timed(lambda: distinct_on_state(subset), args.repeat)
+            one_query = timed(lambda: lateral_state(subset), args.repeat)
+            print(f"{len(subset):>7} | {per_device * 1000:7.0f} ms | {distinct * 1000:8.1f} ms | {one_query * 1000:5.1f} ms")
+
+        conn = connect_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    EXPLAIN (ANALYZE, BUFFERS)
+                    SELECT d.device_name, w.deviceid, w.job_completed, w.uniq_id, w.created_at
+                    FROM unnest(%s::varchar[]) AS d(device_name)
+                    CROSS JOIN LATERAL (
+                        SELECT deviceid, job_completed, uniq_id, created_at FROM weld_details
+                        WHERE device_name = d.device_name ORDER BY created_at DESC LIMIT 1
+                    ) w
+                """, (names[:DEVICE_PAGE_SIZE],))
+                print("== plan of one page:")
+                for (line,) in cur.fetchall():
+                    print(f"   {line}")
+        finally:
+            conn.close()
+    finally:
+        db.DB_CONFIG.pop("options", None)
+        conn = connect_db()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
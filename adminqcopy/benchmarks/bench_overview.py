@@ -0,0 +1,164 @@
+"""
+Overview grid benchmark: rerun time of render_overview() at 50, 200 and 500 devices.
+
+Each fleet is written to the device registry in a scratch schema (bench_overview, dropped at the
+end; the calibration registry is read from the real schema), with DEVICE_ONLINE_SHARE of the
+devices online and the devices spread over 10 contractors. The overview is run in
+streamlit.testing.AppTest:
+
+    single page   every card on one page (DEVICE_PAGE_SIZE raised to the fleet size), which is
+                  what the grid rendered before it was paged
+    paged         one page of DEVICE_PAGE_SIZE cards
+    filtered      one page of one contractor's online devices
+
+and reports the first run (empty caches) and the median of --reruns warm reruns (cached
+registry queries and card HTML), plus the elements sent to the browser. It also times one
+device card's HTML built with textwrap.dedent on every rerun vs get_device_card_html().
+
+Usage (from the adminqcopy/ directory; needs the PostgreSQL database):
+    python benchmarks/bench_overview.py --reruns 10
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import textwrap
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+import db  # noqa: E402
+from device_registry import DEVICE_PAGE_SIZE, create_device_table  # noqa: E402
+from tabs.fabrication_team import get_device_card_html, get_dot_html  # noqa: E402
+
+FLEETS = (50, 200, 500)
+DEVICE_ONLINE_SHARE = 0.6
+BENCH_SCHEMA = "bench_overview"
+
+APP_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import db
+db.DB_CONFIG.update({db_config!r})
+from tabs import fabrication_team
+
+fabrication_team.DEVICE_PAGE_SIZE = {page_size!r}
+fabrication_team.initialize_state()
+fabrication_team.render_overview()
+"""
+
+
+def write_fleet(devices):
+    """Replaces the scratch registry with 'devices' devices."""
+    conn = db.connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE edge_devices")
+            cur.execute("""
+                INSERT INTO edge_devices (device_id, device_name, contractor, welder_badge, machine_serial, last_seen)
+                SELECT 'DEV' || (100 + i), 'Edge Device ' || i, 'Contractor ' || (i %% 10 + 1), 'W' || (100 + i),
+                       'WM-' || (100 + i), CASE WHEN i %% 10 < %s THEN now() END
+                FROM generate_series(1, %s) i
+            """, (int(DEVICE_ONLINE_SHARE * 10), devices))
+            cur.execute("ANALYZE edge_devices")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_case(script, reruns, session_state):
+    """First run and warm reruns of the overview; returns (first s, median rerun s, elements)."""
+    import streamlit as st
+    logging.getLogger("streamlit.runtime.caching.cache_data_api").setLevel(logging.ERROR)  # outside a runtime
+    st.cache_data.clear()
+    get_device_card_html.cache_clear()
+    at = AppTest.from_file(script, default_timeout=120)
+    for key, value in session_state.items():
+        at.session_state[key] = value
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    assert not at.exception, at.exception
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+    elements = len(at.markdown) + len(at.button) + len(at.selectbox) + len(at.number_input)
+    return first, float(np.median(timings)), elements
+
+
+def bench_card_html(repeat=2000):
+    args = ("Contractor 1", "Edge Device 1", "DEV101", True, "Last seen 19 Oct 2026 10:00:00",
+            'No Record<span class="dev-dot dev-gray"></span>', True)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        textwrap.dedent(f"""
+        <div class="dev-card-wrapper"><div class="dev-card"><div class="dev-card-header">
+            <h3 class="dev-card-title">{args[0]}</h3><span class="dev-card-subtitle">{args[1]}</span></div>
+            <div class="dev-card-body"><div class="dev-status-row"><span class="dev-label">Status</span>
+                <span class="dev-value" title="{args[4]}">{"Online" if args[3] else "Offline"}{get_dot_html(args[3])}</span></div>
+            <div class="dev-status-row"><span class="dev-label">Device ID</span><span class="dev-value">{args[2]}</span></div>
+            <div class="dev-status-row"><span class="dev-label">Calibration</span><span class="dev-value">{args[5]}</span></div>
+            </div><div class="dev-card-footer"><div class="dev-status-row"><span class="dev-label">Data Entry</span>
+                <span class="dev-data-status">{"Data Complete" if args[6] else "Data Needed"}{get_dot_html(args[6])}</span>
+            </div></div></div></div>
+        """)
+    dedent = (time.perf_counter() - start) / repeat
+    get_device_card_html(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        get_device_card_html(*args)
+    cached = (time.perf_counter() - start) / repeat
+    print(f"== card HTML: textwrap.dedent per rerun {dedent * 1e6:.1f} us | cached {cached * 1e6:.2f} us per card")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=10)
+    args = parser.parse_args()
+
+    conn = db.connect_db()
+    if conn is None:
+        print("== database: not reachable, skipped")
+        return
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE; CREATE SCHEMA {BENCH_SCHEMA}")
+    conn.commit()
+    conn.close()
+    db.DB_CONFIG["options"] = f"-c search_path={BENCH_SCHEMA},public"
+    try:
+        create_device_table()
+        tmp_dir = tempfile.mkdtemp(prefix="overview_bench_")
+        print(f"{'devices':>7} | {'case':<12} | {'first run':>9} | {'warm rerun':>10} | elements")
+        for devices in FLEETS:
+            write_fleet(devices)
+            cases = {
+                "single page": (devices, {}),
+                "paged": (DEVICE_PAGE_SIZE, {}),
+                "filtered": (DEVICE_PAGE_SIZE, {"overview_contractor": "Contractor 3", "overview_status": "Online"}),
+            }
+            for case, (page_size, session_state) in cases.items():
+                script = os.path.join(tmp_dir, f"overview_{page_size}.py")
+                with open(script, "w") as f:
+                    f.write(APP_SCRIPT.format(root=ROOT_DIR, db_config=db.DB_CONFIG, page_size=page_size))
+                first, rerun, elements = run_case(script, args.reruns, session_state)
+                print(f"{devices:>7} | {case:<12} | {first * 1000:6.0f} ms | {rerun * 1000:7.0f} ms | {elements:>8}")
+        bench_card_html()
+    finally:
+        db.DB_CONFIG.pop("options", None)
+        conn = db.connect_db()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
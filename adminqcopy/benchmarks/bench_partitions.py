@@ -0,0 +1,248 @@
+"""
+weld_details partitioning benchmark and pruning check.
+
+Fills a partitioned weld_details (monthly, as create_weld_details_table() makes it) and an
+unpartitioned copy with the same indexes, each in a scratch schema (bench_partitions and
+bench_partitions_plain, dropped at the end), with --rows records of 500 devices over the last
+3 years, then:
+1. Pruning: EXPLAIN ANALYZE of the hot queries on the partitioned table, asserting which
+   monthly partitions are read: for the latest record of each overview device only the current
+   month (the empty months made ahead are read first, one index probe each), for the threshold
+   checker's active welds the WELD_HOT_MONTHS months (and the months ahead), for a one-month
+   export and mark_job_completed()'s update that month alone.
+2. Timings, partitioned vs unpartitioned (median of 5 runs), with the active welds query also
+   without its WELD_HOT_MONTHS bound (as before partitioning).
+3. Archival: archive_partitions() of the months older than WELD_ARCHIVE_AFTER_MONTHS with an
+   export of each month first; checks the exported and remaining row counts. For comparison,
+   a DELETE of those rows from the unpartitioned table (rolled back).
+4. Migration: migrate_to_partitioned() of the unpartitioned copy; checks rows and ids.
+
+Usage (from the adminqcopy/ directory; needs the PostgreSQL database):
+    python benchmarks/bench_partitions.py --rows 1000000
+"""
+import argparse
+import datetime
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import db  # noqa: E402
+import weld_partitions  # noqa: E402
+from db import connect_db  # noqa: E402
+from weld_export import export_query  # noqa: E402
+from weld_partitions import (  # noqa: E402
+    WELD_ARCHIVE_AFTER_MONTHS, WELD_HOT_MONTHS, archive_partitions, create_month_partitions, list_partitions,
+    migrate_to_partitioned, month_start, scanned_partitions
+)
+from threshold_checker import ACTIVE_WELDS_QUERY  # noqa: E402
+from tabs.fabrication_team import LATEST_DEVICE_STATES_QUERY, create_weld_details_table  # noqa: E402
+
+SCHEMA, PLAIN_SCHEMA, ARCHIVE_SCHEMA = "bench_partitions", "bench_partitions_plain", "bench_partitions_archive"
+DEVICES = 500
+OVERVIEW_DEVICES = tuple(f"Edge Device {i}" for i in range(1, 25))  # one overview page
+
+FILL = """
+    INSERT INTO weld_details (uniq_id, device_name, deviceid, contractor_name, block_number, welder_name,
+        material_type, thickness, type_of_weld, no_of_passes, weld_length, current, voltage, travel_speed,
+        wps_code, job_completed, created_at)
+    SELECT chr(65 + i %% 26) || chr(65 + i / 26 %% 26) || chr(65 + i / 676 %% 26) || chr(65 + i / 17576 %% 26)
+           || chr(65 + i / 456976 %% 26), 'Edge Device ' || (i %% 500), 'DEV' || (100 + i %% 500),
+           'Contractor ' || (i %% 10 + 1), 'Block ' || (i %% 900 + 100), 'Welder ' || (i %% 200),
+           'Carbon Steel', 12, 'FCAW', 2, 600, 150 + i %% 110, 20 + i %% 10, 300,
+           'WPS-' || lpad((i %% 49 + 1)::text, 3, '0'),
+           CASE WHEN i <= 1000 AND i %% 3 = 0 THEN 'NO' ELSE 'YES' END,
+           LOCALTIMESTAMP - i * (interval '3 years' / %s)
+    FROM generate_series(1, %s) i
+"""
+
+
+def use_schema(schema):
+    db.DB_CONFIG["options"] = f"-c search_path={schema}"
+
+
+def run_sql(statement, params=None):
+    conn = connect_db()
+    with conn.cursor() as cur:
+        cur.execute(statement, params)
+        result = cur.fetchall() if cur.description else None
+    conn.commit()
+    conn.close()
+    return result
+
+
+def fill_partitioned(rows):
+    use_schema(SCHEMA)
+    create_weld_details_table()
+    conn = connect_db()
+    with conn.cursor() as cur:
+        today = datetime.date.today()
+        create_month_partitions(cur, [month_start(today, -k) for k in range(37)])
+        cur.execute(FILL, (rows, rows))
+        cur.execute("ANALYZE weld_details")
+    conn.commit()
+    conn.close()
+
+
+def fill_plain(rows):
+    use_schema(PLAIN_SCHEMA)
+    run_sql("""
+        CREATE TABLE weld_details (LIKE bench_partitions.weld_details INCLUDING DEFAULTS);
+        CREATE SEQUENCE weld_details_id_seq OWNED BY weld_details.id;
+        ALTER TABLE weld_details ALTER COLUMN id SET DEFAULT nextval('weld_details_id_seq'),
+            ADD PRIMARY KEY (id), ADD CONSTRAINT unique_uniq_id UNIQUE (uniq_id);
+        CREATE INDEX idx_weld_details_device_name_created_at ON weld_details (device_name, created_at DESC);
+        CREATE INDEX idx_weld_details_created_at ON weld_details (created_at);
+    """)
+    run_sql(FILL, (rows, rows))
+    run_sql("ANALYZE weld_details")
+
+
+def hot_queries():
+    today = datetime.date.today()
+    month = month_start(today, -6)
+    export, export_params = export_query(month, month_start(month, 1) - datetime.timedelta(days=1))
+    return {
+        "latest state, 24 devices": (LATEST_DEVICE_STATES_QUERY, (list(OVERVIEW_DEVICES),)),
+        "active welds": (ACTIVE_WELDS_QUERY.replace("LEFT JOIN wps_limits l ON l.wps_code = latest.wps_code",
+                                                    "LEFT JOIN (SELECT NULL::varchar AS wps_code, NULL::real AS voltage_min, "
+                                                    "NULL::real AS voltage_max, NULL::real AS current_min, NULL::real AS current_max, "
+                                                    "NULL::real AS travel_speed_min, NULL::real AS travel_speed_max) l "
+                                                    "ON l.wps_code = latest.wps_code"), (WELD_HOT_MONTHS - 1,)),
+        "one-month export": (export, export_params),
+    }
+
+
+def check_pruning():
+    use_schema(SCHEMA)
+    conn = connect_db()
+    total = len(list_partitions(conn.cursor()))
+    today = datetime.date.today()
+    current, hot = weld_partitions.partition_name(month_start(today)), weld_partitions.partition_name(month_start(today, 1 - WELD_HOT_MONTHS))
+    half_year = weld_partitions.partition_name(month_start(today, -6))
+    # label -> (oldest partition that may be read, newest partition that may be read)
+    expected = {"latest state, 24 devices": (current, "~"), "active welds": (hot, "~"),
+                "one-month export": (half_year, half_year), "job completed update": (current, current)}
+    print(f"== pruning over {total} monthly partitions (EXPLAIN ANALYZE)")
+    try:
+        with conn.cursor() as cur:
+            queries = hot_queries()
+            cur.execute("SELECT id, created_at FROM weld_details WHERE deviceid = 'DEV103' AND job_completed = 'NO' "
+                        "ORDER BY created_at DESC LIMIT 1")
+            queries["job completed update"] = ("UPDATE weld_details SET job_completed = 'YES' WHERE id = %s AND created_at = %s",
+                                               cur.fetchone())
+            for label, (query, params) in queries.items():
+                scanned, planned = scanned_partitions(cur, query, params)
+                print(f"   {label:<26} reads {len(scanned):2} partitions ({scanned[0]} .. {scanned[-1]}), "
+                      f"{len(planned)} in the plan")
+                oldest, newest = expected[label]
+                assert scanned and oldest <= scanned[0] and scanned[-1] <= newest, (label, scanned)
+        conn.rollback()  # the update
+    finally:
+        conn.close()
+
+
+def timings():
+    print("== median of 5 runs           partitioned   unpartitioned")
+    queries = hot_queries()
+    active, params = queries["active welds"]
+    queries["active welds, unbounded"] = (active.replace(
+        "WHERE created_at >= date_trunc('month', LOCALTIMESTAMP) - make_interval(months => %s)", ""), None)
+    queries["device history"] = ("SELECT * FROM weld_details WHERE device_name = %s ORDER BY created_at DESC",
+                                 ("Edge Device 7",))
+    for label, (query, params) in queries.items():
+        results = []
+        for schema in (SCHEMA, PLAIN_SCHEMA):
+            use_schema(schema)
+            conn = connect_db()
+            with conn.cursor() as cur:
+                runs = []
+                for _ in range(5):
+                    start = time.perf_counter()
+                    cur.execute(query, params)
+                    cur.fetchall()
+                    runs.append(time.perf_counter() - start)
+            conn.close()
+            results.append(statistics.median(runs) * 1000)
+        print(f"   {label:<26}{results[0]:10.1f} ms{results[1]:13.1f} ms")
+
+
+def check_archive(rows):
+    use_schema(SCHEMA)
+    weld_partitions.WELD_ARCHIVE_SCHEMA = ARCHIVE_SCHEMA
+    export_dir = tempfile.mkdtemp(prefix="weld_archive_")
+    try:
+        (before_rows,) = run_sql("SELECT count(*) FROM weld_details")[0]
+        start = time.perf_counter()
+        done = archive_partitions(export_dir=export_dir)
+        seconds = time.perf_counter() - start
+        archived = sum(n for _, n, _ in done)
+        exported = sum(sum(1 for _ in open(os.path.join(export_dir, f))) - 1 for f in os.listdir(export_dir))
+        (after_rows,) = run_sql("SELECT count(*) FROM weld_details")[0]
+        (in_archive,) = run_sql(f"SELECT count(*) FROM pg_tables WHERE schemaname = '{ARCHIVE_SCHEMA}'")[0]
+        print(f"== archive of the months older than {WELD_ARCHIVE_AFTER_MONTHS}: {len(done)} partitions, "
+              f"{archived:,} rows exported ({exported:,} lines) and moved to {ARCHIVE_SCHEMA} in {seconds:.1f} s; "
+              f"{after_rows:,} rows left in {len(list_partitions(connect_db().cursor()))} partitions")
+        assert archived == exported == before_rows - after_rows and in_archive == len(done)
+
+        # The same months removed from the unpartitioned table (rolled back)
+        use_schema(PLAIN_SCHEMA)
+        conn = connect_db()
+        with conn.cursor() as cur:
+            start = time.perf_counter()
+            cur.execute("DELETE FROM weld_details WHERE created_at < %s",
+                        (month_start(datetime.date.today(), -WELD_ARCHIVE_AFTER_MONTHS),))
+            print(f"   unpartitioned: DELETE of the same {cur.rowcount:,} rows {time.perf_counter() - start:.1f} s "
+                  f"(the space comes back only after VACUUM)")
+        conn.rollback()
+        conn.close()
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+
+def check_migration(rows):
+    use_schema(PLAIN_SCHEMA)
+    (max_id,) = run_sql("SELECT max(id) FROM weld_details")[0]
+    start = time.perf_counter()
+    copied = migrate_to_partitioned(drop_old=True)
+    seconds = time.perf_counter() - start
+    create_weld_details_table()  # indexes of the partitioned table
+    (new_id,) = run_sql("INSERT INTO weld_details (deviceid) VALUES ('DEV100') RETURNING id")[0]
+    partitions = len(list_partitions(connect_db().cursor()))
+    print(f"== migration of the unpartitioned copy: {copied:,} rows into {partitions} partitions in {seconds:.1f} s; "
+          f"next id {new_id:,}")
+    assert copied == rows and new_id > max_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if connect_db() is None:
+        print("== database: not reachable, skipped")
+        return
+    schemas = (SCHEMA, PLAIN_SCHEMA, ARCHIVE_SCHEMA)
+    run_sql("; ".join(f"DROP SCHEMA IF EXISTS {s} CASCADE; CREATE SCHEMA {s}" for s in schemas))
+    try:
+        start = time.perf_counter()
+        fill_partitioned(args.rows)
+        fill_plain(args.rows)
+        print(f"== {args.rows:,} weld records of {DEVICES} devices over 3 years, in both tables in "
+              f"{time.perf_counter() - start:.1f} s")
+        check_pruning()
+        timings()
+        check_archive(args.rows)
+        check_migration(args.rows)
+    finally:
+        db.DB_CONFIG.pop("options", None)
+        run_sql("; ".join(f"DROP SCHEMA IF EXISTS {s} CASCADE" for s in schemas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Welder qualification index benchmark.
+
+Builds the (identification number, process) index of qualification_index.py from --certs
+synthetic certificate rows and times check-style lookups (hits and misses) against it.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_qualification.py --certs 100000 --lookups 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qualification_index import add_qualification_rows, lookup_qualification  # noqa: E402
+
+PROCESS_TEXTS = ["FCAW", "FCAW-G (136)", "SMAW", "SMAW 111", "GMAW/FCAW", "SAW (121)", "GTAW + SMAW", "MAG 135"]
+
+
+def make_rows(n, rng):
+    today = date.today()
+    for cert_id in range(1, n + 1):
+        expiry = None if rng.random() < 0.05 else today + timedelta(days=rng.randint(-365, 3 * 365))
+        yield (cert_id, f"W-{rng.randint(1, n // 2):06d}", rng.choice(PROCESS_TEXTS),
+               f"Welder {cert_id}", f"CERT/{cert_id:07d}", expiry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--certs", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows = list(make_rows(args.certs, rng))
+    state = {"count": 0, "last_id": 0}
+    entries = {}
+    start = time.perf_counter()
+    add_qualification_rows(state, rows, entries)
+    build = time.perf_counter() - start
+
+    # Incremental refresh cost: one new certificate
+    start = time.perf_counter()
+    add_qualification_rows(state, [(args.certs + 1, "W-000001", "SMAW", "New", "CERT/NEW", None)], entries)
+    incremental = time.perf_counter() - start
+
+    badges = [f"w{rng.randint(1, args.certs):06d}" for _ in range(args.lookups)]  # ~half are misses
+    processes = [rng.choice(["FCAW", "SAW", "SMAW", "GMAW"]) for _ in range(args.lookups)]
+    statuses = {}
+    timings = np.empty(args.lookups)
+    for i, (badge, process) in enumerate(zip(badges, processes)):
+        start = time.perf_counter()
+        result = lookup_qualification(entries, badge, process)
+        timings[i] = time.perf_counter() - start
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+
+    print(f"index: {len(entries)} (badge, process) keys from {args.certs} certificates, built in {build * 1000:.0f} ms")
+    print(f"incremental add of one certificate: {incremental * 1e6:.1f} us")
+    print(f"lookups: {args.lookups} | p50 {np.percentile(timings, 50) * 1e6:.2f} us | "
+          f"p99 {np.percentile(timings, 99) * 1e6:.2f} us | max {timings.max() * 1e6:.1f} us")
+    for status, n in sorted(statuses.items()):
+        print(f"   {status:<24}{n:>8}")
+
+
+if __name__ == "__main__":
+    main()
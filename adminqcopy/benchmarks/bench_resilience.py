@@ -0,0 +1,108 @@
+"""
+Model call resilience benchmark.
+
+Runs the welder OCR call (resilient_post) against the local replay server through three
+phases and reports how long each upload waited and how it ended:
+
+    healthy   - --warm-calls uploads at the normal OCR latency (seeds the adaptive timeout)
+    outage    - the OCR service hangs (--hang seconds per request) or is down (--down)
+    recovery  - the service is healthy again; after the breaker's reset time a trial call
+                closes the circuit
+
+Times are scaled down by --scale (timeouts, backoff and breaker reset) so the run takes
+seconds; the cost of the previous fixed policy (3 x 120 s timeout + 1 s sleeps per upload)
+is printed for comparison at the same scale.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_resilience.py --latency 2 --hang 600 --scale 0.05
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import resilience  # noqa: E402
+from stub_servers import Latency, ReplayServer  # noqa: E402
+
+ENDPOINT = "Welder OCR"
+LEGACY_RETRIES, LEGACY_TIMEOUT, LEGACY_SLEEP = 3, 120, 1
+
+
+def upload(url):
+    """One OCR call; returns (seconds waited, outcome)."""
+    start = time.perf_counter()
+    try:
+        resilience.resilient_post(ENDPOINT, url, {"file": "", "fileType": 0, "visualize": False})
+        outcome = "ok"
+    except resilience.CircuitOpenError:
+        outcome = "fast-fail"
+    except Exception as e:
+        outcome = type(e).__name__
+    return time.perf_counter() - start, outcome
+
+
+def report(phase, results):
+    waits = np.array([w for w, _ in results])
+    outcomes = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    print(f"{phase:<9} {len(results):>4} uploads | mean wait {waits.mean():7.2f}s | max {waits.max():7.2f}s | "
+          + ", ".join(f"{k}: {v}" for k, v in sorted(outcomes.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=2.0, help="normal OCR latency (s, unscaled)")
+    parser.add_argument("--hang", type=float, default=600.0, help="OCR latency during the outage (s, unscaled)")
+    parser.add_argument("--down", action="store_true", help="outage = connection refused instead of a hang")
+    parser.add_argument("--warm-calls", type=int, default=30)
+    parser.add_argument("--outage-uploads", type=int, default=10)
+    parser.add_argument("--scale", type=float, default=0.05)
+    args = parser.parse_args()
+
+    s = args.scale
+    resilience.TIMEOUT_MIN *= s
+    resilience.TIMEOUT_MAX *= s
+    resilience.BACKOFF_BASE *= s
+    resilience.BACKOFF_CAP *= s
+    resilience.BREAKER_RESET_SECONDS *= s
+    legacy = LEGACY_RETRIES * LEGACY_TIMEOUT + (LEGACY_RETRIES - 1) * LEGACY_SLEEP
+
+    recording = json.load(open(sorted(glob.glob(os.path.join(BENCH_DIR, "recordings", "*.json")))[0]))
+    with ReplayServer(ocr_latency=Latency(args.latency * s, args.latency * s * 0.2)) as server:
+        server.load(recording)
+        url = server.ocr_url
+
+        report("healthy", [upload(url) for _ in range(args.warm_calls)])
+        print(f"          adaptive timeout now {resilience.adaptive_timeout(ENDPOINT):.2f}s "
+              f"(fixed policy: {LEGACY_TIMEOUT * s:.2f}s)")
+
+        if args.down:
+            url = "http://127.0.0.1:9/ocr"
+        else:
+            server.httpd.latency["ocr"] = Latency(args.hang * s)
+        outage = [upload(url) for _ in range(args.outage_uploads)]
+        report("outage", outage)
+        print(f"          total wait {sum(w for w, _ in outage):.2f}s vs ~{legacy * s * args.outage_uploads:.2f}s "
+              f"with the fixed policy ({legacy * s:.2f}s per upload)")
+
+        url = server.ocr_url
+        server.httpd.latency["ocr"] = Latency(args.latency * s)
+        time.sleep(resilience.BREAKER_RESET_SECONDS)
+        report("recovery", [upload(url) for _ in range(5)])
+
+    print()
+    print(resilience.breaker_status().to_string(index=False))
+    print()
+    print(resilience.latency_histograms_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Certificate full-text search benchmark.
+
+Creates the certificate registries in a scratch schema ('bench_search') of the database in
+db.DB_CONFIG, fills the machine calibration registry with --docs synthetic certificates
+(identifying fields + ~250 words of OCR text each), then times search_certs() for lab names,
+serial fragments, examiners and multi-word queries. The schema is dropped afterwards.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_search.py --docs 50000
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from cert_store import create_certificate_tables, search_certs  # noqa: E402
+
+SCHEMA = "bench_search"
+LABS = ["ARMON Calibration Services", "Vaahid & Roto Calibration", "Asha Engineering Labs", "Precision Metrology Pvt Ltd",
+        "Sigma Test House", "Nabl Metrics India", "Kaveri Instruments", "Eastern Calibration Centre"]
+INSTRUMENTS = ["Welding Machine", "Clamp Meter", "Digital Multimeter", "Pressure Gauge", "Vernier Caliper",
+               "Temperature Indicator", "Insulation Tester", "Tong Tester"]
+EXAMINERS = ["R. Srinivas", "K. Naresh", "G. Nanaji", "P. Lakshmi", "S. Venkat", "M. Prasad", "A. Ramesh", "T. Kiran"]
+FILLER = ("calibration certificate reference standard traceable national laboratory uncertainty measurement "
+          "ambient temperature humidity procedure observed value nominal error tolerance remarks issued by "
+          "checked approved authorised signatory page of report customer address validity recommended due "
+          "date environmental conditions results within limits").split()
+
+
+def make_doc(i, rng):
+    serial = f"{rng.choice(['SN', 'EQ', 'WM', 'CM'])}-{rng.randint(1000, 99999)}/{rng.randint(2019, 2026)}"
+    lab, instrument, examiner = rng.choice(LABS), rng.choice(INSTRUMENTS), rng.choice(EXAMINERS)
+    words = [rng.choice(FILLER) for _ in range(250)]
+    for token in (lab, instrument, f"Serial No.: {serial}", f"Calibrated by {examiner}"):
+        words.insert(rng.randint(0, len(words)), token)
+    return (instrument, lab, serial, f"M{i:06d}", " ".join(words))
+
+
+def load_docs(conn, n):
+    rng = random.Random(0)
+    buf = io.StringIO()
+    for i in range(n):
+        buf.write("\t".join(make_doc(i, rng)) + "\n")
+    buf.seek(0)
+    with conn.cursor() as cur:
+        cur.copy_expert(
+            "COPY machine_calibrations (instrument_name, customer_name, serial_number, model_number, ocr_text) FROM STDIN",
+            buf
+        )
+        cur.execute("ANALYZE machine_calibrations")
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50_000)
+    args = parser.parse_args()
+
+    admin = db.connect_db()
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    db.DB_CONFIG["options"] = f"-c search_path={SCHEMA}"
+
+    try:
+        create_certificate_tables()
+        conn = db.connect_db()
+        start = time.perf_counter()
+        load_docs(conn, args.docs)
+        conn.close()
+        print(f"loaded {args.docs} certificates in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(1)
+        queries = (
+            [lab.split()[0] for lab in LABS] +                            # lab name
+            [str(rng.randint(1000, 9999)) for _ in range(8)] +            # serial fragment (prefix)
+            [examiner.split()[-1] for examiner in EXAMINERS] +           # examiner
+            ["armon clamp", "vaahid welding 2024", "naresh pressure gauge", "sn 4471"]
+        )
+        latencies = []
+        for text in queries:
+            start = time.perf_counter()
+            results = search_certs("machine", text)
+            latencies.append((time.perf_counter() - start) * 1000)
+            print(f"   {text!r:<26}{len(results):>4} rows {latencies[-1]:8.1f} ms")
+        print(f"p50 {np.percentile(latencies, 50):.1f} ms | p95 {np.percentile(latencies, 95):.1f} ms | "
+              f"max {max(latencies):.1f} ms over {len(queries)} queries")
+    finally:
+        db.DB_CONFIG.pop("options", None)
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Weld segment benchmark.
+
+1. Detector throughput: detect_segments() over --minutes of simulated 1 kHz voltage of
+   --devices devices, in 1 s chunks as the worker scans them; reports samples per second and
+   how many 1 kHz devices one core keeps up with.
+2. Accuracy: the same devices written to a temporary sensor store and scanned second by second
+   like the worker does (IMU track + voltage), with the segments measured on the seam; reports
+   the detected vs simulated arcs and the error of the segment lengths against the true torch
+   travel (edge_simulator.py).
+3. Worker poll: scan_device() of every device after one more SEGMENT_POLL_SECONDS of frames.
+
+The database insert is not part of the timings (one execute_values per device and poll).
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_segments.py --devices 20 --minutes 10
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import sensor_store  # noqa: E402
+from imu_trajectory import ARC_ON_VOLTAGE  # noqa: E402
+from weld_segments import (  # noqa: E402
+    SEGMENT_POLL_SECONDS, detect_segments, measure_segment, new_segment_state, scan_device, settled_segments
+)
+from sensor_ingest import encode_frame, ingest_frame  # noqa: E402
+from edge_simulator import IMU_RATE_HZ, VOLTAGE_RATE_HZ, device_frames, device_id_of  # noqa: E402
+
+
+def simulate(device_id, seconds, seed, start_ns):
+    """Frames, voltage times and samples, IMU times and true x of 'seconds' of one device."""
+    gen = device_frames(device_id, start_ns, seed=seed, with_truth=True)
+    frames, vt, volts, it, xs = [], [], [], [], []
+    for _ in range(seconds):
+        t0_ns, streams, x = next(gen)
+        frames.append((t0_ns, streams))
+        vt.append(t0_ns + np.arange(VOLTAGE_RATE_HZ) * (10**9 // VOLTAGE_RATE_HZ))
+        volts.append(streams["voltage"][1])
+        it.append(t0_ns + np.arange(IMU_RATE_HZ) * (10**9 // IMU_RATE_HZ))
+        xs.append(x)
+    return frames, np.concatenate(vt), np.concatenate(volts), np.concatenate(it), np.concatenate(xs)
+
+
+def simulated_arcs(volts):
+    """Number of simulated arcs that start and end within the data."""
+    arc = volts < ARC_ON_VOLTAGE
+    edges = np.flatnonzero(np.diff(arc)) + 1
+    on, off = edges[arc[edges]], edges[~arc[edges]]
+    return int(np.sum(off > on[0])) if len(on) else 0
+
+
+def bench_detector(sims):
+    n = sum(len(volts) for _, _, volts, _, _ in sims)
+    start = time.perf_counter()
+    found = 0
+    for _, t_ns, volts, _, _ in sims:
+        state = new_segment_state()
+        for lo in range(0, len(t_ns), VOLTAGE_RATE_HZ):
+            detect_segments(state, t_ns[lo:lo + VOLTAGE_RATE_HZ], volts[lo:lo + VOLTAGE_RATE_HZ])
+        found += len(state["finished"])
+    seconds = time.perf_counter() - start
+    print(f"== detector: {n:,} voltage samples in 1 s chunks, {found} segments")
+    print(f"   {seconds * 1000:.0f} ms | {n / seconds / 1e6:.1f} M samples/s | "
+          f"~{n / seconds / VOLTAGE_RATE_HZ:,.0f} devices at 1 kHz per core")
+
+
+def bench_store(sims, poll_seconds):
+    device_ids = [device_id_of(i) for i in range(len(sims))]
+    states = {device_id: new_segment_state() for device_id in device_ids}
+    seconds = len(sims[0][0]) - poll_seconds
+    scan_timings, length_errors, counts = [], [], [0, 0]
+    for s in range(seconds):
+        for device_id, (frames, *_) in zip(device_ids, sims):
+            ingest_frame(encode_frame(device_id, *frames[s]))
+        start = time.perf_counter()
+        for device_id in device_ids:
+            scan_device(device_id, states[device_id])
+        scan_timings.append(time.perf_counter() - start)
+        for device_id, (_, _, _, it, xs) in zip(device_ids, sims):
+            for start_ns, end_ns, p_start, p_end in settled_segments(device_id, states[device_id]):
+                length_start, length_end, _ = measure_segment(states[device_id], p_start, p_end)
+                if length_start is not None:
+                    travel = np.interp(end_ns, it, xs) - np.interp(start_ns, it, xs)
+                    length_errors.append((length_end - length_start) / 1000 - travel)
+                counts[0] += 1
+    pending = sum(len(state["finished"]) for state in states.values())
+    counts[1] = sum(simulated_arcs(volts[:seconds * VOLTAGE_RATE_HZ]) for _, _, volts, _, _ in sims)
+    errors = np.abs(length_errors) * 1000
+    print(f"== accuracy: {len(sims)} devices x {seconds} s scanned second by second")
+    print(f"   {counts[0]} segments measured + {pending} waiting for the IMU track, {counts[1]} simulated arcs | "
+          f"segment length error: mean {errors.mean():.1f} mm, worst {errors.max():.1f} mm")
+    print(f"   scan of all devices per second of data: median {np.median(scan_timings) * 1000:.1f} ms")
+
+    for s in range(seconds, seconds + poll_seconds):
+        for device_id, (frames, *_) in zip(device_ids, sims):
+            ingest_frame(encode_frame(device_id, *frames[s]))
+    start = time.perf_counter()
+    for device_id in device_ids:
+        scan_device(device_id, states[device_id])
+    elapsed = time.perf_counter() - start
+    print(f"== worker poll after {poll_seconds} s of frames: {elapsed * 1000:.1f} ms for {len(sims)} devices "
+          f"({elapsed / len(sims) * 1000:.2f} ms per device, {elapsed / poll_seconds * 100:.1f}% of a core)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--minutes", type=float, default=10)
+    args = parser.parse_args()
+
+    seconds = int(args.minutes * 60) + SEGMENT_POLL_SECONDS
+    start_ns = (time.time_ns() // 10**9 - seconds) * 10**9
+    sims = [simulate(device_id_of(i), seconds, seed=i, start_ns=start_ns) for i in range(args.devices)]
+    bench_detector(sims)
+    tmp_dir = tempfile.mkdtemp(prefix="segments_bench_")
+    try:
+        sensor_store.SENSOR_DATA_DIR = tmp_dir
+        bench_store(sims, SEGMENT_POLL_SECONDS)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
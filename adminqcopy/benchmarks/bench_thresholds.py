@@ -0,0 +1,204 @@
+"""
+Threshold checker benchmark.
+
+Travel speed is flagged only TRAVEL_SPEED_MARGIN outside the limits; the per-window IMU speed
+error against the simulated truth is reported to justify that margin.
+
+1. Window engine: check_electrical() over --minutes of simulated 1 kHz voltage + current of
+   --devices devices in 1 s chunks (running sums, O(1) per sample) vs recomputing every 1 s
+   window mean from its samples (O(window) per sample), and the excursions found per parameter
+   (edge_simulator.py lengthens the arc outside the +/-10% range about every 2 min of welding).
+2. Worker poll: check_device() of every device against a temporary sensor store, after one more
+   CHECK_POLL_SECONDS of frames (voltage, current and the IMU track / travel speed).
+3. With --db: --events synthetic events over 500 devices in threshold_events, then the latest
+   EVENT_CARD_ROWS events of one device as the dashboard reads them (time + query plan).
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_thresholds.py --devices 20 --minutes 10
+    python benchmarks/bench_thresholds.py --db --events 1000000   # needs the PostgreSQL database
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import sensor_store  # noqa: E402
+import threshold_checker  # noqa: E402
+from threshold_checker import (  # noqa: E402
+    CHECK_POLL_SECONDS, EVENT_CARD_ROWS, ELECTRICAL_WINDOW_SECONDS, TRAVEL_WINDOW_SECONDS, WPS_DEFAULT_TOLERANCE,
+    check_device, check_electrical, create_threshold_tables, load_events, new_checker_state
+)
+from db import connect_db  # noqa: E402
+from sensor_ingest import encode_frame, ingest_frame  # noqa: E402
+from imu_trajectory import ARC_ON_VOLTAGE, arc_on_at, track_since  # noqa: E402
+from edge_simulator import (  # noqa: E402
+    ARC_VOLTAGE, IMU_RATE_HZ, TRAVEL_SPEED, VOLTAGE_RATE_HZ, WELD_CURRENT, device_frames, device_id_of
+)
+
+NOMINAL = {"voltage": ARC_VOLTAGE, "current": WELD_CURRENT, "travel_speed": TRAVEL_SPEED * 60 * 1000}
+LIMITS = {"wps_code": "WPS-BENCH"}
+for _parameter, _value in NOMINAL.items():
+    LIMITS[f"{_parameter}_min"] = _value * (1 - WPS_DEFAULT_TOLERANCE[_parameter])
+    LIMITS[f"{_parameter}_max"] = _value * (1 + WPS_DEFAULT_TOLERANCE[_parameter])
+
+
+def simulate(device_id, seconds, seed, start_ns):
+    """
+    Frames of 'seconds' of one device, its number of torch dwells (stopped >= 5 s with the arc on)
+    and the true torch x at each IMU sample (times, x).
+    """
+    gen = device_frames(device_id, start_ns, seed=seed, with_truth=True)
+    frames, xs = [], []
+    for _ in range(seconds):
+        t0_ns, streams, x = next(gen)
+        frames.append((t0_ns, streams))
+        xs.append(x)
+    arc = np.concatenate([streams["voltage"][1][::VOLTAGE_RATE_HZ // IMU_RATE_HZ] < ARC_ON_VOLTAGE for _, streams in frames])
+    stopped = (arc[1:] & (np.diff(np.concatenate(xs)) * IMU_RATE_HZ < 0.1 * TRAVEL_SPEED)).astype(np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], stopped, [0]])))
+    t_imu = np.concatenate([t0_ns + np.arange(IMU_RATE_HZ) * (10**9 // IMU_RATE_HZ) for t0_ns, _ in frames])
+    return frames, int(np.sum(edges[1::2] - edges[0::2] >= 5 * IMU_RATE_HZ)), (t_imu, np.concatenate(xs))
+
+
+def bench_engine(sims):
+    chunks = [[(t0_ns + np.arange(VOLTAGE_RATE_HZ) * (10**9 // VOLTAGE_RATE_HZ),
+                streams["voltage"][1].astype(np.float64), streams["current"][1].astype(np.float64))
+               for t0_ns, streams in frames] for frames, _, _ in sims]
+    n = sum(len(c[0]) for device in chunks for c in device)
+    found = {}
+    start = time.perf_counter()
+    for device in chunks:
+        state = new_checker_state()
+        for t_ns, volts, current in device:
+            for event in check_electrical(state, t_ns, volts, current, LIMITS):
+                found.setdefault(event["parameter"], set()).add(event["start_ns"])
+    seconds = time.perf_counter() - start
+    print(f"== window engine: {n:,} voltage + current samples in 1 s chunks")
+    print(f"   running sums       {seconds * 1000:8.0f} ms | {n / seconds / 1e6:5.1f} M samples/s | "
+          f"~{n / seconds / VOLTAGE_RATE_HZ:,.0f} devices at 1 kHz per core")
+
+    # Reference: every window mean recomputed from its samples, on one device-minute
+    size = int(ELECTRICAL_WINDOW_SECONDS * VOLTAGE_RATE_HZ)
+    volts = np.concatenate([c[1] for c in chunks[0][:60]])
+    start = time.perf_counter()
+    np.lib.stride_tricks.sliding_window_view(volts, size).mean(axis=1)
+    recompute = (time.perf_counter() - start) / len(volts)
+    print(f"   recomputed windows {recompute * n * 1000:8.0f} ms (extrapolated) | "
+          f"{1 / recompute / 1e6:5.1f} M samples/s per stream")
+    minutes = n / VOLTAGE_RATE_HZ / 60
+    for parameter, starts in sorted(found.items()):
+        print(f"   {parameter:<13}{len(starts):5} excursions ({len(starts) / minutes * 60:.1f} per device-hour)")
+
+
+def speed_errors(device_id, truth):
+    """|IMU - true| window speed / nominal over the corrected track, for windows of steady welding."""
+    t_true, x_true = truth
+    t_ns, positions = track_since(device_id, 0, corrected=True)
+    size = int(TRAVEL_WINDOW_SECONDS * IMU_RATE_HZ)
+    arc = arc_on_at(device_id, t_ns)
+    x = np.interp(t_ns, t_true, x_true)
+    speed = np.linalg.norm(positions[size:] - positions[:-size], axis=1) / TRAVEL_WINDOW_SECONDS
+    true_speed = (x[size:] - x[:-size]) / TRAVEL_WINDOW_SECONDS
+    welding = np.convolve(arc, np.ones(size + 1), "valid") == size + 1
+    steady = welding & (true_speed > 0.9 * TRAVEL_SPEED)
+    return np.abs(speed - true_speed)[steady] / TRAVEL_SPEED
+
+
+def bench_poll(sims):
+    device_ids = [device_id_of(i) for i in range(len(sims))]
+    states = {device_id: new_checker_state() for device_id in device_ids}
+    seconds = len(sims[0][0]) - CHECK_POLL_SECONDS
+    found = {}
+    for s in range(seconds):
+        for device_id, (frames, _, _) in zip(device_ids, sims):
+            ingest_frame(encode_frame(device_id, *frames[s]))
+        if s % 10 == 9 or s == seconds - 1:
+            for device_id in device_ids:
+                for event in check_device(device_id, states[device_id], LIMITS):
+                    found.setdefault(event["parameter"], set()).add((device_id, event["start_ns"]))
+    for s in range(seconds, seconds + CHECK_POLL_SECONDS):
+        for device_id, (frames, _, _) in zip(device_ids, sims):
+            ingest_frame(encode_frame(device_id, *frames[s]))
+    start = time.perf_counter()
+    for device_id in device_ids:
+        check_device(device_id, states[device_id], LIMITS)
+    elapsed = time.perf_counter() - start
+    print(f"== worker poll after {CHECK_POLL_SECONDS} s of frames: {elapsed * 1000:.1f} ms for {len(sims)} devices "
+          f"({elapsed / len(sims) * 1000:.2f} ms per device, {elapsed / CHECK_POLL_SECONDS * 100:.1f}% of a core)")
+    print("   excursions from the store: " + ", ".join(f"{p} {len(v)}" for p, v in sorted(found.items())) +
+          f" | simulated torch dwells: {sum(dwells for _, dwells, _ in sims)}")
+    errors = np.concatenate([speed_errors(device_id, truth) for device_id, (_, _, truth) in zip(device_ids, sims)])
+    print(f"   IMU travel speed error over {TRAVEL_WINDOW_SECONDS:g} s windows (fraction of the nominal speed): "
+          f"p50 {np.percentile(errors, 50):.2f}, p95 {np.percentile(errors, 95):.2f}, p99 {np.percentile(errors, 99):.2f}")
+
+
+def bench_db(events):
+    if not create_threshold_tables():
+        print("== database: not reachable, skipped")
+        return
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM threshold_events WHERE wps_code = 'WPS-BENCH'")
+            start = time.perf_counter()
+            cur.execute("""
+                INSERT INTO threshold_events (deviceid, wps_code, parameter, started_at, ended_at, worst_value, limit_min, limit_max)
+                SELECT 'BENCH' || (i %% 500), 'WPS-BENCH', (ARRAY['voltage', 'current', 'travel_speed'])[i %% 3 + 1],
+                       now() - i * interval '1 second', now() - i * interval '1 second' + interval '3 seconds', 28, 21.6, 26.4
+                FROM generate_series(1, %s) i
+            """, (events,))
+            cur.execute("ANALYZE threshold_events")
+            conn.commit()
+            print(f"== database: {events:,} events over 500 devices inserted in {time.perf_counter() - start:.1f}s")
+            cur.execute("""
+                EXPLAIN (ANALYZE, BUFFERS) SELECT started_at, parameter, wps_code, worst_value, limit_min, limit_max
+                FROM threshold_events WHERE deviceid = 'BENCH7' ORDER BY started_at DESC LIMIT %s
+            """, (EVENT_CARD_ROWS,))
+            for (line,) in cur.fetchall():
+                print(f"   {line}")
+        timings = []
+        for _ in range(20):
+            load_events.clear()
+            start = time.perf_counter()
+            load_events("BENCH7")
+            timings.append(time.perf_counter() - start)
+        print(f"   load_events(), uncached (connect + query): median {np.median(timings) * 1000:.1f} ms")
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM threshold_events WHERE wps_code = 'WPS-BENCH'")
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--db", action="store_true", help="also benchmark the events query (PostgreSQL)")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    seconds = int(args.minutes * 60) + CHECK_POLL_SECONDS
+    start_ns = (time.time_ns() // 10**9 - seconds) * 10**9
+    sims = [simulate(device_id_of(i), seconds, seed=i, start_ns=start_ns) for i in range(args.devices)]
+    bench_engine(sims)
+    tmp_dir = tempfile.mkdtemp(prefix="thresholds_bench_")
+    try:
+        sensor_store.SENSOR_DATA_DIR = tmp_dir
+        threshold_checker.CHECK_BACKFILL_SECONDS = seconds
+        bench_poll(sims)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if args.db:
+        bench_db(args.events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+IMU trajectory benchmark.
+
+1. Accuracy: --minutes of simulated IMU + voltage (edge_simulator.py, which also gives the true
+   torch position) for --devices devices are integrated in 1 s chunks; reports the error of the
+   travel distance of each weld pass (arc on until the torch is back at rest) and the largest
+   position error.
+2. Refresh cost: integrating the newest 1 s chunk into the kept state vs re-integrating the
+   whole --history from scratch on every refresh, and update_trajectory() against the sensor
+   store (read of the new IMU + voltage samples included).
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_trajectory.py --devices 5 --minutes 10 --history 3600
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import sensor_store  # noqa: E402
+import imu_trajectory  # noqa: E402
+from imu_trajectory import ARC_ON_VOLTAGE, STILL_WINDOW, integrate_chunk, new_trajectory_state  # noqa: E402
+from sensor_ingest import encode_frame, ingest_frame  # noqa: E402
+from edge_simulator import IMU_RATE_HZ, VOLTAGE_RATE_HZ, device_frames, device_id_of  # noqa: E402
+
+
+def simulate(device_id, seconds, seed, start_ns=0):
+    """(t_ns, imu samples, arc_on per IMU sample, true x, frames) of 'seconds' of one device."""
+    gen = device_frames(device_id, start_ns, seed=seed, with_truth=True)
+    times, samples, arc, truth, frames = [], [], [], [], []
+    for _ in range(seconds):
+        t0_ns, streams, x = next(gen)
+        times.append(t0_ns + np.arange(IMU_RATE_HZ) * (10**9 // IMU_RATE_HZ))
+        samples.append(streams["imu"][1])
+        arc.append(streams["voltage"][1][::VOLTAGE_RATE_HZ // IMU_RATE_HZ] < ARC_ON_VOLTAGE)
+        truth.append(x)
+        frames.append(encode_frame(device_id, t0_ns, streams))
+    return np.concatenate(times), np.concatenate(samples), np.concatenate(arc), np.concatenate(truth), frames
+
+
+def integrate(t, samples, arc, chunk=IMU_RATE_HZ):
+    state = new_trajectory_state()
+    for lo in range(0, len(t), chunk):
+        integrate_chunk(state, t[lo:lo + chunk], samples[lo:lo + chunk], arc[lo:lo + chunk])
+    return state
+
+
+def positions(state):
+    chunks = state["history"] + state["open"]
+    return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+
+def bench_accuracy(devices, minutes):
+    print(f"== accuracy: {devices} devices x {minutes} min, 1 s chunks")
+    pass_errors, max_errors, travel = [], [], 0.0
+    for i in range(devices):
+        t, samples, arc, truth, _ = simulate(device_id_of(i), int(minutes * 60), seed=i)
+        state = integrate(t, samples, arc)
+        t_est, p = positions(state)
+        x = np.interp(t_est, t, truth - truth[0])
+        max_errors.append(np.abs(p - np.column_stack([x, np.zeros_like(x), np.zeros_like(x)])).max())
+        travel += truth[-1] - truth[0]
+        # Weld passes: arc on until STILL_WINDOW samples after the arc went off (torch at rest)
+        edges = np.flatnonzero(np.diff(arc.astype(np.int8)))
+        starts, ends = edges[arc[edges + 1]] + 1, edges[~arc[edges + 1]] + 1 + STILL_WINDOW
+        for start in starts:
+            later = ends[ends > start]
+            if len(later) and later[0] < len(t_est):
+                est = p[later[0], 0] - p[start, 0]
+                true = truth[later[0]] - truth[start]
+                pass_errors.append((est - true, true))
+    errors = np.array(pass_errors)
+    print(f"   {len(errors)} passes, {travel:.1f} m of travel | pass length error: "
+          f"mean |e| {np.abs(errors[:, 0]).mean() * 1000:.1f} mm "
+          f"({np.abs(errors[:, 0] / errors[:, 1]).mean() * 100:.1f}%), "
+          f"worst {np.abs(errors[:, 0]).max() * 1000:.1f} mm")
+    print(f"   largest position error over a run: {np.median(max_errors) * 1000:.0f} mm median, "
+          f"{np.max(max_errors) * 1000:.0f} mm worst (random walk of the accelerometer noise)")
+
+
+def bench_refresh(history):
+    print(f"== refresh cost with {history} s of history")
+    t, samples, arc, _, _ = simulate("DEV101", history + 10, seed=0)
+    n = history * IMU_RATE_HZ
+    state = integrate(t[:n], samples[:n], arc[:n])
+
+    timings = []
+    for k in range(10):
+        lo = n + k * IMU_RATE_HZ
+        start = time.perf_counter()
+        integrate_chunk(state, t[lo:lo + IMU_RATE_HZ], samples[lo:lo + IMU_RATE_HZ], arc[lo:lo + IMU_RATE_HZ])
+        timings.append(time.perf_counter() - start)
+    print(f"   incremental, newest 1 s chunk           {np.median(timings) * 1000:8.2f} ms")
+
+    start = time.perf_counter()
+    integrate_chunk(new_trajectory_state(), t[:n], samples[:n], arc[:n])
+    print(f"   from scratch, whole history             {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+
+def bench_store(history):
+    print(f"== update_trajectory() against the store, 1 s of new frames per refresh")
+    start_ns = (time.time_ns() // 10**9 - history - 10) * 10**9
+    _, _, _, _, frames = simulate("DEV101", history + 10, seed=0, start_ns=start_ns)
+    for frame in frames[:history]:
+        ingest_frame(frame)
+    start = time.perf_counter()
+    imu_trajectory.update_trajectory("DEV101")
+    print(f"   first update ({imu_trajectory.TRAJECTORY_BACKFILL_SECONDS} s backfill)   "
+          f"{(time.perf_counter() - start) * 1000:8.2f} ms")
+    timings = []
+    for frame in frames[history:]:
+        ingest_frame(frame)
+        start = time.perf_counter()
+        imu_trajectory.update_trajectory("DEV101")
+        timings.append(time.perf_counter() - start)
+    print(f"   refresh after a 1 s frame               {np.median(timings) * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--history", type=int, default=3600, help="seconds of history for the refresh cost")
+    args = parser.parse_args()
+
+    bench_accuracy(args.devices, args.minutes)
+    bench_refresh(args.history)
+    tmp_dir = tempfile.mkdtemp(prefix="trajectory_bench_")
+    try:
+        sensor_store.SENSOR_DATA_DIR = tmp_dir
+        bench_store(min(args.history, imu_trajectory.TRAJECTORY_BACKFILL_SECONDS))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compact weld_details frame benchmark.
+
+Builds --rows weld_details rows as fetch_weld_details() receives them from psycopg2 (tuples of
+Python str / int / datetime, 5% cleared records with NULL data columns) and reports the memory
+per 100k rows (memory_usage(deep=True)) of:
+  - object strings: text as Python objects (pandas 1.x, as pinned in requirements.txt),
+  - inferred: what this pandas version builds from the tuples,
+  - compact: after compact_weld_frame() (weld_frame.py),
+per column and in total, and the time compact_weld_frame() takes.
+
+Usage (from the adminqcopy/ directory):
+    python benchmarks/bench_weld_frame.py --rows 100000
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from weld_frame import compact_weld_frame  # noqa: E402
+
+COLUMNS = [
+    'id', 'uniq_id', 'created_at', 'contractor_name', 'block_number', 'welder_name', 'badge_number',
+    'material_type', 'thickness', 'type_of_weld', 'no_of_passes', 'weld_length',
+    'current', 'voltage', 'travel_speed', 'filler_material', 'wps_code', 'remarks',
+    'deviceid', 'device_name', 'job_completed'
+]
+
+
+def fetched_rows(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start = datetime.datetime(2023, 1, 1)
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    data = []
+    for i in range(rows):
+        device = int(rng.integers(1, 11))
+        cleared = rng.random() < 0.05
+        row = (
+            i + 1, "".join(letters[j] for j in rng.integers(0, 26, 5)), start + datetime.timedelta(minutes=7 * i),
+            f"Contractor {device}", f"Block {chr(65 + i % 26)}-{100 + i % 400}", f"Welder {int(rng.integers(1, 200))}",
+            f"W{int(rng.integers(100, 300))}", ["Carbon Steel", "Stainless Steel", "Alloy Steel"][i % 3],
+            [6, 8, 10, 12][i % 4], ["FCAW", "SAW", "SMAW", "GMAW"][i % 4], i % 4 + 1, [300, 450, 600, 800][i % 4],
+            int(rng.integers(150, 260)), int(rng.integers(20, 30)), int(rng.integers(200, 400)),
+            ["ER70S-6", "E7018", "ER308L"][i % 3], f"WPS-{i % 40:03d}-RevA", ["N/A", "OK", "Rework"][i % 3],
+            f"DEV{100 + device}", f"Edge Device {device}", "YES" if i % 20 else "NO"
+        )
+        if cleared:
+            keep = {"id", "created_at", "deviceid", "device_name", "job_completed"}
+            row = tuple(v if c in keep else None for c, v in zip(COLUMNS, row))
+        data.append(row)
+    return data
+
+
+def as_fetched(data):
+    df = pd.DataFrame(data, columns=COLUMNS)
+    df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    data = fetched_rows(args.rows)
+    inferred = as_fetched(data)
+    objects = inferred.copy()
+    for col in objects.columns:
+        if not pd.api.types.is_numeric_dtype(objects[col]) and col != "created_at":
+            objects[col] = objects[col].astype(object)
+    start = time.perf_counter()
+    compact = compact_weld_frame(inferred)
+    seconds = time.perf_counter() - start
+
+    scale = 100_000 / args.rows
+    frames = {"object strings": objects, "inferred": inferred, "compact": compact}
+    usage = {name: df.memory_usage(deep=True, index=False) * scale / 1e6 for name, df in frames.items()}
+    print(f"== {args.rows:,} rows, pandas {pd.__version__}; MB per 100k rows")
+    print(f"   {'column':<16}" + "".join(f"{name:>16}" for name in frames) + "   compact dtype")
+    for col in COLUMNS:
+        print(f"   {col:<16}" + "".join(f"{usage[name][col]:16.2f}" for name in frames) + f"   {compact[col].dtype}")
+    print(f"   {'total':<16}" + "".join(f"{usage[name].sum():16.2f}" for name in frames))
+    print(f"   compact_weld_frame(): {seconds * 1000:.0f} ms for {args.rows:,} rows")
+
+    # Same contents either way
+    pd.testing.assert_frame_equal(
+        compact.astype(object).where(compact.notna(), None), objects.astype(object).where(objects.notna(), None),
+        check_dtype=False
+    )
+
+
+if __name__ == "__main__":
+    main()
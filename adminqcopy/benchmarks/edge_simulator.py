@@ -0,0 +1,183 @@
+"""
+Local stand-in for the welding edge devices (DEV101, DEV102, ...).
+
+Each simulated device alternates arc-on weld runs (20-60 s) and arc-off gaps (5-20 s) and
+sends one frame per --batch-seconds to the dashboard's ingestion endpoint (sensor_ingest.py):
+
+    voltage  1 kHz  arc voltage ~24 V with ripple while welding, ~65 V open circuit otherwise
+    current  1 kHz  welding current ~200 A while welding; about every 2 min of welding the arc
+                    lengthens for 2-5 s (+4 V, -30 A), outside a +/-10% WPS range
+    imu      100 Hz accelerometer + gyroscope of the torch: travel along X at ~300 mm/min while
+                    the arc is on, gravity on Z, per-device sensor bias and noise (industrial
+                    MEMS grade, ~0.002 m/s^2 per sample); about every 5 min of welding the torch
+                    dwells for 10-20 s with the arc burning
+
+Usage (from the adminqcopy/ directory, with the dashboard running and SENSOR_DEVICE_TOKEN set
+to the dashboard's device token):
+    python benchmarks/edge_simulator.py --devices 10
+    python benchmarks/edge_simulator.py --devices 10 --backfill 3600   # send the last hour first
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensor_ingest import SENSOR_DEVICE_TOKEN, SENSOR_INGEST_PORT, encode_frame  # noqa: E402
+
+VOLTAGE_RATE_HZ = 1000
+IMU_RATE_HZ = 100
+ARC_VOLTAGE = 24.0
+OPEN_CIRCUIT_VOLTAGE = 65.0
+WELD_CURRENT = 200.0
+EXCURSION_INTERVAL = 120.0  # s of welding between long-arc excursions, on average
+EXCURSION_VOLTAGE = 4.0
+EXCURSION_CURRENT = -30.0
+DWELL_INTERVAL = 300.0      # s of welding between torch dwells, on average
+TRAVEL_SPEED = 0.005        # m/s (300 mm/min)
+TRAVEL_TAU = 0.2            # s, time constant of the torch speeding up / slowing down
+GRAVITY = 9.81
+
+
+def device_id_of(i, first=101):
+    return f"DEV{first + i}"
+
+
+def device_frames(device_id, start_ns, batch_seconds=1.0, seed=None, with_truth=False):
+    """
+    Endless generator of (t0_ns, streams) batches for one device, where streams maps
+    'voltage' / 'current' / 'imu' to (rate_hz, samples) as expected by encode_frame(). With with_truth,
+    yields (t0_ns, streams, x) with the true torch X position (m) at each IMU sample.
+    """
+    rng = np.random.default_rng(seed)
+    n_volt = int(VOLTAGE_RATE_HZ * batch_seconds)
+    n_imu = int(IMU_RATE_HZ * batch_seconds)
+    decim = VOLTAGE_RATE_HZ // IMU_RATE_HZ
+    accel_bias = rng.normal(0, 0.02, 3)
+    gyro_bias = rng.normal(0, 0.002, 3)
+
+    arc_on, remaining = False, int(rng.uniform(2, 10) * VOLTAGE_RATE_HZ)
+    excursion = 0  # samples left of the current long-arc excursion
+    dwell = 0      # IMU samples left of the current torch dwell
+    velocity, x, t0_ns, sample = 0.0, 0.0, int(start_ns), 0
+    while True:
+        # Arc on/off schedule at the voltage rate
+        arc = np.empty(n_volt, dtype=bool)
+        pos = 0
+        while pos < n_volt:
+            take = min(remaining, n_volt - pos)
+            arc[pos:pos + take] = arc_on
+            pos += take
+            remaining -= take
+            if remaining == 0:
+                arc_on = not arc_on
+                remaining = int((rng.uniform(20, 60) if arc_on else rng.uniform(5, 20)) * VOLTAGE_RATE_HZ)
+
+        # Long-arc excursions, started at random times while welding
+        long_arc = np.zeros(n_volt, dtype=bool)
+        if excursion == 0 and arc[0] and rng.random() < batch_seconds / EXCURSION_INTERVAL:
+            excursion = int(rng.uniform(2, 5) * VOLTAGE_RATE_HZ)
+        take = min(excursion, n_volt)
+        long_arc[:take] = True
+        excursion -= take
+        long_arc &= arc
+
+        t = (sample + np.arange(n_volt)) / VOLTAGE_RATE_HZ
+        voltage = np.where(
+            arc,
+            ARC_VOLTAGE + EXCURSION_VOLTAGE * long_arc + 1.2 * np.sin(2 * np.pi * 300 * t) + rng.normal(0, 0.8, n_volt),
+            OPEN_CIRCUIT_VOLTAGE + rng.normal(0, 0.2, n_volt)
+        )
+        current = np.where(
+            arc,
+            WELD_CURRENT + EXCURSION_CURRENT * long_arc + 8 * np.sin(2 * np.pi * 300 * t) + rng.normal(0, 3, n_volt),
+            rng.normal(0, 0.5, n_volt)
+        )
+
+        # Torch travel along X: first-order approach to the travel speed while the arc is on
+        # Torch dwells (stops while the arc keeps burning), started at random times while welding
+        dwelling = np.zeros(n_imu, dtype=bool)
+        if dwell == 0 and arc[0] and rng.random() < batch_seconds / DWELL_INTERVAL:
+            dwell = int(rng.uniform(10, 20) * IMU_RATE_HZ)
+        take = min(dwell, n_imu)
+        dwelling[:take] = True
+        dwell -= take
+
+        target = np.where(arc[::decim] & ~dwelling, TRAVEL_SPEED, 0.0)
+        alpha = 1 - np.exp(-1 / (IMU_RATE_HZ * TRAVEL_TAU))
+        ax, xs = np.empty(n_imu), np.empty(n_imu)
+        for i in range(n_imu):
+            dv = alpha * (target[i] - velocity)
+            velocity += dv
+            x += velocity / IMU_RATE_HZ
+            ax[i], xs[i] = dv * IMU_RATE_HZ, x
+        accel = np.column_stack([ax, np.zeros(n_imu), np.full(n_imu, GRAVITY)])
+        accel += accel_bias + rng.normal(0, 0.002, (n_imu, 3))
+        gyro = gyro_bias + rng.normal(0, 0.003, (n_imu, 3))
+
+        streams = {
+            "voltage": (VOLTAGE_RATE_HZ, voltage.astype(np.float32)),
+            "current": (VOLTAGE_RATE_HZ, current.astype(np.float32)),
+            "imu": (IMU_RATE_HZ, np.hstack([accel, gyro]).astype(np.float32))
+        }
+        yield (t0_ns, streams, xs) if with_truth else (t0_ns, streams)
+        sample += n_volt
+        t0_ns += int(batch_seconds * 1e9)
+
+
+def run_device(device_id, url, token, batch_seconds, backfill, duration, stop):
+    """Sends a device's frames: 'backfill' seconds of history as fast as possible, then in real time."""
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {token}"
+    start_ns = time.time_ns() - int(backfill * 1e9)
+    end_ns = time.time_ns() + int(duration * 1e9) if duration else None
+    for t0_ns, streams in device_frames(device_id, start_ns, batch_seconds, seed=zlib.crc32(device_id.encode())):
+        if stop.is_set() or (end_ns and t0_ns >= end_ns):
+            return
+        wait = (t0_ns + batch_seconds * 1e9 - time.time_ns()) / 1e9
+        if wait > 0:
+            time.sleep(wait)  # the batch is complete only once its last sample has been taken
+        try:
+            session.post(url, data=encode_frame(device_id, t0_ns, streams), timeout=10).raise_for_status()
+        except requests.RequestException as e:
+            print(f"{device_id}: {e}")
+            time.sleep(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--first", type=int, default=101, help="number of the first device id (DEV<n>)")
+    parser.add_argument("--url", default=f"http://localhost:{SENSOR_INGEST_PORT}/frames")
+    parser.add_argument("--token", default=SENSOR_DEVICE_TOKEN, help="device token (default: $SENSOR_DEVICE_TOKEN)")
+    parser.add_argument("--batch-seconds", type=float, default=1.0)
+    parser.add_argument("--backfill", type=float, default=0.0, help="seconds of history to send first")
+    parser.add_argument("--duration", type=float, default=0.0, help="seconds to run (0 = until Ctrl+C)")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("a device token is needed (--token or SENSOR_DEVICE_TOKEN)")
+
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=run_device, daemon=True, args=(
+            device_id_of(i, args.first), args.url, args.token, args.batch_seconds, args.backfill, args.duration, stop))
+        for i in range(args.devices)
+    ]
+    for thread in threads:
+        thread.start()
+    print(f"Simulating {args.devices} devices -> {args.url} (Ctrl+C to stop)")
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
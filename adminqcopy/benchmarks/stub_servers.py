@@ -0,0 +1,127 @@
+"""
+Local stand-ins for the model endpoints used by the certificate tabs.
+
+ReplayServer serves the welder OCR endpoint (POST /ocr) and the Ollama chat endpoint
+(POST /api/chat) over HTTP; ReplayGradioClient replaces the gradio Client used by the
+machine calibration tab in-process. Both replay the responses stored in
+benchmarks/recordings/<document>.json with a configurable latency:
+
+    {
+        "ocr": {...},      # JSON body returned by the OCR service for the document
+        "llm": {...},      # Parsed JSON content of the Ollama chat reply
+        "gradio": "..."    # Raw text returned by the gradio OCR app
+    }
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Latency:
+    """Simulated service time: 'mean' seconds +/- a uniform 'jitter'."""
+
+    def __init__(self, mean=0.0, jitter=0.0):
+        self.mean = mean
+        self.jitter = jitter
+
+    def sleep(self):
+        time.sleep(max(0.0, self.mean + random.uniform(-self.jitter, self.jitter)))
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        recording = self.server.recording or {}
+
+        if self.path.rstrip("/").endswith("/ocr"):
+            stage, body = "ocr", recording.get("ocr")
+        elif self.path.rstrip("/").endswith("/api/chat"):
+            stage = "llm"
+            llm = recording.get("llm")
+            body = None if llm is None else {
+                "model": "replay",
+                "message": {"role": "assistant", "content": json.dumps(llm)},
+                "done": True
+            }
+        else:
+            stage, body = None, None
+
+        if body is None:
+            self._send(404, {"error": f"No recording for {self.path}"})
+            return
+
+        self.server.latency[stage].sleep()
+        self._send(200, body)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer:
+    """Threaded HTTP server replaying OCR and Ollama responses for the loaded recording."""
+
+    def __init__(self, ocr_latency=None, llm_latency=None):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ReplayHandler)
+        self.httpd.recording = None
+        self.httpd.latency = {
+            "ocr": ocr_latency or Latency(),
+            "llm": llm_latency or Latency()
+        }
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def ocr_url(self):
+        return f"{self.base_url}/ocr"
+
+    @property
+    def chat_url(self):
+        return f"{self.base_url}/api/chat"
+
+    def load(self, recording):
+        self.httpd.recording = recording
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ReplayGradioClient:
+    """Drop-in for gradio_client.Client.predict() / submit() on the machine calibration OCR app."""
+
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+        self.recording = None
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def load(self, recording):
+        self.recording = recording
+
+    def predict(self, *args, **kwargs):
+        if not self.recording or self.recording.get("gradio") is None:
+            raise RuntimeError("No gradio recording loaded")
+        self.latency.sleep()
+        return [self.recording["gradio"], None]
+
+    def submit(self, *args, **kwargs):
+        """Returns a future, like gradio's Job (result(timeout=...), cancel())."""
+        return self.executor.submit(self.predict, *args, **kwargs)
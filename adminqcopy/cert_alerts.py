@@ -0,0 +1,81 @@
+import html
+import streamlit as st
+import pandas as pd
+from datetime import date
+from cert_store import CERT_TABLES, ALERT_PAGE_SIZE, load_alert_page
+from expiry_digest import digest_alert_buckets, digest_computed_at
+from cert_status import ALERT_BUCKETS
+
+# --- Certificate Alert Feed ---
+# Replaces one st.markdown per expiring row: bucket counts, a group filter, a page selector and
+# a single markdown block with at most ALERT_PAGE_SIZE cards, whatever the registry size.
+
+ALL_GROUPS = "All"
+
+def _alert_card(row, expiry_col, describe):
+    """HTML for one alert card; 'describe' turns the record into its title text."""
+    due = row[expiry_col]
+    days = (pd.to_datetime(due).date() - date.today()).days
+    if days < 0:
+        cls, when = "alert-card-expired", f"expired {-days} day(s) ago"
+    else:
+        cls, when = "alert-card-expiring", f"expires in {days} day(s)"
+    return (
+        f"<div class='{cls}'>Alert: {html.escape(describe(row))} "
+        f"{when} ({html.escape(str(due))})</div>"
+    )
+
+def render_alert_feed(kind, describe):
+    """
+    Renders the expiry alert feed for a registry ('welder' or 'machine'). 'describe(row)' returns
+    the text identifying a record, e.g. the welder name and certificate number.
+    """
+    spec = CERT_TABLES[kind]
+    buckets = digest_alert_buckets(kind)  # precomputed by the expiry digest job
+
+    # Filter by employer / instrument (groups without a value are only shown under 'All')
+    groups = [g for g in buckets["grp"].tolist() if g]
+    group = st.selectbox(
+        f"Filter alerts by {spec['group_label'].lower()}",
+        options=[ALL_GROUPS] + groups,
+        key=f"{kind}_alert_group"
+    )
+    if group != ALL_GROUPS:
+        buckets = buckets[buckets["grp"] == group]
+
+    cols = st.columns(len(ALERT_BUCKETS))
+    for col, (key, label, _) in zip(cols, ALERT_BUCKETS):
+        col.metric(label, int(buckets[key].sum()))
+
+    total = int(buckets[[key for key, _, _ in ALERT_BUCKETS]].to_numpy().sum())
+    if total == 0:
+        st.success("No expired or expiring records.")
+        return
+
+    num_pages = (total - 1) // ALERT_PAGE_SIZE + 1
+    page = 0
+    if num_pages > 1:
+        page = st.number_input(
+            f"Alert page (of {num_pages}, {total} alerts)",
+            min_value=1, max_value=num_pages, value=1, key=f"{kind}_alert_page_{group}"
+        ) - 1
+
+    alert_df = load_alert_page(kind, None if group == ALL_GROUPS else group, page)
+    cards = [_alert_card(row, spec["expiry"], describe) for _, row in alert_df.iterrows()]
+    st.markdown("".join(cards), unsafe_allow_html=True)
+
+def render_expiry_digest_banner():
+    """One-line summary of the expiry digest for page headers (no registry scans)."""
+    parts = []
+    for kind, title in (("welder", "Welder qualifications"), ("machine", "Machine calibrations")):
+        buckets = digest_alert_buckets(kind)
+        counts = ", ".join(f"{html.escape(label)}: {int(buckets[key].sum())}" for key, label, _ in ALERT_BUCKETS)
+        parts.append(f"<b>{title}</b> ({counts})")
+
+    computed_at = digest_computed_at()
+    as_of = f" &middot; as of {computed_at:%d %b %H:%M}" if computed_at is not None else ""
+    st.markdown(
+        f"<div style='font-size: 14px; color: #4b5563; margin-bottom: 10px;'>"
+        f"Certificate alerts &middot; {' | '.join(parts)}{as_of}</div>",
+        unsafe_allow_html=True
+    )
@@ -0,0 +1,267 @@
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+import fitz  # PyMuPDF
+from psycopg2.extras import Json
+from db import connect_db
+
+# --- Near-Duplicate Detection Configuration ---
+# Re-scans and phone photos of a certificate differ byte-wise but render to nearly the same
+# first page. A 64-bit difference hash (dHash) of that page is looked up among the certificates
+# already processed; on a hit the stored extraction is reused and no model is called.
+HASH_RENDER_WIDTH = 320      # px; first page is rasterized in grayscale at roughly this width
+HASH_GRID = 8                # 8 x (8+1) block means -> 64 gradient bits
+CONTENT_CONTRAST = 60        # Pixels this much darker than the page background count as content
+TRIM_QUANTILE = 0.005        # Share of content trimmed from each edge (specks, scanner borders)
+DUPLICATE_MAX_DISTANCE = 10  # Max differing bits (of 64) for two pages to count as the same certificate
+DEDUP_CACHE_TTL = 60         # seconds
+
+def create_fingerprint_tables():
+    """Creates the fingerprint index of processed certificates and the lookup log."""
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS cert_fingerprints (
+                    id SERIAL PRIMARY KEY,
+                    kind VARCHAR(20) NOT NULL,
+                    phash BIGINT NOT NULL,
+                    file_name VARCHAR(255),
+                    extraction JSONB NOT NULL,
+                    extraction_time REAL, -- seconds the original model extraction took
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_cert_fingerprints_kind ON cert_fingerprints (kind);
+
+                CREATE TABLE IF NOT EXISTS cert_dedup_log (
+                    id SERIAL PRIMARY KEY,
+                    kind VARCHAR(20) NOT NULL,
+                    hit BOOLEAN NOT NULL,
+                    saved_time REAL NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            conn.commit()
+            return True
+    except Exception as e:
+        st.error(f"Error creating fingerprint tables: {e}")
+        return False
+    finally:
+        conn.close()
+
+@st.cache_resource
+def ensure_fingerprint_tables():
+    """Runs create_fingerprint_tables() once per process."""
+    return create_fingerprint_tables()
+
+# --- Hashing ---
+
+def first_page_gray(file_bytes, file_type):
+    """Rasterizes the first page of a PDF (or decodes an image) to a grayscale uint8 array."""
+    if file_type == "application/pdf":
+        with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+            page = doc.load_page(0)
+            zoom = HASH_RENDER_WIDTH / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    else:
+        pix = fitz.Pixmap(file_bytes)
+        if pix.n - pix.alpha != 1:
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+
+    rows = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return rows[:, :pix.width]
+
+def _block_means(gray, n_rows, n_cols):
+    """Mean intensity of an n_rows x n_cols grid of (near) equal blocks."""
+    row_edges = np.linspace(0, gray.shape[0], n_rows + 1).astype(int)[:-1]
+    col_edges = np.linspace(0, gray.shape[1], n_cols + 1).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(gray.astype(np.float64), row_edges, axis=0), col_edges, axis=1)
+    counts = np.outer(np.diff(np.append(row_edges, gray.shape[0])), np.diff(np.append(col_edges, gray.shape[1])))
+    return sums / counts
+
+def _content_bounds(profile):
+    """Start/end index keeping all but TRIM_QUANTILE of the content at either end of a profile."""
+    share = np.cumsum(profile) / profile.sum()
+    return int(np.searchsorted(share, TRIM_QUANTILE)), int(np.searchsorted(share, 1 - TRIM_QUANTILE)) + 1
+
+def dhash(gray):
+    """
+    64-bit difference hash of a grayscale page: margins are trimmed to the content (scans and
+    photos frame the page differently), the content is reduced to 8x9 block means and each bit
+    records whether brightness increases to the right. Returned as a signed int (BIGINT).
+    """
+    content = gray < np.percentile(gray, 90) - CONTENT_CONTRAST
+    if content.any():
+        (r0, r1), (c0, c1) = _content_bounds(content.sum(axis=1)), _content_bounds(content.sum(axis=0))
+        gray = gray[r0:r1, c0:c1]
+    if gray.shape[0] < HASH_GRID or gray.shape[1] < HASH_GRID + 1:
+        gray = np.pad(gray, ((0, HASH_GRID), (0, HASH_GRID + 1)), mode="edge")
+
+    blocks = _block_means(gray, HASH_GRID, HASH_GRID + 1)
+    bits = (blocks[:, 1:] > blocks[:, :-1]).ravel()
+    value = int(np.packbits(bits).view(">u8")[0])
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def first_page_hash(file_bytes, file_type):
+    """dHash of the first page, or None if the file can't be rasterized."""
+    try:
+        return dhash(first_page_gray(file_bytes, file_type))
+    except Exception:
+        return None
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def hamming_distances(phash, hashes):
+    """Bit distance between one hash and an int64 array of hashes."""
+    xor = (np.asarray(hashes, dtype=np.int64) ^ np.int64(phash)).view(np.uint8).reshape(-1, 8)
+    return _POPCOUNT[xor].sum(axis=1)
+
+# --- Index ---
+
+@st.cache_data(ttl=DEDUP_CACHE_TTL)
+def load_fingerprint_index(kind):
+    """All (id, phash) pairs of a registry; compared in-process with hamming_distances()."""
+    conn = connect_db()
+    if conn is None:
+        return pd.DataFrame(columns=["id", "phash"])
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, phash FROM cert_fingerprints WHERE kind = %s", (kind,))
+            return pd.DataFrame(cur.fetchall(), columns=["id", "phash"])
+    except Exception as e:
+        st.error(f"Error reading fingerprint index: {e}")
+        return pd.DataFrame(columns=["id", "phash"])
+    finally:
+        conn.close()
+
+def _log_lookup(kind, hit, saved_time):
+    conn = connect_db()
+    if conn is None:
+        return
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO cert_dedup_log (kind, hit, saved_time) VALUES (%s, %s, %s)",
+                (kind, hit, saved_time)
+            )
+            conn.commit()
+        dedup_stats.clear()
+    except Exception as e:
+        st.error(f"Error logging duplicate lookup: {e}")
+    finally:
+        conn.close()
+
+def find_duplicate(kind, phash):
+    """
+    Looks up the closest processed certificate within DUPLICATE_MAX_DISTANCE bits and logs the
+    lookup. Returns a dict (id, file_name, extraction, extraction_time, distance, lookup_time)
+    or None. A certificate without a fingerprint (phash None) is not looked up nor logged.
+    """
+    if phash is None:
+        return None
+    ensure_fingerprint_tables()
+    start = time.time()
+    index = load_fingerprint_index(kind)
+    match = None
+
+    if not index.empty:
+        distances = hamming_distances(phash, index["phash"].to_numpy(dtype=np.int64))
+        best = int(np.argmin(distances))
+        if distances[best] <= DUPLICATE_MAX_DISTANCE:
+            conn = connect_db()
+            if conn is not None:
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            "SELECT file_name, extraction, extraction_time FROM cert_fingerprints WHERE id = %s",
+                            (int(index["id"].iloc[best]),)
+                        )
+                        row = cur.fetchone()
+                    if row:
+                        match = {
+                            "id": int(index["id"].iloc[best]),
+                            "file_name": row[0],
+                            "extraction": row[1],
+                            "extraction_time": row[2] or 0.0,
+                            "distance": int(distances[best])
+                        }
+                except Exception as e:
+                    st.error(f"Error reading fingerprint: {e}")
+                finally:
+                    conn.close()
+
+    if match:
+        match["lookup_time"] = time.time() - start
+    _log_lookup(kind, match is not None, max(match["extraction_time"] - match["lookup_time"], 0.0) if match else 0.0)
+    return match
+
+def record_fingerprint(kind, phash, file_name, extraction, extraction_time):
+    """Adds a freshly extracted certificate to the index. Returns True on success."""
+    if phash is None:
+        return False
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO cert_fingerprints (kind, phash, file_name, extraction, extraction_time)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (kind, phash, file_name, Json(extraction), extraction_time)
+            )
+            conn.commit()
+        load_fingerprint_index.clear()
+        return True
+    except Exception as e:
+        st.error(f"Error saving fingerprint: {e}")
+        return False
+    finally:
+        conn.close()
+
+@st.cache_data(ttl=DEDUP_CACHE_TTL)
+def dedup_stats(kind):
+    """Lookups, duplicate hits, hit rate and total model time saved for a registry."""
+    ensure_fingerprint_tables()
+    conn = connect_db()
+    stats = {"lookups": 0, "hits": 0, "hit_rate": 0.0, "time_saved": 0.0}
+    if conn is None:
+        return stats
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT COUNT(*), COUNT(*) FILTER (WHERE hit), COALESCE(SUM(saved_time), 0) FROM cert_dedup_log WHERE kind = %s",
+                (kind,)
+            )
+            lookups, hits, saved = cur.fetchone()
+        stats.update({
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "time_saved": float(saved)
+        })
+        return stats
+    except Exception as e:
+        st.error(f"Error reading duplicate statistics: {e}")
+        return stats
+    finally:
+        conn.close()
+
+def dedup_caption(kind):
+    """One-line summary of dedup_stats() for the upload section."""
+    s = dedup_stats(kind)
+    return (
+        f"♻️ Duplicate uploads: {s['hits']} of {s['lookups']} ({s['hit_rate']:.0%}) "
+        f"| Model time saved: {s['time_saved']:.1f}s"
+    )
@@ -0,0 +1,24 @@
+import time
+import streamlit as st
+from cert_store import search_certs, SEARCH_RESULT_LIMIT
+
+# --- Certificate Search ---
+# Search box over the registry's full-text index (identifying fields + stored OCR text).
+
+def render_cert_search(kind, display_columns, placeholder):
+    """Renders a search box and the best SEARCH_RESULT_LIMIT matches for a registry."""
+    text = st.text_input("🔍 Search certificates", key=f"{kind}_cert_search", placeholder=placeholder)
+    if not text.strip():
+        return
+
+    start = time.time()
+    results = search_certs(kind, text.strip())
+    elapsed_ms = (time.time() - start) * 1000
+
+    if results.empty:
+        st.info(f"No certificates match '{text}'.")
+        return
+
+    more = " - showing the best matches, refine the search to narrow down" if len(results) == SEARCH_RESULT_LIMIT else ""
+    st.caption(f"{len(results)} match(es) in {elapsed_ms:.0f} ms{more}")
+    st.dataframe(results[display_columns + ["snippet"]], use_container_width=True, hide_index=True)
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from psycopg2 import sql
+
+# --- Certificate Expiry Status ---
+# Shared by the welder qualification and machine calibration registries. The same rules are
+# available as a vectorized pandas/NumPy classifier and as a SQL CASE expression.
+EXPIRING_SOON_DAYS = 30
+
+STATUS_NO_EXPIRY = "Permanent / No Expiry"
+STATUS_EXPIRED = "Expired"
+STATUS_EXPIRING = "Expiring Soon"
+STATUS_VALID = "Valid"
+STATUS_ORDER = [STATUS_EXPIRED, STATUS_EXPIRING, STATUS_VALID, STATUS_NO_EXPIRY]
+
+# Alert feed buckets: (key, label, days from today the bucket ends at). Each bucket starts
+# where the previous one ends; 'expired' is everything before today.
+ALERT_BUCKETS = [
+    ("expired", "Expired", 0),
+    ("within_7", "< 7 days", 7),
+    ("within_30", "< 30 days", EXPIRING_SOON_DAYS)
+]
+
+# Horizons stored in the expiry digest: the alert buckets plus records beyond the alert
+# horizon and records without an expiry date, with the status each one rolls up to.
+HORIZON_VALID = "valid"
+HORIZON_NO_EXPIRY = "no_expiry"
+HORIZON_STATUS = {
+    "expired": STATUS_EXPIRED,
+    "within_7": STATUS_EXPIRING,
+    "within_30": STATUS_EXPIRING,
+    HORIZON_VALID: STATUS_VALID,
+    HORIZON_NO_EXPIRY: STATUS_NO_EXPIRY
+}
+
+def classify_expiry(expiry, today=None, horizon_days=EXPIRING_SOON_DAYS):
+    """
+    Classifies a Series of expiry dates (dates, strings, datetimes or None) in one pass using
+    datetime64 comparisons and np.select. Missing dates are 'Permanent / No Expiry'.
+    Returns a categorical Series aligned with 'expiry'.
+    """
+    expiry = pd.Series(expiry)
+    dates = pd.to_datetime(expiry, errors="coerce").to_numpy(dtype="datetime64[D]")
+    today = np.datetime64(today or date.today(), "D")
+
+    status = np.select(
+        [np.isnat(dates), dates < today, dates < today + np.timedelta64(horizon_days, "D")],
+        [STATUS_NO_EXPIRY, STATUS_EXPIRED, STATUS_EXPIRING],
+        default=STATUS_VALID
+    )
+    return pd.Series(pd.Categorical(status, categories=STATUS_ORDER), index=expiry.index)
+
+def expiry_status_sql(column, horizon_days=EXPIRING_SOON_DAYS):
+    """The classify_expiry() rules as a SQL CASE expression over a DATE column."""
+    return sql.SQL("""
+        CASE
+            WHEN {col} IS NULL THEN {no_expiry}
+            WHEN {col} < CURRENT_DATE THEN {expired}
+            WHEN {col} < CURRENT_DATE + {horizon} THEN {expiring}
+            ELSE {valid}
+        END
+    """).format(
+        col=sql.Identifier(column),
+        horizon=sql.Literal(horizon_days),
+        no_expiry=sql.Literal(STATUS_NO_EXPIRY),
+        expired=sql.Literal(STATUS_EXPIRED),
+        expiring=sql.Literal(STATUS_EXPIRING),
+        valid=sql.Literal(STATUS_VALID)
+    )
+
+def expiry_horizon_sql(column):
+    """SQL CASE mapping a DATE column to its digest horizon (ALERT_BUCKETS keys, 'valid', 'no_expiry')."""
+    whens = [sql.SQL("WHEN {} IS NULL THEN {}").format(sql.Identifier(column), sql.Literal(HORIZON_NO_EXPIRY))]
+    for key, _, upper in ALERT_BUCKETS:
+        whens.append(sql.SQL("WHEN {} < CURRENT_DATE + {} THEN {}").format(
+            sql.Identifier(column), sql.Literal(upper), sql.Literal(key)
+        ))
+    return sql.SQL("CASE {} ELSE {} END").format(sql.SQL(' ').join(whens), sql.Literal(HORIZON_VALID))
@@ -0,0 +1,307 @@
+import re
+import streamlit as st
+import pandas as pd
+from psycopg2 import sql
+from db import connect_db
+from cert_status import EXPIRING_SOON_DAYS, expiry_status_sql
+
+# --- Certificate Registry Configuration ---
+# Reads are cached process-wide (shared by every session) and invalidated on writes;
+# the TTL picks up writes made by other app processes.
+CERT_CACHE_TTL = 60  # seconds
+CERT_PAGE_SIZE = 100
+ALERT_PAGE_SIZE = 10  # Alert cards rendered per page of the expiry feed
+SEARCH_RESULT_LIMIT = 20
+
+# One entry per registry: table name, expiry column, the column the alert feed is filtered by,
+# the columns stored per record and the columns covered by the full-text search index (together
+# with the raw OCR text, stored in 'ocr_text' but not loaded with the record pages).
+CERT_TABLES = {
+    "welder": {
+        "table": "welder_certificates",
+        "expiry": "valid_upto_date",
+        "group": "employer_name",
+        "group_label": "Employer",
+        "columns": [
+            "certificate_number", "welder_name", "identification_number", "employer_name",
+            "welding_process", "initial_approval_date", "valid_upto_date", "address", "file_name"
+        ],
+        "search": ["certificate_number", "welder_name", "identification_number", "employer_name"]
+    },
+    "machine": {
+        "table": "machine_calibrations",
+        "expiry": "due_date",
+        "group": "instrument_name",
+        "group_label": "Instrument",
+        "columns": [
+            "instrument_name", "customer_name", "serial_number", "model_number",
+            "calibration_date", "due_date", "file_name"
+        ],
+        "search": ["instrument_name", "customer_name", "serial_number", "model_number"]
+    }
+}
+
+def create_certificate_tables():
+    """
+    Creates the welder qualification and machine calibration registries if they don't exist,
+    with indexes on the expiry/due date, welder identification number and serial number, and on
+    (employer, expiry) / (instrument, due date) for the filtered alert feed. Each registry also
+    gets the raw OCR text and a GIN-indexed tsvector over it and the identifying fields, with
+    punctuation folded to spaces so that serial fragments ('AB-1234' -> 'ab', '1234') match.
+    """
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS welder_certificates (
+                    id SERIAL PRIMARY KEY,
+                    certificate_number VARCHAR(100) NOT NULL,
+                    welder_name VARCHAR(100) NOT NULL,
+                    identification_number VARCHAR(50),
+                    employer_name VARCHAR(200),
+                    welding_process VARCHAR(100),
+                    initial_approval_date DATE,
+                    valid_upto_date DATE, -- NULL means no expiry on the certificate
+                    address TEXT,
+                    file_name VARCHAR(255),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_welder_certificates_valid_upto
+                    ON welder_certificates (valid_upto_date);
+                CREATE INDEX IF NOT EXISTS idx_welder_certificates_identification
+                    ON welder_certificates (identification_number);
+                CREATE INDEX IF NOT EXISTS idx_welder_certificates_employer_valid_upto
+                    ON welder_certificates (employer_name, valid_upto_date);
+
+                CREATE TABLE IF NOT EXISTS machine_calibrations (
+                    id SERIAL PRIMARY KEY,
+                    instrument_name VARCHAR(200) NOT NULL,
+                    customer_name VARCHAR(200),
+                    serial_number VARCHAR(100) NOT NULL,
+                    model_number VARCHAR(100),
+                    calibration_date DATE,
+                    due_date DATE,
+                    file_name VARCHAR(255),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_machine_calibrations_due_date
+                    ON machine_calibrations (due_date);
+                CREATE INDEX IF NOT EXISTS idx_machine_calibrations_serial
+                    ON machine_calibrations (serial_number);
+                CREATE INDEX IF NOT EXISTS idx_machine_calibrations_instrument_due_date
+                    ON machine_calibrations (instrument_name, due_date);
+            """)
+            for spec in CERT_TABLES.values():
+                document = sql.SQL(" || ' ' || ").join(
+                    sql.SQL("coalesce({}, '')").format(sql.Identifier(col)) for col in spec["search"] + ["ocr_text"]
+                )
+                cur.execute(sql.SQL("""
+                    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS ocr_text TEXT;
+                    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+                        GENERATED ALWAYS AS (
+                            to_tsvector('simple'::regconfig, regexp_replace({document}, '[^[:alnum:]]+', ' ', 'g'))
+                        ) STORED;
+                    CREATE INDEX IF NOT EXISTS {index} ON {table} USING GIN (search_vector);
+                """).format(
+                    table=sql.Identifier(spec["table"]),
+                    document=document,
+                    index=sql.Identifier(f"idx_{spec['table']}_search")
+                ))
+            conn.commit()
+            return True
+    except Exception as e:
+        st.error(f"Error creating certificate tables: {e}")
+        return False
+    finally:
+        conn.close()
+
+@st.cache_resource
+def ensure_certificate_tables():
+    """Runs create_certificate_tables() once per process instead of on every rerun."""
+    return create_certificate_tables()
+
+def _fetch_df(query, params, columns):
+    """Runs a SELECT and returns the rows as a DataFrame (empty with 'columns' on failure)."""
+    conn = connect_db()
+    if conn is None:
+        return pd.DataFrame(columns=columns)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            col_names = [desc[0] for desc in cur.description]
+            return pd.DataFrame(rows, columns=col_names)
+    except Exception as e:
+        st.error(f"Error reading certificate registry: {e}")
+        return pd.DataFrame(columns=columns)
+    finally:
+        conn.close()
+
+@st.cache_data(ttl=CERT_CACHE_TTL)
+def count_certs(kind):
+    """Total number of records in the registry."""
+    table = CERT_TABLES[kind]["table"]
+    df = _fetch_df(sql.SQL("SELECT COUNT(*) AS n FROM {}").format(sql.Identifier(table)), (), ["n"])
+    return int(df["n"].iloc[0]) if not df.empty else 0
+
+@st.cache_data(ttl=CERT_CACHE_TTL)
+def load_cert_page(kind, page=0, page_size=CERT_PAGE_SIZE):
+    """One page of the registry, newest first, including the record 'id'."""
+    spec = CERT_TABLES[kind]
+    columns = ["id"] + spec["columns"]
+    query = sql.SQL("SELECT {} FROM {} ORDER BY id DESC LIMIT %s OFFSET %s").format(
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+        sql.Identifier(spec["table"])
+    )
+    return _fetch_df(query, (page_size, page * page_size), columns)
+
+@st.cache_data(ttl=CERT_CACHE_TTL)
+def load_alert_page(kind, group=None, page=0, page_size=ALERT_PAGE_SIZE):
+    """
+    One page of the expired/expiring records, soonest expiry first, optionally for a single
+    employer/instrument. Served by the expiry index (or the group + expiry index when filtered).
+    """
+    spec = CERT_TABLES[kind]
+    columns = ["id"] + spec["columns"]
+    filters = [sql.SQL("{} < CURRENT_DATE + %s").format(sql.Identifier(spec["expiry"]))]
+    params = [EXPIRING_SOON_DAYS]
+    if group is not None:
+        filters.append(sql.SQL("{} = %s").format(sql.Identifier(spec["group"])))
+        params.append(group)
+
+    query = sql.SQL("SELECT {} FROM {} WHERE {} ORDER BY {}, id LIMIT %s OFFSET %s").format(
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+        sql.Identifier(spec["table"]),
+        sql.SQL(' AND ').join(filters),
+        sql.Identifier(spec["expiry"])
+    )
+    return _fetch_df(query, params + [page_size, page * page_size], columns)
+
+@st.cache_data(ttl=CERT_CACHE_TTL)
+def load_calibration_status(serials):
+    """
+    Latest calibration of each machine serial number in one query (serial number index).
+    'serials' is a tuple (hashable for the cache); returns {serial: {'due_date', 'status',
+    'instrument_name'}} with no entry for serials that have never been calibrated.
+    """
+    if not serials:
+        return {}
+    query = sql.SQL("""
+        SELECT DISTINCT ON (serial_number) serial_number, due_date, {status} AS status, instrument_name
+        FROM machine_calibrations
+        WHERE serial_number = ANY(%s)
+        ORDER BY serial_number, due_date DESC NULLS LAST, id DESC
+    """).format(status=expiry_status_sql("due_date"))
+    df = _fetch_df(query, (list(serials),), ["serial_number", "due_date", "status", "instrument_name"])
+    return {
+        row.serial_number: {"due_date": row.due_date, "status": row.status, "instrument_name": row.instrument_name}
+        for row in df.itertuples(index=False)
+    }
+
+def search_terms(text):
+    """
+    Turns free text into a prefix tsquery ('armon cal' -> 'armon:* & cal:*'), splitting on
+    punctuation like the indexed document. Returns None if there is nothing to search for.
+    """
+    tokens = re.findall(r"[^\W_]+", text.lower())
+    return " & ".join(f"{token}:*" for token in tokens) or None
+
+@st.cache_data(ttl=CERT_CACHE_TTL)
+def search_certs(kind, text, limit=SEARCH_RESULT_LIMIT):
+    """
+    Full-text search over the identifying fields and OCR text, newest matches first.
+    Returns the record columns plus a short OCR 'snippet' around the match.
+    Matching ids always come from the GIN index (OFFSET 0 keeps the planner from walking the
+    primary key for rare terms); ts_headline only runs on the 'limit' rows returned, since
+    ranking or highlighting every match of a common term (a lab name) costs 100+ ms at 50k rows.
+    """
+    spec = CERT_TABLES[kind]
+    columns = ["id"] + spec["columns"] + ["snippet"]
+    terms = search_terms(text)
+    if terms is None:
+        return pd.DataFrame(columns=columns)
+
+    query = sql.SQL("""
+        WITH q AS (SELECT to_tsquery('simple', %s) AS q),
+        top AS (
+            SELECT id FROM (
+                SELECT id FROM {table}, q WHERE search_vector @@ q.q OFFSET 0
+            ) matches
+            ORDER BY id DESC
+            LIMIT %s
+        )
+        SELECT {cols},
+               ts_headline('simple', coalesce(t.ocr_text, ''), q.q, 'StartSel=[, StopSel=], MaxWords=12, MinWords=4, MaxFragments=1') AS snippet
+        FROM {table} t JOIN top USING (id), q
+        ORDER BY t.id DESC
+    """).format(
+        cols=sql.SQL(', ').join(sql.SQL("t.{}").format(sql.Identifier(col)) for col in ["id"] + spec["columns"]),
+        table=sql.Identifier(spec["table"])
+    )
+    return _fetch_df(query, (terms, limit), columns)
+
+def clear_cert_caches():
+    """
+    Invalidates the cached reads for all sessions after a write, asks the expiry digest job for a
+    refresh and marks the welder qualification index for an incremental refresh.
+    """
+    from expiry_digest import request_digest_refresh  # expiry_digest imports this module
+    from qualification_index import invalidate_qualification_index
+
+    count_certs.clear()
+    load_cert_page.clear()
+    load_alert_page.clear()
+    load_calibration_status.clear()
+    search_certs.clear()
+    request_digest_refresh()
+    invalidate_qualification_index()
+
+def add_cert(kind, record):
+    """Inserts a record (dict keyed by the registry's columns and 'ocr_text'). Returns True on success."""
+    spec = CERT_TABLES[kind]
+    cols = [col for col in spec["columns"] + ["ocr_text"] if col in record]
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            query = sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+                sql.Identifier(spec["table"]),
+                sql.SQL(', ').join(map(sql.Identifier, cols)),
+                sql.SQL(', ').join(sql.Placeholder() * len(cols))
+            )
+            cur.execute(query, [record[col] for col in cols])
+            conn.commit()
+        clear_cert_caches()
+        return True
+    except Exception as e:
+        st.error(f"Error saving certificate: {e}")
+        return False
+    finally:
+        conn.close()
+
+def delete_cert(kind, cert_id):
+    """Deletes a record by its id. Returns True on success."""
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("DELETE FROM {} WHERE id = %s").format(sql.Identifier(CERT_TABLES[kind]["table"])),
+                (int(cert_id),)
+            )
+            conn.commit()
+        clear_cert_caches()
+        return True
+    except Exception as e:
+        st.error(f"Error deleting certificate: {e}")
+        return False
+    finally:
+        conn.close()
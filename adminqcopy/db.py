@@ -0,0 +1,21 @@
+import streamlit as st
+import psycopg2
+
+# --- Database Configuration ---
+# PostgreSQL Configuration (shared by the fabrication and certificate registries)
+DB_CONFIG = {
+    "user": "pavansaigeddam",
+    "host": "10.21.137.79",
+    "database": "streamlit_dashboard",
+    "password": "Weld@123",
+    "port": 5432
+}
+
+def connect_db():
+    """Establishes a connection to the PostgreSQL database."""
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        return conn
+    except Exception as e:
+        st.error(f"Database connection failed: {e}")
+        return None
@@ -0,0 +1,236 @@
+import threading
+import time
+import streamlit as st
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from db import connect_db
+
+# --- Device Registry Configuration ---
+# One edge_devices row per edge device, shared by every session: name and device ID shown on the
+# overview, contractor, welder badge and welding machine serial (calibration registry), and the
+# time the device was last heard from. Devices are heard from through the ingestion server
+# (sensor_ingest.py): every accepted sensor frame counts as a heartbeat, and an idle device POSTs
+# {"device_id": "DEV101"} to /heartbeat every DEVICE_HEARTBEAT_SECONDS.
+# Heartbeats are collected in memory and written in one statement every HEARTBEAT_FLUSH_SECONDS,
+# so the database sees one small write per flush however many devices and frames come in. A
+# device that is not registered yet is added on its first heartbeat (named after its device ID).
+# A device is Online while it was heard from within DEVICE_OFFLINE_SECONDS (3 missed heartbeats).
+# The overview grid reads one page of devices at a time, filtered by contractor and status in the
+# database, so a rerun costs the same for 10 or 1,000 devices.
+DEVICE_HEARTBEAT_SECONDS = 10
+DEVICE_OFFLINE_SECONDS = 30
+HEARTBEAT_FLUSH_SECONDS = 5
+DEVICE_CACHE_TTL = 5  # seconds
+DEVICE_PAGE_SIZE = 24  # cards per overview page (8 rows of 3)
+DEVICE_STATUSES = ("Online", "Offline")
+
+# A new registry starts empty: devices register themselves with their first heartbeat. For a demo
+# or test installation without edge devices, SEED_DEMO_DEVICES registers DEMO_DEVICES (made-up
+# IDs and machine serials) on an empty registry; never set it where the registry is real.
+SEED_DEMO_DEVICES = False
+DEMO_DEVICES = [
+    (f"DEV{100 + i}", f"Edge Device {i}", f"Contractor {i}", f"W{100 + i}", f"WM-{100 + i}")
+    for i in range(1, 11)
+]
+
+_pending_heartbeats = {}  # device_id -> epoch seconds of the latest heartbeat not written yet
+_pending_lock = threading.Lock()
+
+def create_device_table():
+    """Creates the edge device registry if it doesn't exist (and registers DEMO_DEVICES when empty, if SEED_DEMO_DEVICES)."""
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS edge_devices (
+                    device_id VARCHAR(50) PRIMARY KEY,
+                    device_name VARCHAR(50) NOT NULL,
+                    contractor VARCHAR(100),
+                    welder_badge VARCHAR(50),
+                    machine_serial VARCHAR(100),
+                    last_seen TIMESTAMPTZ,
+                    registered_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_edge_devices_contractor ON edge_devices (contractor);
+                CREATE INDEX IF NOT EXISTS idx_edge_devices_last_seen ON edge_devices (last_seen);
+            """)
+            if SEED_DEMO_DEVICES:
+                cur.execute("SELECT 1 FROM edge_devices LIMIT 1")
+                if cur.fetchone() is None:
+                    execute_values(cur, """
+                        INSERT INTO edge_devices (device_id, device_name, contractor, welder_badge, machine_serial)
+                        VALUES %s ON CONFLICT (device_id) DO NOTHING
+                    """, DEMO_DEVICES)
+            conn.commit()
+            return True
+    except Exception as e:
+        print(f"Error creating device registry: {e}")  # also runs in the heartbeat writer thread
+        return False
+    finally:
+        conn.close()
+
+@st.cache_resource
+def ensure_device_table():
+    """Runs create_device_table() once per process instead of on every rerun."""
+    return create_device_table()
+
+def record_heartbeat(device_id, seen_at=None):
+    """Notes that a device was heard from (epoch seconds, default now); written by the next flush."""
+    seen_at = time.time() if seen_at is None else seen_at
+    with _pending_lock:
+        if seen_at > _pending_heartbeats.get(device_id, 0.0):
+            _pending_heartbeats[device_id] = seen_at
+
+def flush_heartbeats():
+    """Writes the pending heartbeats in one upsert; returns the number of devices written."""
+    with _pending_lock:
+        pending = dict(_pending_heartbeats)
+        _pending_heartbeats.clear()
+    if not pending:
+        return 0
+
+    conn = connect_db()
+    if conn is not None:
+        try:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO edge_devices (device_id, device_name, last_seen) VALUES %s
+                    ON CONFLICT (device_id)
+                    DO UPDATE SET last_seen = GREATEST(edge_devices.last_seen, EXCLUDED.last_seen)
+                """, [(device_id, device_id, seen_at) for device_id, seen_at in pending.items()],
+                    template="(%s, %s, to_timestamp(%s))")
+            conn.commit()
+            return len(pending)
+        except Exception as e:
+            conn.rollback()
+            print(f"Error writing device heartbeats: {e}")
+        finally:
+            conn.close()
+    # Not written: keep them for the next flush
+    for device_id, seen_at in pending.items():
+        record_heartbeat(device_id, seen_at)
+    return 0
+
+def _heartbeat_loop(interval):
+    while not create_device_table():
+        time.sleep(30)
+    while True:
+        started = time.monotonic()
+        try:
+            flush_heartbeats()
+        except Exception as e:
+            print(f"Heartbeat writer: {e}")
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+@st.cache_resource
+def start_heartbeat_writer(interval=HEARTBEAT_FLUSH_SECONDS):
+    """Starts the background thread that writes the collected heartbeats, once per process."""
+    thread = threading.Thread(target=_heartbeat_loop, args=(interval,), daemon=True, name="heartbeat-writer")
+    thread.start()
+    return thread
+
+def _online_sql():
+    """SQL of a device's online status (heard from within DEVICE_OFFLINE_SECONDS)."""
+    return sql.SQL("coalesce({}, false)").format(_seen_recently_sql())
+
+def _seen_recently_sql():
+    return sql.SQL("last_seen > now() - make_interval(secs => {})").format(sql.Literal(DEVICE_OFFLINE_SECONDS))
+
+def _device_filters(contractor, status):
+    """WHERE clause of the overview filters (None: all contractors / statuses)."""
+    filters, params = [sql.SQL("true")], []
+    if contractor is not None:
+        filters.append(sql.SQL("contractor = %s"))
+        params.append(contractor)
+    if status == "Online":
+        filters.append(_seen_recently_sql())  # last_seen index
+    elif status == "Offline":
+        filters.append(sql.SQL("(last_seen IS NULL OR NOT {})").format(_seen_recently_sql()))
+    return sql.SQL(" AND ").join(filters), params
+
+def _fetch_devices(query, params):
+    """Runs a device SELECT (columns as in load_device_page) and returns the device dicts."""
+    conn = connect_db()
+    if conn is None:
+        return []
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+    except Exception as e:
+        st.error(f"Error reading device registry: {e}")
+        return []
+    finally:
+        conn.close()
+
+    return [
+        {'deviceName': name, 'deviceId': device_id, 'contractor': contractor, 'welderBadge': badge,
+         'machineSerial': serial, 'online': online, 'lastSeen': last_seen}
+        for name, device_id, contractor, badge, serial, last_seen, online in rows
+    ]
+
+@st.cache_data(ttl=DEVICE_CACHE_TTL)
+def count_devices(contractor=None, status=None):
+    """Number of registered devices matching the overview filters."""
+    where, params = _device_filters(contractor, status)
+    conn = connect_db()
+    if conn is None:
+        return 0
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("SELECT COUNT(*) FROM edge_devices WHERE {}").format(where), params)
+            return cur.fetchone()[0]
+    except Exception as e:
+        st.error(f"Error reading device registry: {e}")
+        return 0
+    finally:
+        conn.close()
+
+@st.cache_data(ttl=DEVICE_CACHE_TTL)
+def load_device_page(contractor=None, status=None, page=0, page_size=DEVICE_PAGE_SIZE):
+    """
+    One page of the devices matching the overview filters (contractor name / "Online" /
+    "Offline", None for all), in natural name order, as dicts with the keys deviceName, deviceId,
+    contractor, welderBadge, machineSerial, online and lastSeen (datetime or None). Cached
+    process-wide and shared by every session.
+    """
+    where, params = _device_filters(contractor, status)
+    query = sql.SQL("""
+        SELECT device_name, device_id, contractor, welder_badge, machine_serial, last_seen, {online}
+        FROM edge_devices WHERE {where}
+        ORDER BY length(device_name), device_name LIMIT %s OFFSET %s
+    """).format(online=_online_sql(), where=where)
+    return _fetch_devices(query, params + [page_size, page * page_size])
+
+@st.cache_data(ttl=DEVICE_CACHE_TTL)
+def load_device(device_name):
+    """The registry entry of one device (dict as in load_device_page), or None."""
+    query = sql.SQL("""
+        SELECT device_name, device_id, contractor, welder_badge, machine_serial, last_seen, {online}
+        FROM edge_devices WHERE device_name = %s
+        ORDER BY device_id LIMIT 1
+    """).format(online=_online_sql())
+    devices = _fetch_devices(query, [device_name])
+    return devices[0] if devices else None
+
+@st.cache_data(ttl=DEVICE_CACHE_TTL)
+def load_contractors():
+    """Contractor names of the registered devices (options of the overview filter)."""
+    conn = connect_db()
+    if conn is None:
+        return []
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT contractor FROM edge_devices WHERE contractor IS NOT NULL ORDER BY contractor")
+            return [contractor for (contractor,) in cur.fetchall()]
+    except Exception as e:
+        st.error(f"Error reading device registry: {e}")
+        return []
+    finally:
+        conn.close()
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# --- Chart Downsampling Configuration ---
+# Charts are capped at MAX_CHART_POINTS points per trace, whatever the time window.
+#   minmax - the min and max sample of equal bins: keeps every spike (envelope of the waveform)
+#   lttb   - Largest-Triangle-Three-Buckets: one visually significant point per bucket. Long
+#            inputs are first reduced with minmax to LTTB_PRESELECT points per output point
+#            (MinMaxLTTB), which keeps the sequential LTTB pass short.
+MAX_CHART_POINTS = 2000
+MODE_MINMAX = "minmax"
+MODE_LTTB = "lttb"
+DOWNSAMPLE_MODES = {"Min-max": MODE_MINMAX, "LTTB": MODE_LTTB}
+LTTB_PRESELECT = 4
+LTTB_SMALL_BUCKET = 16       # average bucket size up to which the LTTB pass runs in plain Python
+
+def minmax_indices(y, n_out):
+    """
+    Sorted indices of the min and max sample of (n_out - 2) // 2 equal bins between the first
+    and the last sample (both kept). Returns at most n_out indices.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    n_bins = max(1, (n_out - 2) // 2)
+    width = (n - 2) // n_bins
+    body = y[1:1 + n_bins * width].reshape(n_bins, width)
+    starts = 1 + np.arange(n_bins) * width
+    imin = starts + body.argmin(axis=1)
+    imax = starts + body.argmax(axis=1)
+
+    # Samples left over by the equal-width bins join the last bin
+    tail_start = 1 + n_bins * width
+    if tail_start < n - 1:
+        tail = y[tail_start - width:n - 1]
+        if tail.min() < y[imin[-1]]:
+            imin[-1] = tail_start - width + tail.argmin()
+        if tail.max() > y[imax[-1]]:
+            imax[-1] = tail_start - width + tail.argmax()
+    return np.unique(np.concatenate([[0], imin, imax, [n - 1]]))
+
+def lttb_indices(t, y, n_out):
+    """
+    Indices picked by Largest-Triangle-Three-Buckets: the first and last sample plus, for each of
+    n_out - 2 buckets, the sample forming the largest triangle with the previously picked sample
+    and the mean of the next bucket.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_t = np.add.reduceat(t, edges[:-1]) / counts
+    mean_y = np.add.reduceat(y, edges[:-1]) / counts
+    # "Next bucket" point of each bucket: the following bucket's mean, the last sample for the last bucket
+    next_t = np.append(mean_t[1:], t[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    if n <= LTTB_SMALL_BUCKET * n_out:
+        # Narrow buckets (e.g. after min-max preselection): plain Python beats per-bucket NumPy calls
+        t_list, y_list, edge_list = t.tolist(), y.tolist(), edges.tolist()
+        next_t_list, next_y_list = next_t.tolist(), next_y.tolist()
+        for i in range(n_out - 2):
+            at, ay = t_list[a], y_list[a]
+            dt, dy = at - next_t_list[i], next_y_list[i] - ay
+            best, a = -1.0, edge_list[i]
+            for j in range(edge_list[i], edge_list[i + 1]):
+                area = abs(dt * (y_list[j] - ay) - (at - t_list[j]) * dy)
+                if area > best:
+                    best, a = area, j
+            out[i + 1] = a
+        return out
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        at, ay = t[a], y[a]
+        area = np.abs((at - next_t[i]) * (y[lo:hi] - ay) - (at - t[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+def downsample(t, y, max_points=MAX_CHART_POINTS, mode=MODE_MINMAX):
+    """Reduces one trace (t, y) to at most max_points points; returns (t, y)."""
+    t, y = np.asarray(t), np.asarray(y)
+    if len(y) <= max_points:
+        return t, y
+    if mode == MODE_LTTB:
+        if len(y) > LTTB_PRESELECT * max_points:
+            pre = minmax_indices(y, LTTB_PRESELECT * max_points)
+            t, y = t[pre], y[pre]
+        idx = lttb_indices(t, y, max_points)
+    else:
+        idx = minmax_indices(y, max_points)
+    return t[idx], y[idx]
+
+def downsample_frame(df, max_points=MAX_CHART_POINTS, mode=MODE_MINMAX, trace_name="Trace", value_name="Value"):
+    """
+    Long-format chart data (x, trace, value) with each column of 'df' (indexed by x) reduced to
+    at most max_points points; plot it with st.line_chart(x=<index name>, y=value_name, color=trace_name).
+    """
+    x_name = df.index.name or "x"
+    x = df.index.to_numpy()
+    parts = []
+    for column in df.columns:
+        tx, ty = downsample(x, df[column].to_numpy(), max_points, mode)
+        parts.append(pd.DataFrame({x_name: tx, trace_name: column, value_name: ty}))
+    return pd.concat(parts, ignore_index=True)
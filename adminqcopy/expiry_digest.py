@@ -0,0 +1,169 @@
+import threading
+import time
+import streamlit as st
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+from db import DB_CONFIG, connect_db
+from cert_store import CERT_TABLES, ensure_certificate_tables
+from cert_status import ALERT_BUCKETS, HORIZON_STATUS, STATUS_ORDER, expiry_horizon_sql
+
+# --- Expiry Digest Configuration ---
+# A background job recomputes certificate/calibration counts per employer or instrument and
+# expiry horizon into cert_expiry_digest; the tabs and the Overview header read that table
+# instead of scanning the registries on every render. A write (clear_cert_caches()) does not
+# rebuild the digest itself: it wakes the background job, which refreshes DIGEST_WRITE_DELAY
+# seconds later, once for a whole burst of writes. Refreshes take an EXCLUSIVE lock on the
+# table, so concurrent rebuilds (several dashboard processes) run one after the other while
+# reads go on.
+DIGEST_INTERVAL = 15 * 60  # seconds between scheduled refreshes
+DIGEST_WRITE_DELAY = 2     # seconds between a write's refresh request and the refresh
+DIGEST_CACHE_TTL = 30      # seconds a digest read is reused across sessions
+
+_refresh_requested = threading.Event()
+
+def create_digest_table(cur):
+    """Creates the digest table (one row per registry, employer/instrument and horizon)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS cert_expiry_digest (
+            kind VARCHAR(20) NOT NULL,
+            grp VARCHAR(200) NOT NULL, -- employer / instrument ('' when not recorded)
+            horizon VARCHAR(20) NOT NULL,
+            n INTEGER NOT NULL,
+            computed_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (kind, grp, horizon)
+        )
+    """)
+
+@st.cache_resource
+def ensure_digest_table():
+    """Creates the digest table once per process. Returns True on success."""
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            create_digest_table(cur)
+        conn.commit()
+        return True
+    except Exception as e:
+        st.error(f"Error creating expiry digest table: {e}")
+        return False
+    finally:
+        conn.close()
+
+def _refresh(conn):
+    """
+    Recomputes the whole digest in one transaction so readers never see a partial digest. The
+    EXCLUSIVE lock (readers are not blocked) serialises concurrent refreshes, which would
+    otherwise insert the same (kind, grp, horizon) keys.
+    """
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE cert_expiry_digest IN EXCLUSIVE MODE")
+        cur.execute("DELETE FROM cert_expiry_digest")
+        for kind, spec in CERT_TABLES.items():
+            cur.execute(sql.SQL("""
+                INSERT INTO cert_expiry_digest (kind, grp, horizon, n, computed_at)
+                SELECT %s, COALESCE({group}, ''), {horizon}, COUNT(*), CURRENT_TIMESTAMP
+                FROM {table}
+                GROUP BY 2, 3
+            """).format(
+                group=sql.Identifier(spec["group"]),
+                horizon=expiry_horizon_sql(spec["expiry"]),
+                table=sql.Identifier(spec["table"])
+            ), (kind,))
+    conn.commit()
+
+def refresh_expiry_digest():
+    """Recomputes the digest now, in the calling session. Returns True on success."""
+    ensure_digest_table()
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        _refresh(conn)
+        load_expiry_digest.clear()
+        return True
+    except Exception as e:
+        st.error(f"Error refreshing expiry digest: {e}")
+        return False
+    finally:
+        conn.close()
+
+def request_digest_refresh():
+    """Asks the background job to refresh the digest soon (after writes), without waiting for it."""
+    _refresh_requested.set()
+
+def _scheduler_loop(interval):
+    """
+    Background loop, refreshing every 'interval' seconds or shortly after a refresh request. Runs
+    outside any Streamlit session, so failures are printed.
+    """
+    while True:
+        if _refresh_requested.wait(interval):
+            time.sleep(DIGEST_WRITE_DELAY)  # the rest of a burst of writes is covered by this refresh
+        _refresh_requested.clear()  # a request made during the refresh triggers another one
+        try:
+            conn = psycopg2.connect(**DB_CONFIG)
+            try:
+                _refresh(conn)
+                load_expiry_digest.clear()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Expiry digest refresh failed: {e}")
+
+@st.cache_resource
+def start_digest_scheduler(interval=DIGEST_INTERVAL):
+    """
+    Starts the digest job once per process. The first refresh runs in the calling session so
+    the digest is populated before it is first read.
+    """
+    ensure_certificate_tables()
+    ensure_digest_table()
+    refresh_expiry_digest()
+    thread = threading.Thread(target=_scheduler_loop, args=(interval,), daemon=True, name="expiry-digest")
+    thread.start()
+    return thread
+
+@st.cache_data(ttl=DIGEST_CACHE_TTL)
+def load_expiry_digest():
+    """The precomputed digest rows (kind, grp, horizon, n, computed_at)."""
+    columns = ["kind", "grp", "horizon", "n", "computed_at"]
+    ensure_digest_table()
+    conn = connect_db()
+    if conn is None:
+        return pd.DataFrame(columns=columns)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT kind, grp, horizon, n, computed_at FROM cert_expiry_digest")
+            rows = cur.fetchall()
+        return pd.DataFrame(rows, columns=columns)
+    except Exception as e:
+        st.error(f"Error reading expiry digest: {e}")
+        return pd.DataFrame(columns=columns)
+    finally:
+        conn.close()
+
+def digest_alert_buckets(kind):
+    """Alert bucket counts per employer/instrument: one row per group with the ALERT_BUCKETS keys as columns."""
+    keys = [key for key, _, _ in ALERT_BUCKETS]
+    digest = load_expiry_digest()
+    rows = digest[(digest["kind"] == kind) & digest["horizon"].isin(keys)]
+    buckets = rows.pivot_table(index="grp", columns="horizon", values="n", aggfunc="sum", fill_value=0)
+    return buckets.reindex(columns=keys, fill_value=0).astype(int).reset_index()
+
+def digest_status_counts(kind):
+    """Number of records per expiry status (STATUS_ORDER) across the whole registry."""
+    digest = load_expiry_digest()
+    rows = digest[digest["kind"] == kind]
+    counts = rows.groupby(rows["horizon"].map(HORIZON_STATUS))["n"].sum()
+    return {status: int(counts.get(status, 0)) for status in STATUS_ORDER}
+
+def digest_computed_at():
+    """When the digest was last computed (None before the first run)."""
+    digest = load_expiry_digest()
+    return digest["computed_at"].max() if not digest.empty else None
@@ -0,0 +1,225 @@
+import threading
+import numpy as np
+from sensor_store import latest_timestamp, read_stream
+
+# --- IMU Trajectory Configuration ---
+# Torch position from the 100 Hz IMU stream (accelerometer m/s^2 + gyroscope rad/s). Each update
+# integrates only the samples stored since the previous one; the state is kept per device.
+#   - Zero velocity: a sample is stationary when the arc has been off for STILL_WINDOW samples
+#     (the torch only travels while welding) and the IMU is quiet over that window.
+#   - Bias: the mean specific force of stationary samples is gravity plus the accelerometer bias
+#     (the torch orientation is taken as fixed during a pass, as on a welding carriage) and is
+#     subtracted before integrating. The gyro bias is the stationary mean angular rate.
+#   - Integration: velocity and position are cumulative sums over each run of moving samples.
+#   - Zero-velocity update (ZUPT): when the torch stops, the velocity left at the end of the
+#     motion is drift; it is removed linearly over the motion and that motion's positions are
+#     corrected once. Until the torch stops, the open motion is shown uncorrected.
+ARC_ON_VOLTAGE = 45.0               # V; below this the arc is burning (open circuit ~65 V)
+STILL_WINDOW = 100                  # samples (1 s at 100 Hz); the torch takes ~1 s to stop
+STILL_ACCEL_STD = 0.01              # m/s^2, per-axis standard deviation over the window
+STILL_GYRO_RATE = 0.05              # rad/s, mean bias-corrected angular rate over the window
+BIAS_MEMORY = 6000                  # stationary samples averaged by the bias estimates (~1 min)
+TRAJECTORY_BACKFILL_SECONDS = 600   # history integrated when a device is first shown
+TRAJECTORY_HISTORY_SECONDS = 3600   # positions kept per device
+MAX_GAP_SECONDS = 5                 # a longer gap in the data restarts the integration at rest
+
+_trajectories = {}
+_trajectories_lock = threading.Lock()
+
+def new_trajectory_state():
+    return {
+        "lock": threading.Lock(),
+        "t_ns": None,                        # timestamp just after the last integrated sample
+        "accel_ref": None,                   # stationary specific force (gravity + bias), sensor frame
+        "gyro_bias": np.zeros(3),
+        "bias_samples": 0,
+        "tail": np.empty((0, 7)),            # last STILL_WINDOW - 1 samples (accel, gyro, arc) of the window
+        "velocity": np.zeros(3),
+        "position": np.zeros(3),
+        "moving": False,
+        "open": [],                          # (t_ns, position) chunks of the motion not yet corrected
+        "open_start": None,                  # (t_ns, position) just before that motion
+        "history": []                        # (t_ns, position) chunks, oldest first
+    }
+
+def stationary_mask(state, accel, gyro, arc_on):
+    """Zero-velocity samples of a chunk (causal window, continued from the previous chunk's tail)."""
+    window = np.vstack([state["tail"], np.column_stack([accel, gyro, arc_on])])
+    state["tail"] = window[-(STILL_WINDOW - 1):]
+    pad = STILL_WINDOW - 1 - (len(window) - len(accel))  # stream start: repeat the first sample
+    window = np.vstack([np.repeat(window[:1], pad, axis=0), window])
+
+    # Window sums from cumulative sums (centred on the first sample for precision)
+    centred = window - window[0]
+    sums = np.cumsum(np.vstack([np.zeros((1, 7)), centred]), axis=0)
+    squares = np.cumsum(np.vstack([np.zeros((1, 3)), centred[:, 0:3] ** 2]), axis=0)
+    mean = (sums[STILL_WINDOW:] - sums[:-STILL_WINDOW]) / STILL_WINDOW
+    variance = (squares[STILL_WINDOW:] - squares[:-STILL_WINDOW]) / STILL_WINDOW - mean[:, 0:3] ** 2
+    quiet_accel = variance.max(axis=1) < STILL_ACCEL_STD ** 2
+    rate = np.linalg.norm(mean[:, 3:6] + window[0, 3:6] - state["gyro_bias"], axis=1)
+    arc_off = mean[:, 6] + window[0, 6] == 0
+    return arc_off & quiet_accel & (rate < STILL_GYRO_RATE)
+
+def _update_bias(state, accel, gyro):
+    n = min(state["bias_samples"] + len(accel), BIAS_MEMORY)
+    weight = len(accel) / n if state["accel_ref"] is not None else 1.0
+    ref = state["accel_ref"] if state["accel_ref"] is not None else np.zeros(3)
+    state["accel_ref"] = (1 - weight) * ref + weight * accel.mean(axis=0)
+    state["gyro_bias"] = (1 - weight) * state["gyro_bias"] + weight * gyro.mean(axis=0)
+    state["bias_samples"] = n
+
+def _close_motion(state, t_ns):
+    """ZUPT at the end of a motion: removes the leftover velocity linearly over the motion."""
+    t0, p0 = state["open_start"]
+    duration = (t_ns - t0) / 1e9
+    drift = state["velocity"]
+    for t, p in state["open"]:
+        tau = ((t - t0) / 1e9)[:, None]
+        state["history"].append((t, p - drift * tau ** 2 / (2 * duration)))
+    state["position"] = state["position"] - drift * duration / 2
+    state["velocity"] = np.zeros(3)
+    state["open"], state["open_start"], state["moving"] = [], None, False
+
+def integrate_chunk(state, t_ns, samples, arc_on):
+    """
+    Integrates one chunk of IMU samples (t_ns int64, samples (n, 6): ax, ay, az, gx, gy, gz and
+    arc_on bool per sample) into the trajectory state.
+    """
+    if len(t_ns) == 0:
+        return state
+    accel = samples[:, 0:3].astype(np.float64)
+    gyro = samples[:, 3:6].astype(np.float64)
+    dt = np.diff(t_ns, prepend=t_ns[0] if state["t_ns"] is None else state["t_ns"]) / 1e9
+    if state["t_ns"] is not None and dt[0] > MAX_GAP_SECONDS:
+        # Device was silent: whatever moved is unknown, restart at rest
+        if state["moving"]:
+            state["velocity"] = np.zeros(3)
+            _close_motion(state, state["t_ns"])
+        state["tail"] = state["tail"][:0]
+    if state["accel_ref"] is None:
+        _update_bias(state, accel, gyro)  # first estimate until the torch is seen at rest
+
+    still = stationary_mask(state, accel, gyro, arc_on)
+    # Runs of consecutive stationary / moving samples
+    edges = np.flatnonzero(np.diff(still)) + 1
+    for lo, hi in zip(np.concatenate([[0], edges]), np.concatenate([edges, [len(still)]])):
+        t = t_ns[lo:hi]
+        if still[lo]:
+            if state["moving"]:
+                _close_motion(state, t[0])
+            _update_bias(state, accel[lo:hi], gyro[lo:hi])
+            state["history"].append((t, np.repeat(state["position"][None, :], hi - lo, axis=0)))
+        else:
+            if not state["moving"]:
+                state["moving"] = True
+                state["open_start"] = (t[0] - int(dt[lo] * 1e9), state["position"].copy())
+            step = dt[lo:hi, None]
+            velocity = state["velocity"] + np.cumsum((accel[lo:hi] - state["accel_ref"]) * step, axis=0)
+            position = state["position"] + np.cumsum(velocity * step, axis=0)
+            state["velocity"], state["position"] = velocity[-1], position[-1]
+            state["open"].append((t, position))
+    state["t_ns"] = int(t_ns[-1]) + 1
+
+    # Keep TRAJECTORY_HISTORY_SECONDS of positions
+    cutoff = state["t_ns"] - TRAJECTORY_HISTORY_SECONDS * 10**9
+    while state["history"] and state["history"][0][0][-1] < cutoff:
+        state["history"].pop(0)
+    return state
+
+def arc_on_at(device_id, t_ns):
+    """Whether the arc was burning at each of the given times (from the voltage stream)."""
+    if len(t_ns) == 0:
+        return np.zeros(0, dtype=bool)
+    vt, volts = read_stream(device_id, "voltage", int(t_ns[0]), int(t_ns[-1]) + 1)
+    if len(vt) == 0:
+        return np.zeros(len(t_ns), dtype=bool)
+    i = np.clip(np.searchsorted(vt, t_ns), 0, len(vt) - 1)
+    return volts[i, 0] < ARC_ON_VOLTAGE
+
+def update_trajectory(device_id):
+    """Integrates the IMU samples stored since the last update; returns the device's state."""
+    with _trajectories_lock:
+        state = _trajectories.setdefault(device_id, new_trajectory_state())
+    with state["lock"]:
+        end_ns = latest_timestamp(device_id, "imu")
+        if end_ns is None:
+            return state
+        start_ns = state["t_ns"] if state["t_ns"] is not None else end_ns - TRAJECTORY_BACKFILL_SECONDS * 10**9
+        if end_ns > start_ns:
+            t_ns, samples = read_stream(device_id, "imu", start_ns, end_ns)
+            integrate_chunk(state, t_ns, samples, arc_on_at(device_id, t_ns))
+    return state
+
+def trajectory_window(device_id, seconds):
+    """
+    Torch positions of the last 'seconds' after an update: (t_ns, positions (n, 3) in m, info)
+    with info holding whether the torch is moving and the current bias estimates.
+    """
+    state = update_trajectory(device_id)
+    with state["lock"]:
+        chunks = state["history"] + state["open"]
+        info = {
+            "moving": state["moving"],
+            "accel_ref": state["accel_ref"],
+            "gyro_bias": state["gyro_bias"],
+            "t_ns": state["t_ns"]
+        }
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty((0, 3)), info
+    start_ns = state["t_ns"] - int(seconds * 1e9)
+    chunks = [(t, p) for t, p in chunks if t[-1] >= start_ns]
+    t = np.concatenate([c[0] for c in chunks])
+    p = np.concatenate([c[1] for c in chunks])
+    keep = t >= start_ns
+    return t[keep], p[keep], info
+
+def track_since(device_id, start_ns, corrected=False):
+    """
+    Torch positions integrated at or after start_ns: (t_ns, positions (n, 3) in m), including the
+    open motion as integrated so far, or with corrected=True only up to where that motion started.
+    Call update_trajectory() first.
+    """
+    state = _trajectories.get(device_id)
+    if state is None:
+        return np.empty(0, dtype=np.int64), np.empty((0, 3))
+    with state["lock"]:
+        kept = state["history"] if corrected else state["history"] + state["open"]
+        chunks = [(t, p) for t, p in kept if t[-1] >= start_ns]
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty((0, 3))
+    t = np.concatenate([c[0] for c in chunks])
+    p = np.concatenate([c[1] for c in chunks])
+    keep = t >= start_ns
+    return t[keep], p[keep]
+
+def processed_until(device_id):
+    """Timestamp (ns) just after the last integrated IMU sample of a device, or None."""
+    state = _trajectories.get(device_id)
+    return state["t_ns"] if state is not None else None
+
+def settled_positions(device_id, t_ns):
+    """
+    Corrected torch positions (m, (n, 3)) at the given times, NaN where no positions are kept; None
+    while a time is not integrated yet or falls in the open motion (not corrected until it stops).
+    """
+    state = _trajectories.get(device_id)
+    if state is None:
+        return None
+    t_ns = np.asarray(t_ns, dtype=np.int64)
+    with state["lock"]:
+        if state["t_ns"] is None:
+            return None
+        settled_ns = state["open_start"][0] if state["moving"] else state["t_ns"]
+        if t_ns.max() >= settled_ns:
+            return None
+        # From the last chunk before the earliest time (it may fall between two chunks' samples)
+        first = next((i for i, c in enumerate(state["history"]) if c[0][-1] >= t_ns.min()), len(state["history"]))
+        chunks = state["history"][max(first - 1, 0):]
+    positions = np.full((len(t_ns), 3), np.nan)
+    if chunks:
+        t = np.concatenate([c[0] for c in chunks])
+        p = np.concatenate([c[1] for c in chunks])
+        covered = (t_ns >= t[0]) & (t_ns <= t[-1])
+        for axis in range(3):
+            positions[covered, axis] = np.interp(t_ns[covered], t, p[:, axis])
+    return positions
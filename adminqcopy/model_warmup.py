@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+import streamlit as st
+import fitz  # PyMuPDF
+from resilience import reset_breaker, breaker_status, latency_histograms_text
+
+# --- Model Server Warm-up Configuration ---
+# The certificate tabs register their model endpoints here with a ping function. A background
+# thread pings every endpoint at startup and then every WARMUP_INTERVAL, which keeps the OCR
+# services warm and (with Ollama's keep_alive) gemma3:1b resident. Real extraction calls are
+# recorded too, split into cold and warm latencies for the readiness panel.
+WARMUP_INTERVAL = 240        # seconds between keep-alive pings
+WARMUP_TIMEOUT = 180         # seconds; a cold model load can take minutes
+COLD_AFTER_IDLE = 600        # seconds without traffic after which the next call counts as cold
+LATENCY_HISTORY = 200        # latencies kept per endpoint and kind (cold / warm)
+
+STATUS_PENDING = "⏳ Pending"
+STATUS_READY = "🟢 Ready"
+STATUS_DOWN = "🔴 Down"
+
+# name -> ping function returning (latency seconds, cold flag or None to infer it from idle time)
+_ENDPOINTS = {}
+
+def register_endpoint(name, ping):
+    """Registers a model endpoint for warm-up pings (called at import time by the tabs)."""
+    _ENDPOINTS[name] = ping
+
+def blank_image_png(width=64, height=32):
+    """A tiny white PNG, the cheapest request that still runs an OCR model end to end."""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), 0)
+    pix.clear_with(255)
+    return pix.tobytes("png")
+
+@st.cache_resource
+def _warmup_state():
+    """Process-wide readiness / latency state per endpoint."""
+    return {"lock": threading.Lock(), "endpoints": {}}
+
+def _endpoint(state, name):
+    return state["endpoints"].setdefault(name, {
+        "status": STATUS_PENDING, "last_ping": None, "last_activity": None, "last_error": None,
+        "cold": deque(maxlen=LATENCY_HISTORY), "warm": deque(maxlen=LATENCY_HISTORY)
+    })
+
+def record_call(name, seconds, cold=None, ok=True, error=None):
+    """
+    Records a ping or real call of an endpoint. 'cold' can be given by the caller (e.g. Ollama's
+    load_duration); otherwise a call after COLD_AFTER_IDLE seconds without traffic is cold.
+    """
+    state = _warmup_state()
+    now = time.time()
+    with state["lock"]:
+        ep = _endpoint(state, name)
+        if not ok:
+            ep["status"], ep["last_error"] = STATUS_DOWN, error
+            return
+        if cold is None:
+            cold = ep["last_activity"] is None or now - ep["last_activity"] > COLD_AFTER_IDLE
+        ep["cold" if cold else "warm"].append(seconds)
+        ep["status"], ep["last_activity"], ep["last_error"] = STATUS_READY, now, None
+
+def ping_all():
+    """Pings every registered endpoint once (in the calling thread)."""
+    for name, ping in list(_ENDPOINTS.items()):
+        start = time.time()
+        try:
+            latency, cold = ping()
+            record_call(name, latency, cold)
+            reset_breaker(name)  # the endpoint is back: stop failing fast
+        except Exception as e:
+            record_call(name, time.time() - start, ok=False, error=str(e)[:200])
+        state = _warmup_state()
+        with state["lock"]:
+            _endpoint(state, name)["last_ping"] = time.time()
+
+def _warmup_loop(interval):
+    while True:
+        ping_all()
+        time.sleep(interval)
+
+@st.cache_resource
+def start_warmup_manager(interval=WARMUP_INTERVAL):
+    """Starts the background warm-up / keep-alive thread once per process."""
+    thread = threading.Thread(target=_warmup_loop, args=(interval,), daemon=True, name="model-warmup")
+    thread.start()
+    return thread
+
+def endpoint_status():
+    """Readiness and cold/warm latency split per registered endpoint, as a DataFrame."""
+    state = _warmup_state()
+    now = time.time()
+    rows = []
+    with state["lock"]:
+        for name in _ENDPOINTS:
+            ep = _endpoint(state, name)
+            rows.append({
+                "Endpoint": name,
+                "Status": ep["status"],
+                "Last ping": f"{now - ep['last_ping']:.0f}s ago" if ep["last_ping"] else "-",
+                "Cold p50 (s)": round(float(np.median(ep["cold"])), 2) if ep["cold"] else None,
+                "Cold calls": len(ep["cold"]),
+                "Warm p50 (s)": round(float(np.median(ep["warm"])), 2) if ep["warm"] else None,
+                "Warm calls": len(ep["warm"]),
+                "Last error": ep["last_error"] or ""
+            })
+    return pd.DataFrame(rows)
+
+def render_endpoint_status(names=None):
+    """Collapsible readiness panel for the given endpoints (default: all)."""
+    df = endpoint_status()
+    if names is not None:
+        df = df[df["Endpoint"].isin(names)]
+    ready = (df["Status"] == STATUS_READY).sum()
+    with st.expander(f"Model servers: {ready}/{len(df)} ready"):
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.caption(f"Pinged every {WARMUP_INTERVAL // 60} min to keep the models loaded; a call after "
+                   f"{COLD_AFTER_IDLE // 60} min of idle time (or an Ollama model load) counts as cold.")
+        breakers = breaker_status()
+        if not breakers.empty:
+            breakers = breakers[breakers["Endpoint"].isin(df["Endpoint"])]
+            st.dataframe(breakers, use_container_width=True, hide_index=True)
+            st.download_button(
+                "Export latency histograms", latency_histograms_text(), file_name="model_latency.prom",
+                mime="text/plain", key=f"latency_export_{'_'.join(df['Endpoint'])}"
+            )
@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+from datetime import date, timedelta
+import streamlit as st
+from db import connect_db
+from cert_status import EXPIRING_SOON_DAYS, STATUS_EXPIRED, STATUS_EXPIRING, STATUS_VALID, STATUS_NO_EXPIRY
+
+# --- Welder Qualification Index ---
+# In-memory map (identification number, welding process) -> best certificate, shared by all
+# sessions of the process. Weld registration looks welders up here instead of querying the
+# registry; the map is refreshed incrementally from welder_certificates. Lookups fail open: while
+# the registry is empty or has never been read, welders come back STATUS_NOT_CHECKED (qualified).
+QUAL_INDEX_CHECK_INTERVAL = 30  # seconds between change checks against the registry
+STATUS_NOT_QUALIFIED = "No Qualification"
+STATUS_NOT_CHECKED = "Not Checked"
+
+# Process codes accepted on the weld form and the aliases / ISO 4063 numbers that certificates
+# use for them ('FCAW-G', 'SMAW (111)', 'GMAW/FCAW', ...).
+PROCESS_ALIASES = {
+    "FCAW": ["FCAW", "136", "138"],
+    "SAW": ["SAW", "121"],
+    "SMAW": ["SMAW", "MMA", "111"],
+    "GMAW": ["GMAW", "MIG", "MAG", "135"],
+    "GTAW": ["GTAW", "TIG", "141"]
+}
+_PROCESS_PATTERN = re.compile(
+    r"(?<![A-Z0-9])(" + "|".join(alias for aliases in PROCESS_ALIASES.values() for alias in aliases) + r")(?![A-Z0-9])"
+)
+_ALIAS_TO_PROCESS = {alias: process for process, aliases in PROCESS_ALIASES.items() for alias in aliases}
+
+def normalize_identification(value):
+    """Badge / identification number compared case- and punctuation-insensitively ('w-101' == 'W101')."""
+    return re.sub(r"[^A-Z0-9]", "", str(value or "").upper())
+
+def processes_of(welding_process):
+    """Set of process codes mentioned in a certificate's welding process text."""
+    return {_ALIAS_TO_PROCESS[m] for m in _PROCESS_PATTERN.findall(str(welding_process or "").upper())}
+
+def _better(candidate, current):
+    """The certificate that qualifies for longer (no expiry beats any date)."""
+    if current is None:
+        return candidate
+    if current["valid_upto_date"] is None:
+        return current
+    if candidate["valid_upto_date"] is None or candidate["valid_upto_date"] > current["valid_upto_date"]:
+        return candidate
+    return current
+
+@st.cache_resource
+def _index_state():
+    """
+    The process-wide index: 'entries' maps (identification number, process) to the best
+    certificate; 'count'/'last_id' describe the registry rows loaded so far, 'loaded' whether the
+    registry has been read at least once.
+    """
+    return {"lock": threading.Lock(), "entries": {}, "count": 0, "last_id": 0, "checked_at": 0.0, "loaded": False}
+
+def add_qualification_rows(state, rows, entries):
+    """
+    Adds (id, identification_number, welding_process, welder_name, certificate_number,
+    valid_upto_date) rows to 'entries' and advances the state's count / last id.
+    """
+    for cert_id, ident, process_text, welder_name, cert_no, valid_upto in rows:
+        record = {
+            "id": cert_id, "welder_name": welder_name,
+            "certificate_number": cert_no, "valid_upto_date": valid_upto
+        }
+        ident = normalize_identification(ident)
+        for process in processes_of(process_text):
+            key = (ident, process)
+            entries[key] = _better(record, entries.get(key))
+        state["count"] += 1
+        state["last_id"] = max(state["last_id"], cert_id)
+
+def invalidate_qualification_index():
+    """Forces a change check on the next lookup (called after certificate writes)."""
+    _index_state()["checked_at"] = 0.0
+
+def refresh_qualification_index(state=None):
+    """
+    Brings the index up to date if QUAL_INDEX_CHECK_INTERVAL has passed. The registry's row count
+    and max id are compared with what has been loaded: new rows are added incrementally,
+    deletions trigger a rebuild into a new map that is swapped in, so concurrent lookups never
+    see a half-built index. Returns False on DB errors.
+    """
+    state = state or _index_state()
+    if time.time() - state["checked_at"] < QUAL_INDEX_CHECK_INTERVAL:
+        return True
+
+    with state["lock"]:
+        if time.time() - state["checked_at"] < QUAL_INDEX_CHECK_INTERVAL:
+            return True
+        conn = connect_db()
+        if conn is None:
+            return False
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM welder_certificates")
+                count, max_id = cur.fetchone()
+                if (count, max_id) != (state["count"], state["last_id"]):
+                    query = """
+                        SELECT id, identification_number, welding_process, welder_name,
+                               certificate_number, valid_upto_date
+                        FROM welder_certificates WHERE id > %s ORDER BY id
+                    """
+                    cur.execute(query, (state["last_id"],))
+                    new_rows = cur.fetchall()
+                    if state["count"] + len(new_rows) == count:
+                        add_qualification_rows(state, new_rows, state["entries"])
+                    else:
+                        # Rows were deleted: rebuild from scratch
+                        cur.execute(query, (0,))
+                        entries = {}
+                        state["count"], state["last_id"] = 0, 0
+                        add_qualification_rows(state, cur.fetchall(), entries)
+                        state["entries"] = entries
+            state["checked_at"] = time.time()
+            state["loaded"] = True
+            return True
+        except Exception as e:
+            st.error(f"Error refreshing welder qualification index: {e}")
+            return False
+        finally:
+            conn.close()
+
+def lookup_qualification(entries, identification_number, process, today=None):
+    """
+    Qualification of a welder for a process: dict with 'status' (cert_status constants or
+    STATUS_NOT_QUALIFIED), 'qualified' and the matching certificate fields (if any).
+    A plain dict read, no database access.
+    """
+    record = entries.get((normalize_identification(identification_number), str(process).upper()))
+    if record is None:
+        return {"status": STATUS_NOT_QUALIFIED, "qualified": False}
+
+    today = today or date.today()
+    expiry = record["valid_upto_date"]
+    if expiry is None:
+        status = STATUS_NO_EXPIRY
+    elif expiry < today:
+        status = STATUS_EXPIRED
+    elif expiry < today + timedelta(days=EXPIRING_SOON_DAYS):
+        status = STATUS_EXPIRING
+    else:
+        status = STATUS_VALID
+    return {**record, "status": status, "qualified": status != STATUS_EXPIRED}
+
+def check_welder_qualification(identification_number, process):
+    """
+    Looks a welder up for a process, refreshing the index first if it is due. If the registry
+    could not be read yet or holds no certificates, returns STATUS_NOT_CHECKED (qualified) with
+    the 'reason' instead of refusing everyone.
+    """
+    state = _index_state()
+    refresh_qualification_index(state)
+    if not state["loaded"]:
+        return {"status": STATUS_NOT_CHECKED, "qualified": True, "reason": "the qualification registry could not be read"}
+    if state["count"] == 0:
+        return {"status": STATUS_NOT_CHECKED, "qualified": True, "reason": "the qualification registry is empty"}
+    return lookup_qualification(state["entries"], identification_number, process)
@@ -0,0 +1,193 @@
+import random
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+
+# --- Model Call Resilience Configuration ---
+# Shared by the OCR, Ollama and gradio calls of the certificate tabs. Each endpoint has a
+# circuit breaker: after BREAKER_FAILURE_THRESHOLD consecutive transient failures the circuit
+# opens and calls fail immediately for BREAKER_RESET_SECONDS, then one trial call is let
+# through (half-open). Timeouts adapt to the endpoint's observed latencies instead of a fixed 120 s;
+# the half-open trial gets TIMEOUT_MAX, so a service that became slower re-seeds the percentiles.
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_SECONDS = 60
+RETRIES = 3                  # attempts per call (transient errors only)
+BACKOFF_BASE = 0.5           # seconds; attempt n sleeps uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**n))
+BACKOFF_CAP = 8.0
+CONNECT_TIMEOUT = 5          # seconds; an unreachable host fails fast whatever the read timeout
+TIMEOUT_MIN = 15             # seconds; floor for the adaptive read timeout
+TIMEOUT_MAX = 120            # seconds; used until TIMEOUT_MIN_SAMPLES latencies have been seen
+TIMEOUT_P99_FACTOR = 3.0     # adaptive timeout = factor x p99 of recent successful calls
+TIMEOUT_MIN_SAMPLES = 20
+LATENCY_WINDOW = 500         # recent latencies kept per endpoint for the percentiles
+
+# Latency histogram bucket upper bounds (seconds), Prometheus style
+HISTOGRAM_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, float("inf")]
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the endpoint while its circuit is open."""
+
+
+@st.cache_resource
+def _resilience_state():
+    """Process-wide breaker / latency state per endpoint."""
+    return {"lock": threading.Lock(), "endpoints": {}}
+
+def _endpoint(state, name):
+    return state["endpoints"].setdefault(name, {
+        "breaker": BREAKER_CLOSED, "failures": 0, "opened_at": 0.0, "trial_running": False,
+        "latencies": deque(maxlen=LATENCY_WINDOW),
+        "buckets": np.zeros(len(HISTOGRAM_BUCKETS), dtype=np.int64), "sum": 0.0,
+        "errors": 0, "timeouts": 0, "rejected": 0
+    })
+
+def adaptive_timeout(name):
+    """Read timeout for the next call: TIMEOUT_P99_FACTOR x p99 of recent latencies, clamped."""
+    state = _resilience_state()
+    with state["lock"]:
+        latencies = list(_endpoint(state, name)["latencies"])
+    if len(latencies) < TIMEOUT_MIN_SAMPLES:
+        return TIMEOUT_MAX
+    return float(np.clip(TIMEOUT_P99_FACTOR * np.percentile(latencies, 99), TIMEOUT_MIN, TIMEOUT_MAX))
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff, so retries of concurrent sessions do not line up."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def is_transient(error):
+    """Whether an error says the endpoint is unhealthy (retry / count towards the breaker)."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return not isinstance(error, (ValueError, TypeError))
+
+def _acquire(name):
+    """
+    Checks the breaker before a call: returns True for the half-open trial call, False for a
+    normal call, and raises CircuitOpenError while the circuit is open.
+    """
+    state = _resilience_state()
+    with state["lock"]:
+        ep = _endpoint(state, name)
+        if ep["breaker"] == BREAKER_CLOSED:
+            return False
+        wait = ep["opened_at"] + BREAKER_RESET_SECONDS - time.time()
+        if wait <= 0 and not ep["trial_running"]:
+            ep["breaker"], ep["trial_running"] = BREAKER_HALF_OPEN, True
+            return True
+        ep["rejected"] += 1
+    raise CircuitOpenError(f"{name} is unavailable (circuit open after repeated failures, "
+                           f"retrying in {max(wait, 0):.0f}s)")
+
+def _record_success(name, seconds):
+    state = _resilience_state()
+    with state["lock"]:
+        ep = _endpoint(state, name)
+        ep["latencies"].append(seconds)
+        ep["buckets"][np.searchsorted(HISTOGRAM_BUCKETS, seconds)] += 1
+        ep["sum"] += seconds
+        ep["breaker"], ep["failures"], ep["trial_running"] = BREAKER_CLOSED, 0, False
+
+def _record_failure(name, timed_out):
+    """Counts a transient failure; returns True if the circuit is (now) open."""
+    state = _resilience_state()
+    with state["lock"]:
+        ep = _endpoint(state, name)
+        ep["errors"] += 1
+        ep["timeouts"] += int(timed_out)
+        ep["failures"] += 1
+        if ep["breaker"] == BREAKER_HALF_OPEN or ep["failures"] >= BREAKER_FAILURE_THRESHOLD:
+            ep["breaker"], ep["opened_at"] = BREAKER_OPEN, time.time()
+        ep["trial_running"] = False
+        return ep["breaker"] == BREAKER_OPEN
+
+def reset_breaker(name):
+    """Closes an endpoint's circuit (called when a warm-up ping gets through)."""
+    state = _resilience_state()
+    with state["lock"]:
+        ep = _endpoint(state, name)
+        ep["breaker"], ep["failures"], ep["trial_running"] = BREAKER_CLOSED, 0, False
+
+def call_with_resilience(name, call, retries=RETRIES):
+    """
+    Runs call(timeout) against endpoint 'name' with circuit breaking, an adaptive timeout and
+    jittered backoff between attempts. Non-transient errors (e.g. HTTP 4xx) are raised immediately.
+    """
+    for attempt in range(retries):
+        trial = _acquire(name)
+        timeout = TIMEOUT_MAX if trial else adaptive_timeout(name)
+        start = time.time()
+        try:
+            result = call(timeout)
+        except Exception as e:
+            if not is_transient(e):
+                # The endpoint answered; it is the request that is wrong
+                reset_breaker(name)
+                raise
+            timed_out = isinstance(e, (requests.Timeout, TimeoutError))
+            circuit_open = _record_failure(name, timed_out)
+            if circuit_open or attempt == retries - 1:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        _record_success(name, time.time() - start)
+        return result
+
+def resilient_post(name, url, json_payload, retries=RETRIES):
+    """POSTs JSON to an HTTP model endpoint through call_with_resilience; returns the response."""
+    def post(timeout):
+        response = requests.post(url, json=json_payload, timeout=(CONNECT_TIMEOUT, timeout))
+        response.raise_for_status()
+        return response
+    return call_with_resilience(name, post, retries)
+
+def breaker_status():
+    """Breaker state, current timeout and latency percentiles per endpoint, as a DataFrame."""
+    state = _resilience_state()
+    rows = []
+    with state["lock"]:
+        names = list(state["endpoints"])
+    for name in names:
+        timeout = adaptive_timeout(name)
+        with state["lock"]:
+            ep = _endpoint(state, name)
+            latencies = np.array(ep["latencies"])
+            rows.append({
+                "Endpoint": name,
+                "Circuit": ep["breaker"],
+                "Timeout (s)": round(timeout, 1),
+                "p50 (s)": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+                "p95 (s)": round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+                "p99 (s)": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+                "Calls": int(ep["buckets"].sum()),
+                "Errors": ep["errors"],
+                "Timeouts": ep["timeouts"],
+                "Rejected": ep["rejected"]
+            })
+    return pd.DataFrame(rows)
+
+def latency_histograms_text():
+    """All endpoints' latency histograms in the Prometheus text exposition format."""
+    state = _resilience_state()
+    lines = [
+        "# HELP model_call_latency_seconds Latency of successful model endpoint calls.",
+        "# TYPE model_call_latency_seconds histogram"
+    ]
+    with state["lock"]:
+        for name, ep in state["endpoints"].items():
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for bound, count in zip(HISTOGRAM_BUCKETS, np.cumsum(ep["buckets"])):
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'model_call_latency_seconds_bucket{{endpoint="{label}",le="{le}"}} {count}')
+            lines.append(f'model_call_latency_seconds_sum{{endpoint="{label}"}} {ep["sum"]:.3f}')
+            lines.append(f'model_call_latency_seconds_count{{endpoint="{label}"}} {int(ep["buckets"].sum())}')
+    return "\n".join(lines) + "\n"
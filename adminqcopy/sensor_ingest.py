@@ -0,0 +1,244 @@
+import hmac
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import streamlit as st
+from sensor_store import SENSOR_STREAMS, SAMPLE_DTYPE, append_batch, is_valid_device_id, list_devices, storage_bytes, validate_batch
+from device_registry import record_heartbeat
+from weld_export import open_export
+
+# --- Sensor Ingestion Configuration ---
+# Edge devices POST batched frames to http://<dashboard host>:SENSOR_INGEST_PORT/frames.
+# A frame is one device's batch of samples:
+#
+#     <uint32 little-endian header length><JSON header><float32 samples of each stream, in header order>
+#
+# header = {"device_id": "DEV101", "t0_ns": <epoch ns of the first sample>,
+#           "streams": [{"name": "voltage", "rate_hz": 1000, "count": 1000}, ...]}
+# A stream may carry its own "t0_ns" (e.g. when the IMU clock starts later than the ADC).
+# Every accepted frame is a heartbeat of its device for the device registry (device_registry.py);
+# a device with nothing to send POSTs {"device_id": "DEV101"} to /heartbeat instead.
+# The same server streams the weld record exports made on the dashboard (GET /export/<token>,
+# weld_export.py) with chunked transfer encoding, since Streamlit can only send whole files.
+#
+# Devices authenticate with the shared SENSOR_DEVICE_TOKEN ("Authorization: Bearer <token>");
+# without a token configured every POST is refused. The server listens on this host only: set
+# SENSOR_INGEST_HOST to the plant network interface (or "0.0.0.0") for the edge devices. The store
+# accepts at most MAX_SENSOR_DEVICES devices and MAX_DEVICE_STORE_BYTES of samples per device;
+# frames over the limits are refused (403 / 507) until old hours are removed from sensor_data/.
+SENSOR_INGEST_HOST = "127.0.0.1"
+SENSOR_INGEST_PORT = 8765
+SENSOR_DEVICE_TOKEN = os.environ.get("SENSOR_DEVICE_TOKEN")  # kept out of the source, like a password
+MAX_SENSOR_DEVICES = 200
+MAX_DEVICE_STORE_BYTES = 32 * 1024**3  # ~5 weeks of 1 kHz voltage + current and 100 Hz IMU
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+INGEST_BACKLOG = 128         # pending connections (the default of 5 resets devices reconnecting together)
+
+def encode_frame(device_id, t0_ns, streams):
+    """Encodes a frame; 'streams' maps stream name -> (rate_hz, samples array)."""
+    header, payload = {"device_id": device_id, "t0_ns": int(t0_ns), "streams": []}, []
+    for name, (rate_hz, samples) in streams.items():
+        samples = validate_batch(device_id, name, rate_hz, samples)
+        header["streams"].append({"name": name, "rate_hz": rate_hz, "count": len(samples)})
+        payload.append(samples.tobytes())
+    header_bytes = json.dumps(header).encode("utf-8")
+    return struct.pack("<I", len(header_bytes)) + header_bytes + b"".join(payload)
+
+def decode_frame(body):
+    """Decodes a frame into (device_id, [(stream, t0_ns, rate_hz, samples), ...]); ValueError if malformed."""
+    if len(body) < 4:
+        raise ValueError("Frame too short")
+    (header_len,) = struct.unpack_from("<I", body)
+    try:
+        header = json.loads(body[4:4 + header_len])
+        device_id, t0_ns = header["device_id"], int(header["t0_ns"])
+        stream_headers = header["streams"]
+    except (KeyError, TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid frame header: {e}") from e
+
+    batches, pos = [], 4 + header_len
+    for s in stream_headers:
+        if s.get("name") not in SENSOR_STREAMS:
+            raise ValueError(f"Unknown sensor stream: {s.get('name')!r}")
+        channels = len(SENSOR_STREAMS[s["name"]])
+        size = int(s["count"]) * channels * SAMPLE_DTYPE.itemsize
+        if pos + size > len(body):
+            raise ValueError(f"Frame truncated in stream {s['name']!r}")
+        samples = np.frombuffer(body, dtype=SAMPLE_DTYPE, count=int(s["count"]) * channels, offset=pos)
+        batches.append((s["name"], int(s.get("t0_ns", t0_ns)), float(s["rate_hz"]), samples.reshape(-1, channels)))
+        pos += size
+    if pos != len(body):
+        raise ValueError("Trailing bytes after the last stream")
+    return device_id, batches
+
+class QuotaExceeded(Exception):
+    """A frame refused by DeviceQuota; 'status' is the HTTP status to answer with."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class DeviceQuota:
+    """
+    Caps the devices the store accepts and the bytes stored per device. A device's usage is
+    measured on disk the first time it is seen by the process, then counted per frame.
+    """
+
+    def __init__(self, max_devices=MAX_SENSOR_DEVICES, max_bytes=MAX_DEVICE_STORE_BYTES):
+        self.max_devices, self.max_bytes = max_devices, max_bytes
+        self._lock = threading.Lock()
+        self._used = {device_id: None for device_id in list_devices()}  # device_id -> bytes (None: not measured yet)
+
+    def reserve(self, device_id, nbytes):
+        """Counts nbytes against the device; QuotaExceeded if the device or its bytes are over the limits."""
+        with self._lock:
+            if device_id not in self._used and len(self._used) >= self.max_devices:
+                raise QuotaExceeded(f"Device limit reached ({self.max_devices} devices)", 403)
+            used = self._used.get(device_id)
+            if used is None:
+                used = storage_bytes(device_id)
+            self._used[device_id] = used
+            if used + nbytes > self.max_bytes:
+                raise QuotaExceeded(f"Storage limit of {device_id} reached ({self.max_bytes} bytes)", 507)
+            self._used[device_id] = used + nbytes
+
+
+def ingest_frame(body, quota=None):
+    """
+    Stores all streams of an encoded frame; returns (device_id, samples stored). With a
+    DeviceQuota, a frame over the device's limits raises QuotaExceeded before anything is written.
+    """
+    device_id, batches = decode_frame(body)
+    # reject the whole frame before writing
+    batches = [(stream, t0_ns, rate_hz, validate_batch(device_id, stream, rate_hz, samples))
+               for stream, t0_ns, rate_hz, samples in batches]
+    if quota is not None:
+        quota.reserve(device_id, sum(samples.nbytes for _, _, _, samples in batches))
+    stored = sum(append_batch(device_id, *batch) for batch in batches)
+    return device_id, stored
+
+
+class _IngestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: devices reuse one connection for all their frames
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path not in ("/frames", "/heartbeat"):
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        if not self._authorized():
+            self.close_connection = True  # the body is not read
+            self._send(401, {"error": "Missing or invalid device token"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        if length <= 0 or length > MAX_FRAME_BYTES:
+            self._send(413 if length > MAX_FRAME_BYTES else 400, {"error": f"Invalid frame size {length}"})
+            return
+        body = self.rfile.read(length)
+        if path == "/heartbeat":
+            try:
+                device_id = str(json.loads(body)["device_id"])
+                if not is_valid_device_id(device_id):
+                    raise ValueError(f"Invalid device id: {device_id!r}")
+                self.server.quota.reserve(device_id, 0)
+            except (KeyError, TypeError, ValueError) as e:
+                self._send(400, {"error": f"Invalid heartbeat: {e}"})
+                return
+            except QuotaExceeded as e:
+                self._send(e.status, {"error": str(e)})
+                return
+            record_heartbeat(device_id)
+            self._send(200, {"device_id": device_id})
+            return
+        try:
+            device_id, stored = ingest_frame(body, self.server.quota)
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        except QuotaExceeded as e:
+            self._send(e.status, {"error": str(e)})
+            return
+        self.server.last_frame[device_id] = time.time()
+        record_heartbeat(device_id, self.server.last_frame[device_id])
+        self._send(200, {"device_id": device_id, "samples": stored})
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        export = open_export(parts[1]) if len(parts) == 2 and parts[0] == "export" else None
+        if export is None:
+            self._send(404, {"error": f"Unknown or expired export {self.path}"})
+            return
+        file_name, content_type, chunks = export
+        try:
+            first = next(chunks, b"")
+        except Exception as e:
+            self._send(500, {"error": f"Export failed: {e}"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Disposition", f'attachment; filename="{file_name}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in itertools.chain([first], chunks):
+                if chunk:
+                    self.wfile.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception as e:
+            # Without the final empty chunk the browser reports the download as failed
+            print(f"Export {file_name} aborted: {e}")
+            self.close_connection = True
+        finally:
+            chunks.close()
+
+    def _authorized(self):
+        token = self.server.device_token
+        scheme, _, given = self.headers.get("Authorization", "").partition(" ")
+        return bool(token) and scheme.lower() == "bearer" and hmac.compare_digest(given.encode(), token.encode())
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_ingest_server(host=SENSOR_INGEST_HOST, port=SENSOR_INGEST_PORT, device_token=SENSOR_DEVICE_TOKEN, quota=None):
+    """Creates (but does not start) the frame ingestion HTTP server (quota: default DeviceQuota())."""
+    server = ThreadingHTTPServer((host, port), _IngestHandler, bind_and_activate=False)
+    server.request_queue_size = INGEST_BACKLOG
+    try:
+        server.server_bind()
+        server.server_activate()
+    except OSError:
+        server.server_close()
+        raise
+    server.last_frame = {}  # device_id -> time of the last accepted frame
+    server.device_token = device_token
+    server.quota = quota or DeviceQuota()
+    return server
+
+@st.cache_resource
+def start_sensor_ingest(host=SENSOR_INGEST_HOST, port=SENSOR_INGEST_PORT):
+    """Starts the ingestion server once per process; returns it (None if the port is taken)."""
+    try:
+        server = make_ingest_server(host, port)
+    except OSError as e:
+        print(f"Sensor ingestion not started on {host}:{port}: {e}")
+        return None
+    if not SENSOR_DEVICE_TOKEN:
+        print("Sensor ingestion: SENSOR_DEVICE_TOKEN is not set, device frames and heartbeats are refused")
+    thread = threading.Thread(target=server.serve_forever, daemon=True, name="sensor-ingest")
+    thread.start()
+    return server
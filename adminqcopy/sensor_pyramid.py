@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from sensor_store import (
+    SENSOR_STREAMS, SAMPLE_DTYPE, hour_key, partition_dir, list_partitions, load_index,
+    offset_times, read_stream
+)
+from downsample import MAX_CHART_POINTS, MODE_MINMAX, downsample
+
+# --- Sensor Zoom Pyramid Configuration ---
+# Each hour partition of a stream has PYRAMID_LEVELS precomputed zoom levels: level L keeps, per
+# channel, the min and max sample (value and position) of every PYRAMID_FACTOR**L samples. A chart
+# window is served from the coarsest level that still has max_points points in it and then
+# downsampled to max_points, so an hour of 1 kHz voltage (3.6M samples) reads ~3.5k bins
+# instead of the raw data. Levels are extended incrementally as the open hour grows and saved
+# next to the data (<stream>.pyramid.npz) once the hour is closed.
+PYRAMID_FACTOR = 32
+PYRAMID_LEVELS = 3            # bins of 32, 1,024 and 32,768 samples
+PYRAMID_CACHE_SIZE = 256      # partition pyramids kept in memory
+BIN_DTYPE = np.dtype([("imin", "<u2"), ("imax", "<u2"), ("min", "<f4"), ("max", "<f4")])
+
+_pyramid_cache = OrderedDict()
+_pyramid_cache_lock = threading.Lock()
+
+def bin_size(level):
+    return PYRAMID_FACTOR ** level
+
+def reduce_bins(samples, size):
+    """Min / max (value and position within the bin) of consecutive 'size'-sample bins, per channel."""
+    n, channels = samples.shape
+    full = n // size
+    out = np.empty((full + (n % size > 0), channels), dtype=BIN_DTYPE)
+    if full:
+        blocks = np.asarray(samples[:full * size]).reshape(full, size, channels)
+        imin, imax = blocks.argmin(axis=1), blocks.argmax(axis=1)
+        out["imin"][:full], out["imax"][:full] = imin, imax
+        out["min"][:full] = np.take_along_axis(blocks, imin[:, None, :], axis=1)[:, 0, :]
+        out["max"][:full] = np.take_along_axis(blocks, imax[:, None, :], axis=1)[:, 0, :]
+    if n % size:
+        tail = np.asarray(samples[full * size:])
+        imin, imax = tail.argmin(axis=0), tail.argmax(axis=0)
+        out["imin"][-1], out["imax"][-1] = imin, imax
+        out["min"][-1] = tail[imin, np.arange(channels)]
+        out["max"][-1] = tail[imax, np.arange(channels)]
+    return out
+
+def _pyramid_path(device_id, hour, stream):
+    return os.path.join(partition_dir(device_id, hour), f"{stream}.pyramid.npz")
+
+def _load_saved(device_id, hour, stream):
+    path = _pyramid_path(device_id, hour, stream)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        return {"samples": int(saved["samples"]), "levels": [saved[f"level{L}"] for L in range(1, PYRAMID_LEVELS + 1)]}
+
+def _save(device_id, hour, stream, entry):
+    path = _pyramid_path(device_id, hour, stream)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, samples=entry["samples"], **{f"level{L}": lvl for L, lvl in enumerate(entry["levels"], 1)})
+    os.replace(tmp_path, path)
+
+def partition_pyramid(device_id, hour, stream, index=None):
+    """
+    Zoom levels (list of (bins, channels) BIN_DTYPE arrays, finest first) of a partition's stream,
+    covering every sample referenced by its index. Only bins touched by new samples are recomputed.
+    """
+    index = load_index(device_id, hour, stream) if index is None else index
+    channels = len(SENSOR_STREAMS[stream])
+    n = int((index["offset"] + index["count"]).max()) if len(index) else 0
+    key = (device_id, hour, stream)
+    with _pyramid_cache_lock:
+        entry = _pyramid_cache.get(key)
+    if entry is None:
+        entry = _load_saved(device_id, hour, stream)
+    if entry is not None and entry["samples"] == n:
+        levels = entry["levels"]
+    else:
+        old_n = entry["samples"] if entry is not None and entry["samples"] < n else 0
+        samples = np.memmap(os.path.join(partition_dir(device_id, hour), f"{stream}.f32"),
+                            dtype=SAMPLE_DTYPE, mode="r", shape=(n, channels)) if n else np.empty((0, channels), SAMPLE_DTYPE)
+        levels = []
+        for L in range(1, PYRAMID_LEVELS + 1):
+            size = bin_size(L)
+            keep = old_n // size  # complete bins before the new samples are unchanged
+            new_bins = reduce_bins(samples[keep * size:n], size)
+            levels.append(np.concatenate([entry["levels"][L - 1][:keep], new_bins]) if keep else new_bins)
+        entry = {"samples": n, "levels": levels}
+        if hour < hour_key(time.time_ns()):
+            _save(device_id, hour, stream, entry)  # closed hour: keep the levels on disk
+
+    with _pyramid_cache_lock:
+        _pyramid_cache[key] = entry
+        _pyramid_cache.move_to_end(key)
+        while len(_pyramid_cache) > PYRAMID_CACHE_SIZE:
+            _pyramid_cache.popitem(last=False)
+    return levels
+
+def _samples_in_window(index, start_ns, end_ns):
+    step = 1e9 / index["rate_hz"]
+    i0 = np.clip(np.ceil((start_ns - index["t0_ns"]) / step), 0, index["count"])
+    i1 = np.clip(np.ceil((end_ns - index["t0_ns"]) / step), 0, index["count"])
+    return int(np.clip(i1 - i0, 0, None).sum())
+
+def read_downsampled(device_id, stream, start_ns, end_ns, max_points=MAX_CHART_POINTS, mode=MODE_MINMAX):
+    """
+    Chart data of a stream's window: ({channel: (t_ns, values)} with at most max_points points per
+    channel, info dict with the raw sample count and the zoom level used (0 = raw samples)).
+    """
+    channels = SENSOR_STREAMS[stream]
+    first_hour, last_hour = hour_key(start_ns), hour_key(max(start_ns, end_ns - 1))
+    parts, n = [], 0
+    for hour in list_partitions(device_id):
+        if first_hour <= hour <= last_hour:
+            index = load_index(device_id, hour, stream)
+            in_window = _samples_in_window(index, start_ns, end_ns) if len(index) else 0
+            if in_window:
+                parts.append((hour, index))
+                n += in_window
+
+    # Coarsest level that still gives max_points points (min + max per bin); raw samples if none does
+    level = max((L for L in range(1, PYRAMID_LEVELS + 1) if 2 * n / bin_size(L) >= max_points), default=0)
+
+    traces = {}
+    if level == 0:
+        t, values = read_stream(device_id, stream, start_ns, end_ns)
+        traces = {c: (t, values[:, j]) for j, c in enumerate(channels)}
+    else:
+        collected = {c: ([], []) for c in channels}
+        for hour, index in parts:
+            # Only the bins of the batches overlapping the window
+            size = bin_size(level)
+            batch_end_ns = index["t0_ns"] + index["count"] * 1e9 / index["rate_hz"]
+            overlapping = index[(batch_end_ns > start_ns) & (index["t0_ns"] < end_ns)]
+            first_bin = int(overlapping["offset"].min()) // size
+            last_bin = -(-int((overlapping["offset"] + overlapping["count"]).max()) // size)
+            bins = partition_pyramid(device_id, hour, stream, index)[level - 1][first_bin:last_bin]
+            starts = (first_bin + np.arange(len(bins), dtype=np.int64)) * size
+            offsets = np.concatenate([starts[:, None] + bins["imin"], starts[:, None] + bins["imax"]])
+            values = np.concatenate([bins["min"], bins["max"]])
+            times = offset_times(index, offsets.ravel()).reshape(offsets.shape)
+            for j, c in enumerate(channels):
+                keep = (times[:, j] >= start_ns) & (times[:, j] < end_ns)
+                collected[c][0].append(times[keep, j])
+                collected[c][1].append(values[keep, j])
+        for c, (t_parts, v_parts) in collected.items():
+            t, v = np.concatenate(t_parts), np.concatenate(v_parts)
+            order = np.argsort(t, kind="stable")
+            traces[c] = (t[order], v[order])
+
+    traces = {c: downsample(t, v, max_points, mode) for c, (t, v) in traces.items()}
+    return traces, {"samples": n, "level": level, "bin_size": bin_size(level) if level else 1}
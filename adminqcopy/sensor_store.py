@@ -0,0 +1,178 @@
+import os
+import re
+import threading
+from datetime import datetime, timezone
+import numpy as np
+
+# --- Sensor Time-Series Store Configuration ---
+# Edge devices send batches of samples per stream. Each batch is appended to raw little-endian
+# float32 files partitioned by device and UTC hour:
+#
+#     sensor_data/<device_id>/<YYYYMMDDHH>/<stream>.f32   samples, channels interleaved
+#     sensor_data/<device_id>/<YYYYMMDDHH>/<stream>.idx   one INDEX_DTYPE record per batch
+#
+# Timestamps are not stored per sample: a batch is (t0, rate, offset, count), so a 1 kHz voltage
+# sample costs 4 bytes on disk. The data is written before its index record, so readers (which
+# only trust the index) never see a half-written batch.
+SENSOR_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensor_data")
+SAMPLE_DTYPE = np.dtype("<f4")
+INDEX_DTYPE = np.dtype([("t0_ns", "<i8"), ("rate_hz", "<f8"), ("offset", "<i8"), ("count", "<i8")])
+NS_PER_HOUR = 3600 * 10**9
+
+# Streams accepted from the edge devices and their channels (in sample order)
+SENSOR_STREAMS = {
+    "voltage": ["voltage"],                          # arc voltage (V), 1 kHz
+    "current": ["current"],                          # welding current (A), 1 kHz
+    "imu": ["ax", "ay", "az", "gx", "gy", "gz"]      # accelerometer (m/s^2) + gyroscope (rad/s), 100 Hz
+}
+
+_DEVICE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_device_locks = {}
+_device_locks_guard = threading.Lock()
+
+def _device_lock(device_id):
+    with _device_locks_guard:
+        return _device_locks.setdefault(device_id, threading.Lock())
+
+def hour_key(t_ns):
+    return datetime.fromtimestamp(t_ns // 10**9, tz=timezone.utc).strftime("%Y%m%d%H")
+
+def partition_dir(device_id, hour):
+    return os.path.join(SENSOR_DATA_DIR, device_id, hour)
+
+def is_valid_device_id(device_id):
+    """Whether a device id can name a store directory (letters, digits, '_' and '-', up to 64)."""
+    return bool(_DEVICE_ID_PATTERN.match(str(device_id)))
+
+def validate_batch(device_id, stream, rate_hz, samples):
+    """Checks a batch and returns its samples as an (n, channels) float32 array (ValueError if invalid)."""
+    if not is_valid_device_id(device_id):
+        raise ValueError(f"Invalid device id: {device_id!r}")
+    if stream not in SENSOR_STREAMS:
+        raise ValueError(f"Unknown sensor stream: {stream!r}")
+    if not rate_hz or rate_hz <= 0:
+        raise ValueError(f"Invalid sample rate for {stream}: {rate_hz!r}")
+    channels = len(SENSOR_STREAMS[stream])
+    samples = np.asarray(samples, dtype=SAMPLE_DTYPE)
+    if samples.ndim == 1 and channels == 1:
+        samples = samples[:, None]
+    if samples.ndim != 2 or samples.shape[1] != channels:
+        raise ValueError(f"{stream} samples must have shape (n, {channels}), got {samples.shape}")
+    return samples
+
+def append_batch(device_id, stream, t0_ns, rate_hz, samples):
+    """
+    Appends one batch (samples[i] taken at t0_ns + i / rate_hz) to the device's hour partitions.
+    A batch crossing an hour boundary is split. Returns the number of samples stored.
+    """
+    samples = validate_batch(device_id, stream, rate_hz, samples)
+    n = len(samples)
+    if n == 0:
+        return 0
+    step_ns = 10**9 / rate_hz
+
+    with _device_lock(device_id):
+        start = 0
+        while start < n:
+            t_ns = int(t0_ns + round(start * step_ns))
+            hour_end_ns = (t_ns // NS_PER_HOUR + 1) * NS_PER_HOUR
+            # First sample index at or after the hour boundary
+            end = min(n, max(start + 1, int(np.ceil((hour_end_ns - t0_ns) / step_ns))))
+
+            part_dir = partition_dir(device_id, hour_key(t_ns))
+            os.makedirs(part_dir, exist_ok=True)
+            data_path = os.path.join(part_dir, f"{stream}.f32")
+            with open(data_path, "ab") as f:
+                offset = f.tell() // (SAMPLE_DTYPE.itemsize * samples.shape[1])
+                f.write(np.ascontiguousarray(samples[start:end]).tobytes())
+            record = np.array([(t_ns, rate_hz, offset, end - start)], dtype=INDEX_DTYPE)
+            with open(os.path.join(part_dir, f"{stream}.idx"), "ab") as f:
+                f.write(record.tobytes())
+            start = end
+    return n
+
+def list_devices():
+    """Device ids that have stored sensor data."""
+    if not os.path.isdir(SENSOR_DATA_DIR):
+        return []
+    return sorted(d for d in os.listdir(SENSOR_DATA_DIR) if _DEVICE_ID_PATTERN.match(d))
+
+def list_partitions(device_id):
+    """Hour partitions of a device, oldest first."""
+    device_dir = os.path.join(SENSOR_DATA_DIR, device_id)
+    if not _DEVICE_ID_PATTERN.match(str(device_id)) or not os.path.isdir(device_dir):
+        return []
+    return sorted(h for h in os.listdir(device_dir) if h.isdigit() and len(h) == 10)
+
+def load_index(device_id, hour, stream):
+    path = os.path.join(partition_dir(device_id, hour), f"{stream}.idx")
+    if not os.path.exists(path):
+        return np.empty(0, dtype=INDEX_DTYPE)
+    raw = np.fromfile(path, dtype=np.uint8)
+    usable = len(raw) - len(raw) % INDEX_DTYPE.itemsize  # ignore a torn trailing record
+    return raw[:usable].view(INDEX_DTYPE)
+
+def offset_times(index, offsets):
+    """Timestamps (ns) of the samples at the given offsets of a partition's data file."""
+    index = index[np.argsort(index["offset"], kind="stable")]
+    i = np.searchsorted(index["offset"], offsets, side="right") - 1
+    return index["t0_ns"][i] + np.round((offsets - index["offset"][i]) * 1e9 / index["rate_hz"][i]).astype(np.int64)
+
+def read_stream(device_id, stream, start_ns, end_ns):
+    """
+    Samples of a device's stream with start_ns <= t < end_ns.
+    Returns (timestamps in ns as int64, samples as an (n, channels) float32 array), in time order.
+    """
+    channels = len(SENSOR_STREAMS[stream])
+    times, values = [], []
+    first_hour, last_hour = hour_key(start_ns), hour_key(max(start_ns, end_ns - 1))
+    for hour in list_partitions(device_id):
+        if hour < first_hour or hour > last_hour:
+            continue
+        index = load_index(device_id, hour, stream)
+        if len(index) == 0:
+            continue
+        step_ns = 1e9 / index["rate_hz"]
+        batch_end_ns = index["t0_ns"] + index["count"] * step_ns
+        index = index[(batch_end_ns > start_ns) & (index["t0_ns"] < end_ns)]
+        if len(index) == 0:
+            continue
+
+        data = np.memmap(os.path.join(partition_dir(device_id, hour), f"{stream}.f32"),
+                         dtype=SAMPLE_DTYPE, mode="r").reshape(-1, channels)
+        for t0, rate, offset, count in index[np.argsort(index["t0_ns"], kind="stable")]:
+            step = 1e9 / rate
+            i0 = max(0, int(np.ceil((start_ns - t0) / step)))
+            i1 = min(int(count), int(np.ceil((end_ns - t0) / step)))
+            if i1 <= i0:
+                continue
+            times.append(t0 + np.round(np.arange(i0, i1) * step).astype(np.int64))
+            values.append(np.array(data[offset + i0:offset + i1]))
+
+    if not times:
+        return np.empty(0, dtype=np.int64), np.empty((0, channels), dtype=SAMPLE_DTYPE)
+    return np.concatenate(times), np.concatenate(values)
+
+def latest_timestamp(device_id, stream):
+    """Timestamp (ns) just after the newest stored sample of a stream, or None."""
+    for hour in reversed(list_partitions(device_id)):
+        index = load_index(device_id, hour, stream)
+        if len(index):
+            return int((index["t0_ns"] + index["count"] * 1e9 / index["rate_hz"]).max())
+    return None
+
+def read_latest(device_id, stream, seconds):
+    """The last 'seconds' of a stream (see read_stream); empty if the device has sent nothing."""
+    end_ns = latest_timestamp(device_id, stream)
+    if end_ns is None:
+        channels = len(SENSOR_STREAMS[stream])
+        return np.empty(0, dtype=np.int64), np.empty((0, channels), dtype=SAMPLE_DTYPE)
+    return read_stream(device_id, stream, end_ns - int(seconds * 1e9), end_ns + 1)
+
+def storage_bytes(device_id=None):
+    """Bytes on disk of the store (or of one device)."""
+    root = SENSOR_DATA_DIR if device_id is None else os.path.join(SENSOR_DATA_DIR, device_id)
+    total = 0
+    for dir_path, _, files in os.walk(root):
+        total += sum(os.path.getsize(os.path.join(dir_path, f)) for f in files)
+    return total
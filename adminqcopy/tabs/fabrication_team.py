@@ -2,11 +2,30 @@ import streamlit as st
 import random
 import time
 import textwrap
+import functools
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import psycopg2
 from psycopg2 import sql
+from db import connect_db
+from qualification_index import check_welder_qualification, STATUS_NOT_CHECKED
+from cert_store import ensure_certificate_tables, load_calibration_status
+from cert_status import STATUS_EXPIRED, STATUS_EXPIRING, STATUS_VALID, STATUS_NO_EXPIRY
+from sensor_store import latest_timestamp
+from sensor_pyramid import read_downsampled
+from downsample import DOWNSAMPLE_MODES, MAX_CHART_POINTS, downsample_frame
+from sensor_ingest import SENSOR_INGEST_HOST, SENSOR_INGEST_PORT, start_sensor_ingest
+from imu_trajectory import processed_until, trajectory_window
+from weld_segments import SEGMENT_CARD_ROWS, load_segments, start_segment_worker
+from threshold_checker import EVENT_CARD_ROWS, checked_until, load_events, start_threshold_checker
+from device_registry import (
+    DEVICE_PAGE_SIZE, DEVICE_STATUSES, count_devices, ensure_device_table, load_contractors, load_device,
+    load_device_page, start_heartbeat_writer
+)
+from weld_import import IMPORT_BATCH_ROWS, IMPORT_REQUIRED_COLUMNS, import_weld_details
+from weld_frame import compact_weld_frame, weld_record
+from weld_partitions import create_month_partitions, create_uniq_id_registry, is_partitioned, start_partition_maintainer, upcoming_months
+from weld_export import EXPORT_FORMATS, EXPORT_LINK_SECONDS, EXPORT_PUBLIC_URL, create_export_link, export_file_name, export_reachable, export_url, load_weld_contractors
 import string # Import string for alphabet characters
 
 # --- UNIQUE ID CONFIGURATION ---
@@ -14,31 +33,72 @@ ID_LENGTH = 5
 ID_CHARS = string.ascii_uppercase # Only A-Z (26 characters)
 # Total combinations: 26^5 = 11,881,376
 
-# --- 0. Database Configuration and Utilities ---
-# PostgreSQL Configuration (as provided by the user)
-DB_CONFIG = {
-    "user": "pavansaigeddam",
-    "host": "10.21.137.79",
-    "database": "streamlit_dashboard",
-    "password": "Weld@123",
-    "port": 5432
+# --- WELDER QUALIFICATION CHECK ---
+# New weld registrations are checked against the welder qualification registry (badge number =
+# certificate identification number, type of weld = qualified process). False only flags
+# registrations without a valid qualification in the remarks; True refuses them. While the
+# registry is empty or cannot be read, registrations are not checked (and never refused).
+BLOCK_UNQUALIFIED_WELDS = False
+
+# --- SENSOR DATA ---
+# The edge devices push 1 kHz voltage / 100 Hz IMU frames to the ingestion server (sensor_ingest.py);
+# the dashboard cards read the latest window back from the sensor store (sensor_store.py), downsampled
+# to at most MAX_CHART_POINTS points per trace (sensor_pyramid.py / downsample.py).
+CHART_WINDOWS = {"1 s": 1, "10 s": 10, "1 min": 60, "10 min": 600, "1 h": 3600}
+# The IMU card plots the torch trajectory reconstructed from the IMU stream (imu_trajectory.py)
+TRAJECTORY_CHART_SECONDS = 120
+# The Rework/Old Data table lists the latest weld segments (arc on / off, length along the seam and
+# pass) that a background worker detects in the sensor streams (weld_segments.py); it is a
+# fragment like the live cards below
+SEGMENTS_REFRESH_SECONDS = 10
+# The Threshold Events card lists the latest excursions of voltage, current and travel speed outside
+# the limits of the active weld's WPS, found by the threshold checker (threshold_checker.py)
+EVENTS_REFRESH_SECONDS = 5
+
+# --- LIVE CARDS ---
+# The Running Tasks, Voltage and IMU cards are fragments (st.fragment) that rerun on their own
+# timer: a refresh re-executes only that card and sends only its elements to the browser, instead
+# of rerunning the whole page.
+TASKS_REFRESH_SECONDS = 2
+CHART_REFRESH_SECONDS = 1
+STARTUP_SECONDS = 2.5      # tasks show "Starting..." for this long after a dashboard is opened
+STREAM_IDLE_SECONDS = 5    # a stream without new samples for this long is shown as Idle
+
+# Vega-Lite specs of the live charts. st.line_chart builds and validates an Altair chart on every
+# call (~130 ms of CPU); with a fixed spec a chart refresh only serializes its data.
+VOLTAGE_CHART_SPEC = {
+    "mark": {"type": "line", "color": "#4361ee"},
+    "encoding": {
+        "x": {"field": "Time (s)", "type": "quantitative"},
+        "y": {"field": "Voltage (V)", "type": "quantitative"}
+    },
+    "params": [{"name": "zoom", "select": "interval", "bind": "scales"}],
+    "height": 250
+}
+IMU_CHART_SPEC = {
+    "mark": {"type": "line"},
+    "encoding": {
+        "x": {"field": "Time (s)", "type": "quantitative"},
+        "y": {"field": "Position (mm)", "type": "quantitative"},
+        "color": {"field": "Axis", "type": "nominal"}
+    },
+    "params": [{"name": "zoom", "select": "interval", "bind": "scales"}],
+    "height": 200
 }
 
+# --- 0. Database Configuration and Utilities ---
+# PostgreSQL configuration and connect_db() live in db.py (shared with the certificate registries)
+
+# Latest registration of each device (device ID, job status, unique ID, last activity), read for a
+# whole page of devices in one query and cached process-wide; writes clear it.
+LATEST_STATE_CACHE_TTL = 10  # seconds
+
 # Column configuration for consistency in DB and Streamlit DataFrame
 WELD_DETAIL_COLUMNS = [
     "material_type", "thickness", "type_of_weld", "no_of_passes", "weld_length",
     "current", "voltage", "travel_speed", "filler_material", "wps_code", "remarks"
 ]
 
-def connect_db():
-    """Establishes a connection to the PostgreSQL database."""
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except Exception as e:
-        st.error(f"Database connection failed: {e}")
-        return None
-
 def generate_unique_id(length=ID_LENGTH, characters=ID_CHARS):
     """
     Generates a random ID of the specified length using only uppercase letters.
@@ -46,10 +106,10 @@ def generate_unique_id(length=ID_LENGTH, characters=ID_CHARS):
     return ''.join(random.choice(characters) for _ in range(length))
 
 def check_unique_id_exists(conn, uniq_id):
-    """Checks if a given unique ID already exists in the weld_details table."""
+    """Checks if a given unique ID has already been taken (weld_uniq_ids, see weld_partitions.py)."""
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM weld_details WHERE uniq_id = %s", (uniq_id,))
+            cur.execute("SELECT 1 FROM weld_uniq_ids WHERE uniq_id = %s", (uniq_id,))
             return cur.fetchone() is not None
     except Exception as e:
         # Log error but assume ID is unique to allow registration, relying on DB constraint as fallback
@@ -90,9 +150,10 @@ def create_weld_details_table():
         with conn.cursor() as cur:
             # 1. Define the initial table structure (if it doesn't exist)
             # NOTE: Include 'job_completed' in the IF NOT EXISTS block for new installations
+            # Partitioned by created_at month (weld_partitions.py); the primary key has to include it
             cur.execute(sql.SQL("""
                 CREATE TABLE IF NOT EXISTS weld_details (
-                    id SERIAL PRIMARY KEY,
+                    id SERIAL,
                     uniq_id VARCHAR({}), 
                     device_name VARCHAR(50), 
                     deviceid VARCHAR(50) NOT NULL, 
@@ -112,9 +173,20 @@ def create_weld_details_table():
                     wps_code VARCHAR(100),
                     remarks TEXT,
                     job_completed VARCHAR(3) DEFAULT 'NO', -- New column included here
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (id, created_at)
+                ) PARTITION BY RANGE (created_at);
             """).format(sql.Literal(required_length)))
+            partitioned = is_partitioned(cur)
+            if partitioned:
+                create_month_partitions(cur, upcoming_months())
+            else:
+                # A weld_details made before the partitioning is left as it is: it is converted
+                # offline by `python weld_partitions.py migrate` (see weld_partitions.py).
+                notice = ("weld_details is not partitioned yet: run `python weld_partitions.py migrate` "
+                          "in a maintenance window to partition it by month.")
+                print(notice)
+                st.warning(notice)
 
             # 2. Schema Migration Checks (Ensure necessary columns exist)
             
@@ -180,14 +252,18 @@ def create_weld_details_table():
                         ALTER COLUMN uniq_id TYPE VARCHAR({}) USING uniq_id::VARCHAR({});
                     """).format(sql.Literal(required_length), sql.Literal(required_length)))
                     
-                # Check for and add missing UNIQUE constraint (safety measure)
+                # Check for and add missing UNIQUE constraint (safety measure). A partitioned table
+                # cannot have one (it would have to include created_at): weld_uniq_ids keeps the
+                # IDs unique (step 3b) and the lookups are indexed instead.
+                if partitioned:
+                    cur.execute("CREATE INDEX IF NOT EXISTS idx_weld_details_uniq_id ON weld_details (uniq_id);")
                 cur.execute("""
                     SELECT constraint_name
                     FROM information_schema.table_constraints
                     WHERE table_name = 'weld_details' AND constraint_type = 'UNIQUE'
                     AND constraint_name LIKE '%uniq_id%';
                 """)
-                if cur.fetchone() is None:
+                if cur.fetchone() is None and not partitioned:
                     try:
                         # Attempt to add the constraint. It might fail if existing data violates it.
                         cur.execute("ALTER TABLE weld_details ADD CONSTRAINT unique_uniq_id UNIQUE (uniq_id);")
@@ -195,7 +271,18 @@ def create_weld_details_table():
                         st.info("Added missing UNIQUE constraint to 'uniq_id' column.")
                     except Exception as constraint_e:
                         st.warning(f"Could not add UNIQUE constraint to 'uniq_id': {constraint_e}. Existing data may have duplicates.")
+
+            # 3b. Registry of the unique IDs taken (weld_partitions.py), written with every new record
+            create_uniq_id_registry(cur)
             
+            # 4. Indexes for the latest registration of each device (load_latest_device_states)
+            #    and for date-range exports (weld_export.py)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_weld_details_device_name_created_at
+                    ON weld_details (device_name, created_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_weld_details_created_at ON weld_details (created_at);
+            """)
+
             conn.commit()
             # st.success("Database table ensured.") 
     except Exception as e:
@@ -204,9 +291,25 @@ def create_weld_details_table():
         if conn:
             conn.close()
 
-def save_weld_detail(data, update_id=None):
+@st.cache_resource
+def ensure_weld_details_table():
+    """Runs create_weld_details_table() once per process instead of on every rerun."""
+    create_weld_details_table()
+    return True
+
+def record_filter(weld_id, created_at=None):
+    """
+    WHERE clause (and parameters) of one weld record: its id, plus its created_at when known so that
+    only the record's month partition is read (weld_details is partitioned by created_at).
+    """
+    if created_at is None:
+        return sql.SQL("id = %s"), [weld_id]
+    return sql.SQL("id = %s AND created_at = %s"), [weld_id, created_at]
+
+def save_weld_detail(data, update_id=None, update_created_at=None):
     """
     Saves a new weld detail entry or updates an existing one, respecting the new job_completed logic.
+    update_created_at: created_at of the record to update (limits the UPDATE to its partition).
     """
     conn = connect_db()
     if conn is None: return False
@@ -239,8 +342,9 @@ def save_weld_detail(data, update_id=None):
                 set_clauses = sql.SQL(', ').join(
                     sql.SQL("{} = {}").format(sql.Identifier(col), sql.Placeholder()) for col in cols_to_update
                 )
-                query = sql.SQL("UPDATE weld_details SET {} WHERE id = %s").format(set_clauses)
-                cur.execute(query, values_to_update + [update_id])
+                where, key = record_filter(update_id, update_created_at)
+                query = sql.SQL("UPDATE weld_details SET {} WHERE {}").format(set_clauses, where)
+                cur.execute(query, values_to_update + key)
                 st.success(f"Weld detail ID {update_id} updated successfully!")
 
             else:
@@ -251,7 +355,7 @@ def save_weld_detail(data, update_id=None):
                 # Check for: deviceid match AND uniq_id IS NULL AND job_completed = 'NO'
                 cur.execute(
                     """
-                    SELECT id, job_completed 
+                    SELECT id, created_at 
                     FROM weld_details 
                     WHERE deviceid = %s AND uniq_id IS NULL AND job_completed = 'NO'
                     ORDER BY created_at ASC LIMIT 1
@@ -266,7 +370,7 @@ def save_weld_detail(data, update_id=None):
                 
                 if existing_row:
                     # Case 1: Matching incomplete record found and is NOT completed -> UPDATE (Upsert)
-                    update_id = existing_row[0]
+                    update_id, update_created_at = existing_row
                     st.info(f"Existing incomplete record found for Device ID '{device_id_val}'. Updating record ID {update_id}.")
                     
                     # Ensure uniq_id is generated and included for the update
@@ -275,6 +379,10 @@ def save_weld_detail(data, update_id=None):
                         if unique_id:
                             data['uniq_id'] = unique_id
                             
+                    # Take the ID in the registry in this transaction (a taken ID raises a unique violation)
+                    if data.get('uniq_id') is not None:
+                        cur.execute("INSERT INTO weld_uniq_ids (uniq_id) VALUES (%s)", (data['uniq_id'],))
+
                     # Prepare data for UPDATE
                     cols = list(data.keys())
                     values = list(data.values())
@@ -282,8 +390,9 @@ def save_weld_detail(data, update_id=None):
                     set_clauses = sql.SQL(', ').join(
                         sql.SQL("{} = {}").format(sql.Identifier(col), sql.Placeholder()) for col in cols
                     )
-                    query = sql.SQL("UPDATE weld_details SET {} WHERE id = %s").format(set_clauses)
-                    cur.execute(query, values + [update_id])
+                    where, key = record_filter(update_id, update_created_at)
+                    query = sql.SQL("UPDATE weld_details SET {} WHERE {}").format(set_clauses, where)
+                    cur.execute(query, values + key)
                     st.success(f"Weld details registered and updated existing record successfully! Unique ID: {data.get('uniq_id', 'N/A')}")
                 
                 else:
@@ -301,6 +410,9 @@ def save_weld_detail(data, update_id=None):
                             st.error("Could not generate a unique ID.")
                             return False # Stop if ID generation failed
 
+                    # Take the ID in the registry in this transaction (a taken ID raises a unique violation)
+                    cur.execute("INSERT INTO weld_uniq_ids (uniq_id) VALUES (%s)", (data['uniq_id'],))
+
                     cols = list(data.keys())
                     values = list(data.values())
                     
@@ -316,6 +428,7 @@ def save_weld_detail(data, update_id=None):
                     st.success(f"New weld details registered successfully with Unique ID: {data.get('uniq_id', 'N/A')}")
             
             conn.commit()
+            load_latest_device_states.clear()
             return True
             
     except Exception as e:
@@ -338,7 +451,7 @@ def mark_job_completed(device_id_val):
             # 1. Find the ID of the last non-completed job (job_completed='NO') for this device ID
             cur.execute(
                 """
-                SELECT id 
+                SELECT id, created_at 
                 FROM weld_details 
                 WHERE deviceid = %s 
                 AND job_completed = 'NO' 
@@ -350,17 +463,18 @@ def mark_job_completed(device_id_val):
             result = cur.fetchone()
             
             if result:
-                job_id = result[0]
-                # 2. Update the status
+                job_id, created_at = result
+                # 2. Update the status (created_at: only the record's month partition is touched)
                 cur.execute(
                     """
                     UPDATE weld_details 
                     SET job_completed = 'YES' 
-                    WHERE id = %s;
+                    WHERE id = %s AND created_at = %s;
                     """,
-                    (job_id,)
+                    (job_id, created_at)
                 )
                 conn.commit()
+                load_latest_device_states.clear()
                 st.success(f"Job for Device ID '{device_id_val}' marked as completed (Record ID: {job_id}).")
                 return True
             else:
@@ -373,7 +487,7 @@ def mark_job_completed(device_id_val):
     finally:
         if conn: conn.close()
 
-def clear_weld_detail(weld_id):
+def clear_weld_detail(weld_id, created_at=None):
     """
     Clears most details of a weld entry by setting them to NULL,
     but preserves core tracking columns (id, deviceid, device_name, created_at)
@@ -402,7 +516,8 @@ def clear_weld_detail(weld_id):
     try:
         with conn.cursor() as cur:
             # First, check if the record exists and get the deviceid/name before clearing
-            cur.execute("SELECT deviceid, device_name FROM weld_details WHERE id = %s", (weld_id,))
+            where, key = record_filter(weld_id, created_at)
+            cur.execute(sql.SQL("SELECT deviceid, device_name FROM weld_details WHERE {}").format(where), key)
             result = cur.fetchone()
             
             if not result:
@@ -411,9 +526,10 @@ def clear_weld_detail(weld_id):
             
             # Execute the update query to set everything to NULL except the preserved columns
             # The 'YES' value for job_completed is passed as a parameter
-            query = sql.SQL("UPDATE weld_details SET {} WHERE id = %s").format(set_clauses)
-            cur.execute(query, ['YES', weld_id]) 
+            query = sql.SQL("UPDATE weld_details SET {} WHERE {}").format(set_clauses, where)
+            cur.execute(query, ['YES'] + key)
             conn.commit()
+            load_latest_device_states.clear()
             st.success(f"Record ID {weld_id} successfully cleared (Device ID: {result[0].strip()}).")
             return True
             
@@ -424,94 +540,63 @@ def clear_weld_detail(weld_id):
         if conn: conn.close()
 
 
-def get_last_device_id_for_name(device_name):
-    """
-    Fetches the actual deviceid (the user-entered unique ID) from the most recent
-    record associated with the descriptive device_name (e.g., 'Edge Device 1').
-    Returns the deviceid string or None if no records are found.
-    """
-    conn = connect_db()
-    if conn is None: 
-        return None
-
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT deviceid 
-                FROM weld_details 
-                WHERE device_name = %s 
-                ORDER BY created_at DESC 
-                LIMIT 1;
-                """,
-                (device_name,)
-            )
-            result = cur.fetchone()
-            
-            if result:
-                return result[0].strip() 
-            else:
-                return None
-                
-    except Exception as e:
-        st.error(f"Error fetching last device ID by name: {e}")
-        return None
-    finally:
-        if conn: conn.close()
-
+# On the partitioned weld_details the months are read newest first and a device's probe stops in
+# the newest month holding one of its records (weld_partitions.py)
+LATEST_DEVICE_STATES_QUERY = """
+    SELECT d.device_name, w.deviceid, w.job_completed, w.uniq_id, w.created_at
+    FROM unnest(%s::varchar[]) AS d(device_name)
+    CROSS JOIN LATERAL (
+        SELECT deviceid, job_completed, uniq_id, created_at
+        FROM weld_details
+        WHERE device_name = d.device_name
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) w;
+"""
 
-def check_last_job_completion_status(device_id_val):
+@st.cache_data(ttl=LATEST_STATE_CACHE_TTL)
+def load_latest_device_states(device_names):
     """
-    Checks the status of the latest job for a given device ID.
-    Returns 'YES' if the last job found is marked 'YES', 'NO' if it's marked 'NO', 
-    or 'NO_RECORD' if no records exist for that device ID.
+    Latest weld_details record of each device in one query, instead of one connection and
+    ORDER BY created_at DESC LIMIT 1 per device and question. 'device_names' is a tuple of
+    descriptive names (hashable for the cache); returns {device_name: {'deviceid', 'job_completed',
+    'uniq_id', 'last_activity'}} with no entry for devices without records. job_completed is
+    'YES' / 'NO' (a NULL status, e.g. of an old cleared row, counts as 'YES').
+    Each device is one LIMIT 1 probe of the (device_name, created_at DESC) index, so the cost does
+    not grow with the device's history.
     """
+    if not device_names:
+        return {}
     conn = connect_db()
-    if conn is None: 
-        return 'ERROR'
+    if conn is None:
+        return {}
 
     try:
         with conn.cursor() as cur:
-            # Find the job_completed status of the latest record for this deviceid
-            cur.execute(
-                """
-                SELECT job_completed 
-                FROM weld_details 
-                WHERE deviceid = %s 
-                ORDER BY created_at DESC 
-                LIMIT 1;
-                """,
-                (device_id_val,)
-            )
-            result = cur.fetchone()
-            
-            if result:
-                # FIX: Check if the fetched value is NULL (None in Python) before stripping
-                if result[0] is None:
-                    # If job_completed is NULL (e.g., from an old incomplete or cleared state)
-                    # We treat it as YES for the purpose of allowing new registration.
-                    return 'YES'
-                
-                return result[0].strip() # Returns 'YES' or 'NO' (stripped to handle potential whitespace in CHAR/VARCHAR)
-            else:
-                return 'NO_RECORD' # No records exist for this device ID
-                
+            cur.execute(LATEST_DEVICE_STATES_QUERY, (list(device_names),))
+            rows = cur.fetchall()
     except Exception as e:
-        # Catch and log error, then return 'ERROR'
-        st.error(f"Error checking last job status: {e}")
-        return 'ERROR'
+        st.error(f"Error fetching the latest device states: {e}")
+        return {}
     finally:
         if conn: conn.close()
 
+    return {
+        name: {
+            'deviceid': device_id.strip() if device_id else device_id,
+            'job_completed': job_completed.strip() if job_completed is not None else 'YES',
+            'uniq_id': uniq_id,
+            'last_activity': created_at
+        }
+        for name, device_id, job_completed, uniq_id, created_at in rows
+    }
+
 
 def fetch_weld_details(deviceid):
     """
     Fetches all weld details for a specific device (device_name, NOT deviceid).
     We assume the dashboard context (deviceid) is the descriptive 'device_name'.
     """
-    conn = connect_db()
-    if conn is None: return pd.DataFrame()
-
     # Define all columns explicitly to ensure the DataFrame structure is always correct
     EXPECTED_COLUMNS = [
         'id', 'uniq_id', 'created_at', 'contractor_name', 'block_number', 'welder_name', 'badge_number', 
@@ -520,6 +605,9 @@ def fetch_weld_details(deviceid):
         'deviceid', 'device_name', 'job_completed' # Added new column
     ]
 
+    conn = connect_db()
+    if conn is None: return pd.DataFrame(columns=EXPECTED_COLUMNS)
+
     try:
         with conn.cursor() as cur:
             # Query uses the new 'device_name' column name for filtering based on dashboard context
@@ -553,7 +641,8 @@ def fetch_weld_details(deviceid):
             # -----------------------------------------------------------
 
 
-            return df[[col for col in EXPECTED_COLUMNS if col in df.columns]] # Return DataFrame with guaranteed column order and presence
+            # Guaranteed column order and presence, with compact column types (weld_frame.py)
+            return compact_weld_frame(df[[col for col in EXPECTED_COLUMNS if col in df.columns]])
 
     except Exception as e:
         st.error(f"Error fetching data from database: {e}")
@@ -561,15 +650,17 @@ def fetch_weld_details(deviceid):
     finally:
         if conn: conn.close()
 
-def delete_weld_detail(weld_id):
-    """Dletes a weld detail entry by its ID."""
+def delete_weld_detail(weld_id, created_at=None):
+    """Dletes a weld detail entry by its ID (and created_at, see record_filter())."""
     conn = connect_db()
     if conn is None: return False
 
     try:
         with conn.cursor() as cur:
-            cur.execute("DELETE FROM weld_details WHERE id = %s", (weld_id,))
+            where, key = record_filter(weld_id, created_at)
+            cur.execute(sql.SQL("DELETE FROM weld_details WHERE {}").format(where), key)
             conn.commit()
+            load_latest_device_states.clear()
             st.success(f"Record ID {weld_id} deleted successfully.")
             return True
     except Exception as e:
@@ -693,6 +784,12 @@ OVERVIEW_STYLES = """
         box-shadow: 0 0 0 0 rgba(255, 107, 107, 0.7);
         animation: dev-pulse-red 1.5s infinite;
     }
+    .dev-amber {
+        background-color: #f39c12;
+    }
+    .dev-gray {
+        background-color: #b2bec3;
+    }
 
     @keyframes dev-pulse-green {
         0% { transform: scale(0.95); box-shadow: 0 0 0 0 rgba(39, 174, 96, 0); }
@@ -783,6 +880,11 @@ DASHBOARD_STYLES = """
         color: #06d6a0; /* Green */
         font-weight: bold;
     }
+
+    .status-idle {
+        color: #95a5a6; /* Gray */
+        font-weight: bold;
+    }
     
     /* Custom style for the Delete button (Danger look) */
     /* This targets buttons in the action column, not the dataframe */
@@ -862,17 +964,8 @@ DASHBOARD_STYLES = """
 # --- 2. Data Initialization ---
 def initialize_state():
     """Initializes session state variables."""
-    if 'mock_device_data' not in st.session_state:
-        st.session_state.mock_device_data = [
-            {'deviceName': f'Edge Device {i}', # Renamed key for clarity
-             'deviceId': f'DEV{100 + i}', # Added a specific Device ID for the database
-             'contractor': f'Contractor {i}', 
-             'runningStatus': True, 
-             'welderBadge': f'W{100 + i}' 
-            }
-            for i in range(1, 11)
-        ]
-        
+    # The devices themselves come from the shared device registry (device_registry.py)
+
     # New state for tracking dashboard navigation
     if 'current_dashboard_device' not in st.session_state: # Stores the descriptive Device Name (e.g., 'Edge Device 1')
         st.session_state.current_dashboard_device = None
@@ -881,9 +974,9 @@ def initialize_state():
     if 'register_device_name' not in st.session_state:
         st.session_state.register_device_name = None
         
-    # Track which devices have completed their 'startup' animation sequence
-    if 'dashboard_loaded_devices' not in st.session_state: # Renamed state variable
-        st.session_state.dashboard_loaded_devices = set()
+    # When each device's dashboard was opened (drives the 'startup' animation of the task list)
+    if 'dashboard_opened_at' not in st.session_state:
+        st.session_state.dashboard_opened_at = {}
 
     # State for controlling the Register Details modal
     if 'show_register_modal' not in st.session_state:
@@ -898,28 +991,11 @@ def initialize_state():
         st.session_state.confirm_delete_id = None
 
 
-def update_data():
-    """Ensures specific mappings are maintained."""
-    if 'mock_device_data' in st.session_state:
-        for device in st.session_state.mock_device_data:
-            try:
-                # Safely extract the device number and update related fields
-                dev_num = int(device['deviceName'].split(' ')[-1]) # Use deviceName
-                expected_contractor = f'Contractor {dev_num}'
-                device['contractor'] = expected_contractor
-                # Ensure deviceId is consistent with the new structure
-                device['deviceId'] = f'DEV{100 + dev_num}'
-                if not device.get('welderBadge'):
-                     device['welderBadge'] = f'W{100 + dev_num}'
-            except (ValueError, IndexError):
-                # If extraction fails, skip update logic
-                pass
-            
 def get_device_info(device_name):
-    """Retrieves contractor info for the given device Name."""
-    for device in st.session_state.mock_device_data:
-        if device['deviceName'] == device_name: # Use deviceName
-            return device
+    """Retrieves contractor info for the given device Name (cached registry lookup)."""
+    device = load_device(device_name)
+    if device is not None:
+        return device
     # Return a structure with default values if not found
     return {'deviceName': 'N/A', 'deviceId': 'N/A', 'contractor': 'N/A', 'welderBadge': 'N/A'}
 
@@ -929,23 +1005,126 @@ def get_dot_html(is_active):
     css_class = 'dev-green' if is_active else 'dev-red'
     return f'<span class="dev-dot {css_class}"></span>'
 
+# Device card of the overview grid, filled in by get_device_card_html()
+DEVICE_CARD_TEMPLATE = textwrap.dedent("""
+<div class="dev-card-wrapper">
+    <div class="dev-card">
+        <div class="dev-card-header">
+            <h3 class="dev-card-title">{c_name}</h3>
+            <span class="dev-card-subtitle">{d_name}</span>
+        </div>
+        <div class="dev-card-body">
+            <div class="dev-status-row">
+                <span class="dev-label">Status</span>
+                <span class="dev-value" title="{last_seen}">
+                    {status}
+                    {status_dot}
+                </span>
+            </div>
+            <div class="dev-status-row">
+                <span class="dev-label">Device ID</span>
+                <span class="dev-value">{d_id}</span>
+            </div>
+            <div class="dev-status-row">
+                <span class="dev-label">Calibration</span>
+                <span class="dev-value">
+                    {calibration}
+                </span>
+            </div>
+        </div>
+        <div class="dev-card-footer">
+            <div class="dev-status-row">
+                <span class="dev-label">Data Entry</span>
+                <span class="dev-data-status">
+                    {data_text}
+                    {data_dot}
+                </span>
+            </div>
+        </div>
+    </div>
+</div>
+""")
+
+@functools.lru_cache(maxsize=4096)
+def get_device_card_html(c_name, d_name, d_id, is_online, last_seen, calibration, has_data):
+    """HTML of one device card; cached, so an unchanged card is not rebuilt on every rerun."""
+    return DEVICE_CARD_TEMPLATE.format(
+        c_name=c_name, d_name=d_name, d_id=d_id, last_seen=last_seen,
+        status="Online" if is_online else "Offline", status_dot=get_dot_html(is_online),
+        calibration=calibration,
+        data_text="Data Complete" if has_data else "Data Needed", data_dot=get_dot_html(has_data)
+    )
+
+def get_last_seen_text(last_seen):
+    """Tooltip of the Status badge: when the device was last heard from."""
+    if last_seen is None:
+        return "Never seen"
+    return f"Last seen {last_seen.astimezone():%d %b %Y %H:%M:%S}"
+
+# Calibration status of the welding machine -> (badge text, dot class)
+CALIBRATION_BADGES = {
+    STATUS_VALID: ("Calibrated", "dev-green"),
+    STATUS_NO_EXPIRY: ("Calibrated", "dev-green"),
+    STATUS_EXPIRING: ("Due Soon", "dev-amber"),
+    STATUS_EXPIRED: ("Overdue", "dev-red"),
+}
+
+def get_calibration_html(calibration):
+    """Badge for a device card from its load_calibration_status() entry (None: no record)."""
+    if calibration is None:
+        return 'No Record<span class="dev-dot dev-gray"></span>'
+    text, css_class = CALIBRATION_BADGES[calibration['status']]
+    due = f" (due {calibration['due_date']:%d %b %Y})" if calibration['due_date'] else ""
+    return f'<span title="{text}{due}">{text}</span><span class="dev-dot {css_class}"></span>'
+
 # --- 4. View Rendering Functions ---
 
 def render_overview():
-    """Renders the grid of device cards."""
+    """
+    Renders the grid of device cards: one page of the devices matching the contractor / status
+    filters, filtered and paged in the database (device_registry.py).
+    """
     # Inject Overview CSS
     st.markdown(OVERVIEW_STYLES, unsafe_allow_html=True)
     
     st.markdown("<h1 style='text-align: center; color: #2c3e50; margin-bottom: 30px;'>Edge Device Overview</h1>", unsafe_allow_html=True)
     
+    render_bulk_import()
+    render_weld_export()
+
+    col_refresh, col_contractor, col_status, col_page = st.columns([1, 2, 1.5, 1.5])
+
     # Simple Refresh Button instead of auto-refresh loop
-    if st.button("Refresh Data"):
-        st.rerun()
+    with col_refresh:
+        if st.button("Refresh Data"):
+            st.rerun()
+
+    contractor = col_contractor.selectbox("Contractor", ["All Contractors"] + load_contractors(), key='overview_contractor')
+    status = col_status.selectbox("Status", ("All Statuses",) + DEVICE_STATUSES, key='overview_status')
+    contractor = None if contractor == "All Contractors" else contractor
+    status = None if status == "All Statuses" else status
 
-    devices = sorted(
-        st.session_state.mock_device_data, 
-        key=lambda x: int(x['deviceName'].split(' ')[-1]) # Use deviceName
+    total = count_devices(contractor, status)
+    if not total:
+        if contractor is None and status is None:
+            st.info("No edge devices registered yet. Devices appear here with their first heartbeat.")
+        else:
+            st.info("No devices match the selected filters.")
+        return
+    num_pages = (total - 1) // DEVICE_PAGE_SIZE + 1
+    # Keyed on the filters, so a new filter starts on its first page
+    page = col_page.number_input(
+        f"Page (of {num_pages}, {total} devices)", min_value=1, max_value=num_pages, value=1,
+        key=f"overview_page_{contractor}_{status}"
+    ) - 1
+    devices = load_device_page(contractor, status, page, DEVICE_PAGE_SIZE)
+    
+    # Calibration status of every machine on the page in one (cached) query
+    calibration_status = load_calibration_status(
+        tuple(sorted({d['machineSerial'] for d in devices if d.get('machineSerial')}))
     )
+    # Latest registration of every device on the page in one (cached) query
+    latest_states = load_latest_device_states(tuple(d['deviceName'] for d in devices))
     
     for i in range(0, len(devices), 3):
         cols = st.columns(3)
@@ -954,7 +1133,6 @@ def render_overview():
                 device = devices[i + j]
                 with cols[j]:
                     d_name = device['deviceName'] # Descriptive name for display/navigation
-                    d_id = device['deviceId'] # Unique ID for display
                     
                     # Strict naming logic
                     try:
@@ -967,56 +1145,113 @@ def render_overview():
                     if not c_name or c_name == "Unassigned":
                         c_name = forced_name
 
-                    is_running = device['runningStatus']
-                    has_data = device['welderBadge'] is not None
-                    data_text = "Data Complete" if has_data else "Data Needed"
-                    
                     # Native Streamlit Card using HTML for the look
-                    html = textwrap.dedent(f"""
-                    <div class="dev-card-wrapper">
-                        <div class="dev-card">
-                            <div class="dev-card-header">
-                                <h3 class="dev-card-title">{c_name}</h3>
-                                <span class="dev-card-subtitle">{d_name}</span>
-                            </div>
-                            <div class="dev-card-body">
-                                <div class="dev-status-row">
-                                    <span class="dev-label">Status</span>
-                                    <span class="dev-value">
-                                        { "Running" if is_running else "Stopped" }
-                                        {get_dot_html(is_running)}
-                                    </span>
-                                </div>
-                                <div class="dev-status-row">
-                                    <span class="dev-label">Device ID</span>
-                                    <span class="dev-value">{d_id}</span>
-                                </div>
-                            </div>
-                            <div class="dev-card-footer">
-                                <div class="dev-status-row">
-                                    <span class="dev-label">Data Entry</span>
-                                    <span class="dev-data-status">
-                                        {data_text}
-                                        {get_dot_html(has_data)}
-                                    </span>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    """)
+                    html = get_device_card_html(
+                        c_name, d_name, device['deviceId'], device['online'], get_last_seen_text(device['lastSeen']),
+                        get_calibration_html(calibration_status.get(device.get('machineSerial'))),
+                        latest_states.get(d_name, {}).get('uniq_id') is not None
+                    )
                     st.markdown(html, unsafe_allow_html=True)
                     
                     # Native Streamlit Button for Navigation
                     if st.button(f"View Dashboard", key=f"btn_{d_name}"):
                         st.session_state.current_dashboard_device = d_name # Use deviceName state for dashboard context
                         # If revisiting a dashboard, we might want to reset the animation
-                        if d_name in st.session_state.dashboard_loaded_devices: 
-                             st.session_state.dashboard_loaded_devices.remove(d_name) 
+                        st.session_state.dashboard_opened_at.pop(d_name, None)
                         st.session_state.show_register_modal = False # Ensure modal is closed on nav
                         st.session_state.editing_weld_id = None # Ensure editing is off
                         st.session_state.confirm_delete_id = None # Clear deletion state
                         st.rerun()
 
+def render_bulk_import():
+    """
+    Bulk import of historical weld records from a CSV / Excel file (weld_import.py). The result
+    and the rejected-rows report stay in the session until the next import.
+    """
+    with st.expander("📥 Bulk Import Weld Records (CSV / Excel)"):
+        st.caption(
+            f"One weld per row, with the registration form's fields as columns (or the headings of the "
+            f"Registered Weld Details table); {' and '.join(IMPORT_REQUIRED_COLUMNS)} are required. Rows are "
+            f"validated in batches of {IMPORT_BATCH_ROWS:,}, unique IDs are assigned where missing and "
+            f"rows that fail validation are skipped and listed in a report."
+        )
+        uploaded_file = st.file_uploader("Weld records file", type=["csv", "xlsx"], key="bulk_import_file")
+        if uploaded_file is not None and st.button("Import Records", key="bulk_import_btn"):
+            progress_bar = st.progress(0.0, text="Importing...")
+
+            def show_progress(rows_read):
+                done = min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0)
+                progress_bar.progress(done, text=f"{rows_read:,} rows read")
+
+            st.session_state.bulk_import_result = import_weld_details(
+                uploaded_file, uploaded_file.name, progress=show_progress
+            )
+            progress_bar.empty()
+            load_latest_device_states.clear()
+            load_weld_contractors.clear() # imported contractors become export options
+
+        result = st.session_state.get('bulk_import_result')
+        if result is None:
+            return
+        if result['error']:
+            st.error(f"Import failed, nothing was imported: {result['error']}")
+            return
+        st.success(f"Imported {result['imported']:,} weld records in {result['seconds']:.1f} s.")
+        if result['rejected']:
+            report = result['report']
+            st.warning(
+                f"{result['rejected']:,} rows were rejected"
+                + (f" (the report lists the first {len(report):,})." if len(report) < result['rejected'] else ".")
+            )
+            st.download_button(
+                "Download Rejected Rows Report", report.to_csv(index=False),
+                file_name="rejected_weld_records.csv", mime="text/csv", key="bulk_import_report"
+            )
+            st.dataframe(report.head(100), hide_index=True, height=200)
+
+def render_weld_export():
+    """
+    Export of weld records (date range, contractor, block) as CSV / Parquet for audits. The file
+    is streamed by the ingest server from a server-side cursor (weld_export.py); the dashboard
+    only hands out the download link.
+    """
+    with st.expander("📤 Export Weld Records (CSV / Parquet)"):
+        dashboard_host = st.context.headers.get("Host")
+        if not export_reachable(dashboard_host, SENSOR_INGEST_HOST):
+            st.warning("Weld record exports can only be downloaded on the dashboard machine: set the EXPORT_PUBLIC_URL "
+                       "environment variable to the reverse proxy of the export server (see weld_export.py).")
+            return
+        today = datetime.now().date()
+        col_dates, col_contractor, col_block, col_format = st.columns([2, 1.5, 1, 1])
+        dates = col_dates.date_input("Registered between", (today - timedelta(days=30), today), key='export_dates')
+        contractor = col_contractor.selectbox("Contractor", ["All Contractors"] + load_weld_contractors(), key='export_contractor')
+        block = col_block.text_input("Block No", key='export_block').strip()
+        export_format = col_format.radio("Format", list(EXPORT_FORMATS), horizontal=True, key='export_format')
+
+        if st.button("Create Download Link", key='export_btn'):
+            filters = {
+                'start_date': dates[0] if len(dates) > 0 else None,
+                'end_date': dates[1] if len(dates) > 1 else None,
+                'contractor': None if contractor == "All Contractors" else contractor,
+                'block': block or None
+            }
+            if start_sensor_ingest() is None and not EXPORT_PUBLIC_URL:
+                st.error("The export server is not running (port taken), the file cannot be streamed.")
+                return
+            try:
+                token = create_export_link(filters, export_format)
+            except ValueError as e:
+                st.error(str(e))
+                return
+            url = export_url(token, dashboard_host, SENSOR_INGEST_PORT, SENSOR_INGEST_HOST)
+            st.session_state.weld_export_link = (export_file_name(filters, export_format), url)
+
+        link = st.session_state.get('weld_export_link')
+        if link is not None:
+            file_name, url = link
+            st.link_button(f"⬇️ Download {file_name}", url)
+            st.caption(f"The link works once, within {EXPORT_LINK_SECONDS // 60} minutes; the file is written while it downloads.")
+
 def render_register_modal_content(device_name):
     """
     Renders the content of the registration/edit form (now a full page view).
@@ -1041,8 +1276,8 @@ def render_register_modal_content(device_name):
         edit_row = full_df[full_df['id'] == weld_id_to_edit] 
         
         if not edit_row.empty:
-            # Convert row to dictionary for initial values
-            initial_data = edit_row.iloc[0].to_dict()
+            # Convert row to dictionary for initial values (None where missing)
+            initial_data = weld_record(edit_row.iloc[0])
         else:
             # If we were editing a record that no longer exists (e.g., cleared by another user)
             st.warning("Could not find record to edit.")
@@ -1080,7 +1315,7 @@ def render_register_modal_content(device_name):
         # NOTE: This is safe because it's outside the main form context now
         with col_confirm:
             if st.button("✅ Confirm Clear/Delete", key='confirm_clear_final', type='secondary'):
-                if clear_weld_detail(weld_id_to_edit):
+                if clear_weld_detail(weld_id_to_edit, initial_data.get('created_at')):
                     # Clear state and rerun to go back to dashboard
                     st.session_state.confirm_delete_id = None
                     st.session_state.editing_weld_id = None
@@ -1330,51 +1565,69 @@ def render_register_modal_content(device_name):
                 st.error("Please fill in Welder Name, Block Number, and Material Type.")
                 return # Stop execution if other validation fails
             
+            # Welder qualification for the selected process (in-memory index lookup)
+            qualification_flag = None
+            if not is_editing:
+                qual = check_welder_qualification(badge_number, type_of_weld)
+                if not qual["qualified"]:
+                    reason = (
+                        f"certificate {qual['certificate_number']} expired on {qual['valid_upto_date']}"
+                        if qual.get("certificate_number") else "no qualification certificate on record"
+                    )
+                    if BLOCK_UNQUALIFIED_WELDS:
+                        st.error(f"Badge {badge_number} is not qualified for {type_of_weld}: {reason}.")
+                        return # Stop execution if the welder is not qualified
+                    st.warning(f"Badge {badge_number} is not qualified for {type_of_weld}: {reason}. Registering with a flag.")
+                    qualification_flag = f"[UNQUALIFIED: {type_of_weld} - {reason}]"
+                elif qual["status"] == STATUS_NOT_CHECKED:
+                    st.warning(f"Welder qualification not checked: {qual['reason']}.")
+                elif qual["status"] == STATUS_EXPIRING:
+                    st.warning(f"Qualification {qual['certificate_number']} for {type_of_weld} expires on {qual['valid_upto_date']}.")
+            
             # --- END VALIDATION ---
 
-            else:
-                data = {
-                    # --- MAPPING TO DB COLUMNS ---
-                    'device_name': st.session_state.device_name_for_submit, # The descriptive name
-                    'deviceid': deviceid_input, # The user-provided unique ID (check column)
-                    # -----------------------------
-                    'contractor_name': st.session_state['contractor_name'], # Use the disabled field value
-                    'block_number': block_number,
-                    'welder_name': welder_name,
-                    'badge_number': badge_number,
-                    'material_type': material_type,
-                    'thickness': thickness,
-                    'type_of_weld': type_of_weld,
-                    'no_of_passes': no_of_passes,
-                    'weld_length': weld_length,
-                    'current': current,
-                    'voltage': voltage,
-                    'travel_speed': travel_speed,
-                    'filler_material': filler_material,
-                    'wps_code': wps_code,
-                    'remarks': remarks
-                }
-                
-                # --- Generate Unique ID only on initial Save (not Update) ---
-                if not is_editing:
-                    # Generate the 5-character uppercase ID and check uniqueness
-                    unique_id = generate_guaranteed_unique_id()
-                    if unique_id:
-                        data['uniq_id'] = unique_id
-                    else:
-                        st.error("Could not generate a unique ID. Please check database connectivity or try again.")
-                        # Stop execution if ID generation failed
-                        return 
-
-                # NOTE: save_weld_detail automatically handles the columns in 'data' and the new upsert logic
-                if save_weld_detail(data, update_id=weld_id_to_edit):
-                    # Reset state and close modal on successful save/update
-                    st.session_state.show_register_modal = False
-                    st.session_state.editing_weld_id = None
-                    st.session_state.confirm_delete_id = None # Clear deletion state
-                    # Navigate back to the dashboard of the descriptive name
-                    st.session_state.current_dashboard_device = st.session_state.device_name_for_submit 
-                    st.rerun()
+            data = {
+                # --- MAPPING TO DB COLUMNS ---
+                'device_name': st.session_state.device_name_for_submit, # The descriptive name
+                'deviceid': deviceid_input, # The user-provided unique ID (check column)
+                # -----------------------------
+                'contractor_name': st.session_state['contractor_name'], # Use the disabled field value
+                'block_number': block_number,
+                'welder_name': welder_name,
+                'badge_number': badge_number,
+                'material_type': material_type,
+                'thickness': thickness,
+                'type_of_weld': type_of_weld,
+                'no_of_passes': no_of_passes,
+                'weld_length': weld_length,
+                'current': current,
+                'voltage': voltage,
+                'travel_speed': travel_speed,
+                'filler_material': filler_material,
+                'wps_code': wps_code,
+                'remarks': f"{qualification_flag} {remarks}" if qualification_flag else remarks
+            }
+            
+            # --- Generate Unique ID only on initial Save (not Update) ---
+            if not is_editing:
+                # Generate the 5-character uppercase ID and check uniqueness
+                unique_id = generate_guaranteed_unique_id()
+                if unique_id:
+                    data['uniq_id'] = unique_id
+                else:
+                    st.error("Could not generate a unique ID. Please check database connectivity or try again.")
+                    # Stop execution if ID generation failed
+                    return 
+
+            # NOTE: save_weld_detail automatically handles the columns in 'data' and the new upsert logic
+            if save_weld_detail(data, update_id=weld_id_to_edit, update_created_at=initial_data.get('created_at')):
+                # Reset state and close modal on successful save/update
+                st.session_state.show_register_modal = False
+                st.session_state.editing_weld_id = None
+                st.session_state.confirm_delete_id = None # Clear deletion state
+                # Navigate back to the dashboard of the descriptive name
+                st.session_state.current_dashboard_device = st.session_state.device_name_for_submit 
+                st.rerun()
 
     # --- BUTTONS OUTSIDE THE FORM (Delete/Close) ---
     st.markdown("---")
@@ -1400,6 +1653,149 @@ def render_register_modal_content(device_name):
     # -----------------------------------------------
         
 
+@st.fragment(run_every=TASKS_REFRESH_SECONDS)
+def render_running_tasks_card(device_name):
+    """
+    Running Tasks card (refreshes itself every TASKS_REFRESH_SECONDS). Every task shows
+    "Starting..." for STARTUP_SECONDS after the dashboard is opened; then the acquisition tasks
+    are Running while their stream receives samples and Idle once it has been silent for
+    STREAM_IDLE_SECONDS. Preprocessing is Running while the IMU trajectory keeps up with the
+    stream, the Threshold Checker while it checks the device's samples (active weld only) and
+    Data Transfer follows the device as a whole.
+    """
+    device_id = get_device_info(device_name)['deviceId']
+    now = time.time()
+    opened_at = st.session_state.dashboard_opened_at.get(device_name, now)
+    starting = now - opened_at < STARTUP_SECONDS
+
+    receiving = {}
+    for stream in ("voltage", "imu"):
+        last_ns = latest_timestamp(device_id, stream)
+        receiving[stream] = last_ns is not None and now - last_ns / 1e9 < STREAM_IDLE_SECONDS
+    device_active = any(receiving.values())
+    integrated_ns = processed_until(device_id)
+    threshold_ns = checked_until(device_id)
+    tasks = {
+        "Voltage Acquisition": receiving["voltage"],
+        "IMU Acquisition": receiving["imu"],
+        "Preprocessing": integrated_ns is not None and now - integrated_ns / 1e9 < STREAM_IDLE_SECONDS,
+        "Threshold Checker": threshold_ns is not None and now - threshold_ns / 1e9 < STREAM_IDLE_SECONDS,
+        "Data Transfer": device_active
+    }
+
+    with st.container(border=True):
+        st.subheader("Running Tasks")
+        for task, is_running in tasks.items():
+            if starting:
+                status_text, status_class = "Starting...", "status-starting"
+            elif is_running:
+                status_text, status_class = "Running", "status-running"
+            else:
+                status_text, status_class = "Idle", "status-idle"
+            c1, c2 = st.columns([3, 1])
+            c1.write(task)
+            # Use markdown with custom CSS class for the animation effect
+            c2.markdown(f'<span class="{status_class}">{status_text}</span>', unsafe_allow_html=True)
+
+@st.fragment(run_every=CHART_REFRESH_SECONDS)
+def render_voltage_card(device_name):
+    """Voltage chart card: the latest window of the device's 1 kHz voltage (refreshes itself)."""
+    with st.container(border=True):
+        st.subheader("Real-time Voltage Waveform (1kHz)")
+        device_id = get_device_info(device_name)['deviceId']
+        w_col, m_col = st.columns(2)
+        window = w_col.selectbox("Window", list(CHART_WINDOWS), key='voltage_window')
+        mode = m_col.selectbox("Downsampling", list(DOWNSAMPLE_MODES), key='voltage_mode')
+        end_ns = latest_timestamp(device_id, "voltage")
+        if end_ns is not None:
+            traces, info = read_downsampled(
+                device_id, "voltage", end_ns - CHART_WINDOWS[window] * 10**9, end_ns,
+                MAX_CHART_POINTS, DOWNSAMPLE_MODES[mode]
+            )
+            times_ns, volts = traces["voltage"]
+            chart_data = pd.DataFrame({
+                'Time (s)': ((times_ns - end_ns) / 1e9).astype(np.float32),
+                'Voltage (V)': volts.astype(np.float32)
+            })
+            st.vega_lite_chart(chart_data, VOLTAGE_CHART_SPEC)
+            last_sample = pd.Timestamp(end_ns, unit='ns')
+            st.caption(f"{len(volts):,} of {info['samples']:,} samples from {device_id} "
+                       f"(latest {last_sample:%H:%M:%S} UTC)")
+        else:
+            st.info(f"No voltage frames received from {device_id} yet.")
+
+@st.fragment(run_every=CHART_REFRESH_SECONDS)
+def render_imu_card(device_name):
+    """IMU position card: the torch trajectory of the last TRAJECTORY_CHART_SECONDS (refreshes itself)."""
+    with st.container(border=True):
+        st.subheader("IMU Position Tracking (X/Y/Z)")
+        device_id = get_device_info(device_name)['deviceId']
+
+        # Integrates only the IMU samples received since the last refresh
+        times_ns, position, info = trajectory_window(device_id, TRAJECTORY_CHART_SECONDS)
+        if len(times_ns):
+            df_pos = pd.DataFrame(
+                (position * 1000).astype(np.float32), columns=['Pos X', 'Pos Y', 'Pos Z'],
+                index=pd.Index(((times_ns - times_ns[-1]) / 1e9).astype(np.float32), name='Time (s)')
+            )
+            # Display as a multi-line chart showing position coordinates over time (capped per trace)
+            chart_pos = downsample_frame(df_pos, trace_name='Axis', value_name='Position (mm)')
+            st.vega_lite_chart(chart_pos, IMU_CHART_SPEC)
+
+            # Display current coordinates text
+            curr_x, curr_y, curr_z = position[-1] * 1000
+            motion = "moving" if info['moving'] else "at rest"
+            st.caption(f"**Current Coordinates:** X: {curr_x:.1f}mm | Y: {curr_y:.1f}mm | Z: {curr_z:.1f}mm ({motion})")
+        else:
+            st.info(f"No IMU frames received from {device_id} yet.")
+
+@st.fragment(run_every=SEGMENTS_REFRESH_SECONDS)
+def render_segments_card(device_name):
+    """Connectivity card with the device's latest detected weld segments (refreshes itself)."""
+    with st.container(border=True):
+        # Header with Buttons
+        h_col1, h_col2 = st.columns([2, 2])
+        h_col1.subheader("Connectivity")
+        
+        with h_col2:
+            b1, b2 = st.columns(2)
+            b1.button("Start", type="primary", key='start_conn') 
+            b2.button("Stop", type="secondary", key='stop_conn') 
+        
+        # Data Table with Scrollbar (lots of rows)
+        st.write("**Rework/Old Data**")
+        device_id = get_device_info(device_name)['deviceId']
+        df = load_segments(device_id, SEGMENT_CARD_ROWS)
+        if df.empty:
+            st.info(f"No weld segments detected for {device_id} yet.")
+            return
+        
+        # Define Standard Column Configs 
+        column_configs = {
+            'Length Start (mm)': st.column_config.NumberColumn(format="%d"),
+            'Length End (mm)': st.column_config.NumberColumn(format="%d"),
+        }
+        
+        # Render dataframe with Configs
+        st.dataframe(
+            df, 
+            hide_index=True, 
+            height=200, 
+            column_config=column_configs
+        )
+
+@st.fragment(run_every=EVENTS_REFRESH_SECONDS)
+def render_threshold_events_card(device_name):
+    """Threshold Events card: the device's latest WPS limit excursions (refreshes itself)."""
+    with st.container(border=True):
+        st.subheader("Threshold Events")
+        device_id = get_device_info(device_name)['deviceId']
+        df = load_events(device_id, EVENT_CARD_ROWS)
+        if df.empty:
+            st.info(f"No threshold events for {device_id}.")
+        else:
+            st.dataframe(df, hide_index=True, height=200)
+
 def render_dashboard(device_name):
     """
     Renders the detailed dashboard view using Native Streamlit Components.
@@ -1431,13 +1827,17 @@ def render_dashboard(device_name):
         st.title("System Health Dashboard")
         st.markdown(f"**Viewing:** :blue[{device_name}]") # Use deviceName for display
 
-    # Demo/offline mode: avoid database calls, use mock device ID and status
     device_info = get_device_info(device_name)
-    device_id_for_status_check = device_info['deviceId']
 
     # --- Check Last Job Status ---
-    # In demo mode, always allow registration.
-    last_job_status = 'YES'
+    # Latest registration of this device (the same cached query the overview reads per page)
+    latest_state = load_latest_device_states((device_name,)).get(device_name)
+    if latest_state is None:
+        last_job_status = 'NO_RECORD'
+        device_id_for_status_check = device_info['deviceId']
+    else:
+        last_job_status = latest_state['job_completed']
+        device_id_for_status_check = latest_state['deviceid'] or device_info['deviceId']
     
     # Logic: 
     #   1. If no records exist ('NO_RECORD') OR the last job was marked 'YES', allow registration (disabled=False).
@@ -1475,151 +1875,47 @@ def render_dashboard(device_name):
                 disabled=(last_job_status != 'NO'), 
                 key=f"job_completed_btn_{device_id_for_status_check}"
             ):
-                # Demo/offline mode: no DB updates
-                st.info("Demo mode: Job completion is disabled.")
-                st.rerun() 
+                if mark_job_completed(device_id_for_status_check):
+                    st.rerun() 
             st.markdown('</div>', unsafe_allow_html=True)
 
 
     st.divider()
 
-    # Determine Animation State
-    is_loaded = device_name in st.session_state.dashboard_loaded_devices # Use deviceName state
-    
-    # If not loaded yet, set a flag to run the animation logic
-    if not is_loaded:
-        status_text = "Starting..."
-        status_class = "status-starting"
-        should_rerun = True
-    else:
-        status_text = "Running"
-        status_class = "status-running"
-        should_rerun = False
+    # Start of the 'startup' animation (reset from the overview)
+    st.session_state.dashboard_opened_at.setdefault(device_name, time.time())
 
     # 2. Top Row: Running Tasks & Connectivity
     row1_col1, row1_col2 = st.columns(2)
 
     # --- CARD 1: Running Tasks ---
     with row1_col1:
-        with st.container(border=True):
-            st.subheader("Running Tasks")
-            tasks = [
-                "Voltage Acquisition",
-                "IMU Acquisition",
-                "Preprocessing",
-                "Threshold Checker",
-                "Data Transfer"
-            ]
-            for task in tasks:
-                c1, c2 = st.columns([3, 1])
-                c1.write(task)
-                # Use markdown with custom CSS class for the animation effect
-                c2.markdown(f'<span class="{status_class}">{status_text}</span>', unsafe_allow_html=True)
+        render_running_tasks_card(device_name)
 
     # --- CARD 2: Connectivity Status (now Rework/Old Data) ---
     with row1_col2:
-        with st.container(border=True):
-            # Header with Buttons
-            h_col1, h_col2 = st.columns([2, 2])
-            h_col1.subheader("Connectivity")
-            
-            with h_col2:
-                b1, b2 = st.columns(2)
-                b1.button("Start", type="primary", key='start_conn') 
-                b2.button("Stop", type="secondary", key='stop_conn') 
-            
-            # Data Table with Scrollbar (lots of rows)
-            st.write("**Rework/Old Data**")
-            
-            # Generate 50 rows of mock data (Defect Found column removed)
-            dates = [datetime.now() - timedelta(minutes=x*15) for x in range(50)]
-            data = {
-                "Date/Time": [d.strftime("%d-%m-%Y %I:%M %p") for d in dates],
-                "Length Start (mm)": [random.randint(100, 1000) for _ in range(50)],
-                "Length End (mm)": [random.randint(1100, 2000) for _ in range(50)],
-                "Pass": [random.randint(1, 5) for _ in range(50)],
-            }
-            df = pd.DataFrame(data)
-            
-            # Define Standard Column Configs 
-            column_configs = {
-                'Length Start (mm)': st.column_config.NumberColumn(format="%d"),
-                'Length End (mm)': st.column_config.NumberColumn(format="%d"),
-            }
-            
-            # Render dataframe with Configs
-            st.dataframe(
-                df, 
-                hide_index=True, 
-                height=200, 
-                column_config=column_configs
-            )
+        render_segments_card(device_name)
 
     # 3. Bottom Row: Charts
     row2_col1, row2_col2 = st.columns(2)
 
     # --- CARD 3: Voltage Chart ---
     with row2_col1:
-        with st.container(border=True):
-            st.subheader("Real-time Voltage Waveform (1kHz)")
-            # Generate mock voltage data (sine wave)
-            chart_data = pd.DataFrame(
-                np.sin(np.linspace(0, 20, 100)) + np.random.normal(0, 0.1, 100),
-                columns=['Voltage (V)']
-            )
-            st.line_chart(chart_data, color="#4361ee", height=250)
+        render_voltage_card(device_name)
 
     # --- CARD 4: IMU Position Visualization ---
     with row2_col2:
-        with st.container(border=True):
-            st.subheader("IMU Position Tracking (X/Y/Z)")
-            
-            # Simulated Position Data (Random Walk) to show movement/position
-            steps = np.random.normal(0, 0.5, size=(50, 3))
-            position_data = np.cumsum(steps, axis=0)
-            
-            df_pos = pd.DataFrame(position_data, columns=['Pos X', 'Pos Y', 'Pos Z'])
-            
-            # Display as a multi-line chart showing position coordinates over time
-            st.line_chart(df_pos, height=200)
-            
-            # Display current coordinates text
-            curr_x, curr_y, curr_z = position_data[-1]
-            st.caption(f"**Current Coordinates:** X: {curr_x:.2f}mm | Y: {curr_y:.2f}mm | Z: {curr_z:.2f}mm")
+        render_imu_card(device_name)
+
+    # --- CARD 5: Threshold Events ---
+    render_threshold_events_card(device_name)
 
     st.divider()
     
     # 4. New: Registered Weld Details Table
     st.header("Registered Weld Details")
     
-    # Demo/offline mode: generate mock data instead of fetching from PostgreSQL
-    mock_rows = []
-    for i in range(1, 6):
-        mock_rows.append({
-            'id': i,
-            'uniq_id': generate_unique_id(),
-            'created_at': datetime.now() - timedelta(hours=i),
-            'contractor_name': device_info['contractor'],
-            'block_number': f"Block {chr(64 + i)}-{100 + i}",
-            'welder_name': f"Welder {i}",
-            'badge_number': f"W{100 + i}",
-            'material_type': random.choice(['Carbon Steel', 'Stainless Steel', 'Alloy Steel']),
-            'thickness': random.choice([6, 8, 10, 12]),
-            'type_of_weld': random.choice(['FCAW', 'SAW', 'SMAW', 'GMAW']),
-            'no_of_passes': random.choice([1, 2, 3, 4]),
-            'weld_length': random.choice([300, 450, 600, 800]),
-            'current': random.choice([180, 200, 220, 250]),
-            'voltage': random.choice([22, 24, 26, 28]),
-            'travel_speed': random.choice([250, 300, 350, 400]),
-            'filler_material': random.choice(['ER70S-6', 'E7018', 'ER308L']),
-            'wps_code': f"WPS-00{i}-RevA",
-            'remarks': random.choice(['N/A', 'OK', 'Rework']),
-            'deviceid': device_id_for_status_check,
-            'device_name': device_name,
-            'job_completed': 'YES'
-        })
-
-    weld_df = pd.DataFrame(mock_rows)
+    weld_df = fetch_weld_details(device_name)
 
     # Rename the database columns for user-friendly display and consistency
     weld_df = weld_df.rename(columns={
@@ -1736,19 +2032,19 @@ def render_dashboard(device_name):
             st.session_state.show_register_modal = True
             st.session_state.confirm_delete_id = None # CRITICAL: Clear this state before navigating to edit mode
             st.rerun()
-        
-    # Animation Logic Handling (Run at end of render)
-    if should_rerun:
-        time.sleep(2.5) # Wait for animation to play a bit
-        st.session_state.dashboard_loaded_devices.add(device_name) # Use deviceName state
-        st.rerun()
 
 # --- 5. Main App Controller ---
 def render_fabrication_team_tab():
     # 1. Initialize DB and State
-    # create_weld_details_table()
+    ensure_weld_details_table() # Weld registrations read by the overview and dashboard
+    start_partition_maintainer() # Makes the weld_details partitions of the coming months
+    ensure_certificate_tables() # Calibration registry read by the overview badges
+    ensure_device_table() # Edge device registry behind the overview grid
+    start_heartbeat_writer() # Writes the devices' heartbeats (last seen) to the registry
+    start_sensor_ingest() # Receives the edge devices' sensor frames
+    start_segment_worker() # Detects weld segments in the stored sensor streams
+    start_threshold_checker() # Checks the active welds against their WPS limits
     initialize_state()
-    update_data()
     
     # 2. Render View based on state
     if st.session_state.current_dashboard_device: # Use deviceName state
@@ -8,9 +8,64 @@ import os
 import json
 import re
 from gradio_client import Client, handle_file
+from cert_store import (
+    ensure_certificate_tables, add_cert, delete_cert, count_certs,
+    load_cert_page, CERT_PAGE_SIZE
+)
+from cert_status import classify_expiry
+from cert_alerts import render_alert_feed
+from expiry_digest import start_digest_scheduler, digest_status_counts
+from cert_dedup import first_page_hash, find_duplicate, record_fingerprint, dedup_caption
+from cert_search import render_cert_search
+from model_warmup import (
+    register_endpoint, record_call, start_warmup_manager, render_endpoint_status,
+    blank_image_png, WARMUP_TIMEOUT
+)
+from resilience import call_with_resilience
 
 # --- Configuration ---
 OCR_API_URL = "http://10.21.138.21:7860/"
+MACHINE_OCR_ENDPOINT = "Machine OCR"  # name in the model warm-up panel
+
+# Gradio client, created once per process (Client() fetches the app config on construction)
+_ocr_client = None
+
+def get_ocr_client():
+    """Returns the shared gradio Client for the OCR app, creating it on first use."""
+    global _ocr_client
+    if _ocr_client is None:
+        _ocr_client = Client(OCR_API_URL)
+    return _ocr_client
+
+def run_ocr_predict(image_path, timeout):
+    """
+    Runs the OCR app's free-OCR task on an image file and returns the raw result.
+    Raises TimeoutError (and cancels the queued job) after 'timeout' seconds.
+    """
+    job = get_ocr_client().submit(
+        image=handle_file(image_path),
+        model_size="Gundam (Recommended)",
+        task_type="📝 Free OCR",
+        ref_text="",
+        api_name="/process_ocr_task"
+    )
+    try:
+        return job.result(timeout=timeout)
+    except TimeoutError:
+        job.cancel()
+        raise
+
+def ping_machine_ocr():
+    """Warm-up ping: free OCR of a blank image keeps the gradio app's model loaded."""
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_path = os.path.join(tmp_dir, "warmup.png")
+        with open(image_path, "wb") as f:
+            f.write(blank_image_png())
+        run_ocr_predict(image_path, WARMUP_TIMEOUT)
+    return time.time() - start, None
+
+register_endpoint(MACHINE_OCR_ENDPOINT, ping_machine_ocr)
 
 def process_file_for_ocr(uploaded_file):
     """
@@ -111,17 +166,10 @@ def call_machine_ocr_api(file_bytes, file_name, file_type):
             temp_file.write(file_bytes)
             temp_file_path = temp_file.name
 
-        client = Client(OCR_API_URL)
-        
-        result = client.predict(
-            image=handle_file(temp_file_path),
-            model_size="Gundam (Recommended)",
-            task_type="📝 Free OCR",
-            ref_text="", 
-            api_name="/process_ocr_task"
-        )
+        result = call_with_resilience(MACHINE_OCR_ENDPOINT, lambda timeout: run_ocr_predict(temp_file_path, timeout))
         
         elapsed_time = time.time() - start_time
+        record_call(MACHINE_OCR_ENDPOINT, elapsed_time)
         
         raw_text = result[0]
         structured_data = parse_machine_ocr_text(raw_text)
@@ -130,6 +178,7 @@ def call_machine_ocr_api(file_bytes, file_name, file_type):
         return structured_data, elapsed_time
             
     except Exception as e:
+        record_call(MACHINE_OCR_ENDPOINT, time.time() - start_time, ok=False, error=str(e)[:200])
         st.error(f"An error occurred during extraction: {e}")
         return {}, time.time() - start_time
         
@@ -142,10 +191,15 @@ def call_machine_ocr_api(file_bytes, file_name, file_type):
 
 def render_machine_calibration_tab():
     st.header("Machine Calibration Management")
+    ensure_certificate_tables()
+    start_digest_scheduler()
+    start_warmup_manager()
+    render_endpoint_status([MACHINE_OCR_ENDPOINT])
     st.subheader("Upload New Calibration Certificate")
     
     # --- Step 1: File Upload (Outside Form) ---
     uploaded_file = st.file_uploader("Upload Calibration Certificate (PDF, JPG, PNG)", type=["pdf", "jpg", "png", "jpeg"])
+    st.caption(dedup_caption("machine"))
     
     # Initialize Session State Variables
     if 'mc_name' not in st.session_state: st.session_state.mc_name = ""
@@ -168,18 +222,31 @@ def render_machine_calibration_tab():
             processed_bytes, mime_type, converted = process_file_for_ocr(uploaded_file)
             
             if processed_bytes:
-                if converted:
-                    status_container.info("PDF converted to Image. Sending to OCR model...")
-                else:
-                    status_container.info("Sending Image to OCR model...")
+                # Re-scans / photos of an already processed certificate reuse its extraction
+                phash = first_page_hash(processed_bytes, mime_type)
+                duplicate = find_duplicate("machine", phash)
+                st.session_state.machine_duplicate = duplicate
+                st.session_state.machine_fingerprint = None
                 
-                extracted_data, duration = call_machine_ocr_api(processed_bytes, current_file_name, mime_type)
+                if duplicate:
+                    extracted_data, duration = duplicate["extraction"], duplicate["lookup_time"]
+                else:
+                    if converted:
+                        status_container.info("PDF converted to Image. Sending to OCR model...")
+                    else:
+                        status_container.info("Sending Image to OCR model...")
+                    
+                    extracted_data, duration = call_machine_ocr_api(processed_bytes, current_file_name, mime_type)
+                    if extracted_data:
+                        # Indexed once the record is saved, so a discarded extraction is never reused
+                        st.session_state.machine_fingerprint = (phash, current_file_name, extracted_data, duration)
                 
                 # Update Session State with Extracted Data
                 st.session_state.mc_name = extracted_data.get("Instrument Name", "")
                 st.session_state.mc_customer = extracted_data.get("Customer Name", "")
                 st.session_state.mc_serial = extracted_data.get("Serial Number", "")
                 st.session_state.mc_model = extracted_data.get("Model Number", "")
+                st.session_state.mc_raw_text = extracted_data.get("raw_text", "")
                 
                 # Date Parsing Helper
                 def parse_date_to_obj(date_str):
@@ -211,7 +278,13 @@ def render_machine_calibration_tab():
             else:
                 status_container.error("File processing failed.")
 
-    if 'machine_extraction_time' in st.session_state and st.session_state.machine_extraction_time:
+    duplicate = st.session_state.get('machine_duplicate')
+    if duplicate:
+        st.warning(
+            f"♻️ Near-duplicate of '{duplicate['file_name']}' - its extraction was reused "
+            f"({duplicate['extraction_time']:.2f}s of OCR time saved). Check it isn't already registered."
+        )
+    elif 'machine_extraction_time' in st.session_state and st.session_state.machine_extraction_time:
          st.caption(f"⏱️ Last data extracted in {st.session_state.machine_extraction_time:.2f} seconds")
 
     # --- Step 2: Verification Form (Bound to Session State) ---
@@ -236,18 +309,21 @@ def render_machine_calibration_tab():
             elif not st.session_state.mc_name or not st.session_state.mc_serial:
                 st.error("Essential fields (Instrument Name, Serial No) are missing.")
             else:
-                if 'machine_certs' not in st.session_state:
-                    st.session_state.machine_certs = []
-
-                st.session_state.machine_certs.append({
+                saved = add_cert("machine", {
                     "instrument_name": st.session_state.mc_name,
                     "customer_name": st.session_state.mc_customer,
                     "serial_number": st.session_state.mc_serial,
                     "model_number": st.session_state.mc_model,
-                    "calibration_date": st.session_state.mc_cal_date.isoformat(),
-                    "due_date": st.session_state.mc_due_date.isoformat(),
-                    "file_name": uploaded_file.name
+                    "calibration_date": st.session_state.mc_cal_date,
+                    "due_date": st.session_state.mc_due_date,
+                    "file_name": uploaded_file.name,
+                    "ocr_text": st.session_state.get("mc_raw_text")
                 })
+                if not saved:
+                    st.stop()
+                if st.session_state.get('machine_fingerprint'):
+                    record_fingerprint("machine", *st.session_state.machine_fingerprint)
+                    st.session_state.machine_fingerprint = None
                 
                 # Reset fields
                 st.session_state.mc_name = ""
@@ -256,6 +332,8 @@ def render_machine_calibration_tab():
                 st.session_state.mc_model = ""
                 st.session_state.last_machine_uploaded_file = None
                 st.session_state.machine_extraction_time = None
+                st.session_state.machine_duplicate = None
+                st.session_state.mc_raw_text = ""
                 
                 st.success("Record Saved Successfully!")
                 st.rerun()
@@ -264,25 +342,30 @@ def render_machine_calibration_tab():
     st.markdown("---")
     st.subheader("Existing Machine Calibrations")
     
-    if 'machine_certs' in st.session_state and st.session_state.machine_certs:
-        df = pd.DataFrame(st.session_state.machine_certs)
+    render_cert_search(
+        "machine",
+        ["instrument_name", "customer_name", "serial_number", "model_number", "due_date"],
+        "Lab or customer name, instrument, serial fragment ..."
+    )
+    
+    total_certs = count_certs("machine")
+    if total_certs:
+        # Only one page of the shared registry is loaded per rerun
+        num_pages = (total_certs - 1) // CERT_PAGE_SIZE + 1
+        page = st.number_input(f"Page (of {num_pages}, {total_certs} records)", min_value=1, max_value=num_pages, value=1, key="machine_cert_page") - 1
+        df = load_cert_page("machine", page)
         
         if 'due_date' in df.columns:
-            df['due_date'] = pd.to_datetime(df['due_date']).dt.date
-            df['status'] = df['due_date'].apply(
-                lambda x: "Expired" if x < datetime.now().date() 
-                else ("Expiring Soon" if x < datetime.now().date() + timedelta(days=30) 
-                else "Valid")
-            )
+            df['status'] = classify_expiry(df['due_date'])
             
-            # Alerts
-            for _, row in df[df['status'].isin(["Expired", "Expiring Soon"])].iterrows():
-                cls = "alert-card-expired" if row['status'] == "Expired" else "alert-card-expiring"
-                st.markdown(
-                    f"<div class='{cls}'>Alert: {row.get('instrument_name', 'Unknown')} "
-                    f"is {row['status']} (Due: {row['due_date']})</div>", 
-                    unsafe_allow_html=True
-                )
+            counts = digest_status_counts("machine")
+            st.caption(" | ".join(f"{status}: {n}" for status, n in counts.items()))
+            
+            # Alert feed (bucket counts + one page of cards, queried through the due date index)
+            render_alert_feed(
+                "machine",
+                lambda row: f"{row['instrument_name']} (S/N {row['serial_number']})"
+            )
 
             # Display updated columns
             st.dataframe(
@@ -298,7 +381,7 @@ def render_machine_calibration_tab():
                     format_func=lambda x: f"{df.iloc[x]['instrument_name']} - {df.iloc[x]['serial_number']}"
                 )
                 if st.button("Delete Selected Record"):
-                    st.session_state.machine_certs.pop(idx_to_delete)
-                    st.rerun()
+                    if delete_cert("machine", df.iloc[idx_to_delete]['id']):
+                        st.rerun()
     else:
         st.info("No calibration records found.")
\ No newline at end of file
@@ -8,9 +8,13 @@ from utils import (
     display_metrics_dashboard,
     generate_enhanced_test_data
 )
+from cert_alerts import render_expiry_digest_banner
+from expiry_digest import start_digest_scheduler
 
 def render_overview_tab():
     st.header("Defect Classification and Quantification")
+    start_digest_scheduler()
+    render_expiry_digest_banner()
     st.write("Analyze the distribution and quantification of welding defects across different levels of the ship structure.")
 
     defect_view_option = st.radio(
@@ -1,31 +1,162 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import requests
 import base64
 import json
 import time
 import os
+import re
+from cert_store import (
+    ensure_certificate_tables, add_cert, delete_cert, count_certs,
+    load_cert_page, CERT_PAGE_SIZE
+)
+from cert_status import classify_expiry
+from cert_alerts import render_alert_feed
+from expiry_digest import start_digest_scheduler, digest_status_counts
+from cert_dedup import first_page_hash, find_duplicate, record_fingerprint, dedup_caption
+from cert_search import render_cert_search
+from model_warmup import (
+    register_endpoint, record_call, start_warmup_manager, render_endpoint_status,
+    blank_image_png, WARMUP_TIMEOUT
+)
+from resilience import resilient_post
 
 # --- Configuration ---
 # API Endpoints
 OCR_API_URL = "http://10.21.138.97:8080/ocr"
 OLLAMA_CHAT_URL = "http://10.21.138.97:11434/api/chat"
 OLLAMA_MODEL = "gemma3:1b"
+OLLAMA_KEEP_ALIVE = "30m"        # Keeps the model loaded between warm-up pings (Ollama default: 5m)
+OLLAMA_COLD_LOAD_SECONDS = 1.0   # A load_duration above this means the model had to be loaded (cold call)
+
+# Names of this tab's endpoints in the model warm-up panel
+WELDER_OCR_ENDPOINT = "Welder OCR"
+OLLAMA_ENDPOINT = f"Ollama ({OLLAMA_MODEL})"
+
+# OCR pruning (applied to the OCR lines before they are sent to the LLM)
+OCR_MIN_SCORE = 0.6          # Lines recognised below this confidence are dropped (seals, stamps, signatures)
+PROMPT_TOKEN_BUDGET = 400    # Approximate token budget for the OCR part of the prompt
+CHARS_PER_TOKEN = 4          # Rough chars-per-token estimate used for budgeting
+NEIGHBOUR_ROWS = 2.5         # How many label heights below a label are searched for its value
+
+# Labels of the fields requested in query_ollama's JSON schema. A line matching one of these
+# is kept together with the lines to its right on the same row (or beneath it if the row is empty).
+FIELD_LABEL_PATTERN = re.compile(
+    r"certificate\s*no|cert\.?\s*no|name|identification|id\.?\s*no|employer|address|"
+    r"initial\s*approval|date\s*of\s*(?:welding|test|issue)|welding\s*process|process|"
+    r"valid\s*(?:until|upto|up\s*to|till)|expir",
+    re.IGNORECASE
+)
 
 # --- Utility Functions ---
 
-def request_with_retry(url, json_payload, retries=3):
-    """Utility to handle requests with basic retry logic."""
-    for i in range(retries):
-        try:
-            response = requests.post(url, json=json_payload, timeout=120)
-            response.raise_for_status()
-            return response
-        except Exception as e:
-            if i == retries - 1:
-                raise e
-            time.sleep(1)
+def estimate_tokens(text):
+    """Rough token count of a prompt fragment (no tokenizer is available on the client side)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _row_distance(label_box, box):
+    """
+    Distance (in label heights) of 'box' to the right of 'label_box' on the same row, or None.
+    Boxes are [x1, y1, x2, y2] as returned in the OCR service's 'rec_boxes'.
+    """
+    lx1, ly1, lx2, ly2 = label_box
+    x1, y1, x2, y2 = box
+    height = max(ly2 - ly1, 1)
+    centre_y = (y1 + y2) / 2
+    if ly1 - height / 2 <= centre_y <= ly2 + height / 2 and x1 >= lx1:
+        return max(x1 - lx2, 0) / height
+    return None
+
+def _below_distance(label_box, box):
+    """
+    Distance (in label heights) of 'box' directly beneath 'label_box', or None.
+    Full-width paragraphs under a label are not treated as its value.
+    """
+    lx1, ly1, lx2, ly2 = label_box
+    x1, y1, x2, y2 = box
+    height = max(ly2 - ly1, 1)
+    gap = y1 - ly2
+    if 0 <= gap <= NEIGHBOUR_ROWS * height and x1 <= lx2 and x2 >= lx1 and (x2 - x1) <= 3 * (lx2 - lx1):
+        return gap / height
+    return None
+
+def prune_ocr_lines(ocr_pages, min_score=OCR_MIN_SCORE, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Reduces the OCR output to the label/value neighbourhoods of the certificate fields.
+    Lines below 'min_score' or without any alphanumeric content are dropped; of the rest,
+    lines matching a field label are kept together with the lines in their value
+    neighbourhood. Kept lines are ranked (labels first, then closest values) and trimmed
+    to 'token_budget', then emitted in reading order.
+    Pages without per-line scores/boxes are passed through unpruned, and if no page has a
+    recognisable label (unknown layout) every confident line is kept instead.
+    Returns (prompt_text, stats).
+    """
+    ranked = []  # (rank, page_idx, line_idx, text)
+    unlabelled = []  # Confident lines of pages without labels, used only as a fallback
+    raw_texts = []
+
+    for page_idx, page in enumerate(ocr_pages):
+        result = page.get("prunedResult", {})
+        texts = result.get("rec_texts", [])
+        scores = result.get("rec_scores") or []
+        boxes = result.get("rec_boxes") or []
+        raw_texts.extend(texts)
+
+        if len(scores) != len(texts) or len(boxes) != len(texts):
+            ranked.extend((2, page_idx, i, txt) for i, txt in enumerate(texts))
+            continue
+
+        # 1. Confidence / noise filter (stamps, seals, table borders, tick boxes)
+        candidates = [
+            i for i, (txt, score) in enumerate(zip(texts, scores))
+            if score >= min_score and sum(ch.isalnum() for ch in txt) >= 2
+        ]
+        labels = [i for i in candidates if FIELD_LABEL_PATTERN.search(texts[i])]
+
+        # Pages without labels (terms & conditions, test records) are dropped unless nothing matched
+        if not labels:
+            unlabelled.extend((2, page_idx, i, texts[i]) for i in candidates)
+            continue
+
+        # 2. Labels and their value neighbourhoods. A label's value is searched on its row
+        # first; only labels with nothing to their right look at the lines beneath them.
+        label_set = set(labels)
+        values = [i for i in candidates if i not in label_set]
+        best = {}
+        for l in labels:
+            ranked.append((0, page_idx, l, texts[l]))
+            row = {i: _row_distance(boxes[l], boxes[i]) for i in values}
+            row = {i: d for i, d in row.items() if d is not None}
+            if not row:
+                row = {i: _below_distance(boxes[l], boxes[i]) for i in values}
+                row = {i: d for i, d in row.items() if d is not None}
+            for i, d in row.items():
+                best[i] = min(d, best.get(i, d))
+        ranked.extend((1 + d, page_idx, i, texts[i]) for i, d in best.items())
+
+    if not any(rank < 2 for rank, _, _, _ in ranked):
+        ranked.extend(unlabelled)
+
+    # 3. Token budget: best-ranked lines first, then restore reading order
+    kept, used = [], 0
+    for rank, page_idx, line_idx, txt in sorted(ranked, key=lambda r: r[0]):
+        cost = estimate_tokens(txt) + 1  # +1 for the newline
+        if used + cost > token_budget:
+            continue
+        kept.append((page_idx, line_idx, txt))
+        used += cost
+    kept.sort()
+
+    prompt_text = "\n".join(txt for _, _, txt in kept)
+    raw_text = "\n".join(raw_texts)
+    stats = {
+        "raw_lines": len(raw_texts),
+        "prompt_lines": len(kept),
+        "raw_tokens": estimate_tokens(raw_text),
+        "prompt_tokens": estimate_tokens(prompt_text)
+    }
+    return prompt_text, stats
 
 def query_ollama(ocr_text):
     """
@@ -61,12 +192,17 @@ def query_ollama(ocr_text):
         ],
         "options": {"temperature": 0},
         "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
         "format": json_schema
     }
 
     try:
-        response = request_with_retry(OLLAMA_CHAT_URL, payload)
-        content = response.json().get("message", {}).get("content", "").strip()
+        start = time.time()
+        response = resilient_post(OLLAMA_ENDPOINT, OLLAMA_CHAT_URL, payload)
+        result = response.json()
+        load_seconds = result.get("load_duration", 0) / 1e9
+        record_call(OLLAMA_ENDPOINT, time.time() - start, cold=load_seconds > OLLAMA_COLD_LOAD_SECONDS)
+        content = result.get("message", {}).get("content", "").strip()
         if not content:
             return None
         return json.loads(content)
@@ -76,7 +212,8 @@ def query_ollama(ocr_text):
 
 def process_document(uploaded_file):
     """
-    Workflow: File -> Base64 -> OCR API -> Ollama LLM -> Dict
+    Workflow: File -> Base64 -> OCR API -> Pruning -> Ollama LLM -> Dict
+    The full OCR text is returned under 'raw_text' for the search index.
     """
     total_start = time.time()
     
@@ -88,8 +225,9 @@ def process_document(uploaded_file):
         # 2. OCR Stage
         ocr_start = time.time()
         ocr_payload = {"file": pdf_base64, "fileType": 0, "visualize": False}
-        ocr_response = request_with_retry(OCR_API_URL, ocr_payload)
+        ocr_response = resilient_post(WELDER_OCR_ENDPOINT, OCR_API_URL, ocr_payload)
         ocr_end = time.time()
+        record_call(WELDER_OCR_ENDPOINT, ocr_end - ocr_start)
         
         ocr_data = ocr_response.json()
         ocr_pages = ocr_data.get("result", {}).get("ocrResults", [])
@@ -98,22 +236,27 @@ def process_document(uploaded_file):
             st.error("OCR service returned no text results.")
             return None, None
 
-        raw_text = "\n".join([
-            txt for page in ocr_pages 
-            for txt in page.get("prunedResult", {}).get("rec_texts", [])
-        ])
+        # 3. Pruning Stage (drop low-confidence and irrelevant lines before the prompt)
+        prompt_text, prune_stats = prune_ocr_lines(ocr_pages)
 
-        # 3. LLM Stage
+        # 4. LLM Stage
         llm_start = time.time()
-        structured_data = query_ollama(raw_text)
+        structured_data = query_ollama(prompt_text)
         llm_end = time.time()
         
+        if structured_data:
+            structured_data["raw_text"] = "\n".join(
+                txt for page in ocr_pages for txt in page.get("prunedResult", {}).get("rec_texts", [])
+            )
+        
         total_end = time.time()
 
         metrics = {
             "ocr_time": round(ocr_end - ocr_start, 2),
             "llm_time": round(llm_end - llm_start, 2),
-            "total_time": round(total_end - total_start, 2)
+            "total_time": round(total_end - total_start, 2),
+            "raw_tokens": prune_stats["raw_tokens"],
+            "prompt_tokens": prune_stats["prompt_tokens"]
         }
 
         return structured_data, metrics
@@ -122,6 +265,31 @@ def process_document(uploaded_file):
         st.error(f"Error processing document: {e}")
         return None, None
 
+# --- Model Warm-up ---
+
+def ping_welder_ocr():
+    """Warm-up ping: OCR of a blank image (runs the detection and recognition models)."""
+    start = time.time()
+    payload = {"file": base64.b64encode(blank_image_png()).decode("ascii"), "fileType": 1, "visualize": False}
+    requests.post(OCR_API_URL, json=payload, timeout=WARMUP_TIMEOUT).raise_for_status()
+    return time.time() - start, None
+
+def ping_ollama():
+    """
+    Warm-up ping: an empty generate request loads the model (and renews its keep_alive)
+    without generating any tokens. Ollama's load_duration tells whether the load was cold.
+    """
+    start = time.time()
+    url = OLLAMA_CHAT_URL.rsplit("/api/", 1)[0] + "/api/generate"
+    payload = {"model": OLLAMA_MODEL, "prompt": "", "keep_alive": OLLAMA_KEEP_ALIVE, "stream": False}
+    response = requests.post(url, json=payload, timeout=WARMUP_TIMEOUT)
+    response.raise_for_status()
+    load_seconds = response.json().get("load_duration", 0) / 1e9
+    return time.time() - start, load_seconds > OLLAMA_COLD_LOAD_SECONDS
+
+register_endpoint(WELDER_OCR_ENDPOINT, ping_welder_ocr)
+register_endpoint(OLLAMA_ENDPOINT, ping_ollama)
+
 def parse_date_val(date_str):
     """Helper to convert LLM string date to Python date object. Returns None if invalid/missing."""
     if not date_str or str(date_str).lower() in ["null", "none", "n/a", ""]: 
@@ -137,6 +305,10 @@ def render_welder_qualification_tab():
     st.set_page_config(page_title="Welder Management", layout="wide")
     
     st.title("Welder Qualification Management")
+    ensure_certificate_tables()
+    start_digest_scheduler()
+    start_warmup_manager()
+    render_endpoint_status([WELDER_OCR_ENDPOINT, OLLAMA_ENDPOINT])
     st.subheader("Upload New Welder Qualification Certificate")
     
     # Custom CSS for status alerts
@@ -152,18 +324,18 @@ def render_welder_qualification_tab():
         st.session_state.extracted_welder_data = {}
     if 'metrics' not in st.session_state:
         st.session_state.metrics = None
-    if 'welder_certs' not in st.session_state:
-        st.session_state.welder_certs = []
     if 'processing_done' not in st.session_state:
         st.session_state.processing_done = False
 
     # File uploader outside the form for immediate processing on selection
     uploaded_file = st.file_uploader("Upload Certificate PDF", type=["pdf"], key="file_picker")
+    st.caption(dedup_caption("welder"))
     
     # Reset processing flag if file is removed or changed
     if uploaded_file is None:
         st.session_state.processing_done = False
         st.session_state.last_welder_uploaded_file = None
+        st.session_state.welder_fingerprint = None
     
     # Trigger processing immediately upon upload
     if uploaded_file:
@@ -173,7 +345,22 @@ def render_welder_qualification_tab():
         # Only process if it's a new file AND we haven't successfully processed it in this session yet
         if current_file_name != last_file_name or not st.session_state.processing_done:
             with st.spinner("Processing document ..."):
-                data, metrics = process_document(uploaded_file)
+                # Re-scans / photos of an already processed certificate reuse its extraction
+                phash = first_page_hash(uploaded_file.getvalue(), "application/pdf")
+                duplicate = find_duplicate("welder", phash)
+                st.session_state.welder_fingerprint = None
+                if duplicate:
+                    data = duplicate["extraction"]
+                    metrics = {
+                        "total_time": round(duplicate["lookup_time"], 2),
+                        "duplicate_of": duplicate["file_name"],
+                        "saved_time": round(duplicate["extraction_time"], 2)
+                    }
+                else:
+                    data, metrics = process_document(uploaded_file)
+                    if data:
+                        # Indexed once the record is saved, so a discarded extraction is never reused
+                        st.session_state.welder_fingerprint = (phash, current_file_name, data, metrics["total_time"])
                 if data:
                     st.session_state.extracted_welder_data = data
                     st.session_state.metrics = metrics
@@ -188,9 +375,18 @@ def render_welder_qualification_tab():
         st.markdown("### Verify and Save Extracted Details")
         
         # Show performance stats
-        if st.session_state.metrics:
+        if st.session_state.metrics and st.session_state.metrics.get("duplicate_of"):
+            m = st.session_state.metrics
+            st.warning(
+                f"♻️ Near-duplicate of '{m['duplicate_of']}' - its extraction was reused "
+                f"({m['saved_time']}s of OCR/LLM time saved). Check it isn't already registered."
+            )
+        elif st.session_state.metrics:
             m = st.session_state.metrics
-            st.caption(f"⏱️ OCR: {m['ocr_time']}s | LLM: {m['llm_time']}s | Total: {m['total_time']}s")
+            st.caption(
+                f"⏱️ OCR: {m['ocr_time']}s | LLM: {m['llm_time']}s | Total: {m['total_time']}s "
+                f"| Prompt: ~{m['prompt_tokens']} of ~{m['raw_tokens']} OCR tokens"
+            )
 
         col1, col2 = st.columns(2)
         
@@ -225,19 +421,25 @@ def render_welder_qualification_tab():
             elif not cert_no or not welder_name:
                 st.error("Certificate No and Welder Name are required.")
             else:
-                expiry_to_save = None if no_expiry else valid_date.isoformat()
+                expiry_to_save = None if no_expiry else valid_date
                 
-                st.session_state.welder_certs.append({
+                saved = add_cert("welder", {
                     "certificate_number": cert_no,
                     "welder_name": welder_name,
                     "identification_number": id_no,
                     "employer_name": employer,
                     "welding_process": wps_no,
-                    "initial_approval_date": init_date.isoformat(),
+                    "initial_approval_date": init_date,
                     "valid_upto_date": expiry_to_save,
                     "address": address,
-                    "file_name": uploaded_file.name if uploaded_file else "Manual Entry"
+                    "file_name": uploaded_file.name if uploaded_file else "Manual Entry",
+                    "ocr_text": ext_data.get("raw_text")
                 })
+                if not saved:
+                    st.stop()
+                if st.session_state.get('welder_fingerprint'):
+                    record_fingerprint("welder", *st.session_state.welder_fingerprint)
+                    st.session_state.welder_fingerprint = None
                 
                 # CLEAR FORM STATE COMPLETELY
                 st.session_state.extracted_welder_data = {}
@@ -253,34 +455,30 @@ def render_welder_qualification_tab():
     st.markdown("---")
     st.subheader("Existing Qualifications Dashboard")
     
-    if st.session_state.welder_certs:
-        df = pd.DataFrame(st.session_state.welder_certs)
+    render_cert_search(
+        "welder",
+        ["certificate_number", "welder_name", "identification_number", "employer_name", "valid_upto_date"],
+        "Name, certificate or ID number, employer, examiner ..."
+    )
+    
+    total_certs = count_certs("welder")
+    if total_certs:
+        # Only one page of the shared registry is loaded per rerun
+        num_pages = (total_certs - 1) // CERT_PAGE_SIZE + 1
+        page = st.number_input(f"Page (of {num_pages}, {total_certs} records)", min_value=1, max_value=num_pages, value=1, key="welder_cert_page") - 1
+        df = load_cert_page("welder", page)
         
-        # Calculate expiry statuses (handle None/NaN values for valid_upto_date)
-        def get_status(expiry_date):
-            if pd.isna(expiry_date) or expiry_date is None:
-                return "Permanent / No Expiry"
-            
-            expiry_date = pd.to_datetime(expiry_date).date()
-            today = datetime.now().date()
-            if expiry_date < today:
-                return "Expired"
-            elif expiry_date < today + timedelta(days=30):
-                return "Expiring Soon"
-            else:
-                return "Valid"
-
-        df['status'] = df['valid_upto_date'].apply(get_status)
+        # Expiry status (vectorized; NULL valid_upto_date means no expiry)
+        df['status'] = classify_expiry(df['valid_upto_date'])
         
-        # Show alerts for problematic certificates
-        alert_df = df[df['status'].isin(["Expired", "Expiring Soon"])]
-        for _, row in alert_df.iterrows():
-            cls = "alert-card-expired" if row['status'] == "Expired" else "alert-card-expiring"
-            st.markdown(
-                f"<div class='{cls}'>Alert: {row['welder_name']} ({row['certificate_number']}) "
-                f"is {row['status']} (Expires: {row['valid_upto_date'] if row['valid_upto_date'] else 'N/A'})</div>", 
-                unsafe_allow_html=True
-            )
+        counts = digest_status_counts("welder")
+        st.caption(" | ".join(f"{status}: {n}" for status, n in counts.items()))
+        
+        # Alert feed for expired/expiring certificates (bucket counts + one page of cards)
+        render_alert_feed(
+            "welder",
+            lambda row: f"{row['welder_name']} ({row['certificate_number']}, {row['employer_name'] or 'no employer'})"
+        )
         
         st.dataframe(
             df[["certificate_number", "welder_name", "identification_number", 
@@ -295,10 +493,10 @@ def render_welder_qualification_tab():
                 format_func=lambda x: f"{df.iloc[x]['welder_name']} - {df.iloc[x]['certificate_number']}"
             )
             if st.button("Delete Selected Record"):
-                st.session_state.welder_certs.pop(idx_to_delete)
-                st.rerun()
+                if delete_cert("welder", df.iloc[idx_to_delete]['id']):
+                    st.rerun()
     else:
-        st.info("No qualification records found in current session.")
+        st.info("No qualification records found.")
 
 if __name__ == "__main__":
     render_welder_qualification_tab()
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+pytest setup: the modules are imported from the adminqcopy/ directory, as app.py does.
+
+The database tests (the `scratch_schema` fixture) run in a scratch schema of the database of
+db.DB_CONFIG, or of the one given by TEST_DB_CONFIG (a JSON object of connection settings that
+replace those of DB_CONFIG), and are skipped when it cannot be reached.
+
+Usage (from the adminqcopy/ directory):
+    python -m pytest -q tests
+"""
+import json
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import db  # noqa: E402
+
+SCRATCH_SCHEMA = "pytest_adminqcopy"
+
+
+@pytest.fixture(scope="module")
+def scratch_schema():
+    """An empty schema that the connections of connect_db() use, dropped after the module's tests."""
+    import psycopg2
+
+    saved = dict(db.DB_CONFIG)
+    db.DB_CONFIG.update(json.loads(os.environ.get("TEST_DB_CONFIG", "{}")))
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **db.DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        db.DB_CONFIG.clear()
+        db.DB_CONFIG.update(saved)
+        pytest.skip(f"database not reachable: {e}")
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE; CREATE SCHEMA {SCRATCH_SCHEMA}")
+    db.DB_CONFIG["options"] = f"-c search_path={SCRATCH_SCHEMA}"
+    try:
+        yield SCRATCH_SCHEMA
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE")
+        conn.close()
+        db.DB_CONFIG.clear()
+        db.DB_CONFIG.update(saved)
@@ -0,0 +1,76 @@
+"""First-page difference hash and its bit distances (cert_dedup.py)."""
+import glob
+import os
+
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+
+from cert_dedup import DUPLICATE_MAX_DISTANCE, dhash, first_page_hash, hamming_distances
+
+DOCS = glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "HSL documents", "*.pdf"))
+
+
+def synthetic_page(seed, height=440, width=320):
+    """A white page with dark 'text' blocks at random places."""
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width), 245, dtype=np.uint8)
+    for _ in range(40):
+        y, x = rng.integers(20, height - 30), rng.integers(20, width - 80)
+        page[y:y + rng.integers(4, 12), x:x + rng.integers(20, 70)] = rng.integers(0, 60)
+    return page
+
+
+def test_hamming_distances():
+    hashes = np.array([0, 1, 3, -1, np.iinfo(np.int64).min], dtype=np.int64)
+    assert list(hamming_distances(0, hashes)) == [0, 1, 2, 64, 1]
+    assert list(hamming_distances(-1, hashes)) == [64, 63, 62, 0, 63]
+
+
+def test_hamming_distances_match_popcount():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, size=200, dtype=np.int64)
+    phash = int(hashes[0])
+    expected = [bin((phash ^ int(h)) & (2**64 - 1)).count("1") for h in hashes]
+    assert list(hamming_distances(phash, hashes)) == expected
+
+
+def test_hash_is_a_signed_64_bit_int():
+    for seed in range(5):
+        value = dhash(synthetic_page(seed))
+        assert isinstance(value, int) and -2**63 <= value < 2**63
+
+
+def test_rescan_of_the_same_page_matches():
+    page = synthetic_page(1)
+    framed = np.pad(page, ((60, 25), (35, 50)), constant_values=250)  # another scanner's margins
+    noisy = np.clip(page + np.random.default_rng(2).normal(0, 8, page.shape), 0, 255).astype(np.uint8)
+    darker = (page * 0.8).astype(np.uint8)
+    distances = hamming_distances(dhash(page), np.array([dhash(v) for v in (framed, noisy, darker)], dtype=np.int64))
+    assert (distances <= DUPLICATE_MAX_DISTANCE).all(), distances
+
+
+def test_different_pages_do_not_match():
+    hashes = np.array([dhash(synthetic_page(seed)) for seed in range(10, 20)], dtype=np.int64)
+    for i, phash in enumerate(hashes):
+        distances = np.delete(hamming_distances(int(phash), hashes), i)
+        assert (distances > DUPLICATE_MAX_DISTANCE).all(), distances
+
+
+def test_blank_and_tiny_pages():
+    assert dhash(np.full((300, 200), 255, dtype=np.uint8)) == 0
+    dhash(np.zeros((3, 4), dtype=np.uint8))  # smaller than the hash grid: padded, no error
+
+
+def test_unreadable_file_has_no_hash():
+    assert first_page_hash(b"not a pdf", "application/pdf") is None
+    assert first_page_hash(b"", "image/png") is None
+
+
+@pytest.mark.skipif(not DOCS, reason="no sample certificates")
+def test_sample_certificate_and_its_photo_match():
+    pdf_bytes = open(sorted(DOCS)[0], "rb").read()
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        photo = doc.load_page(0).get_pixmap(matrix=fitz.Matrix(1.5, 1.5)).tobytes("jpeg", jpg_quality=40)
+    original, copy = first_page_hash(pdf_bytes, "application/pdf"), first_page_hash(photo, "image/jpeg")
+    assert hamming_distances(original, [copy])[0] <= DUPLICATE_MAX_DISTANCE
@@ -0,0 +1,75 @@
+"""Certificate expiry status rules (cert_status.py), in pandas and in SQL."""
+import datetime
+
+import pandas as pd
+import pytest
+from psycopg2 import sql
+
+from cert_status import (
+    EXPIRING_SOON_DAYS, HORIZON_STATUS, STATUS_EXPIRED, STATUS_EXPIRING, STATUS_NO_EXPIRY, STATUS_ORDER,
+    STATUS_VALID, classify_expiry, expiry_horizon_sql, expiry_status_sql
+)
+from db import connect_db
+
+TODAY = datetime.date(2024, 6, 15)
+OFFSETS = [None, -400, -1, 0, 6, 7, EXPIRING_SOON_DAYS - 1, EXPIRING_SOON_DAYS, 365]
+EXPECTED = [STATUS_NO_EXPIRY, STATUS_EXPIRED, STATUS_EXPIRED, STATUS_EXPIRING, STATUS_EXPIRING, STATUS_EXPIRING,
+            STATUS_EXPIRING, STATUS_VALID, STATUS_VALID]
+
+
+def day(offset, today=TODAY):
+    return None if offset is None else today + datetime.timedelta(days=offset)
+
+
+def test_boundaries():
+    status = classify_expiry([day(offset) for offset in OFFSETS], today=TODAY)
+    assert list(status) == EXPECTED
+
+
+def test_input_types_and_index():
+    expiry = pd.Series(["2024-06-14", datetime.datetime(2024, 6, 15, 23, 59), pd.NaT, "not a date", "2025-01-01"],
+                       index=[10, 11, 12, 13, 14])
+    status = classify_expiry(expiry, today=TODAY)
+    assert list(status) == [STATUS_EXPIRED, STATUS_EXPIRING, STATUS_NO_EXPIRY, STATUS_NO_EXPIRY, STATUS_VALID]
+    assert list(status.index) == [10, 11, 12, 13, 14]
+    assert list(status.cat.categories) == STATUS_ORDER
+
+
+def test_horizon_days():
+    assert list(classify_expiry([day(10)], today=TODAY, horizon_days=7)) == [STATUS_VALID]
+    assert list(classify_expiry([day(10)], today=TODAY, horizon_days=14)) == [STATUS_EXPIRING]
+
+
+def test_empty():
+    assert len(classify_expiry([], today=TODAY)) == 0
+
+
+@pytest.fixture(scope="module")
+def cur(scratch_schema):
+    """A cursor over a table of expiry dates around CURRENT_DATE (OFFSETS)."""
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE certs (expiry DATE)")
+            cur.executemany("INSERT INTO certs VALUES (CURRENT_DATE + %s::integer)", [(offset,) for offset in OFFSETS])
+            yield cur
+    finally:
+        conn.close()
+
+
+def classify_in_sql(cur, expression):
+    """(expiry, SQL value) of each row, and what classify_expiry() makes of the same dates."""
+    cur.execute(sql.SQL("SELECT expiry, {}, CURRENT_DATE FROM certs ORDER BY expiry NULLS FIRST").format(expression))
+    rows = cur.fetchall()
+    expected = classify_expiry([expiry for expiry, _, _ in rows], today=rows[0][2])
+    return [value for _, value, _ in rows], list(expected)
+
+
+def test_sql_rules_match_classify_expiry(cur):
+    statuses, expected = classify_in_sql(cur, expiry_status_sql("expiry"))
+    assert statuses == expected == EXPECTED
+
+
+def test_digest_horizons_roll_up_to_the_status(cur):
+    horizons, expected = classify_in_sql(cur, expiry_horizon_sql("expiry"))
+    assert [HORIZON_STATUS[horizon] for horizon in horizons] == expected
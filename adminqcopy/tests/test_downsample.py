@@ -0,0 +1,98 @@
+"""Chart downsampling: min-max, LTTB and the zoom pyramid bins (downsample.py, sensor_pyramid.py)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import downsample as ds
+from downsample import MODE_LTTB, MODE_MINMAX, downsample, downsample_frame, lttb_indices, minmax_indices
+from sensor_pyramid import reduce_bins
+
+
+def signal(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.sin(np.linspace(0, 20, n)) * 10 + rng.normal(0, 1, n)
+
+
+def lttb_reference(t, y, n_out):
+    """Textbook Largest-Triangle-Three-Buckets, one bucket at a time."""
+    n = len(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked, a = [0], 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 1 < n_out - 2:
+            ct, cy = t[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            ct, cy = t[-1], y[-1]
+        areas = [abs((t[a] - ct) * (y[j] - y[a]) - (t[a] - t[j]) * (cy - y[a])) for j in range(lo, hi)]
+        a = lo + int(np.argmax(areas))
+        picked.append(a)
+    return picked + [n - 1]
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 100), (10_001, 202), (5003, 50)])
+def test_minmax_keeps_every_bin_extreme(n, n_out):
+    y = signal(n)
+    idx = minmax_indices(y, n_out)
+    assert len(idx) <= n_out and idx[0] == 0 and idx[-1] == n - 1
+    assert (np.diff(idx) > 0).all()
+    assert y.argmin() in idx and y.argmax() in idx
+
+
+def test_minmax_keeps_a_spike_in_the_leftover_samples():
+    y = np.zeros(1009)
+    y[1005] = 100.0  # after the last full equal-width bin
+    assert 1005 in minmax_indices(y, 100)
+
+
+def test_short_inputs_pass_through():
+    y = signal(50)
+    assert list(minmax_indices(y, 100)) == list(range(50))
+    assert list(lttb_indices(np.arange(50), y, 100)) == list(range(50))
+    assert len(downsample(np.arange(50), y, 100)[1]) == 50
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 100), (100_000, 500)])  # plain Python and NumPy passes
+def test_lttb_matches_the_reference(n, n_out):
+    t = np.arange(n, dtype=np.float64) * 0.001
+    y = signal(n, seed=n)
+    assert list(lttb_indices(t, y, n_out)) == lttb_reference(t, y, n_out)
+
+
+@pytest.mark.parametrize("mode", [MODE_MINMAX, MODE_LTTB])
+def test_downsample_caps_the_points(mode):
+    t = np.arange(200_000) * 1_000_000
+    y = signal(len(t))
+    y[123_457] = 50.0
+    dt, dy = downsample(t, y, max_points=1000, mode=mode)
+    assert len(dy) <= 1000 and (np.diff(dt) > 0).all()
+    assert dt[0] == t[0] and dt[-1] == t[-1]
+    assert 50.0 in dy  # a spike survives both modes (LTTB through the min-max preselection)
+
+
+def test_lttb_preselects_long_inputs(monkeypatch):
+    sizes = []
+    monkeypatch.setattr(ds, "lttb_indices", lambda t, y, n_out: sizes.append(len(y)) or np.arange(n_out))
+    downsample(np.arange(100_000), signal(100_000), max_points=500, mode=MODE_LTTB)
+    assert sizes and sizes[0] <= ds.LTTB_PRESELECT * 500
+
+
+def test_downsample_frame_is_long_format():
+    df = pd.DataFrame({"Voltage": signal(5000), "Current": signal(5000, 1)},
+                      index=pd.Index(np.arange(5000), name="Time"))
+    long = downsample_frame(df, max_points=100, trace_name="Trace", value_name="Value")
+    assert list(long.columns) == ["Time", "Trace", "Value"]
+    assert long.groupby("Trace").size().max() <= 100
+    assert set(long["Trace"]) == {"Voltage", "Current"}
+
+
+def test_reduce_bins_per_channel():
+    samples = np.stack([signal(100), signal(100, 1)], axis=1).astype(np.float32)
+    bins = reduce_bins(samples, 32)
+    assert len(bins) == 4  # 3 full bins and the 4-sample tail
+    for b, start in enumerate(range(0, 100, 32)):
+        block = samples[start:start + 32]
+        np.testing.assert_array_equal(bins["min"][b], block.min(axis=0))
+        np.testing.assert_array_equal(bins["max"][b], block.max(axis=0))
+        np.testing.assert_array_equal(bins["imin"][b], block.argmin(axis=0))
+        np.testing.assert_array_equal(bins["imax"][b], block.argmax(axis=0))
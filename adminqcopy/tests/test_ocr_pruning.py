@@ -0,0 +1,63 @@
+"""OCR line pruning before the LLM prompt (tabs/welder_qualification.py)."""
+from tabs.welder_qualification import estimate_tokens, prune_ocr_lines
+
+
+def page(lines):
+    """An OCR service page from (text, score, [x1, y1, x2, y2]) lines."""
+    texts, scores, boxes = zip(*lines) if lines else ((), (), ())
+    return {"prunedResult": {"rec_texts": list(texts), "rec_scores": list(scores), "rec_boxes": list(boxes)}}
+
+
+CERTIFICATE = page([
+    ("Certificate No", 0.99, [10, 10, 110, 30]),
+    ("HSL/123", 0.98, [120, 10, 200, 30]),           # value on the label's row
+    ("seal of the inspector", 0.30, [400, 10, 560, 30]),  # low confidence
+    ("Name", 0.99, [10, 50, 60, 70]),
+    ("K. NARESH", 0.97, [70, 50, 200, 70]),
+    ("~|", 0.99, [300, 50, 320, 70]),                # no alphanumeric content
+    ("Welding Process", 0.99, [10, 100, 150, 120]),
+    ("FCAW", 0.95, [20, 125, 80, 145]),              # value beneath a label with an empty row
+    ("Terms and conditions apply to all tests", 0.99, [10, 400, 600, 420]),
+])
+
+
+def test_labels_and_their_values_are_kept_in_reading_order():
+    prompt, stats = prune_ocr_lines([CERTIFICATE])
+    assert prompt.splitlines() == ["Certificate No", "HSL/123", "Name", "K. NARESH", "Welding Process", "FCAW"]
+    assert stats["raw_lines"] == 9 and stats["prompt_lines"] == 6
+    assert stats["prompt_tokens"] < stats["raw_tokens"]
+
+
+def test_min_score_threshold():
+    prompt, _ = prune_ocr_lines([CERTIFICATE], min_score=0.96)
+    assert "FCAW" not in prompt.splitlines() and "K. NARESH" in prompt.splitlines()
+
+
+def test_pages_without_labels_are_dropped():
+    terms = page([("Terms and conditions", 0.99, [10, 10, 200, 30]), ("Page 2 of 2", 0.99, [10, 50, 100, 70])])
+    prompt, _ = prune_ocr_lines([CERTIFICATE, terms])
+    assert "Terms and conditions" not in prompt and "Page 2 of 2" not in prompt
+
+
+def test_unknown_layout_keeps_every_confident_line():
+    scan = page([("HSL/123", 0.99, [10, 10, 100, 30]), ("K. NARESH", 0.99, [10, 50, 100, 70]),
+                 ("blur", 0.10, [10, 90, 100, 110])])
+    prompt, _ = prune_ocr_lines([scan])
+    assert prompt.splitlines() == ["HSL/123", "K. NARESH"]
+
+
+def test_pages_without_scores_or_boxes_pass_through():
+    plain = {"prunedResult": {"rec_texts": ["anything", "at all"]}}
+    prompt, _ = prune_ocr_lines([plain])
+    assert prompt.splitlines() == ["anything", "at all"]
+
+
+def test_token_budget_keeps_labels_first():
+    budget = sum(estimate_tokens(text) + 1 for text in ("Certificate No", "Name", "Welding Process"))
+    prompt, stats = prune_ocr_lines([CERTIFICATE], token_budget=budget)
+    assert prompt.splitlines() == ["Certificate No", "Name", "Welding Process"]
+    assert stats["prompt_tokens"] <= budget
+
+
+def test_estimate_tokens_rounds_up():
+    assert [estimate_tokens(text) for text in ("", "abc", "abcd", "abcde")] == [0, 1, 1, 2]
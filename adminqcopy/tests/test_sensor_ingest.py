@@ -0,0 +1,130 @@
+"""Edge device frames, the per-device quota and the ingestion endpoint (sensor_ingest.py)."""
+import http.client
+import json
+import struct
+import threading
+
+import numpy as np
+import pytest
+
+import sensor_store
+from sensor_ingest import DeviceQuota, QuotaExceeded, decode_frame, encode_frame, ingest_frame, make_ingest_server
+from sensor_store import read_stream
+
+T0 = 1_700_000_000 * 10**9
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(sensor_store, "SENSOR_DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def frame(header, *arrays):
+    header_bytes = json.dumps(header).encode()
+    return struct.pack("<I", len(header_bytes)) + header_bytes + b"".join(a.astype("<f4").tobytes() for a in arrays)
+
+
+def test_round_trip():
+    volts = np.linspace(20, 30, 1000)
+    imu = np.arange(600, dtype=np.float32).reshape(100, 6)
+    device_id, batches = decode_frame(encode_frame("DEV101", T0, {"voltage": (1000, volts), "imu": (100, imu)}))
+    assert device_id == "DEV101"
+    assert [(name, t0, rate, samples.shape) for name, t0, rate, samples in batches] == \
+        [("voltage", T0, 1000.0, (1000, 1)), ("imu", T0, 100.0, (100, 6))]
+    np.testing.assert_array_equal(batches[0][3][:, 0], volts.astype(np.float32))
+    np.testing.assert_array_equal(batches[1][3], imu)
+
+
+def test_stream_with_its_own_t0():
+    header = {"device_id": "DEV1", "t0_ns": T0, "streams": [
+        {"name": "current", "rate_hz": 1000, "count": 2},
+        {"name": "imu", "rate_hz": 100, "count": 1, "t0_ns": T0 + 5_000_000},
+    ]}
+    _, batches = decode_frame(frame(header, np.array([1, 2]), np.zeros(6)))
+    assert [t0 for _, t0, _, _ in batches] == [T0, T0 + 5_000_000]
+
+
+@pytest.mark.parametrize("body, message", [
+    (b"\x01\x00", "Frame too short"),
+    (struct.pack("<I", 5) + b"{oops", "Invalid frame header"),
+    (frame({"device_id": "DEV1", "streams": []}), "Invalid frame header"),
+    (frame({"device_id": "DEV1", "t0_ns": T0, "streams": [{"name": "gas", "rate_hz": 1, "count": 1}]}),
+     "Unknown sensor stream"),
+    (frame({"device_id": "DEV1", "t0_ns": T0, "streams": [{"name": "voltage", "rate_hz": 1000, "count": 3}]},
+           np.zeros(2)), "Frame truncated"),
+    (frame({"device_id": "DEV1", "t0_ns": T0, "streams": [{"name": "voltage", "rate_hz": 1000, "count": 1}]},
+           np.zeros(2)), "Trailing bytes"),
+])
+def test_malformed_frames_are_refused(body, message):
+    with pytest.raises(ValueError, match=message):
+        decode_frame(body)
+
+
+def test_ingest_stores_every_stream(store):
+    body = encode_frame("DEV7", T0, {"voltage": (1000, np.full(500, 24.0)), "imu": (100, np.ones((50, 6)))})
+    assert ingest_frame(body) == ("DEV7", 550)
+    t_ns, volts = read_stream("DEV7", "voltage", T0, T0 + 10**9)
+    assert len(t_ns) == 500 and t_ns[1] - t_ns[0] == 1_000_000 and (volts == 24.0).all()
+
+
+def test_invalid_device_id_writes_nothing(store):
+    with pytest.raises(ValueError, match="Invalid device id"):
+        ingest_frame(frame({"device_id": "../etc", "t0_ns": T0,
+                            "streams": [{"name": "voltage", "rate_hz": 1000, "count": 1}]}, np.zeros(1)))
+    assert not any(store.iterdir())
+
+
+def test_device_limit(store):
+    quota = DeviceQuota(max_devices=2, max_bytes=10**6)
+    quota.reserve("DEV1", 0)
+    quota.reserve("DEV2", 0)
+    quota.reserve("DEV1", 100)  # known devices are still accepted
+    with pytest.raises(QuotaExceeded) as refused:
+        quota.reserve("DEV3", 0)
+    assert refused.value.status == 403
+
+
+def test_storage_limit_refuses_the_whole_frame(store):
+    ingest_frame(encode_frame("DEV1", T0, {"voltage": (1000, np.zeros(1000))}))
+    on_disk = sensor_store.storage_bytes("DEV1")
+    quota = DeviceQuota(max_bytes=on_disk + 6000)  # measured on disk for a device stored before the process
+    assert quota._used == {"DEV1": None}
+
+    ingest_frame(encode_frame("DEV1", T0 + 10**9, {"voltage": (1000, np.zeros(1000))}), quota)
+    with pytest.raises(QuotaExceeded) as refused:
+        ingest_frame(encode_frame("DEV1", T0 + 2 * 10**9, {"voltage": (1000, np.zeros(1000))}), quota)
+    assert refused.value.status == 507
+    assert len(read_stream("DEV1", "voltage", T0, T0 + 3 * 10**9)[0]) == 2000
+
+
+@pytest.fixture
+def server(store):
+    server = make_ingest_server("127.0.0.1", 0, device_token="s3cret", quota=DeviceQuota(max_devices=1))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, path, body, token=None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    try:
+        conn.request("POST", path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_endpoint(server):
+    body = encode_frame("DEV5", T0, {"current": (1000, np.full(100, 150.0))})
+    assert post(server, "/frames", body)[0] == 401
+    assert post(server, "/frames", body, token="wrong")[0] == 401
+    assert post(server, "/frames", body, token="s3cret") == (200, {"device_id": "DEV5", "samples": 100})
+    assert "DEV5" in server.last_frame
+    assert post(server, "/frames", b"\x00" * 8, token="s3cret")[0] == 400
+    assert post(server, "/heartbeat", json.dumps({"device_id": "DEV6"}).encode(), token="s3cret")[0] == 403
+    assert post(server, "/nowhere", body, token="s3cret")[0] == 404
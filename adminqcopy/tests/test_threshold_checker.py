@@ -0,0 +1,80 @@
+"""Sliding windows and excursion tracking of the threshold checker (threshold_checker.py)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from threshold_checker import _excursions, check_electrical, new_checker_state, new_window, slide_window
+
+LIMITS = {"wps_code": "WPS-001", "voltage_min": 20.0, "voltage_max": 30.0, "current_min": None, "current_max": None,
+          "travel_speed_min": 200.0, "travel_speed_max": None}
+
+
+@pytest.mark.parametrize("chunks", [[1000], [3, 7, 1, 989], [250] * 4, [1] * 20 + [980]])
+def test_slide_window_matches_a_rolling_sum(chunks):
+    size = 50
+    values = np.random.default_rng(0).normal(size=(sum(chunks), 2))
+    window = new_window(size, 2)
+    sums, leaving, filled = [], [], []
+    for chunk in np.split(values, np.cumsum(chunks)[:-1]):
+        s, l, f = slide_window(window, chunk)
+        sums.append(s), leaving.append(l), filled.append(f)
+    sums, leaving, filled = np.vstack(sums), np.vstack(leaving), np.concatenate(filled)
+
+    expected = pd.DataFrame(values).rolling(size, min_periods=1).sum().to_numpy()
+    np.testing.assert_allclose(sums, expected, atol=1e-9)
+    np.testing.assert_array_equal(leaving[size:], values[:-size])
+    assert not leaving[:size].any()
+    np.testing.assert_array_equal(filled, np.minimum(np.arange(1, len(values) + 1), size))
+
+
+def excursions(state, t_ns, values, valid=None, limits=LIMITS, margin=0.0):
+    values = np.asarray(values, dtype=float)
+    valid = np.ones(len(values), dtype=bool) if valid is None else np.asarray(valid)
+    return _excursions(state, "voltage", np.asarray(t_ns), values, valid, limits, margin)
+
+
+def test_excursion_open_and_closed_within_a_chunk():
+    state = new_checker_state()
+    events = excursions(state, range(8), [25, 31, 35, 32, 25, 19, 25, 25])
+    assert [(e["start_ns"], e["end_ns"], e["worst"]) for e in events] == [(1, 4, 35.0), (5, 6, 19.0)]
+    assert events[0]["deviation"] == 5.0 and events[0]["limit_max"] == 30.0
+    assert state["open"]["voltage"] is None
+
+
+def test_excursion_spanning_chunks_is_one_event():
+    state = new_checker_state()
+    first = excursions(state, [0, 1, 2], [25, 31, 33])
+    assert len(first) == 1 and first[0]["end_ns"] is None
+    second = excursions(state, [3, 4, 5], [36, 25, 25])
+    assert second == [first[0]]  # the same event, updated in place and closed
+    assert (first[0]["start_ns"], first[0]["end_ns"], first[0]["worst"]) == (1, 4, 36.0)
+
+
+def test_invalid_samples_and_missing_limits_are_not_flagged():
+    state = new_checker_state()
+    assert excursions(state, range(3), [50, 50, 50], valid=[False, False, False]) == []
+    no_limits = dict(LIMITS, voltage_min=None, voltage_max=None)
+    assert excursions(state, range(3), [50, 50, 50], limits=no_limits) == []
+
+
+def test_margin_widens_the_limits():
+    state = new_checker_state()
+    assert excursions(state, range(2), [32, 18], margin=0.1) == []
+    assert len(excursions(state, range(2), [34, 25], margin=0.1)) == 1
+
+
+def test_check_electrical_flags_the_window_mean():
+    """1 kHz voltage at 25 V with 3 s at 35 V: one voltage excursion, none for the current without limits."""
+    t_ns = np.arange(10_000, dtype=np.int64) * 1_000_000
+    volts = np.full(len(t_ns), 25.0)
+    volts[4000:7000] = 35.0
+    state = new_checker_state()
+    events = []
+    for chunk in np.array_split(np.arange(len(t_ns)), 7):
+        events += check_electrical(state, t_ns[chunk], volts[chunk], np.full(len(chunk), np.nan), LIMITS)
+    closed = {id(e): e for e in events if e["end_ns"] is not None}
+    assert len(closed) == 1
+    (event,) = closed.values()
+    assert event["parameter"] == "voltage" and event["worst"] == pytest.approx(35.0)
+    # the 1 s mean crosses 30 V half a window after the step and falls back half a window after its end
+    assert abs(event["start_ns"] - 4.5e9) < 2e6 and abs(event["end_ns"] - 7.5e9) < 2e6
@@ -0,0 +1,55 @@
+"""Export links of weld_export.py: browser URL and single use."""
+import datetime
+
+import pytest
+
+import weld_export
+from weld_export import create_export_link, export_file_name, export_query, export_url, open_export
+
+
+@pytest.fixture(autouse=True)
+def no_public_url(monkeypatch):
+    monkeypatch.setattr(weld_export, "EXPORT_PUBLIC_URL", None)
+
+
+@pytest.mark.parametrize("dashboard_host, url", [
+    ("qc-pc:8501", "http://qc-pc:8765/export/T"),
+    ("[fe80::1]:8501", "http://[fe80::1]:8765/export/T"),
+    ("10.0.0.5", "http://10.0.0.5:8765/export/T"),
+    (None, "http://localhost:8765/export/T"),
+])
+def test_url_on_the_dashboard_host(dashboard_host, url):
+    assert export_url("T", dashboard_host, 8765, "0.0.0.0") == url
+
+
+@pytest.mark.parametrize("dashboard_host, reachable", [
+    ("localhost:8501", True), ("127.0.0.1:8501", True), ("[::1]:8501", True),
+    ("qc-pc:8501", False), ("[fe80::1]:8501", False),
+])
+def test_loopback_server_only_serves_the_dashboard_machine(dashboard_host, reachable):
+    assert (export_url("T", dashboard_host, 8765, "127.0.0.1") is not None) == reachable
+
+
+def test_public_url(monkeypatch):
+    monkeypatch.setattr(weld_export, "EXPORT_PUBLIC_URL", "https://qc.example.com/weld-export/")
+    assert export_url("T", "qc-pc:8501", 8765, "127.0.0.1") == "https://qc.example.com/weld-export/export/T"
+
+
+def test_link_downloads_once():
+    token = create_export_link({"contractor": "Contractor 1"}, "CSV")
+    file_name, mime, _ = open_export(token)
+    assert (file_name, mime) == ("weld_records_Contractor_1.csv", "text/csv")
+    assert open_export(token) is None
+
+
+def test_unknown_format_is_refused():
+    with pytest.raises(ValueError):
+        create_export_link({}, "XLSX")
+
+
+def test_file_name_and_inclusive_end_date():
+    start, end = datetime.date(2024, 1, 1), datetime.date(2024, 3, 31)
+    assert export_file_name({"start_date": start, "end_date": end, "block": "B/12"}, "Parquet") == \
+        "weld_records_2024-01-01_to_2024-03-31_B-12.parquet"
+    _, params = export_query(start, end)
+    assert params == [start, datetime.date(2024, 4, 1)]
@@ -0,0 +1,51 @@
+"""Compact column types of weld_details frames (weld_frame.py)."""
+import datetime
+
+import pandas as pd
+import pytest
+
+from weld_frame import compact_integers, compact_weld_frame, weld_record
+
+
+@pytest.mark.parametrize("values, dtype", [
+    ([1, 2, 3], "int8"),
+    ([300, 7], "int16"),
+    ([1, None], "Int8"),
+    ([70000, None], "Int32"),
+    ([None, None], "Int8"),
+    ([2.0, 4.0], "int8"),
+])
+def test_whole_numbers_get_the_smallest_integer_type(values, dtype):
+    result = compact_integers(pd.Series(values, dtype=object))
+    assert str(result.dtype) == dtype
+    assert [None if pd.isna(v) else int(v) for v in result] == [None if v is None else int(v) for v in values]
+
+
+@pytest.mark.parametrize("values", [[1.5, None], [1.5, 2], [0.25]])
+def test_fractional_values_stay_float(values):
+    result = compact_integers(pd.Series(values, dtype=object))
+    assert result.dtype == "float64"
+    assert result.iloc[0] == values[0]
+
+
+def test_compact_frame_round_trips_to_plain_values():
+    created_at = datetime.datetime(2024, 5, 1, 8, 30)
+    rows = [
+        {"id": 1, "uniq_id": "ABCDE", "device_name": "Edge Device 1", "contractor_name": "Contractor 1",
+         "thickness": 12, "current": 220, "remarks": "OK", "job_completed": "YES", "created_at": created_at},
+        {"id": 2, "uniq_id": None, "device_name": "Edge Device 1", "contractor_name": None,
+         "thickness": None, "current": 180, "remarks": None, "job_completed": "NO", "created_at": created_at},
+    ]
+    df = compact_weld_frame(pd.DataFrame(rows))
+
+    assert df["device_name"].dtype == "category" and df["job_completed"].dtype == "category"
+    assert str(df["id"].dtype) == "int8" and str(df["thickness"].dtype) == "Int8"
+    assert str(df["current"].dtype) == "int16"
+    assert not isinstance(df["uniq_id"].dtype, pd.CategoricalDtype)  # unique values stay text
+    assert [weld_record(row) for _, row in df.iterrows()] == rows
+
+
+def test_missing_columns_are_skipped():
+    df = compact_weld_frame(pd.DataFrame({"id": [1, 2], "welder_name": ["A", "B"]}))
+    assert list(df.columns) == ["id", "welder_name"]
+    assert str(df["id"].dtype) == "int8"
@@ -0,0 +1,104 @@
+"""Bulk import parsing and validation of weld records (weld_import.py)."""
+import io
+
+import pandas as pd
+import pytest
+
+from db import connect_db
+from weld_import import IMPORT_COLUMNS, import_weld_details, normalize_header, read_batches, validate_batch
+
+
+def batch(rows):
+    return pd.DataFrame(rows, dtype=str).fillna("")
+
+
+def test_valid_rows_are_cast():
+    clean, rejected = validate_batch(batch([
+        {"deviceid": "DEV101", "created_at": "2024-03-05 14:30", "thickness": "12", "uniq_id": "abcde",
+         "welder_name": "  Welder 1 ", "job_completed": "no"},
+        {"deviceid": "DEV102", "created_at": "05/03/2024", "thickness": "", "remarks": ""},
+    ]))
+    assert rejected.empty
+    assert list(clean.columns) == IMPORT_COLUMNS
+    first, second = clean.iloc[0], clean.iloc[1]
+    assert first["created_at"] == pd.Timestamp("2024-03-05 14:30") and second["created_at"] == pd.Timestamp("2024-03-05")
+    assert first["thickness"] == 12 and pd.isna(second["thickness"])
+    assert (first["uniq_id"], first["welder_name"], first["job_completed"]) == ("ABCDE", "Welder 1", "NO")
+    assert pd.isna(second["uniq_id"]) and pd.isna(second["remarks"])
+    assert second["job_completed"] == "YES"  # historical jobs are finished unless the file says otherwise
+
+
+@pytest.mark.parametrize("row, reason", [
+    ({"created_at": "2024-03-05"}, "deviceid is missing"),
+    ({"deviceid": "DEV1"}, "created_at is missing"),
+    ({"deviceid": "DEV1", "created_at": "yesterday"}, "created_at is not a date"),
+    ({"deviceid": "DEV1", "created_at": "2024-03-05", "thickness": "12.5"}, "thickness is not a whole number"),
+    ({"deviceid": "DEV1", "created_at": "2024-03-05", "current": "9999999999"}, "current is not a whole number"),
+    ({"deviceid": "DEV1", "created_at": "2024-03-05", "job_completed": "OK"}, "job_completed must be YES or NO"),
+    ({"deviceid": "DEV1", "created_at": "2024-03-05", "uniq_id": "AB12C"}, "uniq_id must be 5 letters"),
+    ({"deviceid": "D" * 51, "created_at": "2024-03-05"}, "deviceid longer than 50 characters"),
+])
+def test_invalid_rows_are_rejected_with_the_reason(row, reason):
+    clean, rejected = validate_batch(batch([row, {"deviceid": "DEV2", "created_at": "2024-03-05"}]))
+    assert list(clean["deviceid"]) == ["DEV2"]
+    assert list(rejected.index) == [0] and rejected[0] == reason
+
+
+def test_every_reason_of_a_row_is_reported():
+    _, rejected = validate_batch(batch([{"thickness": "x", "created_at": "x"}]))
+    assert rejected[0] == "thickness is not a whole number; created_at is not a date; deviceid is missing"
+
+
+def test_repeated_uniq_id_keeps_the_first():
+    clean, rejected = validate_batch(batch([
+        {"deviceid": "DEV1", "created_at": "2024-03-05", "uniq_id": "ABCDE"},
+        {"deviceid": "DEV2", "created_at": "2024-03-05", "uniq_id": "abcde"},
+    ]))
+    assert list(clean["deviceid"]) == ["DEV1"]
+    assert rejected.to_dict() == {1: "uniq_id repeated in the file"}
+
+
+def test_dashboard_headings_are_accepted():
+    assert [normalize_header(h) for h in ("Device ID", "Thickness (mm)", "Reg Date", " WPS ", "remarks")] == \
+        ["deviceid", "thickness", "created_at", "wps_code", "remarks"]
+
+
+def test_csv_is_read_in_batches():
+    csv = "Device ID,Reg Date,Passes\n" + "".join(f"DEV{i},2024-01-0{i % 9 + 1},{i}\n" for i in range(25))
+    batches = list(read_batches(io.BytesIO(csv.encode()), "records.csv", batch_rows=10))
+    assert [len(b) for b in batches] == [10, 10, 5]
+    assert list(batches[0].columns) == ["deviceid", "created_at", "no_of_passes"]
+    clean, rejected = validate_batch(pd.concat(batches))
+    assert len(clean) == 25 and rejected.empty
+
+
+@pytest.fixture
+def weld_details(scratch_schema):
+    from tabs.fabrication_team import create_weld_details_table
+    create_weld_details_table()
+    conn = connect_db()
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE weld_details, weld_uniq_ids")
+        cur.execute("INSERT INTO weld_uniq_ids VALUES ('TAKEN')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_import_into_the_database(weld_details):
+    lines = ["Device ID,Reg Date,Uniq ID,Thickness (mm)"]
+    lines += [f"DEV{i},2024-0{i % 3 + 1}-15 08:00,,{i}" for i in range(20)]
+    lines += ["DEV90,2024-01-15,QWERT,10", "DEV91,2024-01-15,taken,10", "DEV92,never,,10", ",2024-01-15,,10"]
+    result = import_weld_details(io.BytesIO("\n".join(lines).encode()), "records.csv", batch_rows=7, seed=1)
+
+    assert result["error"] is None
+    assert (result["imported"], result["rejected"]) == (21, 3)
+    assert dict(zip(result["report"]["Row"], result["report"]["Reason"])) == {
+        23: "uniq_id already exists", 24: "created_at is not a date", 25: "deviceid is missing"
+    }
+    with weld_details.cursor() as cur:
+        cur.execute("SELECT count(*), count(DISTINCT uniq_id), count(*) FILTER (WHERE uniq_id = 'QWERT'), "
+                    "count(DISTINCT date_trunc('month', created_at)) FROM weld_details")
+        assert cur.fetchone() == (21, 21, 1, 3)
+        cur.execute("SELECT count(*) FROM weld_uniq_ids")
+        assert cur.fetchone() == (22,)
@@ -0,0 +1,99 @@
+"""
+Partition pruning of the hot weld_details queries (weld_details is partitioned by created_at month):
+EXPLAIN ANALYZE of each query on a year of records, asserting which monthly partitions it reads.
+"""
+import datetime
+
+import pytest
+from psycopg2 import sql
+
+from db import connect_db
+from threshold_checker import ACTIVE_WELDS_QUERY, create_threshold_tables
+from weld_export import export_query
+from weld_partitions import (
+    WELD_HOT_MONTHS, create_month_partitions, is_partitioned, list_partitions, month_start, partition_name,
+    scanned_partitions
+)
+from tabs.fabrication_team import LATEST_DEVICE_STATES_QUERY, create_weld_details_table, record_filter
+
+DEVICES = [f"Edge Device {i}" for i in range(1, 21)]
+ROWS = 5000
+LAST = "~"  # sorts after every partition name: no bound on the newest partition read
+
+
+@pytest.fixture(scope="module")
+def weld_details(scratch_schema):
+    """A partitioned weld_details with a year of records, and one open record per device registered now."""
+    create_weld_details_table()
+    create_threshold_tables()
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            today = datetime.date.today()
+            create_month_partitions(cur, [month_start(today, -k) for k in range(13)])
+            cur.execute("""
+                INSERT INTO weld_details (uniq_id, device_name, deviceid, wps_code, job_completed, created_at)
+                SELECT 'U' || i, 'Edge Device ' || (i %% 20 + 1), 'DEV' || (100 + i %% 20), 'WPS-001', 'YES',
+                       LOCALTIMESTAMP - interval '1 hour' - i * (interval '1 year' / %s)
+                FROM generate_series(1, %s) i;
+                INSERT INTO weld_details (uniq_id, device_name, deviceid, wps_code, job_completed)
+                SELECT 'N' || i, 'Edge Device ' || i, 'DEV' || (99 + i), 'WPS-001', 'NO'
+                FROM generate_series(1, 20) i;
+                ANALYZE weld_details;
+            """, (ROWS, ROWS))
+        conn.commit()
+        yield conn
+    finally:
+        conn.close()
+
+
+def month_partition(months=0):
+    return partition_name(month_start(datetime.date.today(), months))
+
+
+def assert_reads(cur, query, params, oldest, newest):
+    scanned, _ = scanned_partitions(cur, query, params)
+    assert scanned, scanned
+    assert oldest <= scanned[0] and scanned[-1] <= newest, scanned
+    return scanned
+
+
+def test_table_is_partitioned(weld_details):
+    with weld_details.cursor() as cur:
+        assert is_partitioned(cur)
+        assert month_partition() in [name for _, name, _, _ in list_partitions(cur)]
+
+
+def test_latest_device_states_read_the_current_month(weld_details):
+    with weld_details.cursor() as cur:
+        assert_reads(cur, LATEST_DEVICE_STATES_QUERY, (DEVICES,), month_partition(), LAST)
+
+
+def test_active_welds_read_the_hot_months(weld_details):
+    with weld_details.cursor() as cur:
+        assert_reads(cur, ACTIVE_WELDS_QUERY, (WELD_HOT_MONTHS - 1,), month_partition(1 - WELD_HOT_MONTHS), LAST)
+
+
+def test_one_month_export_reads_that_month(weld_details):
+    month = month_start(datetime.date.today(), -6)
+    query, params = export_query(month, month_start(month, 1) - datetime.timedelta(days=1))
+    with weld_details.cursor() as cur:
+        assert_reads(cur, query, params, partition_name(month), partition_name(month))
+
+
+@pytest.mark.parametrize("statement", [
+    "UPDATE weld_details SET job_completed = 'YES' WHERE {}",
+    "UPDATE weld_details SET remarks = 'edited' WHERE {}",
+    "DELETE FROM weld_details WHERE {}",
+])
+def test_record_updates_read_the_record_month(weld_details, statement):
+    """The UPDATE / DELETE of one record (save / clear / delete / mark completed) with its created_at."""
+    with weld_details.cursor() as cur:
+        cur.execute("SELECT id, created_at FROM weld_details WHERE uniq_id = 'U4000'")
+        weld_id, created_at = cur.fetchone()
+        where, params = record_filter(weld_id, created_at)
+        month = partition_name(created_at.date())
+        try:
+            assert_reads(cur, sql.SQL(statement).format(where), params, month, month)
+        finally:
+            weld_details.rollback()
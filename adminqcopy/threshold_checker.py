@@ -0,0 +1,385 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from psycopg2.extras import execute_values
+from db import connect_db
+from sensor_store import latest_timestamp, list_devices, read_stream
+from imu_trajectory import ARC_ON_VOLTAGE, MAX_GAP_SECONDS, arc_on_at, track_since, update_trajectory
+from weld_segments import arc_mask
+from weld_partitions import WELD_HOT_MONTHS
+
+# --- Threshold Checker Configuration ---
+# A background worker checks the welding parameters of every device against the limits of the
+# WPS of its active weld (latest weld_details registration, while job_completed = 'NO'; only
+# registrations of the last WELD_HOT_MONTHS months are read):
+#   - voltage and current: mean over the last ELECTRICAL_WINDOW_SECONDS of the 1 kHz streams
+#   - travel speed: torch displacement over the last TRAVEL_WINDOW_SECONDS of the IMU track, once
+#     the motion has been corrected, so its events appear when the torch comes to rest. Even then
+#     the IMU speed of a window is only good to ~TRAVEL_SPEED_MARGIN (random walk of the
+#     accelerometer noise), so only speeds that far outside the limits are flagged: a stalled or
+#     racing torch, not a 10% deviation.
+# The windows slide sample by sample with O(1) work each: a running sum adds the new sample and
+# subtracts the one leaving the window (kept from the previous chunk). A window is only checked
+# while the arc burned over all of it, so strikes and crater fills are not flagged.
+# Limits come from the wps_limits table; a WPS without a row there is checked against the
+# nominal values of the registration +/- WPS_DEFAULT_TOLERANCE.
+# Each excursion outside the limits is one threshold_events row, inserted when it starts and
+# updated (end, worst value) while it lasts; the dashboard reads the latest rows of a device.
+ELECTRICAL_WINDOW_SECONDS = 1.0
+TRAVEL_WINDOW_SECONDS = 10.0
+TRAVEL_SPEED_MARGIN = 0.30          # fraction of the limit; p99 window speed error, bench_thresholds.py
+WPS_DEFAULT_TOLERANCE = {"voltage": 0.10, "current": 0.10, "travel_speed": 0.20}
+THRESHOLD_PARAMETERS = {"voltage": "Voltage (V)", "current": "Current (A)", "travel_speed": "Travel Speed (mm/min)"}
+CHECK_POLL_SECONDS = 1
+CHECK_BACKFILL_SECONDS = 60         # checked for a device when the worker starts
+WPS_REFRESH_SECONDS = 30            # active welds / limits are re-read this often
+MAX_UNSAVED_EVENTS = 1000           # excursions kept per device while the database is down
+EVENT_CACHE_TTL = 5                 # seconds
+EVENT_CARD_ROWS = 20
+
+_checker_states = {}  # device_id -> checker state, owned by the worker thread
+
+def create_threshold_tables():
+    """
+    Creates the WPS limits and threshold event tables if they don't exist. Events are indexed on
+    (deviceid, started_at DESC) for the latest events of a device; the unique (deviceid, parameter,
+    started_at) key lets an ongoing excursion be updated in place.
+    """
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS wps_limits (
+                    wps_code VARCHAR(100) PRIMARY KEY,
+                    voltage_min REAL,
+                    voltage_max REAL,
+                    current_min REAL,
+                    current_max REAL,
+                    travel_speed_min REAL,
+                    travel_speed_max REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE IF NOT EXISTS threshold_events (
+                    id SERIAL PRIMARY KEY,
+                    deviceid VARCHAR(50) NOT NULL,
+                    wps_code VARCHAR(100),
+                    parameter VARCHAR(20) NOT NULL,
+                    started_at TIMESTAMPTZ NOT NULL,
+                    ended_at TIMESTAMPTZ,
+                    worst_value REAL,
+                    limit_min REAL,
+                    limit_max REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (deviceid, parameter, started_at)
+                );
+                CREATE INDEX IF NOT EXISTS idx_threshold_events_device_started
+                    ON threshold_events (deviceid, started_at DESC);
+            """)
+            conn.commit()
+            return True
+    except Exception as e:
+        print(f"Error creating threshold tables: {e}")
+        return False
+    finally:
+        conn.close()
+
+def new_window(size, channels):
+    return {"size": size, "tail": np.empty((0, channels)), "sum": np.zeros(channels)}
+
+def slide_window(window, values):
+    """
+    Slides a window over new samples (n, channels). Returns, after each sample, the window sums,
+    the sample leaving the window (the one 'size' samples back) and the number of samples in it.
+    """
+    n, size, held = len(values), window["size"], len(window["tail"])
+    joined = np.vstack([window["tail"], values])
+    empty = min(max(size - held, 0), n)  # stream start: nothing leaves a window that is not full yet
+    leaving = joined[held + empty - size:held + n - size] if empty < n else joined[:0]
+    if empty:
+        leaving = np.vstack([np.zeros((empty, values.shape[1])), leaving])
+    sums = window["sum"] + np.cumsum(values - leaving, axis=0)
+    window["sum"], window["tail"] = sums[-1], joined[-size:]
+    return sums, leaving, np.minimum(np.arange(held + 1, held + n + 1), size)
+
+def new_checker_state():
+    return {
+        "t_ns": None,               # timestamp just after the last checked voltage sample
+        "track_ns": None,           # same for the IMU track
+        "arc_on": None,
+        "electrical": None,         # windows over (voltage, current, arc on, current received)
+        "travel": None,             # window over (x, y, z, arc on)
+        "open": {}                  # parameter -> ongoing excursion
+    }
+
+def _excursions(state, parameter, t_ns, values, valid, limits, margin=0.0):
+    """
+    Excursions of one parameter over a chunk (outside its limits widened by 'margin', a fraction of
+    each limit); returns the ones touched (closed or still open).
+    """
+    lo, hi = limits[f"{parameter}_min"], limits[f"{parameter}_max"]
+    if lo is None and hi is None:
+        return []
+    lo = -np.inf if lo is None else lo * (1 - margin)
+    hi = np.inf if hi is None else hi * (1 + margin)
+    over = valid & ((values < lo) | (values > hi))
+    deviation = np.where(values > hi, values - hi, lo - values)
+    event = state["open"].get(parameter)
+    touched = []
+    edges = np.flatnonzero(np.diff(over, prepend=event is not None))
+    for start, end in zip(np.concatenate([[0], edges]), np.concatenate([edges, [len(over)]])):
+        if start == end:
+            continue
+        if over[start]:
+            worst = start + int(np.argmax(deviation[start:end]))
+            if event is None:
+                event = {"parameter": parameter, "wps_code": limits["wps_code"], "start_ns": int(t_ns[start]),
+                         "end_ns": None, "worst": float(values[worst]), "deviation": float(deviation[worst]),
+                         "limit_min": limits[f"{parameter}_min"], "limit_max": limits[f"{parameter}_max"]}
+            elif deviation[worst] > event["deviation"]:
+                event["worst"], event["deviation"] = float(values[worst]), float(deviation[worst])
+        elif event is not None:
+            event["end_ns"] = int(t_ns[start])
+            touched.append(event)
+            event = None
+    if event is not None:
+        touched.append(event)
+    state["open"][parameter] = event
+    return touched
+
+def _close_all(state, end_ns):
+    closed = [dict(event, end_ns=end_ns) for event in state["open"].values() if event is not None]
+    state["open"] = {}
+    return closed
+
+def check_electrical(state, t_ns, volts, current, limits):
+    """Checks a chunk of voltage samples (with the current at the same times, NaN if not received)."""
+    if len(t_ns) == 0:
+        return []
+    events = []
+    if state["t_ns"] is not None and t_ns[0] - state["t_ns"] > MAX_GAP_SECONDS * 1e9:
+        events += _close_all(state, state["t_ns"])
+        state["electrical"], state["arc_on"] = None, None
+    if state["electrical"] is None:
+        step_ns = np.median(np.diff(t_ns)) if len(t_ns) > 1 else 1e6
+        state["electrical"] = new_window(max(1, int(round(ELECTRICAL_WINDOW_SECONDS * 1e9 / step_ns))), 4)
+    arc = arc_mask(volts, bool(volts[0] < ARC_ON_VOLTAGE) if state["arc_on"] is None else state["arc_on"])
+    received = ~np.isnan(current)
+    sums, _, filled = slide_window(state["electrical"], np.column_stack([
+        volts, np.where(received, current, 0.0), arc, received
+    ]))
+    size = state["electrical"]["size"]
+    full = (filled == size) & (sums[:, 2] > size - 0.5)  # window full and the arc on over all of it
+    events += _excursions(state, "voltage", t_ns, sums[:, 0] / size, full, limits)
+    events += _excursions(state, "current", t_ns, sums[:, 1] / size, full & (sums[:, 3] > size - 0.5), limits)
+    state["arc_on"], state["t_ns"] = bool(arc[-1]), int(t_ns[-1]) + 1
+    return events
+
+def check_travel(state, t_ns, positions, arc_on, limits):
+    """Checks a chunk of the IMU track (positions in m, arc on per sample) for the travel speed."""
+    if len(t_ns) == 0:
+        return []
+    events = []
+    if state["travel"] is None or (state["track_ns"] is not None and t_ns[0] - state["track_ns"] > MAX_GAP_SECONDS * 1e9):
+        step_ns = np.median(np.diff(t_ns)) if len(t_ns) > 1 else 1e7
+        state["travel"] = new_window(max(1, int(round(TRAVEL_WINDOW_SECONDS * 1e9 / step_ns))), 4)
+    window = state["travel"]
+    sums, leaving, filled = slide_window(window, np.column_stack([positions, arc_on]))
+    speed = np.linalg.norm(positions - leaving[:, 0:3], axis=1) / TRAVEL_WINDOW_SECONDS * 60 * 1000  # mm/min
+    full = (filled == window["size"]) & (sums[:, 3] > window["size"] - 0.5)
+    events += _excursions(state, "travel_speed", t_ns, speed, full, limits, TRAVEL_SPEED_MARGIN)
+    state["track_ns"] = int(t_ns[-1]) + 1
+    return events
+
+def check_device(device_id, state, limits):
+    """Checks the samples a device sent since the last check; returns the excursions touched."""
+    end_ns = latest_timestamp(device_id, "voltage")
+    events = []
+    if end_ns is not None:
+        start_ns = state["t_ns"] if state["t_ns"] is not None else end_ns - CHECK_BACKFILL_SECONDS * 10**9
+        if end_ns > start_ns:
+            t_ns, volts = read_stream(device_id, "voltage", start_ns, end_ns)
+            ct, amps = read_stream(device_id, "current", start_ns, end_ns)
+            current = np.full(len(t_ns), np.nan)
+            if len(ct):
+                i = np.searchsorted(ct, t_ns, side="right") - 1  # latest current sample at each voltage sample
+                current = np.where(i >= 0, amps[np.maximum(i, 0), 0], np.nan)
+            events += check_electrical(state, t_ns, volts[:, 0].astype(np.float64), current, limits)
+
+    update_trajectory(device_id)
+    if state["track_ns"] is None and end_ns is not None:
+        state["track_ns"] = end_ns - CHECK_BACKFILL_SECONDS * 10**9
+    if state["track_ns"] is not None:
+        t_ns, positions = track_since(device_id, state["track_ns"], corrected=True)
+        events += check_travel(state, t_ns, positions, arc_on_at(device_id, t_ns), limits)
+    return events
+
+# Latest registration of each device within the last WELD_HOT_MONTHS months (only those months'
+# weld_details partitions are read) that is still open, with the limits of its WPS
+ACTIVE_WELDS_QUERY = """
+    SELECT latest.deviceid, latest.wps_code, latest.voltage, latest.current, latest.travel_speed,
+           l.voltage_min, l.voltage_max, l.current_min, l.current_max, l.travel_speed_min, l.travel_speed_max,
+           l.wps_code IS NOT NULL
+    FROM (
+        SELECT DISTINCT ON (deviceid) deviceid, wps_code, voltage, current, travel_speed, job_completed
+        FROM weld_details
+        WHERE created_at >= date_trunc('month', LOCALTIMESTAMP) - make_interval(months => %s)
+        ORDER BY deviceid, created_at DESC
+    ) latest
+    LEFT JOIN wps_limits l ON l.wps_code = latest.wps_code
+    WHERE latest.job_completed = 'NO'
+"""
+
+def load_active_limits(cur):
+    """
+    Limits per device with an active weld: {deviceid: limits dict} with the wps_code and
+    <parameter>_min / _max, from wps_limits or the registered nominal values +/- the tolerance.
+    """
+    cur.execute(ACTIVE_WELDS_QUERY, (WELD_HOT_MONTHS - 1,))
+    active = {}
+    for device_id, wps_code, *values in cur.fetchall():
+        nominal, ranges, has_limits = values[0:3], values[3:9], values[9]
+        limits = {"wps_code": wps_code}
+        for k, parameter in enumerate(THRESHOLD_PARAMETERS):
+            if has_limits:
+                limits[f"{parameter}_min"], limits[f"{parameter}_max"] = ranges[2 * k], ranges[2 * k + 1]
+            elif nominal[k]:
+                tolerance = WPS_DEFAULT_TOLERANCE[parameter]
+                limits[f"{parameter}_min"] = nominal[k] * (1 - tolerance)
+                limits[f"{parameter}_max"] = nominal[k] * (1 + tolerance)
+            else:
+                limits[f"{parameter}_min"] = limits[f"{parameter}_max"] = None
+        active[device_id] = limits
+    return active
+
+def store_events(cur, device_id, events):
+    """Inserts new excursions and updates the end and worst value of the ongoing ones."""
+    rows = [
+        (device_id, e["wps_code"], e["parameter"], e["start_ns"] / 1e9,
+         e["end_ns"] / 1e9 if e["end_ns"] is not None else None, e["worst"], e["limit_min"], e["limit_max"])
+        for e in events
+    ]
+    execute_values(cur, """
+        INSERT INTO threshold_events (deviceid, wps_code, parameter, started_at, ended_at, worst_value, limit_min, limit_max)
+        VALUES %s
+        ON CONFLICT (deviceid, parameter, started_at)
+        DO UPDATE SET ended_at = EXCLUDED.ended_at, worst_value = EXCLUDED.worst_value
+    """, rows, template="(%s, %s, %s, to_timestamp(%s), to_timestamp(%s), %s, %s, %s)")
+
+def update_checks(active, unsaved):
+    """
+    One pass over the devices with an active weld; 'unsaved' collects the excursions (per device)
+    the database has not taken yet. Returns the number of excursions written.
+    """
+    for device_id in list_devices():
+        limits = active.get(device_id)
+        state = _checker_states.setdefault(device_id, new_checker_state())
+        if limits is None:
+            unsaved.setdefault(device_id, []).extend(_close_all(state, state["t_ns"]))
+            state.update(t_ns=None, track_ns=None, electrical=None, travel=None, arc_on=None)
+            continue
+        if state.get("wps_code") != limits["wps_code"]:
+            unsaved.setdefault(device_id, []).extend(_close_all(state, state["t_ns"]))
+            state["wps_code"] = limits["wps_code"]
+        unsaved.setdefault(device_id, []).extend(check_device(device_id, state, limits))
+    # Only the latest state of each excursion is written (or kept while the database is down)
+    pending = {
+        device_id: list({(e["parameter"], e["start_ns"]): e for e in events}.values())[-MAX_UNSAVED_EVENTS:]
+        for device_id, events in unsaved.items() if events
+    }
+    unsaved.clear()
+    unsaved.update(pending)
+    if not pending:
+        return 0
+
+    conn = connect_db()
+    if conn is None:
+        return 0
+    written = 0
+    try:
+        with conn.cursor() as cur:
+            for device_id, events in pending.items():
+                store_events(cur, device_id, events)
+                written += len(events)
+        conn.commit()
+        unsaved.clear()
+        return written
+    except Exception as e:
+        conn.rollback()
+        print(f"Error storing threshold events: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def _checker_loop(interval):
+    while not create_threshold_tables():
+        time.sleep(30)
+    active, unsaved, refreshed = {}, {}, 0.0
+    while True:
+        started = time.monotonic()
+        try:
+            if started - refreshed >= WPS_REFRESH_SECONDS:
+                conn = connect_db()
+                if conn is not None:
+                    try:
+                        with conn.cursor() as cur:
+                            active = load_active_limits(cur)
+                        refreshed = started
+                    except Exception as e:
+                        print(f"Error reading active welds: {e}")
+                    finally:
+                        conn.close()
+            if update_checks(active, unsaved):
+                load_events.clear()
+        except Exception as e:
+            print(f"Threshold checker: {e}")
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+@st.cache_resource
+def start_threshold_checker(interval=CHECK_POLL_SECONDS):
+    """Starts the background threshold checking thread once per process."""
+    thread = threading.Thread(target=_checker_loop, args=(interval,), daemon=True, name="threshold-checker")
+    thread.start()
+    return thread
+
+def checked_until(device_id):
+    """Timestamp (ns) just after the last voltage sample checked for a device, or None if unchecked."""
+    state = _checker_states.get(device_id)
+    return state["t_ns"] if state is not None else None
+
+@st.cache_data(ttl=EVENT_CACHE_TTL)
+def load_events(device_id, limit=EVENT_CARD_ROWS):
+    """The device's latest threshold events, newest first, as the dashboard shows them."""
+    columns = ["Started", "Parameter", "WPS", "Worst", "Limits", "Duration (s)"]
+    conn = connect_db()
+    if conn is None:
+        return pd.DataFrame(columns=columns)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT started_at, parameter, wps_code, worst_value, limit_min, limit_max,
+                       extract(epoch FROM ended_at - started_at)
+                FROM threshold_events
+                WHERE deviceid = %s ORDER BY started_at DESC LIMIT %s
+            """, (device_id, limit))
+            rows = cur.fetchall()
+    except Exception as e:
+        st.error(f"Error reading threshold events: {e}")
+        return pd.DataFrame(columns=columns)
+    finally:
+        conn.close()
+
+    def limits_text(lo, hi):
+        return f"{'-' if lo is None else f'{lo:g}'} .. {'-' if hi is None else f'{hi:g}'}"
+
+    return pd.DataFrame(
+        [(start.astimezone().strftime("%d-%m-%Y %I:%M:%S %p"), THRESHOLD_PARAMETERS.get(parameter, parameter),
+          wps_code, round(worst, 1), limits_text(lo, hi), "ongoing" if duration is None else round(float(duration), 1))
+         for start, parameter, wps_code, worst, lo, hi, duration in rows],
+        columns=columns
+    )
@@ -94,10 +94,6 @@ def init_session_state():
         st.session_state.login_status = False
     if 'selected_ship' not in st.session_state:
         st.session_state.selected_ship = "ship1"
-    if 'welder_certs' not in st.session_state:
-        st.session_state.welder_certs = []
-    if 'machine_certs' not in st.session_state:
-        st.session_state.machine_certs = []
     if 'extracted_welder_data' not in st.session_state:
         st.session_state.extracted_welder_data = {}
     if 'extracted_machine_data' not in st.session_state:
@@ -0,0 +1,246 @@
+import csv
+import datetime
+import io
+import os
+import secrets
+import threading
+import time
+from urllib.parse import urlsplit
+import streamlit as st
+from psycopg2 import sql
+from db import connect_db
+
+# --- Export Configuration ---
+# Audit exports of weld_details (date range, contractor and / or block) as CSV or Parquet. The rows
+# are read through a named (server-side) cursor EXPORT_FETCH_ROWS at a time and each chunk is
+# written out before the next is fetched, so memory stays the same for a hundred rows or ten
+# million. Streamlit's download button needs the whole file in memory, so the dashboard hands out
+# a short-lived link instead and the file is streamed, chunk by chunk, by the HTTP server the
+# dashboard already runs for the edge devices (sensor_ingest.py, GET /export/<token>).
+# The records name welders, so a link downloads once and that server listens on localhost: for
+# browsers on other machines the export needs a reverse proxy (HTTPS, forwarding /export/ to
+# http://127.0.0.1:<ingest port>/export/) whose address is set in the EXPORT_PUBLIC_URL
+# environment variable; without it only a browser on the dashboard machine can export.
+EXPORT_FETCH_ROWS = 10_000      # rows per round trip (one CSV chunk / one Parquet row group)
+EXPORT_LINK_SECONDS = 600       # an export link can be used once, within 10 minutes after it is made
+EXPORT_PUBLIC_URL = os.environ.get("EXPORT_PUBLIC_URL")  # e.g. "https://qc.example.com/weld-export"; unset: http://<dashboard host>:<ingest port>
+EXPORT_CONTRACTORS_TTL = 600    # seconds the contractor options of the export are reused
+LOOPBACK_HOSTS = ("localhost", "127.0.0.1", "::1")
+EXPORT_FORMATS = {              # format -> (file extension, MIME type)
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet")
+}
+EXPORT_COLUMNS = [
+    "id", "uniq_id", "created_at", "deviceid", "device_name", "contractor_name", "block_number",
+    "welder_name", "badge_number", "material_type", "thickness", "type_of_weld", "no_of_passes",
+    "weld_length", "current", "voltage", "travel_speed", "filler_material", "wps_code", "remarks",
+    "job_completed"
+]
+EXPORT_INTEGER_COLUMNS = ["id", "thickness", "no_of_passes", "weld_length", "current", "voltage", "travel_speed"]
+
+_export_links = {}  # token -> (expiry epoch seconds, filters, export format)
+_export_links_lock = threading.Lock()
+
+@st.cache_data(ttl=EXPORT_CONTRACTORS_TTL)
+def load_weld_contractors():
+    """Contractor names found in weld_details (options of the export filter, imported records included)."""
+    conn = connect_db()
+    if conn is None:
+        return []
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT contractor_name FROM weld_details WHERE contractor_name IS NOT NULL ORDER BY 1")
+            return [contractor for (contractor,) in cur.fetchall()]
+    except Exception as e:
+        st.error(f"Error reading weld record contractors: {e}")
+        return []
+    finally:
+        conn.close()
+
+def export_query(start_date=None, end_date=None, contractor=None, block=None):
+    """SELECT of the weld records matching the filters (None: no filter; end_date inclusive), oldest first."""
+    filters, params = [sql.SQL("true")], []
+    if start_date is not None:
+        filters.append(sql.SQL("created_at >= %s"))
+        params.append(start_date)
+    if end_date is not None:
+        filters.append(sql.SQL("created_at < %s"))
+        params.append(end_date + datetime.timedelta(days=1))
+    if contractor is not None:
+        filters.append(sql.SQL("contractor_name = %s"))
+        params.append(contractor)
+    if block is not None:
+        filters.append(sql.SQL("block_number = %s"))
+        params.append(block)
+    query = sql.SQL("SELECT {} FROM weld_details WHERE {} ORDER BY created_at, id").format(
+        sql.SQL(", ").join(map(sql.Identifier, EXPORT_COLUMNS)), sql.SQL(" AND ").join(filters)
+    )
+    return query, params
+
+def iter_export_rows(filters, fetch_rows=EXPORT_FETCH_ROWS):
+    """
+    Yields the matching weld_details rows (tuples in EXPORT_COLUMNS order) in lists of at most
+    fetch_rows, read with a named cursor so only one list is ever held. 'filters' are the keyword
+    arguments of export_query().
+    """
+    conn = connect_db()
+    if conn is None:
+        raise ConnectionError("Database connection failed.")
+
+    try:
+        with conn.cursor(name=f"weld_export_{secrets.token_hex(4)}") as cur:
+            cur.itersize = fetch_rows
+            cur.execute(*export_query(**filters))
+            while True:
+                rows = cur.fetchmany(fetch_rows)
+                if not rows:
+                    break
+                yield rows
+        conn.rollback()  # read-only; ends the transaction the named cursor lived in
+    finally:
+        conn.close()
+
+def iter_csv(filters, fetch_rows=EXPORT_FETCH_ROWS):
+    """Yields the export as CSV bytes: the heading line, then one chunk per fetched list of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode("utf-8")
+    for rows in iter_export_rows(filters, fetch_rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands the written bytes out in pieces (drain()) and keeps the position."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks, self._position = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def _parquet_schema():
+    import pyarrow as pa
+    types = {col: pa.int32() for col in EXPORT_INTEGER_COLUMNS}
+    types["created_at"] = pa.timestamp("us")
+    return pa.schema([(col, types.get(col, pa.string())) for col in EXPORT_COLUMNS])
+
+def iter_parquet(filters, fetch_rows=EXPORT_FETCH_ROWS):
+    """Yields the export as Parquet bytes, one row group per fetched list of rows, then the footer."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Parquet export needs the pyarrow package (or export as CSV)") from e
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+        for rows in iter_export_rows(filters, fetch_rows):
+            columns = list(zip(*rows))
+            writer.write_table(pa.table(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+def iter_export(filters, export_format, fetch_rows=EXPORT_FETCH_ROWS):
+    """Chunks (bytes) of the export file in the given format (see EXPORT_FORMATS)."""
+    if export_format == "Parquet":
+        return iter_parquet(filters, fetch_rows)
+    return iter_csv(filters, fetch_rows)
+
+def write_export(path, filters, export_format, fetch_rows=EXPORT_FETCH_ROWS):
+    """Writes the export to a file; returns its size in bytes."""
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in iter_export(filters, export_format, fetch_rows):
+            f.write(chunk)
+            size += len(chunk)
+    return size
+
+def export_file_name(filters, export_format):
+    """Download name describing the filters, e.g. weld_records_2024-01-01_to_2024-03-31_Contractor_1.csv."""
+    parts = ["weld_records"]
+    if filters.get("start_date") or filters.get("end_date"):
+        parts.append(f"{filters.get('start_date') or 'start'}_to_{filters.get('end_date') or 'today'}")
+    parts += [str(filters[key]) for key in ("contractor", "block") if filters.get(key)]
+    name = "_".join(parts).replace(" ", "_").replace("/", "-")
+    return f"{name}.{EXPORT_FORMATS[export_format][0]}"
+
+def create_export_link(filters, export_format):
+    """
+    Registers an export and returns its token, valid for EXPORT_LINK_SECONDS. ValueError if the
+    format cannot be written here (Parquet without pyarrow).
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {export_format!r}")
+    if export_format == "Parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as e:
+            raise ValueError("Parquet export needs the pyarrow package (or export as CSV)") from e
+    token = secrets.token_urlsafe(24)
+    now = time.time()
+    with _export_links_lock:
+        for expired in [t for t, (expiry, _, _) in _export_links.items() if expiry < now]:
+            del _export_links[expired]
+        _export_links[token] = (now + EXPORT_LINK_SECONDS, dict(filters), export_format)
+    return token
+
+def open_export(token):
+    """
+    (file name, MIME type, chunk iterator) of a registered export, or None if unknown / expired /
+    already used: the link is removed when it is opened.
+    """
+    with _export_links_lock:
+        link = _export_links.pop(token, None)
+    if link is None or link[0] < time.time():
+        return None
+    _, filters, export_format = link
+    return export_file_name(filters, export_format), EXPORT_FORMATS[export_format][1], iter_export(filters, export_format)
+
+def dashboard_hostname(dashboard_host):
+    """Host name of a 'Host' header ("qc-pc:8501", "[fe80::1]:8501"), without the port and IPv6 brackets."""
+    return urlsplit("//" + (dashboard_host or "localhost")).hostname or "localhost"
+
+def export_reachable(dashboard_host, listen_host=None):
+    """
+    Whether a browser that reached the dashboard at 'dashboard_host' can download the exports:
+    always behind EXPORT_PUBLIC_URL, else only on the dashboard machine if the export server
+    listens on localhost ('listen_host').
+    """
+    if EXPORT_PUBLIC_URL:
+        return True
+    return listen_host not in LOOPBACK_HOSTS or dashboard_hostname(dashboard_host) in LOOPBACK_HOSTS
+
+def export_url(token, dashboard_host, port, listen_host=None):
+    """
+    Browser URL of an export: under EXPORT_PUBLIC_URL if set, else on the HTTP server listening on
+    'port' of the host the browser reached the dashboard at ('Host' header, e.g. "qc-pc:8501").
+    None if the browser cannot reach it (export_reachable()).
+    """
+    if EXPORT_PUBLIC_URL:
+        return f"{EXPORT_PUBLIC_URL.rstrip('/')}/export/{token}"
+    if not export_reachable(dashboard_host, listen_host):
+        return None
+    host = dashboard_hostname(dashboard_host)
+    if ":" in host:
+        host = f"[{host}]"
+    return f"http://{host}:{port}/export/{token}"
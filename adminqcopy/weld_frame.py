@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# --- Weld Details Frame Schema ---
+# weld_details rows read into pandas (the edit form's fetch_weld_details(), the Registered Weld
+# Details table) stay in the session, so their columns are stored compactly when loaded:
+#   - text with few distinct values (a device's name / ID, contractor, material, weld type,
+#     filler, WPS code, YES/NO) as categoricals: one small integer code per row plus the
+#     distinct strings once;
+#   - INTEGER columns as the smallest integer type holding their values (nullable Int8 / Int16 /
+#     Int32 where a value is missing, e.g. on cleared records);
+#   - the rest (unique ID, welder, badge, block, remarks) stays text.
+# Categoricals compare, filter and display like the strings; missing values become NaN / <NA>,
+# so use weld_record() for a row's plain Python values (None where missing).
+WELD_CATEGORY_COLUMNS = [
+    "device_name", "deviceid", "contractor_name", "material_type", "type_of_weld", "filler_material",
+    "wps_code", "job_completed"
+]
+WELD_INTEGER_COLUMNS = ["id", "thickness", "no_of_passes", "weld_length", "current", "voltage", "travel_speed"]
+NULLABLE_INTEGER_TYPES = ["Int8", "Int16", "Int32", "Int64"]
+
+def compact_integers(values):
+    """
+    A column of whole numbers as the smallest integer dtype that holds it (nullable if values are
+    missing). A column with fractional values is returned as plain (float) numbers.
+    """
+    numbers = pd.to_numeric(values, errors="coerce")
+    if not (numbers.dropna() % 1 == 0).all():
+        return numbers
+    if len(numbers) and numbers.notna().all():
+        return pd.to_numeric(numbers, downcast="integer")
+    low, high = numbers.min(), numbers.max()
+    for dtype in NULLABLE_INTEGER_TYPES:
+        limits = np.iinfo(dtype.lower())
+        if pd.isna(low) or (limits.min <= low and high <= limits.max):
+            return numbers.astype(dtype)
+    return numbers
+
+def compact_weld_frame(df):
+    """Returns a weld_details DataFrame with the compact column types above (columns it lacks are skipped)."""
+    df = df.copy()
+    for col in WELD_CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in WELD_INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = compact_integers(df[col])
+    return df
+
+def weld_record(row):
+    """A row of a compact weld frame as a dict of plain Python values, None where missing."""
+    record = {}
+    for col, value in row.items():
+        if pd.api.types.is_scalar(value) and pd.isna(value):
+            value = None
+        elif isinstance(value, np.generic):
+            value = value.item()
+        record[col] = value
+    return record
@@ -0,0 +1,275 @@
+import io
+import re
+import string
+import time
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+from db import connect_db
+from weld_partitions import ensure_weld_partitions, reserve_uniq_ids
+
+# --- Bulk Import Configuration ---
+# Historical weld logs (CSV or Excel) go into weld_details without the registration form: the file
+# is read IMPORT_BATCH_ROWS rows at a time, each batch is validated and cast column by column
+# (vectorized, no per-row Python), unique IDs are allocated for the whole batch at once and the
+# valid rows are loaded with one COPY. The import is one transaction: either every valid row is
+# stored or, on a database error, none. Rows that fail validation are skipped and listed in a
+# rejected-rows report (file row number, reasons, original values).
+# The file is read ahead once (unique IDs and dates only) so the weld_details partitions of its
+# months exist before the import starts (weld_partitions.py). Every unique ID, given or allocated,
+# is taken in weld_uniq_ids within the import's transaction, so the registration form cannot hand
+# out an ID the import is about to commit.
+IMPORT_BATCH_ROWS = 50_000
+MAX_REJECTED_REPORT_ROWS = 100_000  # rejected rows kept for the report (all are counted)
+UNIQ_ID_LENGTH = 5                  # weld_details.uniq_id, as generated by the registration form
+UNIQ_ID_CHARS = string.ascii_uppercase
+MAX_INTEGER = 2**31 - 1             # INTEGER columns
+
+# Columns the file may provide, with the VARCHAR length of the text columns (None: TEXT)
+IMPORT_TEXT_COLUMNS = {
+    "uniq_id": UNIQ_ID_LENGTH, "device_name": 50, "deviceid": 50, "contractor_name": 100,
+    "block_number": 50, "welder_name": 100, "badge_number": 50, "material_type": 100,
+    "type_of_weld": 10, "filler_material": 100, "wps_code": 100, "remarks": None, "job_completed": 3
+}
+IMPORT_INTEGER_COLUMNS = ["thickness", "no_of_passes", "weld_length", "current", "voltage", "travel_speed"]
+IMPORT_COLUMNS = list(IMPORT_TEXT_COLUMNS) + IMPORT_INTEGER_COLUMNS + ["created_at"]
+IMPORT_REQUIRED_COLUMNS = ["deviceid", "created_at"]
+# Historical jobs are finished unless the file says otherwise
+IMPORT_DEFAULT_JOB_COMPLETED = "YES"
+
+# File headings -> columns; headings are matched lower-case with punctuation as '_', and the
+# dashboard's table headings ('Device ID', 'Thickness (mm)', ...) are accepted too.
+IMPORT_HEADER_ALIASES = {
+    "device_id": "deviceid", "contractor": "contractor_name", "block_no": "block_number",
+    "welder": "welder_name", "badge_no": "badge_number", "material": "material_type",
+    "thickness_mm": "thickness", "weld_type": "type_of_weld", "passes": "no_of_passes",
+    "length_mm": "weld_length", "current_a": "current", "voltage_v": "voltage",
+    "wps": "wps_code", "reg_date": "created_at", "date": "created_at", "created": "created_at"
+}
+# Timestamp formats tried in order (day first, as the dashboard shows dates)
+IMPORT_DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S",
+    "%d-%m-%Y %I:%M:%S %p", "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d-%m-%Y",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y"
+]
+
+def normalize_header(heading):
+    """Column of a file heading (see IMPORT_HEADER_ALIASES); unknown headings are returned as is."""
+    key = re.sub(r"[^0-9a-z]+", "_", str(heading).strip().lower()).strip("_")
+    return IMPORT_HEADER_ALIASES.get(key, key)
+
+def _cell_text(value):
+    """Excel cell -> text as it would appear in a CSV export."""
+    if value is None:
+        return ""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def read_batches(file, file_name, batch_rows=IMPORT_BATCH_ROWS, columns=None):
+    """
+    Yields the rows of a CSV or Excel (.xlsx) file as DataFrames of text ('' for empty cells) of
+    at most batch_rows rows, with the headings normalized (only 'columns' if given). Neither
+    format is loaded whole.
+    """
+    if file_name.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError as e:
+            raise ValueError("Excel import needs the openpyxl package (or save the sheet as CSV)") from e
+        sheet = load_workbook(file, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        headings = [normalize_header(h) for h in next(rows, [])]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_rows:
+                yield _excel_frame(batch, headings, columns)
+                batch = []
+        if batch:
+            yield _excel_frame(batch, headings, columns)
+        return
+
+    usecols = None if columns is None else (lambda heading: normalize_header(heading) in columns)
+    for batch in pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=batch_rows, usecols=usecols):
+        batch.columns = [normalize_header(h) for h in batch.columns]
+        yield batch
+
+def _excel_frame(rows, headings, columns=None):
+    width = len(headings)
+    df = pd.DataFrame([tuple(row[:width]) + (None,) * (width - len(row)) for row in rows], columns=headings)
+    if columns is not None:
+        df = df[[col for col in df.columns if col in columns]]
+    for col in df.columns:
+        df[col] = df[col].map(_cell_text)
+    return df
+
+def _parse_timestamps(text):
+    """Timestamps of a text Series (NaT where no IMPORT_DATE_FORMATS format matches)."""
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for fmt in IMPORT_DATE_FORMATS:
+        todo = parsed.isna() & (text != "")
+        if not todo.any():
+            break
+        parsed[todo] = pd.to_datetime(text[todo], format=fmt, errors="coerce")
+    return parsed
+
+def validate_batch(raw):
+    """
+    Casts a batch of text rows to the weld_details column types, vectorized per column.
+    Returns (clean DataFrame with IMPORT_COLUMNS of the valid rows, Series of the rejection
+    reasons of the invalid rows, indexed like 'raw').
+    """
+    reasons = pd.Series("", index=raw.index, dtype=object)
+
+    def reject(mask, reason):
+        reasons[mask] = reasons[mask] + reason + "; "
+
+    clean = pd.DataFrame(index=raw.index)
+    for col, max_length in IMPORT_TEXT_COLUMNS.items():
+        text = raw[col].astype(str).str.strip() if col in raw.columns else pd.Series("", index=raw.index)
+        if max_length is not None:
+            reject(text.str.len() > max_length, f"{col} longer than {max_length} characters")
+        clean[col] = text.where(text != "", None).astype(object)
+
+    for col in IMPORT_INTEGER_COLUMNS:
+        text = raw[col].astype(str).str.strip() if col in raw.columns else pd.Series("", index=raw.index)
+        number = pd.to_numeric(text.where(text != ""), errors="coerce")
+        invalid = (text != "") & (number.isna() | (number % 1 != 0) | (number.abs() > MAX_INTEGER))
+        reject(invalid, f"{col} is not a whole number")
+        clean[col] = number.where(~invalid).astype("Int64")
+
+    text = raw["created_at"].astype(str).str.strip() if "created_at" in raw.columns else pd.Series("", index=raw.index)
+    clean["created_at"] = _parse_timestamps(text)
+    reject((text != "") & clean["created_at"].isna(), "created_at is not a date")
+    reject(text == "", "created_at is missing")
+    reject(clean["deviceid"].isna(), "deviceid is missing")
+
+    job = clean["job_completed"].str.upper().fillna(IMPORT_DEFAULT_JOB_COMPLETED)
+    reject(~job.isin(["YES", "NO"]), "job_completed must be YES or NO")
+    clean["job_completed"] = job
+
+    uniq = clean["uniq_id"].str.upper()
+    reject(uniq.notna() & ~uniq.str.fullmatch(f"[{UNIQ_ID_CHARS}]{{{UNIQ_ID_LENGTH}}}").fillna(False).astype(bool),
+           f"uniq_id must be {UNIQ_ID_LENGTH} letters")
+    reject(uniq.notna() & uniq.duplicated(keep="first"), "uniq_id repeated in the file")
+    clean["uniq_id"] = uniq
+
+    invalid = reasons != ""
+    return clean[~invalid][IMPORT_COLUMNS], reasons[invalid].str.rstrip("; ")
+
+def read_ahead(file, file_name):
+    """
+    (unique IDs the file gives, upper case; first days of the months of its dates), read ahead
+    so that IDs allocated for the rows of one batch never take the ID a row further down the
+    file brings, and the months' partitions can be made first. Rewinds the file.
+    """
+    ids, months = set(), set()
+    for raw in read_batches(file, file_name, columns=["uniq_id", "created_at"]):
+        if "uniq_id" in raw.columns:
+            ids.update(raw["uniq_id"].str.strip().str.upper())
+        if "created_at" in raw.columns:
+            dates = _parse_timestamps(raw["created_at"].astype(str).str.strip()).dropna()
+            months.update(dates.dt.to_period("M").dt.start_time.dt.date.unique())
+    file.seek(0)
+    ids.discard("")
+    return ids, months
+
+def allocate_unique_ids(cur, count, taken, rng):
+    """
+    'count' new random unique IDs (UNIQ_ID_LENGTH of UNIQ_ID_CHARS) in bulk: candidates are drawn
+    together and taken in weld_uniq_ids in one query per round, instead of one query per ID.
+    'taken' holds IDs that must not be used (those the file gives); the new IDs are added to it.
+    """
+    alphabet = np.frombuffer(UNIQ_ID_CHARS.encode("ascii"), dtype="S1")
+    allocated = []
+    while len(allocated) < count:
+        need = count - len(allocated)
+        draws = alphabet[rng.integers(0, len(alphabet), size=(need + need // 10 + 16, UNIQ_ID_LENGTH))]
+        candidates = pd.unique(draws.view(f"S{UNIQ_ID_LENGTH}").ravel().astype(str))
+        candidates = [c for c in candidates if c not in taken][:need]
+        reserved = reserve_uniq_ids(cur, candidates)
+        fresh = [c for c in candidates if c in reserved]
+        taken.update(fresh)
+        allocated.extend(fresh)
+    return allocated
+
+def copy_rows(cur, clean):
+    """Loads validated rows into weld_details with one COPY."""
+    buffer = io.StringIO()
+    clean.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S")
+    buffer.seek(0)
+    query = sql.SQL("COPY weld_details ({}) FROM STDIN WITH (FORMAT csv)").format(
+        sql.SQL(", ").join(map(sql.Identifier, IMPORT_COLUMNS))
+    )
+    cur.copy_expert(query.as_string(cur), buffer)
+
+def import_weld_details(file, file_name, progress=None, batch_rows=IMPORT_BATCH_ROWS, seed=None):
+    """
+    Bulk imports a CSV / Excel file of weld records into weld_details (see the configuration
+    above). progress(rows_read) is called after each batch. Returns a dict with 'imported',
+    'rejected' (count), 'report' (DataFrame of up to MAX_REJECTED_REPORT_ROWS rejected rows:
+    Row, Reason and the file's columns), 'seconds' and 'error' (None, or why nothing was imported).
+    """
+    result = {"imported": 0, "rejected": 0, "report": pd.DataFrame(columns=["Row", "Reason"]),
+              "seconds": 0.0, "error": None}
+    start = time.perf_counter()
+    conn = connect_db()
+    if conn is None:
+        result["error"] = "Database connection failed."
+        return result
+
+    rng = np.random.default_rng(seed)
+    reports, reported, rows_read = [], 0, 0
+    try:
+        taken, months = read_ahead(file, file_name)
+        if ensure_weld_partitions(months) is None:
+            raise ValueError("Could not create the weld_details partitions of the file's months")
+        with conn.cursor() as cur:
+            for raw in read_batches(file, file_name, batch_rows):
+                if rows_read == 0:
+                    missing = [col for col in IMPORT_REQUIRED_COLUMNS if col not in raw.columns]
+                    if missing:
+                        raise ValueError(f"The file has no {', '.join(missing)} column")
+                raw.index = pd.RangeIndex(rows_read + 2, rows_read + 2 + len(raw))  # file row numbers
+                rows_read += len(raw)
+                clean, reasons = validate_batch(raw)
+
+                # IDs given in the file must be new; the others are allocated for the batch at once
+                given = clean["uniq_id"].dropna()
+                reserved = reserve_uniq_ids(cur, given.unique())
+                if len(reserved) < given.nunique():
+                    duplicate = clean["uniq_id"].notna() & ~clean["uniq_id"].isin(reserved)
+                    reasons = pd.concat([reasons, pd.Series("uniq_id already exists", index=clean.index[duplicate])])
+                    clean = clean[~duplicate]
+                missing_ids = clean["uniq_id"].isna()
+                if missing_ids.any():
+                    clean.loc[missing_ids, "uniq_id"] = allocate_unique_ids(
+                        cur, int(missing_ids.sum()), taken, rng
+                    )
+
+                copy_rows(cur, clean)
+                result["imported"] += len(clean)
+                result["rejected"] += len(reasons)
+                if len(reasons) and reported < MAX_REJECTED_REPORT_ROWS:
+                    reasons = reasons.sort_index().iloc[:MAX_REJECTED_REPORT_ROWS - reported]
+                    report = raw.loc[reasons.index].copy()
+                    report.insert(0, "Reason", reasons)
+                    report.insert(0, "Row", reasons.index)
+                    reports.append(report)
+                    reported += len(report)
+                if progress is not None:
+                    progress(rows_read)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        result.update(imported=0, error=str(e))
+    finally:
+        conn.close()
+
+    if reports:
+        result["report"] = pd.concat(reports, ignore_index=True)
+    result["seconds"] = time.perf_counter() - start
+    return result
@@ -0,0 +1,324 @@
+import argparse
+import datetime
+import os
+import re
+import threading
+import time
+import streamlit as st
+from psycopg2 import sql
+from db import connect_db
+from weld_export import export_file_name, write_export
+
+# --- Weld Details Partitioning Configuration ---
+# weld_details is range-partitioned by created_at month: weld_details_2024_05 holds May 2024.
+#   - Partitions are made ahead of the writes: from last month to WELD_PARTITION_MONTHS_AHEAD
+#     months ahead when the table is ensured and then daily by a background thread, and for the
+#     months of an imported file before its rows are copied (weld_import.py).
+#   - There is no DEFAULT partition: with non-overlapping month ranges only, PostgreSQL scans the
+#     months in order, so "latest record of a device" (ORDER BY created_at DESC LIMIT 1) stops in
+#     the newest month holding one instead of probing every month. Queries bounded in time (the
+#     threshold checker's active welds, WELD_HOT_MONTHS; date-range exports) skip the other
+#     months altogether.
+#   - Cold months, older than WELD_ARCHIVE_AFTER_MONTHS, are archived with archive_partitions() /
+#     `python weld_partitions.py archive`: optionally exported to a file, then detached from
+#     weld_details and moved to the WELD_ARCHIVE_SCHEMA schema (still queryable), left detached
+#     or dropped. Archived records no longer appear in the dashboard or in uniq_id lookups.
+#   - A weld_details created before partitioning keeps working unpartitioned until it is
+#     converted with `python weld_partitions.py migrate` (the old table is kept until dropped).
+# uniq_id uniqueness cannot be a constraint of a partitioned table (it would have to include
+# created_at), so it is kept by the weld_uniq_ids table (uniq_id PRIMARY KEY): the registration
+# form and the bulk import insert every new ID there in the transaction that writes its record.
+# An ID stays taken after its record is cleared, archived or dropped.
+WELD_PARTITION_MONTHS_AHEAD = 3
+WELD_HOT_MONTHS = 3             # an active weld (job_completed = 'NO') is registered within this many months
+WELD_ARCHIVE_AFTER_MONTHS = 24
+WELD_ARCHIVE_SCHEMA = "weld_archive"
+PARTITION_CHECK_SECONDS = 24 * 3600
+PARTITION_ACTIONS = {"archive": f"moved to {WELD_ARCHIVE_SCHEMA}", "detach": "detached", "drop": "dropped"}
+_PARTITION_NAME = re.compile(r"^weld_details_(\d{4})_(\d{2})$")
+
+def month_start(day, months=0):
+    """First day of the month of 'day', shifted by 'months'."""
+    index = day.year * 12 + day.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f"weld_details_{month.year}_{month.month:02d}"
+
+def upcoming_months(today=None):
+    """Months that must have a partition for new registrations: last month to WELD_PARTITION_MONTHS_AHEAD ahead."""
+    today = today or datetime.date.today()
+    return [month_start(today, k) for k in range(-1, WELD_PARTITION_MONTHS_AHEAD + 1)]
+
+def is_partitioned(cur, table="weld_details"):
+    """Whether the table (on the search path) is a partitioned table."""
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+def list_partitions(cur):
+    """Partitions of weld_details, oldest first: [(month, name, estimated rows, bytes), ...]."""
+    cur.execute("""
+        SELECT c.relname, c.reltuples, pg_total_relation_size(c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('weld_details')
+    """)
+    partitions = []
+    for name, rows, size in cur.fetchall():
+        match = _PARTITION_NAME.match(name)
+        if match:
+            month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append((month, name, max(int(rows), 0), size))
+    return sorted(partitions)
+
+def create_month_partitions(cur, months):
+    """Creates the missing partitions of the given months (dates); returns the names created."""
+    existing = {month for month, _, _, _ in list_partitions(cur)}
+    created = []
+    for month in sorted({month_start(m) for m in months} - existing):
+        cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF weld_details FOR VALUES FROM (%s) TO (%s)").format(
+            sql.Identifier(partition_name(month))
+        ), (month, month_start(month, 1)))
+        created.append(partition_name(month))
+    return created
+
+def ensure_weld_partitions(months=None):
+    """
+    Creates the partitions of the given months (default: upcoming_months()) in their own
+    transaction. Does nothing on an unpartitioned weld_details. Returns the names created, or
+    None if the database could not be reached / the partitions not created.
+    """
+    conn = connect_db()
+    if conn is None:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            if not is_partitioned(cur):
+                return []
+            created = create_month_partitions(cur, upcoming_months() if months is None else months)
+        conn.commit()
+        return created
+    except Exception as e:
+        conn.rollback()
+        print(f"Error creating weld_details partitions: {e}")
+        return None
+    finally:
+        conn.close()
+
+def _partition_loop(interval):
+    """Background loop; runs outside any Streamlit session, so failures are printed."""
+    while True:
+        time.sleep(interval)
+        ensure_weld_partitions()
+
+@st.cache_resource
+def start_partition_maintainer(interval=PARTITION_CHECK_SECONDS):
+    """Starts the thread that keeps the upcoming months' partitions made, once per process."""
+    thread = threading.Thread(target=_partition_loop, args=(interval,), daemon=True, name="weld-partitions")
+    thread.start()
+    return thread
+
+def register_existing_uniq_ids(cur, table="weld_details"):
+    """Adds the uniq_ids held by a weld records table to weld_uniq_ids (those already there are skipped)."""
+    cur.execute(sql.SQL("""
+        INSERT INTO weld_uniq_ids (uniq_id)
+        SELECT DISTINCT uniq_id FROM {} WHERE uniq_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """).format(sql.Identifier(table)))
+
+def create_uniq_id_registry(cur):
+    """Creates weld_uniq_ids if it does not exist, filled with the uniq_ids weld_details holds."""
+    cur.execute("SELECT to_regclass('weld_uniq_ids') IS NULL")
+    (missing,) = cur.fetchone()
+    cur.execute("CREATE TABLE IF NOT EXISTS weld_uniq_ids (uniq_id VARCHAR(50) PRIMARY KEY)")
+    if missing:
+        register_existing_uniq_ids(cur)
+
+def reserve_uniq_ids(cur, ids):
+    """
+    Takes the given uniq_ids in weld_uniq_ids, in the caller's transaction, and returns the set of
+    those that were free. An ID another transaction has taken but not committed yet waits for it.
+    """
+    if len(ids) == 0:
+        return set()
+    cur.execute(
+        "INSERT INTO weld_uniq_ids (uniq_id) SELECT unnest(%s::varchar[]) ON CONFLICT DO NOTHING RETURNING uniq_id",
+        (list(ids),)
+    )
+    return {uniq_id for (uniq_id,) in cur.fetchall()}
+
+def cold_partitions(cur, before=None):
+    """Partitions of the months before 'before' (default: WELD_ARCHIVE_AFTER_MONTHS ago)."""
+    before = before or month_start(datetime.date.today(), -WELD_ARCHIVE_AFTER_MONTHS)
+    return [p for p in list_partitions(cur) if p[0] < before]
+
+def archive_partitions(before=None, action="archive", export_dir=None, export_format="CSV", force=False):
+    """
+    Archives the partitions before the month 'before' (default: WELD_ARCHIVE_AFTER_MONTHS ago),
+    one transaction per partition:
+      - export_dir: the month is first written there with weld_export.py (file per month),
+      - action "archive": detached and moved to WELD_ARCHIVE_SCHEMA; "detach": detached only
+        (a standalone table in the same schema); "drop": detached and dropped.
+    Months within WELD_HOT_MONTHS are never archived; a month with open jobs (job_completed =
+    'NO') is skipped unless force. Returns [(partition, rows, what was done), ...].
+    """
+    if action not in PARTITION_ACTIONS:
+        raise ValueError(f"Unknown action {action!r} (one of {', '.join(PARTITION_ACTIONS)})")
+    hot = month_start(datetime.date.today(), -WELD_HOT_MONTHS + 1)
+    before = min(before or month_start(datetime.date.today(), -WELD_ARCHIVE_AFTER_MONTHS), hot)
+    conn = connect_db()
+    if conn is None:
+        raise ConnectionError("Database connection failed.")
+
+    done = []
+    try:
+        with conn.cursor() as cur:
+            if not is_partitioned(cur):
+                raise ValueError("weld_details is not partitioned (run: python weld_partitions.py migrate)")
+            for month, name, _, _ in cold_partitions(cur, before):
+                table = sql.Identifier(name)
+                cur.execute(sql.SQL("SELECT count(*), count(*) FILTER (WHERE job_completed = 'NO') FROM {}").format(table))
+                rows, open_jobs = cur.fetchone()
+                if open_jobs and not force:
+                    done.append((name, rows, f"skipped: {open_jobs} open jobs"))
+                    continue
+                if export_dir:
+                    filters = {"start_date": month, "end_date": month_start(month, 1) - datetime.timedelta(days=1)}
+                    path = os.path.join(export_dir, export_file_name(filters, export_format))
+                    write_export(path, filters, export_format)
+                cur.execute(sql.SQL("ALTER TABLE weld_details DETACH PARTITION {}").format(table))
+                if action == "archive":
+                    cur.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(WELD_ARCHIVE_SCHEMA)))
+                    cur.execute(sql.SQL("ALTER TABLE {} SET SCHEMA {}").format(table, sql.Identifier(WELD_ARCHIVE_SCHEMA)))
+                elif action == "drop":
+                    cur.execute(sql.SQL("DROP TABLE {}").format(table))
+                conn.commit()
+                done.append((name, rows, PARTITION_ACTIONS[action] + (" after export" if export_dir else "")))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return done
+
+def migrate_to_partitioned(drop_old=False):
+    """
+    Converts an unpartitioned weld_details in one transaction: the table is renamed to
+    weld_details_unpartitioned (its indexes get the same suffix), a partitioned weld_details with
+    the same columns, defaults and id sequence is created with a partition for every month from
+    the oldest record on, and the rows are copied; their uniq_ids are added to weld_uniq_ids.
+    Returns the number of rows copied.
+    The indexes are then made by create_weld_details_table() (ensure_weld_details_table()).
+    """
+    conn = connect_db()
+    if conn is None:
+        raise ConnectionError("Database connection failed.")
+
+    try:
+        with conn.cursor() as cur:
+            if is_partitioned(cur):
+                raise ValueError("weld_details is already partitioned")
+            cur.execute("LOCK TABLE weld_details IN ACCESS EXCLUSIVE MODE")
+            cur.execute("SELECT pg_get_serial_sequence('weld_details', 'id')")
+            (sequence,) = cur.fetchone()
+            cur.execute("""
+                SELECT i.relname FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+                WHERE x.indrelid = to_regclass('weld_details')
+            """)
+            for (index,) in cur.fetchall():
+                cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                    sql.Identifier(index), sql.Identifier(f"{index}_unpartitioned")
+                ))
+            cur.execute("ALTER TABLE weld_details RENAME TO weld_details_unpartitioned")
+            cur.execute("""
+                CREATE TABLE weld_details (LIKE weld_details_unpartitioned INCLUDING DEFAULTS)
+                PARTITION BY RANGE (created_at)
+            """)
+            cur.execute("UPDATE weld_details_unpartitioned SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+            cur.execute("ALTER TABLE weld_details ALTER COLUMN created_at SET NOT NULL, ADD PRIMARY KEY (id, created_at)")
+            if sequence:
+                cur.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY weld_details.id").format(sql.SQL(sequence)))
+            cur.execute("SELECT min(created_at)::date FROM weld_details_unpartitioned")
+            (oldest,) = cur.fetchone()
+            months, month = [], month_start(oldest or datetime.date.today())
+            while month <= month_start(datetime.date.today(), WELD_PARTITION_MONTHS_AHEAD):
+                months.append(month)
+                month = month_start(month, 1)
+            create_month_partitions(cur, months)
+            cur.execute("INSERT INTO weld_details SELECT * FROM weld_details_unpartitioned")
+            copied = cur.rowcount
+            # The UNIQUE constraint on uniq_id stays with the old table: weld_uniq_ids takes over
+            create_uniq_id_registry(cur)
+            register_existing_uniq_ids(cur)
+            if drop_old:
+                cur.execute("DROP TABLE weld_details_unpartitioned")
+        conn.commit()
+        return copied
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def scanned_partitions(cur, query, params=None):
+    """
+    Runs EXPLAIN ANALYZE of a query and returns (partitions scanned, partitions in the plan):
+    partitions pruned when planning or at executor start are not in the plan; partitions of an
+    ordered scan that was stopped early (LIMIT) are in the plan but never executed.
+    """
+    cur.execute(sql.SQL("EXPLAIN (ANALYZE, FORMAT JSON) ") + (query if isinstance(query, sql.Composable) else sql.SQL(query)), params)
+    scanned, planned = set(), set()
+
+    def walk(node):
+        name = node.get("Relation Name", "")
+        if _PARTITION_NAME.match(name):
+            planned.add(name)
+            if node.get("Actual Loops", 0) > 0:
+                scanned.add(name)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    plan = cur.fetchone()[0]
+    walk((plan[0] if isinstance(plan, list) else plan)["Plan"])
+    return sorted(scanned), sorted(planned)
+
+def main():
+    parser = argparse.ArgumentParser(description="weld_details partition maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="list the partitions")
+    migrate = commands.add_parser("migrate", help="convert an unpartitioned weld_details")
+    migrate.add_argument("--drop-old", action="store_true", help="drop weld_details_unpartitioned afterwards")
+    archive = commands.add_parser("archive", help="archive the cold partitions")
+    archive.add_argument("--before", help="first month kept, YYYY-MM (default: %d months ago)" % WELD_ARCHIVE_AFTER_MONTHS)
+    archive.add_argument("--action", choices=list(PARTITION_ACTIONS), default="archive")
+    archive.add_argument("--export-dir", help="write each month to this directory first")
+    archive.add_argument("--format", choices=["CSV", "Parquet"], default="CSV")
+    archive.add_argument("--force", action="store_true", help="also archive months with open jobs")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        print(f"Copied {migrate_to_partitioned(args.drop_old):,} rows into the partitioned weld_details.")
+        ensure_weld_partitions()
+    elif args.command == "archive":
+        before = datetime.datetime.strptime(args.before, "%Y-%m").date() if args.before else None
+        if args.export_dir:
+            os.makedirs(args.export_dir, exist_ok=True)
+        for name, rows, what in archive_partitions(before, args.action, args.export_dir, args.format, args.force):
+            print(f"{name}: {rows:,} rows {what}")
+    else:
+        conn = connect_db()
+        if conn is None:
+            return
+        try:
+            with conn.cursor() as cur:
+                if not is_partitioned(cur):
+                    print("weld_details is not partitioned (run: python weld_partitions.py migrate)")
+                    return
+                for month, name, rows, size in list_partitions(cur):
+                    print(f"{name}  {month:%Y-%m}  ~{rows:,} rows  {size / 1e6:.1f} MB")
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
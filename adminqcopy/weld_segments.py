@@ -0,0 +1,301 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from psycopg2.extras import execute_values
+from db import connect_db
+from sensor_store import latest_timestamp, list_devices, read_stream
+from imu_trajectory import (
+    ARC_ON_VOLTAGE, MAX_GAP_SECONDS, TRAJECTORY_BACKFILL_SECONDS, settled_positions, update_trajectory
+)
+
+# --- Weld Segment Configuration ---
+# A background worker turns the sensor streams of every device into weld segments (arc on until
+# arc off), stored in the weld_segments table that the dashboard's Rework/Old Data card reads.
+#   - Arc detection: hysteresis on the 1 kHz voltage (the arc strikes below ARC_ON_VOLTAGE and is
+#     out above ARC_OFF_VOLTAGE), vectorized over each chunk of new samples. Outages shorter than
+#     MIN_ARC_GAP_SECONDS (short circuits, spatter) stay inside the segment; arcs shorter than
+#     MIN_SEGMENT_SECONDS (tack strikes, touches) are dropped.
+#   - Length: the torch positions at arc on / arc off from the IMU track (imu_trajectory.py), once
+#     that motion has been corrected, projected on the seam: the direction of the job's first
+#     segment, measured from where it started. A job is everything after the device's latest
+#     weld registration (weld_details).
+#   - Pass: a segment starting more than PASS_RESTART_MM behind where the previous one ended is a
+#     new pass (the torch went back along the seam); otherwise it continues the pass (restrike).
+ARC_OFF_VOLTAGE = 55.0
+MIN_ARC_GAP_SECONDS = 0.5
+MIN_SEGMENT_SECONDS = 1.0
+PASS_RESTART_MM = 50.0
+MIN_SEAM_MM = 10.0                  # a shorter first segment leaves the seam direction on X
+SEGMENT_IMU_WAIT_SECONDS = 60       # a segment is stored without lengths if the IMU track lags more
+SEGMENT_POLL_SECONDS = 2
+SEGMENT_BACKFILL_SECONDS = TRAJECTORY_BACKFILL_SECONDS  # scanned for a device without stored segments
+MAX_PENDING_SEGMENTS = 1000         # finished segments kept per device while the database is down
+SEGMENT_CACHE_TTL = 5               # seconds
+SEGMENT_CARD_ROWS = 50
+
+def create_segment_table():
+    """
+    Creates the weld_segments table if it doesn't exist. The unique (deviceid, start_time) index
+    serves the card's latest-segments query and makes a re-scan after a restart idempotent.
+    """
+    conn = connect_db()
+    if conn is None:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            # Sensor timestamps are UTC epoch times, hence TIMESTAMPTZ
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS weld_segments (
+                    id SERIAL PRIMARY KEY,
+                    deviceid VARCHAR(50) NOT NULL,
+                    start_time TIMESTAMPTZ NOT NULL,
+                    end_time TIMESTAMPTZ NOT NULL,
+                    length_start_mm REAL,
+                    length_end_mm REAL,
+                    pass_number INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (deviceid, start_time)
+                );
+            """)
+            conn.commit()
+            return True
+    except Exception as e:
+        print(f"Error creating weld_segments table: {e}")
+        return False
+    finally:
+        conn.close()
+
+def new_segment_state(t_ns=None):
+    return {
+        "t_ns": t_ns,               # timestamp just after the last scanned voltage sample
+        "arc_on": None,             # hysteresis state after that sample
+        "start_ns": None,           # arc on of the open segment
+        "off_ns": None,             # arc off of the open segment while the outage may still be a gap
+        "partial": False,           # the open segment was already burning when the scan started
+        "finished": [],             # (start_ns, end_ns) of segments not stored yet, oldest first
+        "job_ns": None,             # registration time of the current job (None: no registration)
+        "job_loaded": False,
+        "pass": 0,
+        "origin": None,             # torch position where the job's first measured segment started
+        "direction": None,          # unit vector along the seam
+        "last_end_mm": None
+    }
+
+def arc_mask(volts, was_on):
+    """Arc state per sample: on below ARC_ON_VOLTAGE, off above ARC_OFF_VOLTAGE, unchanged in between."""
+    last = np.where((volts < ARC_ON_VOLTAGE) | (volts > ARC_OFF_VOLTAGE), np.arange(len(volts)), -1)
+    np.maximum.accumulate(last, out=last)  # index of the last decisive sample
+    return np.where(last >= 0, volts[np.maximum(last, 0)] < ARC_ON_VOLTAGE, was_on)
+
+def _finish(state, end_ns):
+    if not state["partial"] and end_ns - state["start_ns"] >= MIN_SEGMENT_SECONDS * 1e9:
+        state["finished"].append((state["start_ns"], end_ns))
+        del state["finished"][:-MAX_PENDING_SEGMENTS]
+    state["start_ns"], state["off_ns"], state["partial"] = None, None, False
+
+def detect_segments(state, t_ns, volts):
+    """Scans one chunk of voltage samples (t_ns int64, volts) and moves completed segments to 'finished'."""
+    if len(t_ns) == 0:
+        return state
+    gap = state["t_ns"] is not None and t_ns[0] - state["t_ns"] > MAX_GAP_SECONDS * 1e9
+    if gap and state["start_ns"] is not None:
+        _finish(state, state["off_ns"] or state["t_ns"])  # device was silent: close where the data stopped
+    if state["arc_on"] is None or gap:
+        # Start of the scan: an arc already burning is a segment whose start is unknown
+        state["arc_on"] = bool(volts[0] < ARC_ON_VOLTAGE)
+        if state["arc_on"]:
+            state["start_ns"], state["partial"] = int(t_ns[0]), True
+
+    arc = arc_mask(volts, state["arc_on"])
+    edges = np.flatnonzero(np.diff(arc, prepend=state["arc_on"]))
+    min_gap_ns = MIN_ARC_GAP_SECONDS * 1e9
+    for i in edges:
+        t = int(t_ns[i])
+        if arc[i]:
+            if state["off_ns"] is not None and t - state["off_ns"] >= min_gap_ns:
+                _finish(state, state["off_ns"])
+            if state["start_ns"] is None:
+                state["start_ns"] = t
+            state["off_ns"] = None
+        else:
+            state["off_ns"] = t
+    state["arc_on"] = bool(arc[-1])
+    state["t_ns"] = int(t_ns[-1]) + 1
+    if state["off_ns"] is not None and state["t_ns"] - state["off_ns"] >= min_gap_ns:
+        _finish(state, state["off_ns"])
+    return state
+
+def scan_device(device_id, state):
+    """Integrates the device's new IMU samples and scans its new voltage samples."""
+    update_trajectory(device_id)
+    end_ns = latest_timestamp(device_id, "voltage")
+    if end_ns is None:
+        return state
+    start_ns = state["t_ns"] if state["t_ns"] is not None else end_ns - SEGMENT_BACKFILL_SECONDS * 10**9
+    if end_ns > start_ns:
+        t_ns, volts = read_stream(device_id, "voltage", start_ns, end_ns)
+        detect_segments(state, t_ns, volts[:, 0])
+    return state
+
+def settled_segments(device_id, state):
+    """
+    Removes and returns the finished segments whose torch positions are final, as
+    (start_ns, end_ns, position at arc on, position at arc off), positions NaN if not tracked.
+    """
+    ready = []
+    while state["finished"]:
+        start_ns, end_ns = state["finished"][0]
+        positions = settled_positions(device_id, [start_ns, end_ns])
+        if positions is None:
+            if state["t_ns"] - end_ns < SEGMENT_IMU_WAIT_SECONDS * 1e9:
+                break
+            positions = np.full((2, 3), np.nan)
+        state["finished"].pop(0)
+        ready.append((start_ns, end_ns, positions[0], positions[1]))
+    return ready
+
+def measure_segment(state, p_start, p_end):
+    """(length start mm, length end mm, pass number) of a segment, continuing the state's job."""
+    if np.isnan(p_start).any() or np.isnan(p_end).any():
+        state["pass"] = max(state["pass"], 1)
+        return None, None, state["pass"]
+    if state["origin"] is None:
+        chord = p_end - p_start
+        state["origin"] = p_start
+        state["direction"] = chord / np.linalg.norm(chord) if np.linalg.norm(chord) * 1000 >= MIN_SEAM_MM else np.array([1.0, 0.0, 0.0])
+    length_start, length_end = ((p - state["origin"]) @ state["direction"] * 1000 for p in (p_start, p_end))
+    if state["pass"] == 0 or (state["last_end_mm"] is not None and length_start < state["last_end_mm"] - PASS_RESTART_MM):
+        state["pass"] += 1
+    state["last_end_mm"] = length_end
+    return float(length_start), float(length_end), state["pass"]
+
+def _load_job(cur, device_id, state):
+    """Starts a new job in the state when the device has been registered again (continues its pass count)."""
+    try:
+        cur.execute("SELECT extract(epoch FROM max(created_at)::timestamptz) FROM weld_details WHERE deviceid = %s", (device_id,))
+        registered = cur.fetchone()[0]
+    except Exception:
+        cur.connection.rollback()  # no weld registry (demo mode): one job per device
+        registered = None
+    job_ns = int(float(registered) * 1e9) if registered is not None else None
+    if state["job_loaded"] and job_ns == state["job_ns"]:
+        return
+    cur.execute("""
+        SELECT pass_number FROM weld_segments
+        WHERE deviceid = %s AND (%s IS NULL OR start_time >= to_timestamp(%s))
+        ORDER BY start_time DESC LIMIT 1
+    """, (device_id, registered, registered))
+    row = cur.fetchone()
+    state.update(job_ns=job_ns, job_loaded=True, origin=None, direction=None, last_end_mm=None)
+    state["pass"] = row[0] if row else 0
+
+def store_segments(conn, device_id, state):
+    """Measures and inserts the device's settled segments; returns the number stored."""
+    ready = settled_segments(device_id, state)
+    if not ready:
+        return 0
+    try:
+        with conn.cursor() as cur:
+            _load_job(cur, device_id, state)
+            rows = [
+                (device_id, start_ns / 1e9, end_ns / 1e9, *measure_segment(state, p_start, p_end))
+                for start_ns, end_ns, p_start, p_end in ready
+            ]
+            execute_values(cur, """
+                INSERT INTO weld_segments (deviceid, start_time, end_time, length_start_mm, length_end_mm, pass_number)
+                VALUES %s ON CONFLICT (deviceid, start_time) DO NOTHING
+            """, rows, template="(%s, to_timestamp(%s), to_timestamp(%s), %s, %s, %s)")
+        conn.commit()
+        return len(rows)
+    except Exception as e:
+        conn.rollback()
+        state["finished"][:0] = [(start_ns, end_ns) for start_ns, end_ns, _, _ in ready]  # retried next poll
+        state["job_loaded"] = False
+        print(f"Error storing weld segments of {device_id}: {e}")
+        return 0
+
+def _resume_points():
+    """End (ns) of the last stored segment per device, to continue scanning there after a restart."""
+    conn = connect_db()
+    if conn is None:
+        return {}
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT deviceid, extract(epoch FROM max(end_time)) FROM weld_segments GROUP BY deviceid")
+            return {device_id: int(float(end) * 1e9) for device_id, end in cur.fetchall()}
+    except Exception as e:
+        print(f"Error reading weld segments: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def update_segments(states, resume=None):
+    """One pass over every device of the sensor store; returns the number of segments stored."""
+    resume = resume or {}
+    for device_id in list_devices():
+        if device_id not in states:
+            latest = latest_timestamp(device_id, "voltage")
+            start_ns = None
+            if device_id in resume and latest is not None:
+                start_ns = max(resume[device_id], latest - SEGMENT_BACKFILL_SECONDS * 10**9)
+            states[device_id] = new_segment_state(start_ns)
+        scan_device(device_id, states[device_id])
+    if not any(state["finished"] for state in states.values()):
+        return 0
+
+    conn = connect_db()
+    if conn is None:
+        return 0
+    try:
+        return sum(store_segments(conn, device_id, state) for device_id, state in states.items() if state["finished"])
+    finally:
+        conn.close()
+
+def _segment_loop(interval):
+    while not create_segment_table():
+        time.sleep(30)
+    states, resume = {}, _resume_points()
+    while True:
+        started = time.monotonic()
+        try:
+            if update_segments(states, resume):
+                load_segments.clear()
+        except Exception as e:
+            print(f"Weld segment worker: {e}")
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+@st.cache_resource
+def start_segment_worker(interval=SEGMENT_POLL_SECONDS):
+    """Starts the background weld segment detection thread once per process."""
+    thread = threading.Thread(target=_segment_loop, args=(interval,), daemon=True, name="weld-segments")
+    thread.start()
+    return thread
+
+@st.cache_data(ttl=SEGMENT_CACHE_TTL)
+def load_segments(device_id, limit=SEGMENT_CARD_ROWS):
+    """The device's latest weld segments, newest first, as the Rework/Old Data card shows them."""
+    columns = ["Date/Time", "Length Start (mm)", "Length End (mm)", "Pass"]
+    conn = connect_db()
+    if conn is None:
+        return pd.DataFrame(columns=columns)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT start_time, length_start_mm, length_end_mm, pass_number FROM weld_segments
+                WHERE deviceid = %s ORDER BY start_time DESC LIMIT %s
+            """, (device_id, limit))
+            rows = cur.fetchall()
+    except Exception as e:
+        st.error(f"Error reading weld segments: {e}")
+        return pd.DataFrame(columns=columns)
+    finally:
+        conn.close()
+    return pd.DataFrame(
+        [(start.astimezone().strftime("%d-%m-%Y %I:%M %p"), length_start, length_end, pass_no)
+         for start, length_start, length_end, pass_no in rows],
+        columns=columns
+    )